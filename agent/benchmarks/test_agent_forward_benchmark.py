@@ -0,0 +1,71 @@
+"""
+Per-step MettaAgent inference latency at the small batch sizes used by evaluation and play, where Python overhead in
+walking the component DAG is a large part of each step.
+
+"recursive" runs the output components the way forward() used to, letting each layer recurse through its sources and
+skip those already in the TensorDict. "plan" is forward() with the flat execution plan, and "compiled" adds
+compile_plan so the components between LSTMs run under torch.compile.
+"""
+
+import gymnasium as gym
+import numpy as np
+import pytest
+import torch
+from omegaconf import OmegaConf
+
+from metta.agent.metta_agent import MettaAgent
+from metta.agent.policy_state import PolicyState
+from metta.common.util.fs import get_repo_root
+
+NUM_TOKENS = 200
+
+
+def make_agent(agent_cfg: str, compile_plan: bool) -> MettaAgent:
+    cfg = OmegaConf.to_container(OmegaConf.load(get_repo_root() / "configs" / "agent" / f"{agent_cfg}.yaml"))
+    cfg.pop("_target_")
+    obs_space = gym.spaces.Dict(
+        {
+            "grid_obs": gym.spaces.Box(low=0, high=255, shape=(NUM_TOKENS, 3), dtype=np.uint8),
+            "global_vars": gym.spaces.Box(low=-np.inf, high=np.inf, shape=[0], dtype=np.int32),
+        }
+    )
+    agent = MettaAgent(
+        obs_space=obs_space,
+        obs_width=11,
+        obs_height=11,
+        action_space=gym.spaces.MultiDiscrete([3, 4]),
+        feature_normalizations={i: 1.0 for i in range(20)},
+        device="cpu",
+        compile_plan=compile_plan,
+        **cfg,
+    )
+    agent.activate_actions(["noop", "move", "rotate"], [0, 1, 3], "cpu")
+    return agent.eval()
+
+
+def make_obs(batch_size: int) -> torch.Tensor:
+    g = torch.Generator().manual_seed(0)
+    obs = torch.full((batch_size, NUM_TOKENS, 3), 255, dtype=torch.uint8)
+    for b in range(batch_size):
+        n = int(torch.randint(25, 95, (1,), generator=g))
+        x, y = torch.randint(0, 11, (2, n), generator=g)
+        obs[b, :n, 0] = (x << 4 | y).to(torch.uint8)
+        obs[b, :n, 1] = torch.randint(0, 20, (n,), generator=g).to(torch.uint8)
+        obs[b, :n, 2] = torch.randint(0, 5, (n,), generator=g).to(torch.uint8)
+    return obs
+
+
+@pytest.mark.parametrize("mode", ["recursive", "plan", "compiled"])
+@pytest.mark.parametrize("batch_size", [1, 8, 64])
+@pytest.mark.parametrize("agent_cfg", ["fast", "latent_attn_small"])
+def test_agent_inference_step(benchmark, agent_cfg, batch_size, mode):
+    torch.manual_seed(0)
+    agent = make_agent(agent_cfg, compile_plan=mode == "compiled")
+    obs = make_obs(batch_size)
+    state = PolicyState()
+    if mode == "recursive":
+        # A plan that just calls the output components is exactly what forward() used to do.
+        agent.__dict__["_execution_plan"] = [agent.components["_value_"], agent.components["_action_"]]
+
+    with torch.no_grad():
+        benchmark.pedantic(agent, args=(obs, state), rounds=200, warmup_rounds=5)
@@ -0,0 +1,98 @@
+"""
+Token observation encoder throughput, padded vs packed (ObsTokenPadStrip(packed=True)).
+
+Batches are made of real arena observations, so the benchmark sees the token densities MettaGrid actually produces:
+around 50 of the 200 token slots are used on average, but the densest observation in a batch usually has about twice
+that, which is where the padded path strips to.
+
+The arena maps are built by metta.map, so these benchmarks need the full metta repo.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+import torch
+from hydra import compose, initialize_config_dir
+from omegaconf import OmegaConf
+
+from metta.agent.lib.obs_enc import ObsLatentAttn
+from metta.agent.lib.obs_tokenizers import ObsAttrEmbedFourier, ObsAttrValNorm, ObsTokenPadStrip
+
+pytest.importorskip("metta.map.mapgen")
+resolvers = pytest.importorskip("metta.common.util.resolvers")
+mettagrid_env = pytest.importorskip("metta.mettagrid.mettagrid_env")
+curriculum = pytest.importorskip("metta.mettagrid.curriculum.core")
+actions = pytest.importorskip("metta.mettagrid.util.actions")
+
+CONFIGS_DIR = Path(__file__).resolve().parents[2] / "configs"
+BATCH_SIZE = 2048
+DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+
+def arena_observations(arena: str, batch_size: int) -> torch.Tensor:
+    """Observations from random play on an arena map, shuffled so each batch mixes agents and steps."""
+    resolvers.register_resolvers()
+    with initialize_config_dir(config_dir=str(CONFIGS_DIR), version_base=None):
+        cfg = compose(config_name=f"env/mettagrid/arena/{arena}").env.mettagrid.arena
+    OmegaConf.set_struct(cfg, False)
+    cfg.game.num_agents = 24
+    env = mettagrid_env.MettaGridEnv(curriculum.SingleTaskCurriculum("packed_obs", task_cfg=cfg), render_mode=None)
+    obs, _ = env.reset(seed=42)
+    steps = []
+    for seed in range(batch_size // env.num_agents + 1):
+        obs, *_ = env.step(actions.generate_valid_random_actions(env, num_agents=env.num_agents, seed=seed))
+        steps.append(obs.copy())
+    env.close()
+    all_obs = np.concatenate(steps)
+    return torch.from_numpy(all_obs[np.random.default_rng(0).permutation(len(all_obs))[:batch_size]])
+
+
+def latent_attn_encoder(obs_shape, packed: bool) -> ObsLatentAttn:
+    """The token encoder of configs/agent/latent_attn_small.yaml."""
+    strip = ObsTokenPadStrip(obs_shape=obs_shape, packed=packed, name="_obs_")
+    norm = ObsAttrValNorm(feature_normalizations=[10.0] * 256, name="obs_normalizer", sources=[{"name": "_obs_"}])
+    fourier = ObsAttrEmbedFourier(
+        attr_embed_dim=8, num_freqs=8, name="obs_fourier", sources=[{"name": "obs_normalizer"}]
+    )
+    attn = ObsLatentAttn(
+        out_dim=32,
+        use_mask=True,
+        num_query_tokens=10,
+        query_token_dim=32,
+        num_heads=4,
+        name="obs_latent_query_attn",
+        sources=[{"name": "obs_fourier"}],
+    )
+    strip.setup()
+    norm.setup({"_obs_": strip})
+    fourier.setup({"obs_normalizer": norm})
+    attn.setup({"obs_fourier": fourier})
+    return attn.to(DEVICE)
+
+
+@pytest.mark.parametrize("packed", [False, True], ids=["padded", "packed"])
+@pytest.mark.parametrize("arena", ["basic", "combat"])
+def test_token_encoder_training_step(benchmark, arena, packed):
+    torch.manual_seed(0)
+    obs = arena_observations(arena, BATCH_SIZE).to(DEVICE)
+    encoder = latent_attn_encoder(tuple(obs.shape[1:]), packed)
+
+    def run_step():
+        td = encoder({"x": obs})
+        td["obs_latent_query_attn"].square().mean().backward()
+        if DEVICE.type == "cuda":
+            torch.cuda.synchronize()
+        return td
+
+    td = benchmark.pedantic(run_step, rounds=10, warmup_rounds=2)
+
+    real_tokens = int((obs[..., 0] != 255).sum())
+    encoded_tokens = td["obs_fourier"].shape[:-1].numel()
+    benchmark.extra_info.update(
+        {
+            "device": DEVICE.type,
+            "mean_tokens": real_tokens / BATCH_SIZE,
+            "encoded_token_fraction": real_tokens / encoded_tokens,
+        }
+    )
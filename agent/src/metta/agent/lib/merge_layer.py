@@ -73,11 +73,14 @@ class MergeLayerBase(LayerBase):
         raise NotImplementedError("Subclasses should implement this method.")
 
     def forward(self, td: TensorDict):
+        for src_cfg in self._sources:
+            self._source_components[src_cfg["name"]].forward(td)
+        return self._forward(td)
+
+    def _forward(self, td: TensorDict):
         outputs = []
-        # TODO: do this without a for loop or dictionary lookup for perf
         for src_cfg in self._sources:
             source_name = src_cfg["name"]
-            self._source_components[source_name].forward(td)
             src_tensor = td[source_name]
 
             if "_slice_params" in src_cfg:
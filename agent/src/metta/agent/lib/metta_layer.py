@@ -54,8 +54,8 @@ class LayerBase(nn.Module):
             sources = cfg.pop("sources")
         self._sources = sources
         if self._sources is not None:
-            # convert from omegaconf's list class
-            self._sources = list(self._sources)
+            # convert from omegaconf's list and dict classes, whose item lookups are slow enough to show up in forward
+            self._sources = [dict(source) for source in self._sources]
 
         # Extract nn_params from cfg if not provided directly
         if nn_params is None and "_nn_params" in cfg:
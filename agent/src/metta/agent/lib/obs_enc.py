@@ -6,6 +6,7 @@ import torch.nn as nn
 from tensordict import TensorDict
 
 from metta.agent.lib.nn_layer_library import LayerBase
+from metta.agent.lib.packed_attn import packed_cross_attention
 
 
 class ObsLatentAttn(LayerBase):
@@ -50,7 +51,9 @@ class ObsLatentAttn(LayerBase):
 
     Input TensorDict:
         - `x_features` (from `self._sources[0]["name"]`): Tensor of shape `[B_TT, M, feat_dim]`
-          containing the input features.
+          containing the input features, or `[N, feat_dim]` packed tokens from `ObsTokenPadStrip(packed=True)`.
+          Packed tokens are attended per sequence using `obs_cu_seqlens` and `obs_max_seqlen`, and `use_mask`
+          is ignored since there is no padding to mask.
         - `obs_mask` (optional, if `use_mask` is True): Tensor of shape `[B_TT, M]` indicating
           elements to be masked (True for masked).
         - `_BxTT_`: Batch-time dimension.
@@ -150,8 +153,9 @@ class ObsLatentAttn(LayerBase):
 
     def _forward(self, td: TensorDict) -> TensorDict:
         x_features = td[self._sources[0]["name"]]
+        packed = x_features.dim() == 2
         key_mask = None
-        if self._use_mask:
+        if self._use_mask and not packed:
             key_mask = td["obs_mask"]
         B_TT = td["_BxTT_"]
 
@@ -161,26 +165,38 @@ class ObsLatentAttn(LayerBase):
         k_p = self.k_proj(kv_norm)
         v_p = self.v_proj(kv_norm)
 
-        k_p = einops.rearrange(k_p, "b m (h d) -> b h m d", h=self._num_heads)
-        v_p = einops.rearrange(v_p, "b m (h d) -> b h m d", h=self._num_heads)
+        if packed:
+            k_p = einops.rearrange(k_p, "n (h d) -> n h d", h=self._num_heads)
+            v_p = einops.rearrange(v_p, "n (h d) -> n h d", h=self._num_heads)
+        else:
+            k_p = einops.rearrange(k_p, "b m (h d) -> b h m d", h=self._num_heads)
+            v_p = einops.rearrange(v_p, "b m (h d) -> b h m d", h=self._num_heads)
 
         for layer in self.layers:
             # Attention block
             queries_res = queries
             queries_norm = layer["norm1"](queries)
             q_p = layer["q_proj"](queries_norm)
-            q_p = einops.rearrange(q_p, "b q (h d) -> b h q d", h=self._num_heads)
 
-            attn_scores = torch.einsum("bhqd,bhkd->bhqk", q_p, k_p) * self._scale
+            if packed:
+                q_p = einops.rearrange(q_p, "b q (h d) -> b q h d", h=self._num_heads)
+                attn_output = packed_cross_attention(
+                    q_p, k_p, v_p, td["obs_cu_seqlens"], td["obs_max_seqlen"], self._scale
+                )
+                attn_output = einops.rearrange(attn_output, "b q h d -> b q (h d)")
+            else:
+                q_p = einops.rearrange(q_p, "b q (h d) -> b h q d", h=self._num_heads)
 
-            if key_mask is not None:
-                mask_value = -torch.finfo(attn_scores.dtype).max
-                # key_mask: [B_TT, M] -> [B_TT, 1, 1, M] for broadcasting
-                attn_scores = attn_scores + key_mask.unsqueeze(1).unsqueeze(1).to(attn_scores.dtype) * mask_value
+                attn_scores = torch.einsum("bhqd,bhkd->bhqk", q_p, k_p) * self._scale
+
+                if key_mask is not None:
+                    mask_value = -torch.finfo(attn_scores.dtype).max
+                    # key_mask: [B_TT, M] -> [B_TT, 1, 1, M] for broadcasting
+                    attn_scores = attn_scores + key_mask.unsqueeze(1).unsqueeze(1).to(attn_scores.dtype) * mask_value
 
-            attn_weights = torch.softmax(attn_scores, dim=-1)
-            attn_output = torch.einsum("bhqk,bhkd->bhqd", attn_weights, v_p)
-            attn_output = einops.rearrange(attn_output, "b h q d -> b q (h d)")
+                attn_weights = torch.softmax(attn_scores, dim=-1)
+                attn_output = torch.einsum("bhqk,bhkd->bhqd", attn_weights, v_p)
+                attn_output = einops.rearrange(attn_output, "b h q d -> b q (h d)")
             attn_output = layer["attn_out_proj"](attn_output)
 
             # reesidgual konnectshun
@@ -260,6 +276,8 @@ class ObsSelfAttn(LayerBase):
 
     def _forward(self, td: TensorDict) -> TensorDict:
         x_features = td[self._sources[0]["name"]]
+        if x_features.dim() == 2:
+            raise ValueError(f"{self._name} can't attend over packed tokens; pool them with ObsLatentAttn first")
         if self._use_cls_token:
             x_features = torch.cat([self._cls_token.expand(x_features.shape[0], -1, -1), x_features], dim=1)
 
@@ -6,6 +6,7 @@ import torch.nn as nn
 from tensordict import TensorDict
 
 from metta.agent.lib.nn_layer_library import LayerBase
+from metta.agent.lib.packed_attn import pack_tokens
 
 
 class ObsTokenPadStrip(LayerBase):
@@ -18,16 +19,23 @@ class ObsTokenPadStrip(LayerBase):
     eliminates the padding tokens from the the sequence with the fewest padding tokens and also removes that number of
     padding tokens from all other sequences. In practice, the sequence with the most dense tokens can have many more
     dense tokens than the average sequence so there is room for improvement by computing attention over ragged tensors.
+
+    With packed=True it drops every padding token instead and returns a tensor of shape [N, 3] holding the real tokens
+    of all sequences back to back, along with their offsets in `obs_cu_seqlens` and the longest length in
+    `obs_max_seqlen` (see packed_attn.py). ObsLatentAttn recognizes packed input by its shape and attends over the real
+    tokens only.
     """
 
     def __init__(
         self,
         obs_shape: Tuple[int, ...],
+        packed: bool = False,
         **cfg,
     ) -> None:
         super().__init__(**cfg)
         self._obs_shape = obs_shape
         self._M = obs_shape[0]
+        self._packed = packed
         # Initialize feature remapping as identity by default
         self.register_buffer("feature_id_remap", torch.arange(256, dtype=torch.uint8))
         self._remapping_active = False
@@ -73,8 +81,17 @@ class ObsTokenPadStrip(LayerBase):
         coords = observations[..., 0]
         obs_mask = coords == 255  # important! true means mask me
 
+        if self._packed:
+            observations, cu_seqlens, max_seqlen = pack_tokens(observations, obs_mask)
+            td[self._name] = observations
+            td["obs_cu_seqlens"] = cu_seqlens
+            td["obs_max_seqlen"] = max_seqlen
+            return td
+
         # find each row's flip‐point ie when it goes from dense to padding
         flip_pts = obs_mask.int().argmax(dim=1)  # shape [B]
+        # argmax is 0 for rows without any padding, but those need all M columns
+        flip_pts = torch.where(obs_mask.any(dim=1), flip_pts, self._M)
 
         # find the global max flip‐point as a 0‐d tensor
         max_flip = flip_pts.max()
@@ -251,9 +268,8 @@ class ObsAttrEmbedFourier(LayerBase):
         x_coords_norm = x_coords_norm.unsqueeze(-1)  # [B_TT, M, 1]
         y_coords_norm = y_coords_norm.unsqueeze(-1)  # [B_TT, M, 1]
 
-        # Get frequencies and reshape for broadcasting
-        # self.frequencies is [f], reshape to [1, 1, f]
-        frequencies = self.get_buffer("frequencies").view(1, 1, -1)
+        # self.frequencies is [f], which broadcasts against the trailing 1 of both padded and packed coords
+        frequencies = self.get_buffer("frequencies")
 
         # Compute scaled coordinates for Fourier features
         x_scaled = x_coords_norm * frequencies
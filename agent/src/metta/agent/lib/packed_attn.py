@@ -0,0 +1,117 @@
+"""
+Attention over packed token sequences.
+
+With ObsTokenPadStrip(packed=True), padding tokens are dropped and the real tokens of every sequence in the batch are
+stored back to back in one [N, ...] tensor. The sequence boundaries travel alongside it in the TensorDict:
+- `obs_cu_seqlens`: [B_TT + 1] cumulative offsets (int32), so sequence b is rows cu_seqlens[b]:cu_seqlens[b + 1]
+- `obs_max_seqlen`: the number of tokens in the longest sequence, as a python int
+
+Token-wise layers (ObsAttrValNorm, ObsAttrCoordEmbed, ObsAttrEmbedFourier, ObsAttrCoordValueEmbed) work on the packed
+tensor unchanged since they only index the last dimension. The attention layers that pool tokens into a fixed number of
+outputs per sequence call packed_cross_attention() instead of masking a padded [B_TT, M] batch.
+"""
+
+import torch
+import torch.nn.functional as F
+
+
+def pack_tokens(observations: torch.Tensor, obs_mask: torch.Tensor) -> tuple[torch.Tensor, torch.Tensor, int]:
+    """
+    Packs the unmasked tokens of a [B, M, ...] batch into one [N, ...] tensor.
+
+    Returns the packed tokens, the cumulative sequence offsets and the longest sequence length.
+    """
+    keep = ~obs_mask
+    seqlens = keep.sum(dim=1)
+    cu_seqlens = F.pad(seqlens.cumsum(dim=0), (1, 0)).to(torch.int32)
+    max_seqlen = int(seqlens.max()) if seqlens.numel() > 0 else 0
+    # Boolean indexing walks the batch in row-major order, so each sequence's tokens stay contiguous and in order.
+    return observations[keep], cu_seqlens, max_seqlen
+
+
+def packed_cross_attention(
+    q: torch.Tensor,
+    k: torch.Tensor,
+    v: torch.Tensor,
+    cu_seqlens: torch.Tensor,
+    max_seqlen: int,
+    scale: float,
+    num_buckets: int = 4,
+) -> torch.Tensor:
+    """
+    Multi-head attention from a fixed number of queries per sequence to that sequence's packed keys and values.
+
+    Args:
+        q: [B, Q, H, qk_head_dim] queries. May be an expanded view when every sequence shares the same queries.
+        k: [N, H, qk_head_dim] packed keys.
+        v: [N, H, v_head_dim] packed values.
+        cu_seqlens: [B + 1] cumulative sequence offsets into k and v.
+        max_seqlen: Length of the longest sequence.
+        scale: Multiplier applied to the attention scores.
+        num_buckets: CPU only. Sequences are sorted by length and attended in this many buckets, each padded only to its
+            own longest sequence.
+
+    Returns:
+        [B, Q, H, v_head_dim] attention outputs. Sequences with no tokens get zeros.
+    """
+    if q.is_cuda:
+        return _nested_cross_attention(q, k, v, cu_seqlens, max_seqlen, scale)
+    return _bucketed_cross_attention(q, k, v, cu_seqlens, scale, num_buckets)
+
+
+def _nested_cross_attention(
+    q: torch.Tensor, k: torch.Tensor, v: torch.Tensor, cu_seqlens: torch.Tensor, max_seqlen: int, scale: float
+) -> torch.Tensor:
+    # Jagged nested tensors let scaled_dot_product_attention dispatch to its varlen flash / memory-efficient kernels,
+    # which take the offsets directly and never see a padding token.
+    B, Q, H, _ = q.shape
+    # The kernels have no keys to normalize over in an empty sequence, so those are left out and come out as zeros.
+    nonempty = cu_seqlens.diff().nonzero().squeeze(1)
+    if len(nonempty) < B:
+        out = q.new_zeros(B, Q, H, v.shape[-1])
+        if len(nonempty) > 0:
+            nonempty_cu_seqlens = F.pad(cu_seqlens[1:][nonempty], (1, 0))
+            out[nonempty] = _nested_cross_attention(q[nonempty], k, v, nonempty_cu_seqlens, max_seqlen, scale)
+        return out
+
+    q_offsets = torch.arange(0, (B + 1) * Q, Q, device=q.device)
+    q_nt = torch.nested.nested_tensor_from_jagged(q.reshape(B * Q, H, -1), q_offsets, max_seqlen=Q)
+    k_nt = torch.nested.nested_tensor_from_jagged(k, cu_seqlens.long(), max_seqlen=max_seqlen)
+    v_nt = torch.nested.nested_tensor_from_jagged(v, cu_seqlens.long(), max_seqlen=max_seqlen)
+    out = F.scaled_dot_product_attention(q_nt.transpose(1, 2), k_nt.transpose(1, 2), v_nt.transpose(1, 2), scale=scale)
+    return out.transpose(1, 2).values().view(B, Q, H, -1)
+
+
+def _bucketed_cross_attention(
+    q: torch.Tensor, k: torch.Tensor, v: torch.Tensor, cu_seqlens: torch.Tensor, scale: float, num_buckets: int
+) -> torch.Tensor:
+    # There are no varlen attention kernels on CPU, and segment-wise softmax built from scatter ops is several times
+    # slower than one dense masked attention. Attending over length-sorted buckets keeps the dense kernels while only
+    # padding each sequence to the longest one in its bucket.
+    starts = cu_seqlens[:-1].long()
+    seqlens = cu_seqlens.diff().long()
+    order = torch.argsort(seqlens)
+    outputs = []
+    for idx in order.chunk(num_buckets):
+        lens = seqlens[idx]
+        max_len = int(lens.max())
+        if max_len == 0:
+            outputs.append(q.new_zeros(len(idx), q.shape[1], v.shape[1], v.shape[2]))
+            continue
+        positions = torch.arange(max_len, device=k.device)
+        valid = positions < lens.unsqueeze(1)  # [b, m]
+        # Padding positions point at some real row (the sequence's own first one, where it has any); their scores are
+        # masked out below.
+        token_idx = (starts[idx].unsqueeze(1) + positions * valid).clamp_(max=k.shape[0] - 1)
+        k_b = k[token_idx]  # [b, m, H, d]
+        v_b = v[token_idx] * valid[..., None, None]  # zeroed so that empty sequences come out as zeros
+
+        attn_scores = torch.einsum("bqhd,bmhd->bhqm", q[idx], k_b) * scale
+        mask_value = -torch.finfo(attn_scores.dtype).max
+        attn_scores = attn_scores.masked_fill(~valid[:, None, None, :], mask_value)
+        attn_weights = torch.softmax(attn_scores, dim=-1)
+        outputs.append(torch.einsum("bhqm,bmhd->bqhd", attn_weights, v_b))
+
+    inverse_order = torch.empty_like(order)
+    inverse_order[order] = torch.arange(len(order), device=order.device)
+    return torch.cat(outputs)[inverse_order]
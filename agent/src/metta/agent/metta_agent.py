@@ -8,6 +8,8 @@ from omegaconf import DictConfig, OmegaConf
 from torch import nn
 from torch.nn.parallel import DistributedDataParallel
 
+from metta.agent.lib.lstm import LSTM
+from metta.agent.lib.metta_layer import LayerBase
 from metta.agent.policy_state import PolicyState
 from metta.agent.util.debug import assert_shape
 from metta.agent.util.distribution_utils import evaluate_actions, sample_actions
@@ -19,6 +21,9 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger("metta_agent")
 
+# The components whose outputs MettaAgent.forward reads, in the order they are computed.
+OUTPUT_COMPONENTS = ("_value_", "_action_")
+
 
 def make_policy(env: "MettaGridEnv", cfg: DictConfig) -> "MettaAgent":
     obs_space = gym.spaces.Dict(
@@ -44,6 +49,17 @@ def make_policy(env: "MettaGridEnv", cfg: DictConfig) -> "MettaAgent":
     )
 
 
+class _PlanSegment:
+    """A run of execution plan steps called back to back, so torch.compile can trace them as one function."""
+
+    def __init__(self, steps: list):
+        self.steps = steps
+
+    def __call__(self, td: dict) -> None:
+        for step in self.steps:
+            step(td)
+
+
 class DistributedMettaAgent(DistributedDataParallel):
     def __init__(self, agent, device):
         logger.info("Converting BatchNorm layers to SyncBatchNorm for distributed training...")
@@ -92,6 +108,7 @@ class MettaAgent(nn.Module):
         self.hidden_size = cfg.components._core_.output_size
         self.core_num_layers = cfg.components._core_.nn_params.num_layers
         self.clip_range = cfg.clip_range
+        self._compile_plan = cfg.get("compile_plan", False)  # torch.compile the execution plan between LSTMs
 
         assert hasattr(cfg.observations, "obs_key") and cfg.observations.obs_key is not None, (
             "Configuration is missing required field 'observations.obs_key'"
@@ -129,10 +146,8 @@ class MettaAgent(nn.Module):
             # Instantiate component
             self.components[component_name] = instantiate(comp_dict)
 
-        component = self.components["_value_"]
-        self._setup_components(component)
-        component = self.components["_action_"]
-        self._setup_components(component)
+        for name in OUTPUT_COMPONENTS:
+            self._setup_components(self.components[name])
 
         for name, component in self.components.items():
             if not getattr(component, "ready", False):
@@ -164,6 +179,59 @@ class MettaAgent(nn.Module):
                 source_components[source["name"]] = self.components[source["name"]]
         component.setup(source_components)
 
+    def _execution_order(self) -> list[str]:
+        """Names of the components the outputs depend on, each after all of its sources."""
+        order = []
+        visited = set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            visited.add(name)
+            for source in self.components[name]._sources or []:
+                visit(source["name"])
+            order.append(name)
+
+        for name in OUTPUT_COMPONENTS:
+            visit(name)
+        return order
+
+    def _build_execution_plan(self) -> list:
+        """
+        Flattens the component DAG into the steps forward() runs in order.
+
+        Each step calls the component's _forward directly, so nothing recurses through sources or checks whether an
+        output is already in the TensorDict. With compile_plan set, each run of steps between LSTM components is
+        wrapped in torch.compile as one unit. The plan is derived from the components and rebuilt on demand, so it is
+        never pickled with the agent.
+        """
+        compile_plan = self.__dict__.get("_compile_plan", False)
+        plan = []
+        segment = []
+        for name in self._execution_order():
+            component = self.components[name]
+            step = component._forward if isinstance(component, LayerBase) else component
+            if compile_plan and isinstance(component, LSTM):
+                # LSTMs run eagerly; everything between them is compiled as one segment.
+                if segment:
+                    plan.append(torch.compile(_PlanSegment(segment)))
+                    segment = []
+                plan.append(step)
+            else:
+                segment.append(step)
+        if compile_plan and segment:
+            plan.append(torch.compile(_PlanSegment(segment)))
+        elif segment:
+            plan.extend(segment)
+
+        self.__dict__["_execution_plan"] = plan
+        return plan
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_execution_plan", None)
+        return state
+
     def initialize_to_environment(
         self,
         features: dict[str, dict],
@@ -460,8 +528,12 @@ class MettaAgent(nn.Module):
             # Concatenate LSTM states along dimension 0
             td["state"] = torch.cat([lstm_h, lstm_c], dim=0)
 
-        # Forward pass through value network
-        self.components["_value_"](td)
+        plan = self.__dict__.get("_execution_plan")
+        if plan is None:
+            plan = self._build_execution_plan()
+        for step in plan:
+            step(td)
+
         value = td["_value_"]
 
         # Value shape is (BT, 1) - keeping the final dimension explicit (instead of squeezing)
@@ -470,8 +542,6 @@ class MettaAgent(nn.Module):
         if __debug__:
             assert_shape(value, ("BT", 1), "value")
 
-        # Forward pass through action network
-        self.components["_action_"](td)
         logits = td["_action_"]
 
         if __debug__:
@@ -6,6 +6,9 @@ It provides functionality to:
 - Select policies based on metadata filters
 - Track policy metadata and versioning
 
+Alongside each checkpoint it writes a small metadata sidecar, and each directory it scans gets an index of its
+checkpoints' metadata, so selecting policies by metadata doesn't have to unpickle every model.
+
 The PolicyStore is used by the training system to manage opponent policies and checkpoints.
 """
 
@@ -36,6 +39,31 @@ logger = logging.getLogger("policy_store")
 
 PolicySelectorType = Literal["all", "top", "latest", "rand"]
 
+# Index of the metadata of every checkpoint in a directory, keyed by file name; built lazily when the directory is
+# scanned, so directories of checkpoints saved without sidecars only have to be fully loaded once.
+METADATA_INDEX_FILENAME = ".policy_metadata_index"
+
+
+def metadata_sidecar_path(checkpoint_path: str) -> str:
+    """Path of the file holding just the metadata of the checkpoint at checkpoint_path."""
+    return checkpoint_path + ".metadata"
+
+
+def _file_stamp(path: str) -> tuple[int, int]:
+    """Identifies a version of a file, to tell whether metadata read from it earlier is still current."""
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _atomic_torch_save(obj: Any, path: str) -> None:
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        torch.save(obj, temp_path)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
 
 class PolicySelectorConfig:
     """Simple config class for policy selection without pydantic dependency."""
@@ -269,6 +297,8 @@ class PolicyStore:
                 except OSError:
                     pass
 
+        self._save_metadata_sidecar(pr, path)
+
         # Don't cache the policy that we just saved,
         # since it might be updated later. We always
         # load the policy from the file when needed.
@@ -276,6 +306,34 @@ class PolicyStore:
         self._cached_prs.put(path, pr)
         return pr
 
+    def _save_metadata_sidecar(self, pr: PolicyRecord, path: str) -> None:
+        entry = self._metadata_entry(pr, _file_stamp(path))
+        try:
+            _atomic_torch_save(entry, metadata_sidecar_path(path))
+        except OSError as e:
+            logger.warning(f"Failed to write metadata sidecar for {path}: {e}")
+
+    def _metadata_entry(self, pr: PolicyRecord, stamp: tuple[int, int]) -> dict[str, Any]:
+        """What a sidecar or index stores about a checkpoint: enough to rebuild its metadata-only PolicyRecord."""
+        return {"stamp": stamp, "run_name": pr.run_name, "uri": pr.uri, "metadata": dict(pr.metadata)}
+
+    def _pr_from_metadata_entry(self, entry: dict[str, Any]) -> PolicyRecord:
+        return PolicyRecord(self, entry["run_name"], entry["uri"], PolicyMetadata(**entry["metadata"]))
+
+    def _load_metadata_sidecar(self, path: str) -> dict[str, Any] | None:
+        """The checkpoint's sidecar entry, or None if it has none or the checkpoint changed since it was written."""
+        sidecar_path = metadata_sidecar_path(path)
+        if not os.path.exists(sidecar_path):
+            return None
+        try:
+            entry = torch.load(sidecar_path, weights_only=False)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable metadata sidecar {sidecar_path}: {e}")
+            return None
+        if entry.get("stamp") != _file_stamp(path):
+            return None
+        return entry
+
     def add_to_wandb_run(self, run_id: str, pr: PolicyRecord, additional_files: list[str] | None = None) -> str:
         return self.add_to_wandb_artifact(run_id, "model", pr.metadata, pr.file_path, additional_files)
 
@@ -301,13 +359,46 @@ class PolicyStore:
         return artifact.qualified_name
 
     def _prs_from_path(self, path: str) -> list[PolicyRecord]:
-        paths = []
-
         if path.endswith(".pt"):
-            paths.append(path)
-        else:
-            paths.extend([os.path.join(path, p) for p in os.listdir(path) if p.endswith(".pt")])
-        return [self._load_from_file(path, metadata_only=True) for path in paths]
+            return [self._load_from_file(path, metadata_only=True)]
+        return self._prs_from_dir(path, [p for p in os.listdir(path) if p.endswith(".pt")])
+
+    def _prs_from_dir(self, dir_path: str, filenames: list[str]) -> list[PolicyRecord]:
+        """Metadata-only records for the given checkpoints in dir_path, read from (and kept in) the dir's index."""
+        index_path = os.path.join(dir_path, METADATA_INDEX_FILENAME)
+        index: dict[str, dict[str, Any]] = {}
+        if os.path.exists(index_path):
+            try:
+                index = torch.load(index_path, weights_only=False)
+            except Exception as e:
+                logger.warning(f"Rebuilding unreadable policy metadata index {index_path}: {e}")
+
+        index_changed = False
+        prs = []
+        for filename in filenames:
+            path = os.path.join(dir_path, filename)
+            stamp = _file_stamp(path)
+            entry = index.get(filename)
+            if entry is not None and entry["stamp"] == stamp:
+                pr = self._cached_prs.get(path) or self._pr_from_metadata_entry(entry)
+                self._cached_prs.put(path, pr)
+            else:
+                pr = self._load_from_file(path, metadata_only=True)
+                index[filename] = self._metadata_entry(pr, stamp)
+                index_changed = True
+            prs.append(pr)
+
+        for filename in set(index) - set(filenames):
+            if not os.path.exists(os.path.join(dir_path, filename)):
+                del index[filename]
+                index_changed = True
+
+        if index_changed:
+            try:
+                _atomic_torch_save(index, index_path)
+            except OSError as e:
+                logger.warning(f"Failed to write policy metadata index {index_path}: {e}")
+        return prs
 
     def _prs_from_wandb_artifact(self, uri: str, version: str | None = None) -> list[PolicyRecord]:
         """
@@ -409,12 +500,19 @@ class PolicyStore:
                 return cached_pr
 
         if not path.endswith(".pt") and os.path.isdir(path):
-            path = os.path.join(path, os.listdir(path)[-1])
-
-        logger.info(f"Loading policy from {path}")
+            path = os.path.join(path, [p for p in os.listdir(path) if p.endswith(".pt")][-1])
 
         assert path.endswith(".pt"), f"Policy file {path} does not have a .pt extension"
 
+        if metadata_only:
+            entry = self._load_metadata_sidecar(path)
+            if entry is not None:
+                pr = self._pr_from_metadata_entry(entry)
+                self._cached_prs.put(path, pr)
+                return pr
+
+        logger.info(f"Loading policy from {path}")
+
         # Make codebase backwards compatible before loading
         self._make_codebase_backwards_compatible()
 
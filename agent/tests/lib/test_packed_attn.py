@@ -0,0 +1,128 @@
+import pytest
+import torch
+
+from metta.agent.lib.obs_enc import ObsLatentAttn
+from metta.agent.lib.obs_tokenizers import ObsAttrEmbedFourier, ObsAttrValNorm, ObsTokenPadStrip
+from metta.agent.lib.packed_attn import pack_tokens, packed_cross_attention
+
+NUM_TOKENS = 40
+
+
+def make_token_obs(seqlens: list[int]) -> torch.Tensor:
+    """Random token observations with seqlens[b] real tokens in row b and padding after them."""
+    g = torch.Generator().manual_seed(0)
+    obs = torch.full((len(seqlens), NUM_TOKENS, 3), 255, dtype=torch.uint8)
+    for b, n in enumerate(seqlens):
+        x = torch.randint(0, 11, (n,), generator=g)
+        y = torch.randint(0, 11, (n,), generator=g)
+        obs[b, :n, 0] = (x << 4 | y).to(torch.uint8)
+        obs[b, :n, 1] = torch.randint(0, 20, (n,), generator=g).to(torch.uint8)
+        obs[b, :n, 2] = torch.randint(0, 10, (n,), generator=g).to(torch.uint8)
+    return obs
+
+
+def make_encoder(num_layers: int) -> tuple[ObsTokenPadStrip, ObsLatentAttn]:
+    strip = ObsTokenPadStrip(obs_shape=(NUM_TOKENS, 3), name="_obs_")
+    norm = ObsAttrValNorm(feature_normalizations=[10.0] * 20, name="obs_norm", sources=[{"name": "_obs_"}])
+    fourier = ObsAttrEmbedFourier(attr_embed_dim=8, num_freqs=4, name="obs_fourier", sources=[{"name": "obs_norm"}])
+    attn = ObsLatentAttn(
+        out_dim=16,
+        use_mask=True,
+        num_query_tokens=3,
+        query_token_dim=16,
+        num_heads=4,
+        num_layers=num_layers,
+        name="obs_attn",
+        sources=[{"name": "obs_fourier"}],
+    )
+    strip.setup()
+    norm.setup({"_obs_": strip})
+    fourier.setup({"obs_norm": norm})
+    attn.setup({"obs_fourier": fourier})
+    return strip, attn
+
+
+def reference_cross_attention(q, k, v, seqlens, scale):
+    outputs = []
+    for b, (k_b, v_b) in enumerate(zip(k.split(seqlens), v.split(seqlens), strict=True)):
+        weights = torch.softmax(torch.einsum("qhd,mhd->hqm", q[b], k_b) * scale, dim=-1)
+        outputs.append(torch.einsum("hqm,mhd->qhd", weights, v_b))
+    return torch.stack(outputs)
+
+
+@pytest.mark.parametrize("num_layers", [1, 2])
+def test_packed_encoder_matches_padded(num_layers):
+    torch.manual_seed(0)
+    strip, attn = make_encoder(num_layers)
+    obs = make_token_obs([1, 5, 40, 17, 23, 9, 31, 2, 12, 40, 3])
+
+    padded = attn({"x": obs})["obs_attn"]
+    strip._packed = True
+    td = attn({"x": obs})
+    packed = td["obs_attn"]
+
+    assert td["_obs_"].shape == (183, 3)
+    assert td["obs_max_seqlen"] == 40
+    torch.testing.assert_close(packed, padded, rtol=1e-5, atol=1e-5)
+
+
+def test_pack_tokens_keeps_each_sequence_contiguous():
+    obs = make_token_obs([3, 0, 2])
+    packed, cu_seqlens, max_seqlen = pack_tokens(obs, obs[..., 0] == 255)
+
+    assert cu_seqlens.tolist() == [0, 3, 3, 5]
+    assert max_seqlen == 3
+    torch.testing.assert_close(packed, torch.cat([obs[0, :3], obs[2, :2]]))
+
+
+def test_packed_cross_attention_matches_per_sequence_attention():
+    torch.manual_seed(0)
+    seqlens = [4, 9, 1, 6, 7, 2, 8]
+    q = torch.randn(len(seqlens), 3, 2, 5, requires_grad=True)
+    k = torch.randn(sum(seqlens), 2, 5, requires_grad=True)
+    v = torch.randn(sum(seqlens), 2, 4, requires_grad=True)
+    cu_seqlens = torch.tensor([0, *torch.tensor(seqlens).cumsum(0).tolist()], dtype=torch.int32)
+
+    out = packed_cross_attention(q, k, v, cu_seqlens, max(seqlens), scale=0.5, num_buckets=3)
+    out.square().sum().backward()
+    grads = [t.grad.clone() for t in (q, k, v)]
+    for t in (q, k, v):
+        t.grad = None
+    expected = reference_cross_attention(q, k, v, seqlens, scale=0.5)
+    expected.square().sum().backward()
+
+    torch.testing.assert_close(out, expected)
+    for grad, t in zip(grads, (q, k, v), strict=True):
+        torch.testing.assert_close(grad, t.grad)
+
+
+def test_packed_cross_attention_empty_sequences_are_zero():
+    q = torch.randn(3, 2, 1, 4)
+    k = torch.randn(5, 1, 4)
+    v = torch.randn(5, 1, 4)
+    cu_seqlens = torch.tensor([0, 0, 5, 5], dtype=torch.int32)
+
+    out = packed_cross_attention(q, k, v, cu_seqlens, 5, scale=0.5, num_buckets=2)
+
+    assert torch.all(out[[0, 2]] == 0)
+    torch.testing.assert_close(out[1:2], reference_cross_attention(q[1:2], k, v, [5], scale=0.5))
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="The nested tensor path only runs on CUDA")
+def test_nested_cross_attention_matches_bucketed():
+    torch.manual_seed(0)
+    seqlens = [4, 0, 9, 1, 6, 0, 8]
+    cu_seqlens = torch.tensor([0, *torch.tensor(seqlens).cumsum(0).tolist()], dtype=torch.int32)
+    inputs = [torch.randn(len(seqlens), 3, 2, 16), torch.randn(sum(seqlens), 2, 16), torch.randn(sum(seqlens), 2, 16)]
+    outputs, grads = [], []
+    for device in ["cpu", "cuda"]:
+        q, k, v = (t.detach().to(device).requires_grad_() for t in inputs)
+        out = packed_cross_attention(q, k, v, cu_seqlens.to(device), max(seqlens), scale=0.25, num_buckets=3)
+        out.square().sum().backward()
+        outputs.append(out.detach().cpu())
+        grads.append([t.grad.cpu() for t in (q, k, v)])
+
+    assert torch.all(outputs[1][[1, 5]] == 0)
+    torch.testing.assert_close(outputs[1], outputs[0], rtol=1e-4, atol=1e-4)
+    for cuda_grad, cpu_grad in zip(grads[1], grads[0], strict=True):
+        torch.testing.assert_close(cuda_grad, cpu_grad, rtol=1e-4, atol=1e-4)
@@ -0,0 +1,91 @@
+import copy
+
+import gymnasium as gym
+import numpy as np
+import pytest
+import torch
+from omegaconf import OmegaConf
+
+from metta.agent.metta_agent import MettaAgent
+from metta.agent.policy_state import PolicyState
+from metta.common.util.fs import get_repo_root
+
+NUM_TOKENS = 200
+
+
+def make_agent(agent_cfg: str) -> MettaAgent:
+    cfg = OmegaConf.to_container(OmegaConf.load(get_repo_root() / "configs" / "agent" / f"{agent_cfg}.yaml"))
+    cfg.pop("_target_")
+    obs_space = gym.spaces.Dict(
+        {
+            "grid_obs": gym.spaces.Box(low=0, high=255, shape=(NUM_TOKENS, 3), dtype=np.uint8),
+            "global_vars": gym.spaces.Box(low=-np.inf, high=np.inf, shape=[0], dtype=np.int32),
+        }
+    )
+    agent = MettaAgent(
+        obs_space=obs_space,
+        obs_width=11,
+        obs_height=11,
+        action_space=gym.spaces.MultiDiscrete([3, 4]),
+        feature_normalizations={i: 1.0 for i in range(20)},
+        device="cpu",
+        **cfg,
+    )
+    agent.activate_actions(["noop", "move", "rotate"], [0, 1, 3], "cpu")
+    return agent
+
+
+def make_obs(batch_size: int) -> torch.Tensor:
+    g = torch.Generator().manual_seed(0)
+    obs = torch.full((batch_size, NUM_TOKENS, 3), 255, dtype=torch.uint8)
+    for b in range(batch_size):
+        n = int(torch.randint(20, 80, (1,), generator=g))
+        x, y = torch.randint(0, 11, (2, n), generator=g)
+        obs[b, :n, 0] = (x << 4 | y).to(torch.uint8)
+        obs[b, :n, 1] = torch.randint(0, 20, (n,), generator=g).to(torch.uint8)
+        obs[b, :n, 2] = torch.randint(0, 5, (n,), generator=g).to(torch.uint8)
+    return obs
+
+
+def recursive_forward(agent: MettaAgent, obs: torch.Tensor) -> dict:
+    td = {"x": obs, "state": None}
+    agent.components["_value_"](td)
+    agent.components["_action_"](td)
+    return td
+
+
+@pytest.mark.parametrize("agent_cfg", ["fast", "latent_attn_small"])
+def test_execution_order_runs_sources_first(agent_cfg):
+    agent = make_agent(agent_cfg)
+    order = agent._execution_order()
+
+    assert sorted(order) == sorted(agent.components.keys())
+    for i, name in enumerate(order):
+        for source in agent.components[name]._sources or []:
+            assert order.index(source["name"]) < i
+
+
+@pytest.mark.parametrize("agent_cfg", ["fast", "latent_attn_small"])
+def test_execution_plan_matches_recursive_forward(agent_cfg):
+    torch.manual_seed(0)
+    agent = make_agent(agent_cfg)
+    obs = make_obs(8)
+
+    expected = recursive_forward(agent, obs)
+    _, _, _, value, log_probs = agent(obs, PolicyState())
+
+    torch.testing.assert_close(value, expected["_value_"])
+    torch.testing.assert_close(log_probs, torch.log_softmax(expected["_action_"], dim=-1))
+
+
+def test_execution_plan_is_rebuilt_for_copies():
+    agent = make_agent("fast")
+    obs = make_obs(4)
+    agent(obs, PolicyState())
+
+    clone = copy.deepcopy(agent)
+
+    assert "_execution_plan" not in clone.__dict__
+    _, _, _, value, _ = clone(obs, PolicyState())
+    assert all(step.__self__ in set(clone.components.values()) for step in clone.__dict__["_execution_plan"])
+    torch.testing.assert_close(value, recursive_forward(agent, obs)["_value_"])
@@ -4,13 +4,14 @@
 import os
 import tempfile
 
+import pytest
 import torch
 from omegaconf import OmegaConf
 
 from metta.agent.mocks import MockPolicy
 from metta.agent.policy_metadata import PolicyMetadata
 from metta.agent.policy_record import PolicyRecord
-from metta.agent.policy_store import PolicyStore
+from metta.agent.policy_store import METADATA_INDEX_FILENAME, PolicyStore, metadata_sidecar_path
 
 
 def test_policy_save_load_without_pydantic():
@@ -250,6 +251,97 @@ def test_policy_record_backwards_compatibility():
         print("✅ Correctly raised AttributeError when no metadata found")
 
 
+def make_policy_store() -> PolicyStore:
+    cfg = OmegaConf.create(
+        {
+            "device": "cpu",
+            "run": "test_run",
+            "run_dir": tempfile.mkdtemp(),
+            "vectorization": "serial",
+            "trainer": {
+                "checkpoint": {"checkpoint_dir": tempfile.mkdtemp()},
+                "num_workers": 1,
+            },
+            "data_dir": tempfile.mkdtemp(),
+        }
+    )
+    return PolicyStore(cfg, wandb_run=None)
+
+
+def save_test_policy(policy_store: PolicyStore, path: str, epoch: int) -> None:
+    pr = policy_store.create_empty_policy_record(name=os.path.basename(path), override_path=path)
+    pr.metadata = PolicyMetadata(agent_step=epoch * 100, epoch=epoch, score=float(epoch), eval_scores={"nav": epoch})
+    pr.policy = MockPolicy()
+    policy_store.save(pr)
+
+
+@pytest.fixture
+def checkpoint_loads(monkeypatch):
+    """Records the checkpoint files PolicyStore fully unpickles."""
+    loaded = []
+    original_load = torch.load
+
+    def load(path, *args, **kwargs):
+        if str(path).endswith(".pt"):
+            loaded.append(os.path.basename(path))
+        return original_load(path, *args, **kwargs)
+
+    monkeypatch.setattr("metta.agent.policy_store.torch.load", load)
+    return loaded
+
+
+def test_top_policy_selection_reads_only_metadata(tmp_path, checkpoint_loads):
+    """Selecting policies from a directory of saved checkpoints reads their sidecars, not the checkpoints."""
+    for epoch in range(1, 5):
+        save_test_policy(make_policy_store(), str(tmp_path / f"model_{epoch:04d}.pt"), epoch)
+    assert os.path.exists(metadata_sidecar_path(str(tmp_path / "model_0001.pt")))
+
+    prs = make_policy_store().policy_records(str(tmp_path), selector_type="top", n=2, metric="score")
+    assert [pr.metadata["epoch"] for pr in prs] == [4, 3]
+    assert prs[0].metadata["eval_scores"] == {"nav": 4}
+    assert checkpoint_loads == []
+    assert os.path.exists(tmp_path / METADATA_INDEX_FILENAME)
+
+    # Loading the selected policy still reads its checkpoint.
+    assert type(prs[0].policy).__name__ == "MockPolicy"
+    assert checkpoint_loads == ["model_0004.pt"]
+
+
+def test_metadata_index_is_built_for_checkpoints_without_sidecars(tmp_path, checkpoint_loads):
+    """Checkpoints saved before sidecars existed are loaded once, after which the directory's index has them."""
+    for epoch in range(1, 4):
+        path = str(tmp_path / f"model_{epoch:04d}.pt")
+        save_test_policy(make_policy_store(), path, epoch)
+        os.remove(metadata_sidecar_path(path))
+
+    prs = make_policy_store().policy_records(str(tmp_path), selector_type="all")
+    assert sorted(pr.metadata["epoch"] for pr in prs) == [1, 2, 3]
+    assert sorted(checkpoint_loads) == ["model_0001.pt", "model_0002.pt", "model_0003.pt"]
+
+    checkpoint_loads.clear()
+    prs = make_policy_store().policy_records(str(tmp_path), selector_type="all")
+    assert sorted(pr.metadata["epoch"] for pr in prs) == [1, 2, 3]
+    assert checkpoint_loads == []
+
+
+def test_metadata_index_follows_changed_checkpoints(tmp_path):
+    path = str(tmp_path / "model_0001.pt")
+    save_test_policy(make_policy_store(), path, 1)
+    assert make_policy_store().policy_record(str(tmp_path), selector_type="latest").metadata["epoch"] == 1
+
+    # Overwrite the checkpoint with a different one; the stale index entry must not be used.
+    save_test_policy(make_policy_store(), path, 7)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    os.remove(metadata_sidecar_path(path))
+    assert make_policy_store().policy_record(str(tmp_path), selector_type="latest").metadata["epoch"] == 7
+
+    os.remove(path)
+    save_test_policy(make_policy_store(), str(tmp_path / "model_0002.pt"), 2)
+    prs = make_policy_store().policy_records(str(tmp_path), selector_type="all")
+    assert [pr.metadata["epoch"] for pr in prs] == [2]
+    assert set(torch.load(tmp_path / METADATA_INDEX_FILENAME, weights_only=False)) == {"model_0002.pt"}
+
+
 if __name__ == "__main__":
     test_policy_save_load_without_pydantic()
     test_policy_save_load_with_dict_metadata()
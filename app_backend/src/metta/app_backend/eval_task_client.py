@@ -4,9 +4,11 @@ import httpx
 from pydantic import BaseModel
 
 from metta.app_backend.routes.eval_task_routes import (
+    MAX_LONG_POLL_TIMEOUT,
     TaskClaimRequest,
     TaskClaimResponse,
     TaskCreateRequest,
+    TaskQueueVersionResponse,
     TaskResponse,
     TasksResponse,
     TaskUpdateRequest,
@@ -16,6 +18,9 @@ from metta.common.util.collections import remove_none_values
 
 T = TypeVar("T", bound=BaseModel)
 
+# Added to the wait of long polling requests for their HTTP timeout.
+LONG_POLL_TIMEOUT_MARGIN = 30.0
+
 
 class EvalTaskClient:
     def __init__(self, backend_url: str, machine_token: str | None = None) -> None:
@@ -55,6 +60,30 @@ class EvalTaskClient:
         params = {"assignee": assignee} if assignee is not None else {}
         return await self._make_request(TasksResponse, "GET", "/tasks/claimed", params=params)
 
+    async def wait_for_claimed_tasks(self, assignee: str, timeout: float = 20.0) -> TasksResponse:
+        # Longer waits are rejected by the server; callers wait again if nothing happened.
+        timeout = min(timeout, MAX_LONG_POLL_TIMEOUT)
+        return await self._make_request(
+            TasksResponse,
+            "GET",
+            "/tasks/claimed/wait",
+            params={"assignee": assignee, "timeout": timeout},
+            timeout=timeout + LONG_POLL_TIMEOUT_MARGIN,
+        )
+
+    async def wait_for_task_queue_change(
+        self, version: str | None = None, timeout: float = 20.0
+    ) -> TaskQueueVersionResponse:
+        timeout = min(timeout, MAX_LONG_POLL_TIMEOUT)
+        params = remove_none_values({"version": version, "timeout": timeout})
+        return await self._make_request(
+            TaskQueueVersionResponse,
+            "GET",
+            "/tasks/changes",
+            params=params,
+            timeout=timeout + LONG_POLL_TIMEOUT_MARGIN,
+        )
+
     async def update_task_status(self, request: TaskUpdateRequest) -> TaskUpdateResponse:
         return await self._make_request(
             TaskUpdateResponse, "POST", "/tasks/claimed/update", json=request.model_dump(mode="json")
@@ -0,0 +1,94 @@
+"""Wakes up requests waiting for eval tasks to change, using Postgres LISTEN/NOTIFY."""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from psycopg import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+# Notified by a trigger on eval_tasks whenever a task is created, claimed or changes status, with the task's assignee
+# (or '') as payload. See the migration that adds it in metta_repo.py.
+EVAL_TASKS_CHANNEL = "eval_tasks"
+
+# How long to wait before listening again when the connection is lost.
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+class EvalTaskNotifier:
+    """
+    Listens on EVAL_TASKS_CHANNEL on a connection of its own, and wakes up the subscribers interested in each
+    notification: subscribers for an assignee are woken up by changes to that assignee's tasks, others by any change.
+
+    Subscribers should check the tasks after subscribing, and again whenever they're woken up; notifications only say
+    that something changed. All of them are woken up when the connection is lost, since notifications may have been
+    missed until it's back.
+    """
+
+    def __init__(self, db_uri: str) -> None:
+        self.db_uri = db_uri
+        self._listener: asyncio.Task | None = None
+        self._listening = asyncio.Event()
+        self._subscribers: set[tuple[str | None, asyncio.Event]] = set()
+
+    @asynccontextmanager
+    async def subscribe(self, assignee: str | None = None, timeout: float = 5.0) -> AsyncIterator[asyncio.Event]:
+        """
+        Yields an event that's set when eval tasks (of `assignee`, if given) change. Waits up to `timeout` seconds for
+        the listener to be connected first, so that changes made after subscribing aren't missed.
+        """
+        self._ensure_listener()
+        try:
+            await asyncio.wait_for(self._listening.wait(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Not listening for eval task notifications yet; subscribers will wait for their timeout")
+
+        subscriber = (assignee, asyncio.Event())
+        self._subscribers.add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            self._subscribers.discard(subscriber)
+
+    def _ensure_listener(self) -> None:
+        # The listener is bound to the event loop it was started in, like the connection pool of the MettaRepo.
+        loop = asyncio.get_running_loop()
+        if self._listener is None or self._listener.done() or self._listener.get_loop() is not loop:
+            self._listening = asyncio.Event()
+            self._listener = loop.create_task(self._listen())
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                async with await AsyncConnection.connect(self.db_uri, autocommit=True) as con:
+                    await con.execute(f"LISTEN {EVAL_TASKS_CHANNEL}")
+                    self._listening.set()
+                    async for notify in con.notifies():
+                        self._notify(notify.payload or None)
+            except Exception:
+                logger.warning("Lost the eval task notifications connection", exc_info=True)
+            self._listening.clear()
+            self._notify_all()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _notify(self, assignee: str | None) -> None:
+        for subscribed_assignee, event in self._subscribers:
+            if subscribed_assignee is None or subscribed_assignee == assignee:
+                event.set()
+
+    def _notify_all(self) -> None:
+        for _, event in self._subscribers:
+            event.set()
+
+    async def close(self) -> None:
+        listener, self._listener = self._listener, None
+        if listener is None or listener.done():
+            return
+        try:
+            listener.cancel()
+            await listener
+        except (asyncio.CancelledError, RuntimeError):
+            # Cancelled, or started in an event loop that isn't running anymore
+            pass
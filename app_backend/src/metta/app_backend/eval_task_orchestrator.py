@@ -4,7 +4,7 @@ Orchestrates containers to process eval tasks, one container per git hash.
 
 This script:
 1. Maintains one worker container per unique git hash
-2. Pulls tasks from the backend queue and routes them to the appropriate worker
+2. Pulls tasks from the backend queue as soon as they're queued and routes them to the appropriate worker
 3. Dynamically creates workers for new git hashes
 4. Monitors container status and reports results
 """
@@ -35,7 +35,7 @@ class EvalTaskOrchestrator:
         backend_url: str,
         machine_token: str,
         docker_image: str = "metta-policy-evaluator-local:latest",
-        poll_interval: float = 5.0,
+        poll_interval: float = 30.0,
         worker_idle_timeout: float = 1200.0,
         max_workers_per_git_hash: int = 5,
         container_manager: AbstractContainerManager | None = None,
@@ -173,16 +173,19 @@ class EvalTaskOrchestrator:
         self._logger.info(f"Worker idle timeout: {self._worker_idle_timeout}s")
         self._logger.info(f"Max workers per git hash: {self._max_workers_per_git_hash}")
 
+        version: str | None = None
         while True:
-            start_time = datetime.now(timezone.utc)
             try:
+                # Returns at once on the first iteration, and when the cycle itself claimed or unclaimed tasks; other
+                # times, as soon as a task is queued or finished, and at least every poll interval (or the longest wait
+                # the backend allows, if shorter) for the upkeep of workers and timed out tasks.
+                new_version = (await self._task_client.wait_for_task_queue_change(version, self._poll_interval)).version
                 await self.run_cycle()
+                # Only once the cycle went through, so that after a failure the next wait returns at once.
+                version = new_version
             except Exception as e:
                 self._logger.error(f"Error in orchestrator loop: {e}", exc_info=True)
-
-            elapsed_time = (datetime.now(timezone.utc) - start_time).total_seconds()
-            sleep_time = max(0, self._poll_interval - elapsed_time)
-            await asyncio.sleep(sleep_time)
+                await asyncio.sleep(self._poll_interval)
 
 
 async def main() -> None:
@@ -193,7 +196,7 @@ async def main() -> None:
 
     backend_url = os.environ.get("BACKEND_URL", "http://localhost:8000")
     docker_image = os.environ.get("DOCKER_IMAGE", "metta-policy-evaluator-local:latest")
-    poll_interval = float(os.environ.get("POLL_INTERVAL", "5"))
+    poll_interval = float(os.environ.get("POLL_INTERVAL", "30"))
     worker_idle_timeout = float(os.environ.get("WORKER_IDLE_TIMEOUT", "1200"))
     max_workers_per_git_hash = int(os.environ.get("MAX_WORKERS_PER_GIT_HASH", "5"))
     machine_token = os.environ["MACHINE_TOKEN"]
@@ -3,7 +3,7 @@
 Runs eval tasks inside a Docker container.
 
 - Checks out the specified git hash once at startup
-- Polls the backend for tasks assigned to this worker
+- Waits on the backend for tasks assigned to this worker
 - Processes tasks one at a time
 - Reports success/failure back
 """
@@ -38,7 +38,8 @@ class EvalTaskWorker:
         CLIAuthenticator(self._backend_url).save_token(machine_token)
         self._client = EvalTaskClient(backend_url)
         self._logger = logger or logging.getLogger(__name__)
-        self._poll_interval = 5.0
+        # How long each request for tasks waits for one to be assigned
+        self._wait_timeout = 20.0
 
     async def __aenter__(self):
         return self
@@ -177,9 +178,8 @@ class EvalTaskWorker:
         self._logger.info(f"Worker running from main branch, sim.py will use git hash {self._git_hash}")
 
         while True:
-            loop_start_time = datetime.now()
             try:
-                claimed_tasks = await self._client.get_claimed_tasks(assignee=self._assignee)
+                claimed_tasks = await self._client.wait_for_claimed_tasks(self._assignee, timeout=self._wait_timeout)
 
                 if claimed_tasks.tasks:
                     task: TaskResponse = min(claimed_tasks.tasks, key=lambda x: x.assigned_at or datetime.min)
@@ -195,9 +195,6 @@ class EvalTaskWorker:
                 else:
                     self._logger.debug("No tasks claimed")
 
-                elapsed_time = (datetime.now() - loop_start_time).total_seconds()
-                await asyncio.sleep(max(0, self._poll_interval - elapsed_time))
-
             except KeyboardInterrupt:
                 self._logger.info("Worker interrupted")
                 break
@@ -1,6 +1,8 @@
+import asyncio
 import hashlib
 import json
 import secrets
+import time
 import uuid
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
@@ -11,6 +13,8 @@ from psycopg.types.json import Jsonb
 from psycopg_pool import AsyncConnectionPool
 from pydantic import BaseModel, Field
 
+from metta.app_backend.eval_task_notifier import EvalTaskNotifier
+from metta.app_backend.query_cache import QueryCache
 from metta.app_backend.query_logger import execute_single_row_query_and_log
 from metta.app_backend.schema_manager import SqlMigration, run_migrations
 
@@ -376,13 +380,137 @@ MIGRATIONS = [
             """,
         ],
     ),
+    SqlMigration(
+        version=20,
+        description="Add policy_eval_metrics aggregate table for heatmaps",
+        sql_statements=[
+            # Sum and count of each metric over the agents of a policy's episodes of an eval, kept up to date by
+            # record_episodes, so that heatmaps don't aggregate episode_agent_metrics on every request.
+            """CREATE TABLE policy_eval_metrics (
+                policy_id UUID NOT NULL REFERENCES policies(id),
+                eval_name TEXT NOT NULL,
+                eval_category TEXT,
+                env_name TEXT,
+                metric TEXT NOT NULL,
+                total_value DOUBLE PRECISION NOT NULL,
+                num_agents INTEGER NOT NULL,
+                latest_episode_internal_id INTEGER NOT NULL,
+                latest_replay_url TEXT,
+                PRIMARY KEY (policy_id, eval_name, metric)
+            )""",
+            """CREATE INDEX idx_policy_eval_metrics_eval_name_metric ON policy_eval_metrics(eval_name, metric)""",
+            """INSERT INTO policy_eval_metrics
+            SELECT
+                e.primary_policy_id,
+                e.eval_name,
+                ANY_VALUE(e.eval_category),
+                ANY_VALUE(e.env_name),
+                eam.metric,
+                COALESCE(SUM(eam.value::text::double precision), 0),
+                COUNT(*),
+                MAX(e.internal_id),
+                (ARRAY_AGG(e.replay_url ORDER BY e.internal_id DESC))[1]
+            FROM episodes e
+            JOIN episode_agent_metrics eam ON e.internal_id = eam.episode_internal_id
+            WHERE e.eval_name IS NOT NULL
+            GROUP BY e.primary_policy_id, e.eval_name, eam.metric
+            """,
+        ],
+    ),
+    SqlMigration(
+        version=21,
+        description="Notify eval task changes",
+        sql_statements=[
+            # Wakes up the orchestrator and workers waiting for tasks (see EvalTaskNotifier) as soon as a task is
+            # created, claimed or finished, rather than on their next poll.
+            """CREATE FUNCTION notify_eval_task_change() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('eval_tasks', COALESCE(NEW.assignee, ''));
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql""",
+            """CREATE TRIGGER eval_tasks_notify_change
+            AFTER INSERT OR UPDATE OF status, assignee ON eval_tasks
+            FOR EACH ROW EXECUTE FUNCTION notify_eval_task_change()""",
+        ],
+    ),
+    SqlMigration(
+        version=22,
+        description="Add episode ingest versions",
+        sql_statements=[
+            # Bumped by every record_episodes transaction just before it commits. The row lock orders the bumps like
+            # the commits, unlike internal ids, which are reserved before the episodes are written (see QueryCache).
+            """CREATE TABLE episode_ingest_version (
+                id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+                version BIGINT NOT NULL
+            )""",
+            """INSERT INTO episode_ingest_version (version) VALUES (0)""",
+            """CREATE TABLE episode_ingests (
+                version BIGINT PRIMARY KEY,
+                internal_ids BIGINT[] NOT NULL
+            )""",
+        ],
+    ),
 ]
 
+# Records an ingest under the next ingest version. Run last in the ingest transaction, so that the version row stays
+# locked, and concurrent ingests wait on it, only until the commit.
+RECORD_EPISODE_INGEST_QUERY = """
+    WITH bumped AS (
+        UPDATE episode_ingest_version SET version = version + 1 RETURNING version
+    )
+    INSERT INTO episode_ingests (version, internal_ids)
+    SELECT version, %s FROM bumped
+"""
+
+# Folds the metrics of newly recorded episodes into policy_eval_metrics. Rows are upserted in metric order, so that
+# concurrent writers for the same policy and eval lock them in the same order. Metric values are REAL; summing them
+# through their text form adds up the values as recorded (123.45679) rather than their float4 approximations.
+UPDATE_POLICY_EVAL_METRICS_QUERY = """
+    INSERT INTO policy_eval_metrics AS pem
+    SELECT
+        e.primary_policy_id,
+        e.eval_name,
+        ANY_VALUE(e.eval_category),
+        ANY_VALUE(e.env_name),
+        eam.metric,
+        COALESCE(SUM(eam.value::text::double precision), 0),
+        COUNT(*),
+        MAX(e.internal_id),
+        (ARRAY_AGG(e.replay_url ORDER BY e.internal_id DESC))[1]
+    FROM episodes e
+    JOIN episode_agent_metrics eam ON e.internal_id = eam.episode_internal_id
+    WHERE e.internal_id = ANY(%s) AND e.eval_name IS NOT NULL
+    GROUP BY e.primary_policy_id, e.eval_name, eam.metric
+    ORDER BY eam.metric
+    ON CONFLICT (policy_id, eval_name, metric) DO UPDATE SET
+        total_value = pem.total_value + EXCLUDED.total_value,
+        num_agents = pem.num_agents + EXCLUDED.num_agents,
+        latest_episode_internal_id = GREATEST(pem.latest_episode_internal_id, EXCLUDED.latest_episode_internal_id),
+        latest_replay_url = CASE
+            WHEN EXCLUDED.latest_episode_internal_id > pem.latest_episode_internal_id THEN EXCLUDED.latest_replay_url
+            ELSE pem.latest_replay_url
+        END
+"""
+
+
+async def _wait_until(event: asyncio.Event, deadline: float) -> bool:
+    """Waits for `event` until `deadline` (in `time.monotonic()` time), and clears it. Returns whether it was set."""
+    try:
+        await asyncio.wait_for(event.wait(), max(0.0, deadline - time.monotonic()))
+    except asyncio.TimeoutError:
+        return False
+    event.clear()
+    return True
+
 
 class MettaRepo:
     def __init__(self, db_uri: str) -> None:
         self.db_uri = db_uri
         self._pool: AsyncConnectionPool | None = None
+        # Results of dashboard and heatmap queries, shared by the routes until new episodes are recorded
+        self.query_cache = QueryCache(self.connect)
+        self.task_notifier = EvalTaskNotifier(db_uri)
         # Run migrations synchronously during initialization
         with Connection.connect(self.db_uri) as con:
             run_migrations(con, MIGRATIONS)
@@ -400,6 +528,7 @@ class MettaRepo:
             yield conn
 
     async def close(self) -> None:
+        await self.task_notifier.close()
         if self._pool:
             try:
                 await self._pool.close()
@@ -534,88 +663,120 @@ class MettaRepo:
         eval_task_id: uuid.UUID | None = None,
         tags: list[str] | None = None,
     ) -> uuid.UUID:
-        async with self.connect() as con:
-            # Parse eval_category and env_name from eval_name
-            eval_category = eval_name.split("/", 1)[0] if eval_name else None
-            env_name = eval_name.split("/", 1)[1] if eval_name and "/" in eval_name else None
+        episode_ids = await self.record_episodes(
+            primary_policy_id=primary_policy_id,
+            stats_epoch=stats_epoch,
+            eval_name=eval_name,
+            simulation_suite=simulation_suite,
+            replay_urls=[replay_url],
+            attributes=[attributes],
+            agent_policies=[(0, agent_id, policy_id) for agent_id, policy_id in agent_policies.items()],
+            agent_metrics=[
+                (0, agent_id, metric, value)
+                for agent_id, metrics in agent_metrics.items()
+                for metric, value in metrics.items()
+            ],
+            eval_task_id=eval_task_id,
+            tags=tags,
+        )
+        return episode_ids[0]
+
+    async def record_episodes(
+        self,
+        primary_policy_id: uuid.UUID,
+        stats_epoch: uuid.UUID | None,
+        eval_name: str | None,
+        simulation_suite: str | None,
+        replay_urls: list[str | None],
+        attributes: list[dict[str, Any]],
+        agent_policies: list[tuple[int, int, uuid.UUID]],
+        agent_metrics: list[tuple[int, int, str, float]],
+        eval_task_id: uuid.UUID | None = None,
+        tags: list[str] | None = None,
+    ) -> list[uuid.UUID]:
+        """
+        Record a batch of episodes of the same eval in one transaction.
+
+        `replay_urls` and `attributes` have an entry per episode. `agent_policies` rows are (episode index, agent id,
+        policy id) and `agent_metrics` rows are (episode index, agent id, metric, value), where the episode index is the
+        episode's position in the batch.
+
+        Rows are streamed with COPY, so the cost of a batch is a handful of round-trips however many episodes it has.
+        """
+        # Parse eval_category and env_name from eval_name
+        eval_category = eval_name.split("/", 1)[0] if eval_name else None
+        env_name = eval_name.split("/", 1)[1] if eval_name and "/" in eval_name else None
+        # Episode ids are assigned up front, so that agent rows can reference their episodes in the same COPY stream
+        episode_ids = [uuid.uuid4() for _ in replay_urls]
+        # COPY can't skip conflicting rows, and new episodes can only conflict on repeated tags
+        unique_tags = list(dict.fromkeys(tags or []))
 
-            # Insert into episodes table
+        async with self.connect() as con:
             result = await con.execute(
-                """
-                INSERT INTO episodes (
-                    replay_url,
-                    eval_name,
-                    simulation_suite,
-                    eval_category,
-                    env_name,
-                    primary_policy_id,
-                    stats_epoch,
-                    attributes,
-                    eval_task_id
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) RETURNING id, internal_id
-                """,
-                (
-                    replay_url,
-                    eval_name,
-                    simulation_suite,
-                    eval_category,
-                    env_name,
-                    primary_policy_id,
-                    stats_epoch,
-                    Jsonb(attributes),
-                    eval_task_id,
-                ),
+                "SELECT nextval(pg_get_serial_sequence('episodes', 'internal_id')) FROM generate_series(1, %s)",
+                (len(episode_ids),),
             )
-            row = await result.fetchone()
-            if row is None:
-                raise RuntimeError("Failed to insert episode record")
-            episode_id = row[0]
-            episode_internal_id = row[1]
+            internal_ids = [row[0] for row in await result.fetchall()]
 
-            # Insert agent policies
-            for agent_id, policy_id in agent_policies.items():
-                await con.execute(
+            async with con.cursor() as cursor:
+                async with cursor.copy(
                     """
-                    INSERT INTO episode_agent_policies (
-                        episode_id,
-                        policy_id,
-                        agent_id
-                    ) VALUES (%s, %s, %s)
-                    """,
-                    (episode_id, policy_id, agent_id),
-                )
+                    COPY episodes (
+                        id,
+                        internal_id,
+                        replay_url,
+                        eval_name,
+                        simulation_suite,
+                        eval_category,
+                        env_name,
+                        primary_policy_id,
+                        stats_epoch,
+                        attributes,
+                        eval_task_id
+                    ) FROM STDIN
+                    """
+                ) as copy:
+                    for episode_id, internal_id, replay_url, episode_attributes in zip(
+                        episode_ids, internal_ids, replay_urls, attributes, strict=True
+                    ):
+                        await copy.write_row(
+                            (
+                                episode_id,
+                                internal_id,
+                                replay_url,
+                                eval_name,
+                                simulation_suite,
+                                eval_category,
+                                env_name,
+                                primary_policy_id,
+                                stats_epoch,
+                                Jsonb(episode_attributes),
+                                eval_task_id,
+                            )
+                        )
 
-            # Insert agent metrics in bulk
-            rows: list[tuple[int, int, str, float]] = []
-            for agent_id, metrics in agent_metrics.items():
-                for metric_name, value in metrics.items():
-                    rows.append((episode_internal_id, agent_id, metric_name, value))
+                async with cursor.copy(
+                    "COPY episode_agent_policies (episode_id, policy_id, agent_id) FROM STDIN"
+                ) as copy:
+                    for episode, agent_id, policy_id in agent_policies:
+                        await copy.write_row((episode_ids[episode], policy_id, agent_id))
 
-            async with con.cursor() as cursor:
-                await cursor.executemany(
-                    """
-                  INSERT INTO episode_agent_metrics (episode_internal_id, agent_id, metric, value)
-                  VALUES (%s, %s, %s, %s)
-                  """,
-                    rows,
-                )
+                async with cursor.copy(
+                    "COPY episode_agent_metrics (episode_internal_id, agent_id, metric, value) FROM STDIN"
+                ) as copy:
+                    for episode, agent_id, metric, value in agent_metrics:
+                        await copy.write_row((internal_ids[episode], agent_id, metric, value))
 
-            # Add tags if provided
-            if tags:
-                tag_rows = [(episode_id, tag) for tag in tags]
-                async with con.cursor() as cursor:
-                    await cursor.executemany(
-                        """
-                        INSERT INTO episode_tags (episode_id, tag)
-                        VALUES (%s, %s)
-                        ON CONFLICT (episode_id, tag) DO NOTHING
-                        """,
-                        tag_rows,
-                    )
-
-            return episode_id
+                if unique_tags:
+                    async with cursor.copy("COPY episode_tags (episode_id, tag) FROM STDIN") as copy:
+                        for episode_id in episode_ids:
+                            for tag in unique_tags:
+                                await copy.write_row((episode_id, tag))
+
+            await con.execute(UPDATE_POLICY_EVAL_METRICS_QUERY, (internal_ids,))
+            await con.execute(RECORD_EPISODE_INGEST_QUERY, (internal_ids,))
+
+        return episode_ids
 
     async def get_suites(self) -> list[str]:
         async with self.connect() as con:
@@ -1089,6 +1250,37 @@ class MettaRepo:
                 for row in rows
             ]
 
+    async def wait_for_claimed_tasks(self, assignee: str, timeout: float) -> list[dict[str, Any]]:
+        """Tasks claimed by `assignee`, waiting up to `timeout` seconds for one to be claimed if there are none."""
+        deadline = time.monotonic() + timeout
+        async with self.task_notifier.subscribe(assignee) as changed:
+            while True:
+                tasks = await self.get_claimed_tasks(assignee=assignee)
+                if tasks or not await _wait_until(changed, deadline):
+                    return tasks
+
+    async def get_task_queue_version(self) -> str:
+        """A digest of the unprocessed tasks and their assignees, which changes when tasks are queued or dispatched."""
+        async with self.connect() as con:
+            result = await con.execute(
+                """
+                SELECT md5(COALESCE(string_agg(id::text || ':' || COALESCE(assignee, ''), ',' ORDER BY id), ''))
+                FROM eval_tasks
+                WHERE status = 'unprocessed'
+                """
+            )
+            row = await result.fetchone()
+            return row[0] if row else ""
+
+    async def wait_for_task_queue_change(self, version: str | None, timeout: float) -> str:
+        """The task queue version, once it's different from `version` or after `timeout` seconds."""
+        deadline = time.monotonic() + timeout
+        async with self.task_notifier.subscribe() as changed:
+            while True:
+                current = await self.get_task_queue_version()
+                if current != version or not await _wait_until(changed, deadline):
+                    return current
+
     async def update_task_statuses(
         self,
         updates: dict[uuid.UUID, TaskStatusUpdate],
@@ -1160,18 +1352,15 @@ class MettaRepo:
 
         async with self.connect() as con:
             # Use INSERT ... ON CONFLICT DO NOTHING to avoid duplicate key errors
-            rows_affected = 0
-            for episode_id in episode_ids:
-                result = await con.execute(
-                    """
-                    INSERT INTO episode_tags (episode_id, tag)
-                    VALUES (%s, %s)
-                    ON CONFLICT (episode_id, tag) DO NOTHING
-                    """,
-                    (episode_id, tag),
-                )
-                rows_affected += result.rowcount
-            return rows_affected
+            result = await con.execute(
+                """
+                INSERT INTO episode_tags (episode_id, tag)
+                SELECT episode_id, %s FROM unnest(%s::uuid[]) AS episode_id
+                ON CONFLICT (episode_id, tag) DO NOTHING
+                """,
+                (tag, episode_ids),
+            )
+            return result.rowcount
 
     async def remove_episode_tags(self, episode_ids: list[uuid.UUID], tag: str) -> int:
         """Remove a tag from multiple episodes by UUID. Returns number of episodes untagged."""
@@ -0,0 +1,134 @@
+"""Caching of read-only query results that only change when episodes are recorded."""
+
+import asyncio
+import functools
+import json
+from collections import OrderedDict
+from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from psycopg import AsyncConnection
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+# (route, normalized parameters)
+CacheKey = tuple[str, str]
+
+# Every batch of episodes bumps the ingest version in the transaction that records it, so the version tells whether
+# anything changed since a result was computed. Internal ids can't tell that: concurrent ingests reserve them before
+# writing, so a batch can commit after one with larger ids. It's a single row, so checking it on every request is cheap.
+GET_WATERMARK_QUERY = "SELECT version FROM episode_ingest_version"
+
+
+@dataclass
+class _Entry(Generic[T]):
+    watermark: int
+    value: T
+
+
+@dataclass
+class _Pending:
+    watermark: int
+    task: "asyncio.Task[Any]"
+
+
+def normalize_params(params: Any) -> str:
+    """A canonical string for query parameters: pydantic models are dumped and dict keys sorted."""
+    if isinstance(params, BaseModel):
+        params = params.model_dump(mode="json")
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class QueryCache:
+    """
+    LRU cache of query results, keyed by route and parameters, and invalidated when new episodes are recorded.
+
+    Every lookup reads the current episode watermark and serves the cached result if it was computed at that watermark.
+    Otherwise the result is computed again, or brought up to date with `update` when the caller can do that
+    incrementally. Concurrent lookups of the same key share a single computation, so a burst of identical dashboard
+    requests runs each query once.
+    """
+
+    def __init__(
+        self, connect: Callable[[], AbstractAsyncContextManager[AsyncConnection]], max_entries: int = 1024
+    ) -> None:
+        self._connect = connect
+        self.max_entries = max_entries
+        self._entries: OrderedDict[CacheKey, _Entry[Any]] = OrderedDict()
+        self._pending: dict[CacheKey, _Pending] = {}
+        # Lookups served from the cache, and computations run, for monitoring.
+        self.hits = 0
+        self.misses = 0
+
+    async def get(
+        self,
+        route: str,
+        params: Any,
+        compute: Callable[[], Awaitable[T]],
+        update: Optional[Callable[[T, int], Awaitable[T]]] = None,
+    ) -> T:
+        """
+        The result of `compute()` for `route` and `params`, computed at the current episode watermark.
+
+        Args:
+            route: Name of the query or route
+            params: Parameters the result depends on; anything JSON serializable, or a pydantic model
+            compute: Computes the result from scratch
+            update: Given a stale result and the watermark it was computed at, computes the current result, typically
+                by only querying the episodes ingested past that watermark (see `episode_ingests`)
+
+        Returns:
+            The cached or freshly computed result, shared between callers; don't modify it
+        """
+        key = (route, normalize_params(params))
+        watermark = await self.watermark()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.watermark >= watermark:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+        pending = self._pending.get(key)
+        if pending is None or pending.watermark < watermark:
+            self.misses += 1
+            load = compute
+            if entry is not None and update is not None:
+                load = functools.partial(update, entry.value, entry.watermark)
+            pending = _Pending(watermark, asyncio.ensure_future(self._load(key, watermark, load)))
+            self._pending[key] = pending
+
+        # Shielded, so that a caller going away doesn't cancel the query for the others waiting on it.
+        return await asyncio.shield(pending.task)
+
+    async def _load(self, key: CacheKey, watermark: int, load: Callable[[], Awaitable[T]]) -> T:
+        try:
+            value = await load()
+            entry = self._entries.get(key)
+            if entry is None or entry.watermark <= watermark:
+                self._entries[key] = _Entry(watermark, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            pending = self._pending.get(key)
+            if pending is not None and pending.task is asyncio.current_task():
+                del self._pending[key]
+
+    async def watermark(self) -> int:
+        """Version of the last committed episode ingest, or 0 if there are none."""
+        async with self._connect() as con:
+            result = await con.execute(GET_WATERMARK_QUERY)
+            row = await result.fetchone()
+            return row[0] if row and row[0] else 0
+
+    def clear(self, route: Optional[str] = None) -> None:
+        """Drop the cached results of `route`, or of every route."""
+        if route is None:
+            self._entries.clear()
+            return
+        for key in [key for key in self._entries if key[0] == route]:
+            del self._entries[key]
@@ -12,6 +12,9 @@ from metta.app_backend.route_logger import timed_http_handler
 
 T = TypeVar("T")
 
+# Longest wait, in seconds, that the long polling routes accept; clients clamp their waits to it.
+MAX_LONG_POLL_TIMEOUT = 60.0
+
 
 class TaskCreateRequest(BaseModel):
     policy_id: uuid.UUID
@@ -81,6 +84,10 @@ class TasksResponse(BaseModel):
     tasks: list[TaskResponse]
 
 
+class TaskQueueVersionResponse(BaseModel):
+    version: str
+
+
 async def _get_latest_main_commit() -> str:
     async with httpx.AsyncClient() as client:
         response = await client.get(
@@ -150,6 +157,24 @@ def create_eval_task_router(stats_repo: MettaRepo) -> APIRouter:
         task_responses = [TaskResponse.from_db(task) for task in tasks]
         return TasksResponse(tasks=task_responses)
 
+    @router.get("/claimed/wait")
+    @timed_http_handler
+    async def wait_for_claimed_tasks(
+        assignee: str, timeout: float = Query(default=20.0, ge=0, le=MAX_LONG_POLL_TIMEOUT)
+    ) -> TasksResponse:
+        """Long poll for the tasks claimed by `assignee`: returns as soon as there are any, or after `timeout`."""
+        tasks = await stats_repo.wait_for_claimed_tasks(assignee=assignee, timeout=timeout)
+        return TasksResponse(tasks=[TaskResponse.from_db(task) for task in tasks])
+
+    @router.get("/changes")
+    @timed_http_handler
+    async def wait_for_task_queue_change(
+        version: str | None = Query(None), timeout: float = Query(default=20.0, ge=0, le=MAX_LONG_POLL_TIMEOUT)
+    ) -> TaskQueueVersionResponse:
+        """Long poll for changes to the unprocessed tasks, which returns once they differ from `version`."""
+        current = await stats_repo.wait_for_task_queue_change(version=version, timeout=timeout)
+        return TaskQueueVersionResponse(version=current)
+
     @router.get("/all", response_model=TasksResponse)
     @timed_http_handler
     async def get_all_tasks(
@@ -166,16 +166,24 @@ GET_EVALS_QUERY = """
     )
 """
 
-GET_AVAILABLE_METRICS_QUERY = """
-    SELECT DISTINCT eam.metric
-    FROM episode_agent_metrics eam
-    JOIN wide_episodes we ON we.internal_id = eam.episode_internal_id
+# policy_eval_metrics holds per-(policy, eval, metric) aggregates maintained at ingest time (see MettaRepo), so these
+# queries read one row per cell rather than every agent metric of every episode.
+POLICY_EVAL_METRICS_FROM = """
+    FROM policy_eval_metrics pem
+    JOIN policies p ON pem.policy_id = p.id
+    LEFT JOIN epochs ep ON p.epoch_id = ep.id
+    LEFT JOIN training_runs tr ON ep.run_id = tr.id
     WHERE (
-        we.training_run_id = ANY(%s) OR  -- Policies from selected training runs
-        (we.training_run_id IS NULL AND we.primary_policy_id = ANY(%s))  -- Selected run-free policies
+        tr.id = ANY(%s) OR  -- Policies from selected training runs
+        (tr.id IS NULL AND pem.policy_id = ANY(%s))  -- Selected run-free policies
     )
-    AND we.eval_name = ANY(%s)
-    ORDER BY eam.metric
+"""
+
+GET_AVAILABLE_METRICS_QUERY = f"""
+    SELECT DISTINCT pem.metric
+    {POLICY_EVAL_METRICS_FROM}
+    AND pem.eval_name = ANY(%s)
+    ORDER BY pem.metric
 """
 
 GET_POLICY_NAMES_BY_IDS_QUERY = """
@@ -185,29 +193,22 @@ GET_POLICY_NAMES_BY_IDS_QUERY = """
     ORDER BY p.name
 """
 
-POLICY_HEATMAP_DATA_QUERY = """
+POLICY_HEATMAP_DATA_QUERY = f"""
     SELECT
-        we.primary_policy_id as policy_id,
-        we.policy_name,
-        we.eval_category,
-        we.env_name,
-        ANY_VALUE(we.replay_url) as replay_url,
-        SUM(eam.value) as total_score,
-        COUNT(eam.*) as num_agents,
-        MAX(we.internal_id) as episode_id,
-        we.training_run_id::text as run_id,
-        we.epoch_end_training_epoch as epoch
-    FROM wide_episodes we
-    JOIN episode_agent_metrics eam ON we.internal_id = eam.episode_internal_id
-    WHERE (
-        we.training_run_id = ANY(%s) OR  -- Policies from selected training runs
-        (we.training_run_id IS NULL AND we.primary_policy_id = ANY(%s))  -- Selected run-free policies
-    )
-    AND eam.metric = %s
-    AND we.eval_name = ANY(%s)
-    GROUP BY we.primary_policy_id, we.policy_name, we.eval_category, we.env_name, we.training_run_id,
-        we.epoch_end_training_epoch
-    ORDER BY we.policy_name, we.eval_category, we.env_name
+        pem.policy_id,
+        p.name as policy_name,
+        pem.eval_category,
+        pem.env_name,
+        pem.latest_replay_url as replay_url,
+        pem.total_value as total_score,
+        pem.num_agents,
+        pem.latest_episode_internal_id as episode_id,
+        tr.id::text as run_id,
+        ep.end_training_epoch as epoch
+    {POLICY_EVAL_METRICS_FROM}
+    AND pem.metric = %s
+    AND pem.eval_name = ANY(%s)
+    ORDER BY p.name, pem.eval_category, pem.env_name
 """
 
 
@@ -469,8 +470,12 @@ def create_policy_heatmap_router(metta_repo: MettaRepo) -> APIRouter:
         if not request.training_run_ids and not request.run_free_policy_ids:
             return []
 
-        async with metta_repo.connect() as con:
-            return await get_evals_for_selection(con, request.training_run_ids, request.run_free_policy_ids)
+        async def compute() -> List[str]:
+            async with metta_repo.connect() as con:
+                return await get_evals_for_selection(con, request.training_run_ids, request.run_free_policy_ids)
+
+        # Selections are reloaded by every user with the dashboard open, and only change when episodes are recorded
+        return await metta_repo.query_cache.get("get_evals", request, compute)
 
     @router.post("/metrics")
     @timed_route("get_available_metrics")
@@ -479,10 +484,13 @@ def create_policy_heatmap_router(metta_repo: MettaRepo) -> APIRouter:
         if (not request.training_run_ids and not request.run_free_policy_ids) or not request.eval_names:
             return []
 
-        async with metta_repo.connect() as con:
-            return await get_available_metrics_for_selection(
-                con, request.training_run_ids, request.run_free_policy_ids, request.eval_names
-            )
+        async def compute() -> List[str]:
+            async with metta_repo.connect() as con:
+                return await get_available_metrics_for_selection(
+                    con, request.training_run_ids, request.run_free_policy_ids, request.eval_names
+                )
+
+        return await metta_repo.query_cache.get("get_available_metrics", request, compute)
 
     @router.post("/heatmap")
     @timed_route("generate_policy_heatmap")
@@ -495,11 +503,12 @@ def create_policy_heatmap_router(metta_repo: MettaRepo) -> APIRouter:
         ):
             raise HTTPException(status_code=400, detail="Missing required parameters")
 
-        async with metta_repo.connect() as con:
-            # Fetch evaluation data
-            evaluations = await fetch_policy_heatmap_data(
-                con, request.training_run_ids, request.run_free_policy_ids, request.eval_names, request.metric
-            )
+        async def compute() -> HeatmapData:
+            async with metta_repo.connect() as con:
+                # Fetch evaluation data
+                evaluations = await fetch_policy_heatmap_data(
+                    con, request.training_run_ids, request.run_free_policy_ids, request.eval_names, request.metric
+                )
 
             # Apply training run policy selector if we have evaluations
             if evaluations:
@@ -519,4 +528,6 @@ def create_policy_heatmap_router(metta_repo: MettaRepo) -> APIRouter:
                     evalMaxScores={},
                 )
 
+        return await metta_repo.query_cache.get("generate_policy_heatmap", request, compute)
+
     return router
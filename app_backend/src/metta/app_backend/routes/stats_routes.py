@@ -2,7 +2,7 @@ import uuid
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from metta.app_backend.auth import create_user_or_token_dependency
 from metta.app_backend.metta_repo import MettaRepo
@@ -64,6 +64,51 @@ class EpisodeResponse(BaseModel):
     id: str
 
 
+class EpisodeBatchCreate(BaseModel):
+    """
+    Episodes of one eval, in columnar form. `replay_urls` and `attributes` have an entry per episode; the agent policy
+    and agent metric columns have an entry per row, where `*_episodes` is the index of the row's episode in the batch.
+    """
+
+    primary_policy_id: str
+    stats_epoch: Optional[str] = None
+    eval_name: Optional[str] = None
+    simulation_suite: Optional[str] = None
+    eval_task_id: Optional[str] = None
+    tags: Optional[List[str]] = None
+
+    replay_urls: List[Optional[str]]
+    attributes: List[Dict[str, Any]]
+
+    policy_episodes: List[int] = Field(default_factory=list)
+    policy_agent_ids: List[int] = Field(default_factory=list)
+    policy_ids: List[str] = Field(default_factory=list)
+
+    metric_episodes: List[int] = Field(default_factory=list)
+    metric_agent_ids: List[int] = Field(default_factory=list)
+    metric_names: List[str] = Field(default_factory=list)
+    metric_values: List[float] = Field(default_factory=list)
+
+    @model_validator(mode="after")
+    def check_columns(self) -> "EpisodeBatchCreate":
+        num_episodes = len(self.replay_urls)
+        if len(self.attributes) != num_episodes:
+            raise ValueError("replay_urls and attributes must have an entry per episode")
+        for table, columns in [
+            ("policy", [self.policy_episodes, self.policy_agent_ids, self.policy_ids]),
+            ("metric", [self.metric_episodes, self.metric_agent_ids, self.metric_names, self.metric_values]),
+        ]:
+            if len({len(column) for column in columns}) > 1:
+                raise ValueError(f"The {table} columns must have the same length")
+            if any(not 0 <= episode < num_episodes for episode in columns[0]):
+                raise ValueError(f"{table}_episodes must be indices of episodes in the batch")
+        return self
+
+
+class EpisodeBatchResponse(BaseModel):
+    ids: List[str]
+
+
 def create_stats_router(stats_repo: MettaRepo) -> APIRouter:
     """Create a stats router with the given StatsRepo instance."""
     router = APIRouter(prefix="/stats", tags=["stats"])
@@ -166,4 +211,43 @@ def create_stats_router(stats_repo: MettaRepo) -> APIRouter:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to record episode: {str(e)}") from e
 
+    @router.post("/episodes/bulk", response_model=EpisodeBatchResponse)
+    @timed_route("record_episodes")
+    async def record_episodes(episodes: EpisodeBatchCreate, user: str = user_or_token) -> EpisodeBatchResponse:
+        """Record a batch of episodes of one eval, with their agent policies and metrics, in one transaction."""
+        try:
+            policy_ids_uuid = [uuid.UUID(policy_id) for policy_id in episodes.policy_ids]
+            primary_policy_id_uuid = uuid.UUID(episodes.primary_policy_id)
+            stats_epoch_uuid = uuid.UUID(episodes.stats_epoch) if episodes.stats_epoch else None
+            eval_task_id_uuid = uuid.UUID(episodes.eval_task_id) if episodes.eval_task_id else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail="Invalid UUID format") from e
+
+        try:
+            episode_ids = await stats_repo.record_episodes(
+                primary_policy_id=primary_policy_id_uuid,
+                stats_epoch=stats_epoch_uuid,
+                eval_name=episodes.eval_name,
+                simulation_suite=episodes.simulation_suite,
+                replay_urls=episodes.replay_urls,
+                attributes=episodes.attributes,
+                agent_policies=list(
+                    zip(episodes.policy_episodes, episodes.policy_agent_ids, policy_ids_uuid, strict=True)
+                ),
+                agent_metrics=list(
+                    zip(
+                        episodes.metric_episodes,
+                        episodes.metric_agent_ids,
+                        episodes.metric_names,
+                        episodes.metric_values,
+                        strict=True,
+                    )
+                ),
+                eval_task_id=eval_task_id_uuid,
+                tags=episodes.tags,
+            )
+            return EpisodeBatchResponse(ids=[str(episode_id) for episode_id in episode_ids])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to record episodes: {str(e)}") from e
+
     return router
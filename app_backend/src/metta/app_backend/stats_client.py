@@ -1,5 +1,5 @@
 import uuid
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 import httpx
 from pydantic import BaseModel
@@ -7,6 +7,7 @@ from pydantic import BaseModel
 from metta.app_backend.eval_task_client import EvalTaskClient
 from metta.app_backend.routes.eval_task_routes import TaskCreateRequest, TaskResponse
 from metta.app_backend.routes.stats_routes import (
+    EpisodeBatchCreate,
     EpisodeCreate,
     EpochCreate,
     PolicyCreate,
@@ -36,6 +37,10 @@ class ClientEpisodeResponse(BaseModel):
     id: uuid.UUID
 
 
+class ClientEpisodeBatchResponse(BaseModel):
+    ids: List[uuid.UUID]
+
+
 class _NotAuthenticatedError(ConnectionError):
     """Exception raised when the stats client is not authenticated."""
 
@@ -270,6 +275,90 @@ class StatsClient:
         episode_id_uuid = uuid.UUID(response_data["id"])
         return ClientEpisodeResponse(id=episode_id_uuid)
 
+    def record_episodes(
+        self,
+        primary_policy_id: uuid.UUID,
+        replay_urls: List[Optional[str]],
+        attributes: List[Dict[str, Any]],
+        policy_episodes: Sequence[int],
+        policy_agent_ids: Sequence[int],
+        policy_ids: Sequence[uuid.UUID],
+        metric_episodes: Sequence[int],
+        metric_agent_ids: Sequence[int],
+        metric_names: Sequence[str],
+        metric_values: Sequence[float],
+        stats_epoch: Optional[uuid.UUID] = None,
+        eval_name: Optional[str] = None,
+        simulation_suite: Optional[str] = None,
+        eval_task_id: Optional[uuid.UUID] = None,
+        tags: Optional[List[str]] = None,
+        episodes_per_request: int = 500,
+    ) -> ClientEpisodeBatchResponse:
+        """
+        Record a batch of episodes of one eval, given as columns rather than one dict per episode.
+
+        Args:
+            primary_policy_id: UUID of the primary policy
+            replay_urls: URL of each episode's replay, if any
+            attributes: Attributes of each episode
+            policy_episodes, policy_agent_ids, policy_ids: One entry per agent policy row: the index of its episode
+                in `replay_urls`, the agent ID and the policy UUID
+            metric_episodes, metric_agent_ids, metric_names, metric_values: One entry per agent metric row
+            stats_epoch: Optional stats epoch UUID
+            eval_name: Optional evaluation name
+            simulation_suite: Optional simulation suite identifier
+            eval_task_id: Optional UUID of the eval task these episodes are for
+            tags: Optional list of tags to associate with every episode
+            episodes_per_request: Maximum number of episodes sent in one request
+
+        Returns:
+            ClientEpisodeBatchResponse containing the created episode UUIDs, in order
+
+        Raises:
+            httpx.HTTPStatusError: If a request fails. Episodes sent in earlier requests stay recorded.
+        """
+        num_requests = -(-len(replay_urls) // episodes_per_request)
+
+        def split(episodes: Sequence[int], *columns: Sequence[Any]) -> List[List[List[Any]]]:
+            # Split rows by request, renumbering their episodes within it
+            chunks: List[List[List[Any]]] = [[[] for _ in range(len(columns) + 1)] for _ in range(num_requests)]
+            for row, episode in enumerate(episodes):
+                chunk = chunks[episode // episodes_per_request]
+                chunk[0].append(episode % episodes_per_request)
+                for i, column in enumerate(columns, start=1):
+                    chunk[i].append(column[row])
+            return chunks
+
+        policy_chunks = split(policy_episodes, policy_agent_ids, [str(policy_id) for policy_id in policy_ids])
+        metric_chunks = split(metric_episodes, metric_agent_ids, metric_names, metric_values)
+
+        headers = {"X-Auth-Token": self.machine_token}
+        episode_ids: List[uuid.UUID] = []
+        for i in range(num_requests):
+            episodes = slice(i * episodes_per_request, (i + 1) * episodes_per_request)
+            data = EpisodeBatchCreate(
+                primary_policy_id=str(primary_policy_id),
+                stats_epoch=str(stats_epoch) if stats_epoch else None,
+                eval_name=eval_name,
+                simulation_suite=simulation_suite,
+                eval_task_id=str(eval_task_id) if eval_task_id else None,
+                tags=tags,
+                replay_urls=replay_urls[episodes],
+                attributes=attributes[episodes],
+                policy_episodes=policy_chunks[i][0],
+                policy_agent_ids=policy_chunks[i][1],
+                policy_ids=policy_chunks[i][2],
+                metric_episodes=metric_chunks[i][0],
+                metric_agent_ids=metric_chunks[i][1],
+                metric_names=metric_chunks[i][2],
+                metric_values=metric_chunks[i][3],
+            )
+            response = self.http_client.post("/stats/episodes/bulk", json=data.model_dump(), headers=headers)
+            response.raise_for_status()
+            episode_ids.extend(uuid.UUID(episode_id) for episode_id in response.json()["ids"])
+
+        return ClientEpisodeBatchResponse(ids=episode_ids)
+
     async def create_task(self, request: TaskCreateRequest) -> TaskResponse:
         client = EvalTaskClient(backend_url=str(self.http_client.base_url), machine_token=self.machine_token)
         return await client.create_task(request)
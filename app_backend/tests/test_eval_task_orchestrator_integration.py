@@ -1,3 +1,4 @@
+import asyncio
 import uuid
 from datetime import datetime, timedelta, timezone
 from typing import Any
@@ -9,6 +10,7 @@ from metta.app_backend.container_managers.models import WorkerInfo
 from metta.app_backend.eval_task_orchestrator import EvalTaskOrchestrator
 from metta.app_backend.routes.eval_task_routes import (
     TaskClaimResponse,
+    TaskQueueVersionResponse,
     TaskResponse,
     TasksResponse,
     TaskUpdateResponse,
@@ -53,6 +55,7 @@ class MockEvalTaskClient:
         self.claim_calls: list[Any] = []
         self.update_calls: list[Any] = []
         self.get_latest_calls: list[str] = []
+        self.wait_calls: list[str | None] = []
 
     async def get_available_tasks(self, limit: int = 200) -> TasksResponse:
         from copy import deepcopy
@@ -101,6 +104,13 @@ class MockEvalTaskClient:
         tasks = [t for t in self.tasks.values() if t.assignee == assignee and t.assigned_at]
         return max(tasks, key=lambda t: t.assigned_at or datetime.min) if tasks else None
 
+    async def wait_for_task_queue_change(
+        self, version: str | None = None, timeout: float = 20.0
+    ) -> TaskQueueVersionResponse:
+        # Every wait sees a new version
+        self.wait_calls.append(version)
+        return TaskQueueVersionResponse(version=f"v{len(self.wait_calls)}")
+
     async def close(self):
         pass
 
@@ -622,3 +632,24 @@ class TestEvalTaskOrchestratorIntegration:
         spawned_hashes = {call[0] for call in mock_container_manager.start_worker_calls}
         assert spawned_hashes == {"timeout_hash", "new_hash"}
         assert len(mock_task_client.claim_calls) == 3  # timeout (replacement) + existing + new
+
+    @pytest.mark.asyncio
+    async def test_queue_version_is_kept_until_a_cycle_succeeds(self, orchestrator, mock_task_client, monkeypatch):
+        """A failed cycle is retried without waiting for the task queue to change again."""
+        cycles = 0
+
+        async def run_cycle():
+            nonlocal cycles
+            cycles += 1
+            if cycles == 1:
+                raise RuntimeError("cycle failed")
+            if cycles == 3:
+                raise asyncio.CancelledError
+
+        monkeypatch.setattr(orchestrator, "run_cycle", run_cycle)
+        monkeypatch.setattr(orchestrator, "_poll_interval", 0.0)
+
+        with pytest.raises(asyncio.CancelledError):
+            await orchestrator.run()
+
+        assert mock_task_client.wait_calls == [None, None, "v2"]
@@ -1,3 +1,5 @@
+import asyncio
+import time
 import uuid
 
 import pytest
@@ -390,3 +392,57 @@ class TestEvalTaskRoutes:
             assert row is not None, f"Task {task_id} not found in database"
             assert row[0] == "error"
             assert row[1]["error_reason"] == error_reason
+
+    @pytest.mark.asyncio
+    async def test_wait_for_claimed_tasks_returns_when_a_task_is_claimed(
+        self, eval_task_client: EvalTaskClient, test_policy_id: uuid.UUID
+    ):
+        """Test that a worker waiting for tasks gets its assignment as soon as it's claimed."""
+        assignee = f"waiting_worker_{uuid.uuid4().hex[:8]}"
+        empty_response = await eval_task_client.wait_for_claimed_tasks(assignee, timeout=0.1)
+        assert empty_response.tasks == []
+
+        wait = asyncio.create_task(eval_task_client.wait_for_claimed_tasks(assignee, timeout=30))
+        await asyncio.sleep(0.2)
+        assert not wait.done()
+
+        task_response = await eval_task_client.create_task(
+            TaskCreateRequest(policy_id=test_policy_id, git_hash="wait_test_hash", sim_suite="all")
+        )
+        # Tasks of other workers don't wake it up
+        await eval_task_client.claim_tasks(TaskClaimRequest(tasks=[task_response.id], assignee="other_worker"))
+        await eval_task_client.update_task_status(
+            TaskUpdateRequest(
+                updates={task_response.id: TaskStatusUpdate(status="unprocessed", clear_assignee=True)},
+            )
+        )
+        await asyncio.sleep(0.2)
+        assert not wait.done()
+
+        start = time.monotonic()
+        await eval_task_client.claim_tasks(TaskClaimRequest(tasks=[task_response.id], assignee=assignee))
+        claimed_response = await asyncio.wait_for(wait, timeout=5)
+
+        assert time.monotonic() - start < 5
+        assert [task.id for task in claimed_response.tasks] == [task_response.id]
+
+    @pytest.mark.asyncio
+    async def test_wait_for_task_queue_change(self, eval_task_client: EvalTaskClient, test_policy_id: uuid.UUID):
+        """Test that waiting for the task queue to change returns as soon as a task is created."""
+        version = (await eval_task_client.wait_for_task_queue_change(None)).version
+        unchanged = await eval_task_client.wait_for_task_queue_change(version, timeout=0.1)
+        assert unchanged.version == version
+
+        wait = asyncio.create_task(eval_task_client.wait_for_task_queue_change(version, timeout=30))
+        await asyncio.sleep(0.2)
+        assert not wait.done()
+
+        await eval_task_client.create_task(
+            TaskCreateRequest(policy_id=test_policy_id, git_hash="queue_change_hash", sim_suite="all")
+        )
+        changed = await asyncio.wait_for(wait, timeout=5)
+        assert changed.version != version
+
+        # Waits longer than the server allows are clamped rather than rejected
+        stale = await eval_task_client.wait_for_task_queue_change(version, timeout=120)
+        assert stale.version == changed.version
@@ -687,6 +687,68 @@ class TestPolicyHeatmapRoutes:
         policy_name = test_data["policy_names"][0]
         assert heatmap["cells"][policy_name]["agg_suite/test_env"]["value"] == 90.0
 
+    def test_generate_policy_heatmap_accumulates_ingested_batches(
+        self, test_client: TestClient, stats_client: StatsClient
+    ) -> None:
+        """Test that episodes recorded in bulk and one at a time add up, and the latest episode's replay is shown."""
+        test_data = self._create_test_data(stats_client, "ingested_batches", num_policies=1)
+        policy = test_data["policies"][0]
+        policy_name = test_data["policy_names"][0]
+
+        # Two episodes with two agents each, then a single episode
+        stats_client.record_episodes(
+            primary_policy_id=policy.id,
+            replay_urls=["https://example.com/replay/bulk_0", "https://example.com/replay/bulk_1"],
+            attributes=[{}, {}],
+            policy_episodes=[0, 0, 1, 1],
+            policy_agent_ids=[0, 1, 0, 1],
+            policy_ids=[policy.id] * 4,
+            metric_episodes=[0, 0, 1, 1],
+            metric_agent_ids=[0, 1, 0, 1],
+            metric_names=["reward"] * 4,
+            metric_values=[10.0, 20.0, 30.0, 40.0],
+            stats_epoch=test_data["epochs"][0].id,
+            eval_name="batch_suite/test_env",
+            simulation_suite="batch_suite",
+        )
+
+        def heatmap_cell() -> Dict[str, Any]:
+            response = test_client.post(
+                "/heatmap/heatmap",
+                json={
+                    "training_run_ids": [str(test_data["training_run"].id)],
+                    "run_free_policy_ids": [],
+                    "eval_names": ["batch_suite/test_env"],
+                    "training_run_policy_selector": "latest",
+                    "metric": "reward",
+                },
+            )
+            assert response.status_code == 200
+            return response.json()["cells"][policy_name]["batch_suite/test_env"]
+
+        # The mean over all agents of all episodes: (10 + 20 + 30 + 40) / 4
+        assert heatmap_cell() == {
+            "evalName": "batch_suite/test_env",
+            "replayUrl": "https://example.com/replay/bulk_1",
+            "value": 25.0,
+        }
+
+        stats_client.record_episode(
+            agent_policies={0: policy.id},
+            agent_metrics={0: {"reward": 60.0}},
+            primary_policy_id=policy.id,
+            stats_epoch=test_data["epochs"][0].id,
+            eval_name="batch_suite/test_env",
+            simulation_suite="batch_suite",
+            replay_url="https://example.com/replay/single",
+        )
+
+        assert heatmap_cell() == {
+            "evalName": "batch_suite/test_env",
+            "replayUrl": "https://example.com/replay/single",
+            "value": 32.0,
+        }
+
     def test_invalid_policy_selector_value(self, test_client: TestClient) -> None:
         """Test that invalid training_run_policy_selector values are rejected."""
         response = test_client.post(
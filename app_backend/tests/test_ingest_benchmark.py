@@ -0,0 +1,63 @@
+"""
+Ingest throughput benchmark: episodes/sec written through MettaRepo.record_episodes by concurrent eval workers, each
+sending either one episode per call (like /stats/episodes) or batches (like /stats/episodes/bulk). Runs against the
+test Postgres container; compare the `episodes_per_sec` extra info across parameters.
+"""
+
+import asyncio
+
+import pytest
+
+from metta.app_backend.metta_repo import MettaRepo
+
+NUM_EPISODES = 200
+NUM_AGENTS = 24
+METRICS = [f"metric_{i}" for i in range(20)]
+
+
+class TestIngestBenchmark:
+    @pytest.fixture(scope="class")
+    def ingest(self, db_uri: str):
+        # One loop for the whole class, since the repo's connection pool is bound to the loop that opened it
+        loop = asyncio.new_event_loop()
+        repo = MettaRepo(db_uri)
+        policy_id = loop.run_until_complete(
+            repo.create_policy(name="ingest_benchmark_policy", description=None, url=None, epoch_id=None)
+        )
+        yield loop, repo, policy_id
+        loop.run_until_complete(repo.close())
+        loop.close()
+
+    @pytest.mark.parametrize(
+        "episodes_per_call,num_workers",
+        [(1, 1), (1, 8), (25, 8)],
+        ids=["single-1-worker", "single-8-workers", "batch25-8-workers"],
+    )
+    def test_ingest_throughput(self, benchmark, ingest, episodes_per_call: int, num_workers: int) -> None:
+        loop, repo, policy_id = ingest
+        agent_policies = [(e, a, policy_id) for e in range(episodes_per_call) for a in range(NUM_AGENTS)]
+        agent_metrics = [
+            (e, a, metric, float(a)) for e in range(episodes_per_call) for a in range(NUM_AGENTS) for metric in METRICS
+        ]
+
+        async def worker(num_calls: int) -> None:
+            for _ in range(num_calls):
+                await repo.record_episodes(
+                    primary_policy_id=policy_id,
+                    stats_epoch=None,
+                    eval_name="benchmark/ingest",
+                    simulation_suite="benchmark",
+                    replay_urls=[None] * episodes_per_call,
+                    attributes=[{"seed": 0}] * episodes_per_call,
+                    agent_policies=agent_policies,
+                    agent_metrics=agent_metrics,
+                    tags=["benchmark"],
+                )
+
+        async def ingest_all() -> None:
+            calls_per_worker = NUM_EPISODES // (episodes_per_call * num_workers)
+            await asyncio.gather(*(worker(calls_per_worker) for _ in range(num_workers)))
+
+        benchmark.pedantic(lambda: loop.run_until_complete(ingest_all()), rounds=3, iterations=1)
+        if benchmark.stats is not None:
+            benchmark.extra_info["episodes_per_sec"] = NUM_EPISODES / benchmark.stats.stats.mean
@@ -0,0 +1,155 @@
+"""Tests for the episode-watermark query cache shared by the dashboard and heatmap routes."""
+
+import asyncio
+import uuid
+
+import pytest
+
+from metta.app_backend.metta_repo import RECORD_EPISODE_INGEST_QUERY, MettaRepo
+from metta.app_backend.query_cache import QueryCache
+from metta.app_backend.routes.dashboard_routes import fetch_all_metrics, fetch_new_metrics
+from tests.base_async_test import BaseAsyncTest
+
+
+class TestQueryCache(BaseAsyncTest):
+    async def _record_episode(self, stats_repo: MettaRepo, metric: str = "reward") -> None:
+        policy_id = await stats_repo.create_policy(
+            name=f"query_cache_policy_{uuid.uuid4()}", description=None, url=None, epoch_id=None
+        )
+        await stats_repo.record_episodes(
+            primary_policy_id=policy_id,
+            stats_epoch=None,
+            eval_name="cache_suite/env",
+            simulation_suite="cache_suite",
+            replay_urls=[None],
+            attributes=[{}],
+            agent_policies=[(0, 0, policy_id)],
+            agent_metrics=[(0, 0, metric, 1.0)],
+        )
+
+    @pytest.mark.asyncio
+    async def test_results_are_cached_until_an_episode_is_recorded(self, stats_repo: MettaRepo) -> None:
+        cache = QueryCache(stats_repo.connect)
+        calls = []
+
+        async def compute() -> list[str]:
+            calls.append(1)
+            return [f"result_{len(calls)}"]
+
+        assert await cache.get("route", {"a": 1, "b": 2}, compute) == ["result_1"]
+        # Same parameters in another order
+        assert await cache.get("route", {"b": 2, "a": 1}, compute) == ["result_1"]
+        assert await cache.get("route", {"a": 2, "b": 2}, compute) == ["result_2"]
+        assert await cache.get("other_route", {"a": 1, "b": 2}, compute) == ["result_3"]
+
+        await self._record_episode(stats_repo)
+        assert await cache.get("route", {"a": 1, "b": 2}, compute) == ["result_4"]
+        assert (cache.hits, cache.misses) == (1, 4)
+
+    @pytest.mark.asyncio
+    async def test_concurrent_lookups_share_one_query(self, stats_repo: MettaRepo) -> None:
+        cache = QueryCache(stats_repo.connect)
+        calls = []
+
+        async def compute() -> list[str]:
+            calls.append(1)
+            await asyncio.sleep(0.1)
+            return ["result"]
+
+        results = await asyncio.gather(*(cache.get("route", "params", compute) for _ in range(10)))
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+    @pytest.mark.asyncio
+    async def test_stale_results_are_updated_incrementally(self, stats_repo: MettaRepo) -> None:
+        cache = QueryCache(stats_repo.connect)
+        watermark = await cache.watermark()
+        updates = []
+
+        async def compute() -> list[str]:
+            return ["a"]
+
+        async def update(value: list[str], since: int) -> list[str]:
+            updates.append(since)
+            return value + ["b"]
+
+        assert await cache.get("route", None, compute, update) == ["a"]
+        await self._record_episode(stats_repo)
+        assert await cache.get("route", None, compute, update) == ["a", "b"]
+        assert updates == [watermark]
+
+    @pytest.mark.asyncio
+    async def test_least_recently_used_results_are_evicted(self, stats_repo: MettaRepo) -> None:
+        cache = QueryCache(stats_repo.connect, max_entries=2)
+
+        async def compute() -> int:
+            return cache.misses
+
+        for params in [1, 2, 1, 3]:
+            await cache.get("route", params, compute)
+
+        # 2 was used least recently, so it's computed again
+        assert await cache.get("route", 1, compute) == 1
+        assert await cache.get("route", 3, compute) == 3
+        assert await cache.get("route", 2, compute) == 4
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self, stats_repo: MettaRepo) -> None:
+        cache = QueryCache(stats_repo.connect)
+        results = iter([RuntimeError("query failed"), ["result"]])
+
+        async def compute() -> list[str]:
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        with pytest.raises(RuntimeError, match="query failed"):
+            await cache.get("route", None, compute)
+        assert await cache.get("route", None, compute) == ["result"]
+
+    @pytest.mark.asyncio
+    async def test_ingests_committed_out_of_id_order_are_picked_up(self, stats_repo: MettaRepo) -> None:
+        cache = QueryCache(stats_repo.connect)
+        policy_id = await stats_repo.create_policy(
+            name=f"query_cache_policy_{uuid.uuid4()}", description=None, url=None, epoch_id=None
+        )
+
+        async def get_metrics() -> list[str]:
+            return await cache.get(
+                "get_all_metrics",
+                None,
+                lambda: fetch_all_metrics(stats_repo),
+                lambda metrics, since_version: fetch_new_metrics(stats_repo, metrics, since_version),
+            )
+
+        await self._record_episode(stats_repo)
+        assert "late_metric" not in await get_metrics()
+
+        # An ingest that reserves its internal id, and then commits after an ingest with a larger one
+        async with stats_repo.connect() as late:
+            result = await late.execute(
+                """
+                INSERT INTO episodes (primary_policy_id, eval_name, simulation_suite)
+                VALUES (%s, 'cache_suite/env', 'cache_suite')
+                RETURNING internal_id
+                """,
+                (policy_id,),
+            )
+            (internal_id,) = await result.fetchone()
+            await late.execute(
+                """
+                INSERT INTO episode_agent_metrics (episode_internal_id, agent_id, metric, value)
+                VALUES (%s, 0, 'late_metric', 1)
+                """,
+                (internal_id,),
+            )
+
+            await self._record_episode(stats_repo, metric="early_metric")
+            metrics = await get_metrics()
+            assert "early_metric" in metrics and "late_metric" not in metrics
+
+            await late.execute(RECORD_EPISODE_INGEST_QUERY, ([internal_id],))
+
+        assert "late_metric" in await get_metrics()
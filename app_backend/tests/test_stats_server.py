@@ -106,6 +106,68 @@ class TestStatsServerSimple:
         # Verify all episodes have different IDs
         assert len(set(episode_ids)) == 5
 
+    def test_record_episodes_in_bulk(self, stats_client: StatsClient) -> None:
+        """Test recording a columnar batch of episodes, split over several requests."""
+        policy = stats_client.create_policy(name="bulk_episode_policy")
+        opponent = stats_client.create_policy(name="bulk_episode_opponent")
+
+        num_episodes = 5
+        response = stats_client.record_episodes(
+            primary_policy_id=policy.id,
+            replay_urls=[f"https://example.com/replay_{i}" for i in range(num_episodes)],
+            attributes=[{"seed": i} for i in range(num_episodes)],
+            policy_episodes=[i for i in range(num_episodes) for _ in range(2)],
+            policy_agent_ids=[0, 1] * num_episodes,
+            policy_ids=[policy.id, opponent.id] * num_episodes,
+            metric_episodes=[i for i in range(num_episodes) for _ in range(2)],
+            metric_agent_ids=[0, 1] * num_episodes,
+            metric_names=["reward"] * 2 * num_episodes,
+            metric_values=[float(i * 10 + agent) for i in range(num_episodes) for agent in range(2)],
+            eval_name="bulk/test_env",
+            tags=["bulk"],
+            episodes_per_request=2,
+        )
+        assert len(set(response.ids)) == num_episodes
+
+        # Every row went to its own episode, whichever request it was sent in.
+        result = stats_client.http_client.post(
+            "/sql/query",
+            json={
+                "query": f"""
+                    SELECT e.replay_url, e.env_name, eam.agent_id, eam.value
+                    FROM episodes e
+                    JOIN episode_agent_metrics eam ON e.internal_id = eam.episode_internal_id
+                    WHERE e.primary_policy_id = '{policy.id}'
+                    ORDER BY e.replay_url, eam.agent_id
+                """
+            },
+            headers={"X-Auth-Token": stats_client.machine_token},
+        )
+        assert result.status_code == 200, result.text
+        assert result.json()["rows"] == [
+            [f"https://example.com/replay_{i}", "test_env", agent, float(i * 10 + agent)]
+            for i in range(num_episodes)
+            for agent in range(2)
+        ]
+
+    def test_record_episodes_rejects_rows_of_unknown_episodes(self, stats_client: StatsClient) -> None:
+        """Test that bulk episode rows must refer to episodes in the batch."""
+        policy = stats_client.create_policy(name="bulk_episode_invalid_policy")
+        response = stats_client.http_client.post(
+            "/stats/episodes/bulk",
+            json={
+                "primary_policy_id": str(policy.id),
+                "replay_urls": [None],
+                "attributes": [{}],
+                "metric_episodes": [1],
+                "metric_agent_ids": [0],
+                "metric_names": ["reward"],
+                "metric_values": [1.0],
+            },
+            headers={"X-Auth-Token": stats_client.machine_token},
+        )
+        assert response.status_code == 422
+
     def test_policy_id_lookup_empty(self, stats_client: StatsClient) -> None:
         """Test policy ID lookup with empty list."""
         policy_ids = stats_client.get_policy_ids([])
@@ -1,4 +1,3 @@
-import json
 import logging
 import os
 from urllib.parse import unquote
@@ -16,8 +15,7 @@ from metta.common.util.mettagrid_cfgs import (
 )
 from metta.common.util.resolvers import register_resolvers
 from metta.map.utils.storable_map import StorableMap, StorableMapDict
-from metta.map.utils.storable_map_index import StorableMapIndex
-from metta.mettagrid.util.file import read
+from metta.map.utils.storable_map_index import MapFilter, StorableMapIndex, parse_filter
 
 logger = logging.getLogger("metta.gridworks.server")
 
@@ -56,15 +54,12 @@ def make_app():
 
     @app.get("/stored-maps/find-maps")
     async def route_stored_maps_find_maps(dir: str, filter: str) -> StoredMapsFindMapsResult:
-        print(filter)
-        filter_items: list[tuple[str, str]] = []
+        filter_items: list[MapFilter] = []
         for item in filter.split(","):
             if not item:
                 continue
-            if "=" not in item:
-                raise ValueError(f"Invalid filter item: {item}")
-            key, value = item.split("=")
-            filter_items.append((key, unquote(value)))
+            key, op, value = parse_filter(item)
+            filter_items.append((key, op, unquote(value)))
 
         index = StorableMapIndex.load(dir)
         map_files = index.find_maps(filter_items)
@@ -82,12 +77,12 @@ def make_app():
 
     @app.post("/stored-maps/index-dir")
     async def route_stored_maps_index_dir(dir: str) -> StoredMapsIndexDirResult:
-        StorableMapIndex.create(dir)
+        StorableMapIndex.refresh(dir)
         return {"success": True}
 
     @app.get("/stored-maps/get-index")
     async def route_stored_maps_get_index(dir: str) -> dict:
-        return json.loads(read(f"{dir}/index.json").decode("utf-8"))
+        return StorableMapIndex.load(dir).value_index()
 
     @app.get("/mettagrid-cfgs")
     async def route_mettagrid_cfgs() -> dict[CfgKind, list[dict]]:
@@ -1,3 +1,4 @@
+import hashlib
 from typing import cast
 
 import numpy as np
@@ -7,6 +8,7 @@ from metta.map.scene import make_scene
 from metta.map.utils.storable_map import StorableMap
 from metta.mettagrid.level_builder import Level
 from metta.mettagrid.room.room import Room
+from metta.mettagrid.util import file as file_utils
 
 from .types import Area, SceneCfg
 
@@ -24,7 +26,10 @@ class Load(Room):
     def __init__(self, uri: str, extra_root: SceneCfg | DictConfig | None = None):
         super().__init__()
         self._uri = uri
-        self._storable_map = StorableMap.from_uri(uri)
+        # Read by cache_key() or the first build, and parsed on the first build, so levels served from a LevelCache are
+        # never parsed.
+        self._map_content: str | None = None
+        self._storable_map: StorableMap | None = None
 
         if isinstance(extra_root, DictConfig):
             extra_root = cast(dict, OmegaConf.to_container(extra_root))
@@ -32,7 +37,22 @@ class Load(Room):
         if isinstance(extra_root, dict):
             self._extra_root = extra_root
 
+    def _read_map(self) -> str:
+        if self._map_content is None:
+            self._map_content = file_utils.read(self._uri).decode()
+        return self._map_content
+
+    def cache_key(self):
+        # The level is determined by the stored map (which may be rewritten under the same URI), unless extra_root
+        # renders on top of it with an unseeded rng.
+        if self._extra_root is not None:
+            return None
+        map_digest = hashlib.sha256(self._read_map().encode()).hexdigest()
+        return {"type": "Load", "uri": self._uri, "map_sha256": map_digest}
+
     def build(self):
+        if self._storable_map is None:
+            self._storable_map = StorableMap.from_str(self._read_map())
         grid = self._storable_map.grid
 
         area = Area.root_area_from_grid(grid)
@@ -1,28 +1,53 @@
+import functools
 import random
 
+from omegaconf import ListConfig, OmegaConf
+
 from metta.map.load import Load
+from metta.map.utils.storable_map_index import INDEX_FILENAME, MapFilter, StorableMapIndex
 from metta.mettagrid.util import file as file_utils
 
 from .types import SceneCfg
 
 
+@functools.lru_cache(maxsize=32)
+def _candidate_uris(index_uri: str, filters: tuple[MapFilter, ...]) -> tuple[str, ...]:
+    # Cached, so that only the first map built from an index pays for fetching and querying it, and later draws are
+    # constant-time no matter how many maps the index has.
+    if index_uri.endswith(INDEX_FILENAME):
+        return tuple(StorableMapIndex.load_from_uri(index_uri).find_maps(list(filters)))
+
+    # A plain list of map URIs, one per line.
+    if filters:
+        raise ValueError(f"Filters are only supported for {INDEX_FILENAME} indexes, got {index_uri}")
+    return tuple(line for line in file_utils.read(index_uri).decode().split("\n") if line)
+
+
 class LoadRandomFromIndex(Load):
     """
     Load a random map from a list of pregenerated maps.
 
-    The index file can be produced with the following command:
-        python -m tools.index_s3_maps --dir=s3://...
+    `index_uri` is either a `StorableMapIndex` database (`<dir>/index.duckdb`, see `StorableMapIndex.refresh`), in
+    which case the map is drawn from the maps that match `filters`, or a text file with one map URI per line.
 
     See also: `LoadRandom` for a version that loads a random map from an S3 directory.
     """
 
-    def __init__(self, index_uri: str, extra_root: SceneCfg | None = None):
+    def __init__(
+        self,
+        index_uri: str,
+        filters: list[MapFilter] | ListConfig | None = None,
+        extra_root: SceneCfg | None = None,
+    ):
         self._index_uri = index_uri
 
-        # For 10k maps in a directory we'd have to fetch 100Kb of index data.
-        # (Can we optimize this further by caching?)
-        index = file_utils.read(self._index_uri).decode()
-        index = index.split("\n")
-        random_map_uri = random.choice(index)
+        if isinstance(filters, ListConfig):
+            filters = OmegaConf.to_container(filters)  # type: ignore[assignment]
+        filters_key = tuple(tuple(map_filter) for map_filter in filters or [])
+
+        candidates = _candidate_uris(index_uri, filters_key)
+        if not candidates:
+            raise ValueError(f"No maps in {index_uri} match {list(filters_key)}")
+        random_map_uri = random.choice(candidates)
 
         super().__init__(random_map_uri, extra_root)
@@ -1,17 +1,69 @@
-from typing import cast
+import hashlib
+from pathlib import Path
+from typing import Any, cast
 
 import numpy as np
 from omegaconf import DictConfig, OmegaConf
 
 from metta.common.util.config import Config
+from metta.map.config import scenes_root
 from metta.map.scene import Scene, load_class, make_scene, scene_cfg_to_dict
 from metta.map.scenes.room_grid import RoomGrid, RoomGridParams
 from metta.map.scenes.transplant_scene import TransplantScene
 from metta.map.types import MapGrid
+from metta.mettagrid.coded_grid import CodedGrid, count_agents
 from metta.mettagrid.level_builder import Level, LevelBuilder
 
 from .types import Area, AreaWhere, ChildrenAction, SceneCfg
 
+# Part of the cache key of seeded maps (see `LevelBuilder.cache_key`). Bump it when a change to MapGen or to scene code
+# changes the maps built from existing configs, so that levels cached by the old code aren't served anymore.
+MAPGEN_VERSION = 1
+
+
+def _referenced_file(value: str) -> Path | None:
+    # Scene configs are referenced relative to the scenes root (see `scene_cfg_to_dict`), other files (e.g. ascii maps)
+    # relative to the working directory.
+    if not value or "\n" in value:
+        return None
+    for path in (scenes_root / value.lstrip("/"), Path(value)):
+        try:
+            if path.is_file():
+                return path.resolve()
+        except OSError:
+            pass  # not a valid path
+    return None
+
+
+def referenced_file_digests(cfg: Any, digests: dict[str, str] | None = None) -> dict[str, str]:
+    """
+    SHA-256 of each file that a scene config refers to, by path: scene configs (and the files they refer to in turn),
+    ascii maps, and the files in the directories of `dir` params.
+    """
+    if digests is None:
+        digests = {}
+
+    files: list[Path] = []
+    if isinstance(cfg, dict):
+        for key, value in cfg.items():
+            if key == "dir" and isinstance(value, str) and Path(value).is_dir():
+                files.extend(sorted(path.resolve() for path in Path(value).iterdir() if path.is_file()))
+            else:
+                referenced_file_digests(value, digests)
+    elif isinstance(cfg, (list, tuple)):
+        for value in cfg:
+            referenced_file_digests(value, digests)
+    elif isinstance(cfg, str) and (path := _referenced_file(cfg)) is not None:
+        files.append(path)
+
+    for path in files:
+        if str(path) in digests:
+            continue
+        digests[str(path)] = hashlib.sha256(path.read_bytes()).hexdigest()
+        if path.suffix in (".yaml", ".yml"):
+            referenced_file_digests(OmegaConf.to_container(OmegaConf.load(path)), digests)
+    return digests
+
 
 class MapGenParams(Config):
     # Root scene configuration.
@@ -75,6 +127,17 @@ class MapGen(LevelBuilder):
         self.seed = params.seed
         self.rng = np.random.default_rng(self.seed)
 
+        # build() overwrites some of the fields above (e.g. width and height from the root scene's intrinsic size), so
+        # the cache key is taken from the params as given.
+        self._params_key = {"type": "MapGen", **params.model_dump(mode="json", exclude={"root"}), "root": self.root}
+
+    def cache_key(self):
+        # Without a seed, every build is different.
+        if self.seed is None:
+            return None
+        # Files are hashed on every call, so that a config or map edited in the meantime isn't served from the cache.
+        return {**self._params_key, "version": MAPGEN_VERSION, "files": referenced_file_digests(self.root)}
+
     def build(self):
         if not self.width or not self.height:
             dict_cfg = scene_cfg_to_dict(self.root)
@@ -89,13 +152,13 @@ class MapGen(LevelBuilder):
             # Auto-detect the number of instances.
             # We'll render the first instance in a separate grid to count the number of agents.
             # Then we'll transplant it into the final multi-instance grid.
-            single_instance_grid = np.full((self.height, self.width), "empty", dtype="<U50")
+            single_instance_grid = CodedGrid.full((self.height, self.width), "empty")
             single_instance_area = Area(
                 x=0, y=0, width=self.width, height=self.height, grid=single_instance_grid, tags=[]
             )
             single_instance_scene = make_scene(self.root, single_instance_area, rng=self.rng)
             single_instance_scene.render_with_children()
-            single_instance_num_agents = int(np.count_nonzero(np.char.startswith(single_instance_grid, "agent")))
+            single_instance_num_agents = count_agents(single_instance_grid)
             if self.num_agents % single_instance_num_agents != 0:
                 raise ValueError(
                     f"Number of agents {self.num_agents} is not divisible by number of agents in a single instance"
@@ -124,11 +187,7 @@ class MapGen(LevelBuilder):
 
         bw = self.border_width
 
-        self.grid: MapGrid = np.full(
-            (self.inner_height + 2 * bw, self.inner_width + 2 * bw),
-            "empty",
-            dtype="<U50",
-        )
+        self.grid: MapGrid = CodedGrid.full((self.inner_height + 2 * bw, self.inner_width + 2 * bw), "empty")
 
         # draw outer walls
         # note that the inner walls when instances > 1 will be drawn by the RoomGrid scene
@@ -166,6 +225,8 @@ class MapGen(LevelBuilder):
                     )
                 )
 
+            # All remaining instances come from a single action, so scenes that support it (see `Scene.render_batch`)
+            # generate them together.
             children_actions.append(
                 ChildrenAction(
                     scene=self.root,
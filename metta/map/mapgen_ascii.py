@@ -1,5 +1,7 @@
+import hashlib
+
 from metta.common.util.config import Config
-from metta.map.mapgen import MapGen
+from metta.map.mapgen import MAPGEN_VERSION, MapGen
 
 
 class MapGenAsciiParams(Config):
@@ -44,3 +46,15 @@ class MapGenAscii(MapGen):
             border_width=ascii_params.border_width,
             root={"type": "metta.map.scenes.ascii.Ascii", "params": {"uri": ascii_params.uri}},
         )
+        self._ascii_params = ascii_params
+
+    def cache_key(self):
+        # ASCII maps are fully determined by the file contents.
+        with open(self._ascii_params.uri, "rb") as f:
+            map_digest = hashlib.sha256(f.read()).hexdigest()
+        return {
+            "type": "MapGenAscii",
+            "version": MAPGEN_VERSION,
+            "map_sha256": map_digest,
+            "border_width": self._ascii_params.border_width,
+        }
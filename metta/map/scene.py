@@ -132,14 +132,37 @@ class Scene(Generic[ParamsT]):
 
     def render_with_children(self):
         self.render()
+        self.render_children()
 
+    def render_children(self):
         for action in self.get_children():
             areas = self.select_areas(action)
+            action_children = []
             for area in areas:
                 child_rng = self.rng.spawn(1)[0]
                 child_scene = make_scene(cfg=action.scene, area=area, rng=child_rng)
                 self.children.append(child_scene)
-                child_scene.render_with_children()
+                action_children.append(child_scene)
+
+            # Children of one action almost always share a class, so they can be rendered as a batch.
+            child_classes = {type(child) for child in action_children}
+            if len(child_classes) == 1:
+                child_classes.pop().render_batch(action_children)
+            else:
+                for child_scene in action_children:
+                    child_scene.render_with_children()
+
+    @classmethod
+    def render_batch(cls, scenes: list[Scene]):
+        """
+        Render several scenes of this class, with their children.
+
+        Scenes are rendered one by one by default. Subclasses whose rendering is vectorized can override this to render
+        all scenes at once, e.g. all instances of a multi-instance MapGen map. Each scene should still only use its
+        own rng, so that the result is the same as when rendering scenes one by one.
+        """
+        for scene in scenes:
+            scene.render_with_children()
 
     def make_area(self, x: int, y: int, width: int, height: int, tags: Optional[list[str]] = None) -> Area:
         area = Area(
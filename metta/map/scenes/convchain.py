@@ -23,6 +23,7 @@
 # software.
 
 import math
+from collections import defaultdict
 
 import numpy as np
 
@@ -40,14 +41,88 @@ class ConvChainParams(Config):
     symmetry: Symmetry = "all"
 
 
+def _independent_lines(size: int, n: int) -> list[np.ndarray]:
+    """
+    Splits `range(size)` into groups of lines that are at least `n` apart, wrapping around.
+
+    Lines are grouped by their remainder modulo `n`; if `size` is not a multiple of `n`, the last `size % n` lines would
+    be too close to the first ones across the wrap, so each of them gets a group of its own.
+    """
+    full = size - size % n
+    return [np.arange(r, full, n) for r in range(min(n, full))] + [np.array([i]) for i in range(full, size)]
+
+
+def _window_indices(fields: np.ndarray, n: int) -> np.ndarray:
+    """Pattern index (see `Pattern.index`) of the periodic `n`x`n` window at each position of each field."""
+    indices = np.zeros(fields.shape, dtype=np.int64)
+    for dy in range(n):
+        for dx in range(n):
+            indices |= np.roll(fields, (-dy, -dx), axis=(-2, -1)).astype(np.int64) << (dy * n + dx)
+    return indices
+
+
+def convchain_sample(
+    log_weights: np.ndarray,
+    n: int,
+    iterations: int,
+    temperature: float,
+    shape: tuple[int, int],
+    rngs: list[np.random.Generator],
+) -> np.ndarray:
+    """
+    Samples `len(rngs)` independent fields with the ConvChain Metropolis chain, and returns them as a boolean array of
+    shape `(len(rngs), height, width)`.
+
+    Flipping a cell only changes the `n`x`n` windows that cover it, so cells that are at least `n` apart in either
+    direction can be updated at the same time. Each iteration sweeps over the groups of such cells, computing the
+    energy change for all cells of a group (and all fields) with array operations. Field `i` only draws random numbers
+    from `rngs[i]`, so it doesn't depend on the other fields in the batch.
+    """
+    height, width = shape
+    fields = np.stack([rng.choice([False, True], size=shape) for rng in rngs])
+    indices = _window_indices(fields, n)
+
+    groups = []
+    for ys in _independent_lines(height, n):
+        for xs in _independent_lines(width, n):
+            cell_ys, cell_xs = (a.ravel() for a in np.meshgrid(ys, xs, indexing="ij"))
+            # The windows that cover each cell, with the bit that the cell has in them.
+            windows = [
+                ((cell_ys - dy) % height, (cell_xs - dx) % width, 1 << (dy * n + dx))
+                for dy in range(n)
+                for dx in range(n)
+            ]
+            groups.append((cell_ys, cell_xs, windows))
+
+    for _ in range(iterations):
+        # Each cell is updated once per iteration.
+        log_uniforms = np.log(np.stack([rng.random(shape) for rng in rngs]))
+        for cell_ys, cell_xs, windows in groups:
+            delta = np.zeros((len(rngs), len(cell_ys)))
+            for window_ys, window_xs, bit in windows:
+                window_indices = indices[:, window_ys, window_xs]
+                delta += log_weights[window_indices ^ bit] - log_weights[window_indices]
+
+            # Same acceptance rule as ConvChainSlow: flip if (q / p) ** (1 / temperature) >= uniform.
+            flip = log_uniforms[:, cell_ys, cell_xs] < delta / temperature
+            fields[:, cell_ys, cell_xs] ^= flip
+            field_ids, cell_ids = np.nonzero(flip)
+            for window_ys, window_xs, bit in windows:
+                indices[field_ids, window_ys[cell_ids], window_xs[cell_ids]] ^= bit
+
+    return fields
+
+
 class ConvChain(Scene[ConvChainParams]):
     """
-    ConvChain scene generator, based on https://github.com/mxgmn/ConvChain
-    (ConvChainFast.cs version).
+    ConvChain scene generator, based on https://github.com/mxgmn/ConvChain.
 
     This algorithm generates patterns similar to a given sample pattern.
     It uses a statistical model to capture local features of the sample
     and then generates new patterns with similar local characteristics.
+
+    Cells are updated in parallel with array operations (see `convchain_sample`), and scenes with the same params and
+    size are generated together when rendered as a batch.
     """
 
     def post_init(self):
@@ -61,67 +136,34 @@ class ConvChain(Scene[ConvChainParams]):
         self._weights = np.maximum(self._weights, 0.1)
 
     def render(self):
-        # Generate the field using the ConvChain algorithm
-
-        params = self.params
-
-        # Intentionally use a list here, to avoid numpy array overhead.
-        # (The code is not vectorized, so numpy is not faster here)
-        field = self.rng.choice([False, True], size=self.grid.shape).tolist()
-        weights = list(self._weights)
-
-        n = params.pattern_size
-
-        r = 0
-        for _ in range(params.iterations * self.width * self.height):
-            x0 = self.rng.integers(0, self.width, dtype=int)
-            y0 = self.rng.integers(0, self.height, dtype=int)
-
-            # This algorithm applies some clever bitwise magic to calculate the
-            # energy of the field.
-            #
-            # Refer to the implementation in ConvChainSlow class for more
-            # details, and to the original C# code at
-            # https://github.com/mxgmn/ConvChain/blob/master/ConvChainFast.cs.
-            q = 1
-            for sy in range(y0 - n + 1, y0 + n):
-                for sx in range(x0 - n + 1, x0 + n):
-                    ind = 0
-                    difference = 0
-                    for dy in range(n):
-                        for dx in range(n):
-                            x = (sx + dx) % self.width
-                            y = (sy + dy) % self.height
-
-                            value = field[y][x]
-                            power = 1 << (dy * n + dx)
-                            if value:
-                                ind += power
-                            if x == x0 and y == y0:
-                                difference = power if value else -power
-
-                    q *= weights[ind - difference] / weights[ind]
-
-            # For the sake of parity with ConvChainSlow class, we pre-generate a
-            # random number.
-            # (This allows us to compare whether the output is identical to the
-            # ConvChainSlow version, can be optimized later)
-            rnd = self.rng.random()
-            if q >= 1:
-                field[y0][x0] = not field[y0][x0]
-                continue
-
-            if self.params.temperature != 1:
-                q = q ** (1.0 / self.params.temperature)
-
-            r += 1
-            if q > rnd:
-                field[y0][x0] = not field[y0][x0]
-
-        # Apply the generated field to the scene grid
-        for y in range(self.height):
-            for x in range(self.width):
-                self.grid[y, x] = "wall" if field[y][x] else "empty"
+        self._render_fields([self])
+
+    @classmethod
+    def render_batch(cls, scenes: list[Scene]):
+        batches: dict[tuple, list[ConvChain]] = defaultdict(list)
+        for scene in scenes:
+            assert isinstance(scene, ConvChain)
+            batches[(scene.grid.shape, scene.params.model_dump_json())].append(scene)
+
+        for batch in batches.values():
+            cls._render_fields(batch)
+
+        for scene in scenes:
+            scene.render_children()
+
+    @staticmethod
+    def _render_fields(scenes: list["ConvChain"]):
+        params = scenes[0].params
+        fields = convchain_sample(
+            np.log(scenes[0]._weights),
+            params.pattern_size,
+            params.iterations,
+            params.temperature,
+            scenes[0].grid.shape,
+            [scene.rng for scene in scenes],
+        )
+        for scene, field in zip(scenes, fields, strict=True):
+            scene.grid[:] = np.where(field, "wall", "empty")
 
 
 class ConvChainSlow(Scene[ConvChainParams]):
@@ -1,7 +1,16 @@
+import logging
+
 import numpy as np
 
 from metta.common.util.config import Config
 from metta.map.scene import Scene
+from metta.map.utils.connectivity import all_adjacent, label_components
+
+logger = logging.getLogger(__name__)
+
+# Candidate positions sampled per object to place before giving up, e.g. when the cells the agent can reach are all far
+# from the mean distance.
+MAX_ATTEMPTS_PER_OBJECT = 1000
 
 
 class MeanDistanceParams(Config):
@@ -12,8 +21,19 @@ class MeanDistanceParams(Config):
 class MeanDistance(Scene[MeanDistanceParams]):
     """
     This scene places an agent at the center of the scene and places objects at a mean distance from the agent.
+
+    Objects are only placed on empty cells the agent can reach, and never where they would cut the agent off from an
+    object placed before, so every object ends up next to a cell the agent can walk to. This also works on top of scenes
+    that drew walls. Raises if there are fewer such cells than objects; objects that can't be placed in
+    MAX_ATTEMPTS_PER_OBJECT tries are skipped with a warning.
     """
 
+    def _reachable(self, agent_pos: tuple[int, int]) -> np.ndarray:
+        passable = self.grid == "empty"
+        passable[agent_pos] = True
+        labels, _ = label_components(passable)
+        return labels == labels[agent_pos]
+
     def render(self):
         # Define the agent's initial position (here: center of the room)
         agent_pos = (self.height // 2, self.width // 2)
@@ -21,11 +41,21 @@ class MeanDistance(Scene[MeanDistanceParams]):
         # Place the agent at the center.
         self.grid[agent_pos] = "agent.agent"
 
+        reachable = self._reachable(agent_pos)
+        total_count = sum(self.params.objects.values())
+        free_count = int(reachable.sum()) - 1
+        if total_count > free_count:
+            raise ValueError(f"Too many objects for the empty cells the agent can reach: {total_count} > {free_count}")
+
+        placed_objects = np.zeros_like(reachable)
+
         # Place each object based on a Poisson-distributed distance from the agent.
         # For each object type and the number of instances required:
         for obj_name, count in self.params.objects.items():
             placed = 0
-            while placed < count:
+            for _ in range(count * MAX_ATTEMPTS_PER_OBJECT):
+                if placed == count:
+                    break
                 # Sample a distance from a Poisson distribution.
                 d = self.rng.poisson(lam=self.params.mean_distance)
                 # Ensure a nonzero distance (so objects don't collide with the agent)
@@ -38,11 +68,26 @@ class MeanDistance(Scene[MeanDistanceParams]):
                 dy = int(round(d * np.sin(angle)))
                 # Candidate position (note: grid indexing is row, col so we add dy then dx).
                 candidate = (agent_pos[0] + dy, agent_pos[1] + dx)
-                # Check if candidate position is inside the room and unoccupied.
-                if (
+                # Check if candidate position is inside the room, reachable and unoccupied.
+                if not (
                     0 <= candidate[0] < self.height
                     and 0 <= candidate[1] < self.width
+                    and reachable[candidate]
                     and self.grid[candidate] == "empty"
                 ):
-                    self.grid[candidate] = obj_name
-                    placed += 1
+                    continue
+
+                # Objects block movement, so make sure this one doesn't wall off the ones already placed (or itself).
+                self.grid[candidate] = obj_name
+                placed_objects[candidate] = True
+                new_reachable = self._reachable(agent_pos)
+                if not all_adjacent(placed_objects, new_reachable):
+                    self.grid[candidate] = "empty"
+                    placed_objects[candidate] = False
+                    continue
+
+                reachable = new_reachable
+                placed += 1
+
+            if placed < count:
+                logger.warning(f"Placed only {placed} of {count} {obj_name} objects: no room near the agent")
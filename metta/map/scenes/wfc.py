@@ -22,7 +22,10 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import heapq
+#
+# Unlike the original, the wave is stored as bitsets and propagated in batches instead of pattern-by-pattern support
+# counting; see `WFCRenderSession` for details.
+
 import logging
 import time
 from typing import Literal
@@ -37,14 +40,12 @@ logger = logging.getLogger(__name__)
 
 dx = [0, 1, 0, -1]
 dy = [-1, 0, 1, 0]
+_dx = np.array(dx)[:, None]
+_dy = np.array(dy)[:, None]
 
 NextNodeHeuristic = Literal["scanline", "mrv", "entropy"]
 
 
-def opposite_direction(d: int) -> int:
-    return (d + 2) % 4
-
-
 class WFCParams(Config):
     pattern: str
     pattern_size: int = 3
@@ -64,11 +65,12 @@ class WFC(Scene[WFCParams]):
         )
 
         self._weights = np.array([p[1] for p in patterns_with_counts], dtype=np.float64)
+        self._weight_log_weights = self._weights * np.log(self._weights)
         self._patterns = [p[0] for p in patterns_with_counts]
         self._pattern_count = len(self._weights)
 
         self._sum_of_weights = np.sum(self._weights)
-        self._sum_of_weight_log_weights = np.sum(self._weights * np.log(self._weights))
+        self._sum_of_weight_log_weights = np.sum(self._weight_log_weights)
 
         self._starting_entropy = np.log(self._sum_of_weights) - self._sum_of_weight_log_weights / self._sum_of_weights
 
@@ -82,75 +84,78 @@ class WFC(Scene[WFCParams]):
         Here we pre-calculate pattern compatibility, and we'll use this to check the compatibility of potential
         patterns going forward, when we exclude some possibility from the wave function and want to propagate
         the change.
-        """
-        self._propagator = []  # no point in using numpy arrays here (I tested it, it's slower)
 
-        self._propagator_lengths = np.zeros((4, self._pattern_count), dtype=np.int_)
+        `_propagator[d, t2]` is the bitset of patterns `t1` such that `t2` can be placed at offset `(dx[d], dy[d])`
+        from `t1`. OR-ing it over the patterns left in a cell gives the patterns its neighbor at the opposite offset
+        can still have.
+        """
+        size = self.params.pattern_size
+        data = np.stack([pattern.data for pattern in self._patterns])
 
+        compatible = np.zeros((4, self._pattern_count, self._pattern_count), dtype=np.bool_)
         for d in range(4):
-            d_propagator = []
-            for t in range(self._pattern_count):
-                compatibles = []
-                for t2 in range(self._pattern_count):
-                    if self._patterns[t].is_compatible(self._patterns[t2], dx[d], dy[d]):
-                        compatibles.append(t2)
-                d_propagator.append(compatibles)
-                self._propagator_lengths[d, t] = len(compatibles)
-            self._propagator.append(d_propagator)
+            # The region where two patterns overlap, in the coordinates of the first and of the second pattern.
+            first = data[:, max(dy[d], 0) : size + min(dy[d], 0), max(dx[d], 0) : size + min(dx[d], 0)]
+            second = data[:, max(-dy[d], 0) : size + min(-dy[d], 0), max(-dx[d], 0) : size + min(-dx[d], 0)]
+            first = first.reshape(self._pattern_count, 1, -1)
+            second = second.reshape(1, self._pattern_count, -1)
+            compatible[d] = np.all(first == second, axis=2).T
+
+        self._propagator = self._pack(compatible)
+        self._single_patterns = self._pack(np.eye(self._pattern_count, dtype=np.bool_))
+
+    def _pack(self, bits: np.ndarray) -> np.ndarray:
+        """Packs boolean arrays over patterns (along the last axis) into uint64 bitsets."""
+        words = -(-self._pattern_count // 64)
+        padding = [(0, 0)] * (bits.ndim - 1) + [(0, words * 64 - self._pattern_count)]
+        packed = np.packbits(np.pad(bits, padding), axis=-1, bitorder="little")
+        return packed.view(np.uint64)
+
+    def _unpack(self, packed: np.ndarray) -> np.ndarray:
+        """Inverse of `_pack`."""
+        bits = np.unpackbits(packed.view(np.uint8), axis=-1, bitorder="little")
+        return bits[..., : self._pattern_count].view(np.bool_)
 
     def render(self):
         WFCRenderSession(self).run()
 
 
 class WFCRenderSession:
+    """
+    A single WFC run over the scene's area.
+
+    The wave holds a bitset of the patterns still possible in each cell, as a `(cells, words)` uint64 array with cells
+    in row-major order. Propagation works on all cells changed in the previous step at once: for each changed cell
+    and direction, the propagator bitsets of its remaining patterns are OR-ed into the patterns its neighbor may keep;
+    these are AND-ed per neighbor and intersected with the neighbor's wave. Neighbors that lost patterns are the
+    cells changed in the next step, until nothing changes.
+    """
+
     def __init__(self, scene: WFC):
         self.scene = scene
 
-        self.pattern_count = len(self.scene._weights)
+        self.pattern_count = scene._pattern_count
         self.width = self.scene.width
         self.height = self.scene.height
 
         self.reset()
 
     def reset(self):
-        start = time.time()
-        self.wave = np.full((self.height, self.width, self.pattern_count), True, dtype=np.bool_)
+        cell_count = self.width * self.height
+        self.wave = np.repeat(self.scene._pack(np.ones((1, self.pattern_count), dtype=np.bool_)), cell_count, axis=0)
+        self.sums_of_ones = np.full(cell_count, self.pattern_count, dtype=np.int_)
+        self.entropies = np.full(cell_count, self.scene._starting_entropy, dtype=np.float64)
 
-        self.compatible = np.zeros((self.height, self.width, 4, self.pattern_count), dtype=np.int_)
+        # Breaks ties between cells with the same score, as in the original.
+        self.noise = self.scene.rng.random(cell_count) * 1e-6
 
-        for y in range(self.height):
-            for x in range(self.width):
-                for d in range(4):
-                    self.compatible[y, x, d, :] = self.scene._propagator_lengths[opposite_direction(d), :]
-
-        self.sums_of_ones = np.full((self.height, self.width), len(self.scene._weights), dtype=np.int_)
-        self.sums_of_weights = np.full((self.height, self.width), self.scene._sum_of_weights, dtype=np.float64)
-        self.sums_of_weight_log_weights = np.full(
-            (self.height, self.width),
-            self.scene._sum_of_weight_log_weights,
-            dtype=np.float64,
-        )
         self.observed = 0
-        self.queue = []
-        for y in range(self.height):
-            for x in range(self.width):
-                heapq.heappush(self.queue, (self.cell_score(x, y), x, y))
-
-        self.stack = np.zeros((self.width * self.height * self.pattern_count, 3), dtype=np.int_)
-        self.stacksize = 0
-        logger.debug(f"reset() time: {time.time() - start}")
 
         self._pick_next_time = 0
         self._pick_next_count = 0
         self._observe_time = 0
         self._propagate_time = 0
 
-    def cell_score(self, x: int, y: int) -> float:
-        if self.scene._next_node_heuristic == "mrv":
-            return self.sums_of_ones[y, x]
-        else:
-            return self.scene._starting_entropy
-
     def attempt_run(self):
         while True:
             cell = self.pick_next_node()
@@ -159,7 +164,7 @@ class WFCRenderSession:
 
             self.observe(cell)
             start = time.time()
-            if not self.propagate():
+            if not self.propagate(np.array([cell])):
                 return False
             self._propagate_time += time.time() - start
 
@@ -186,84 +191,76 @@ class WFCRenderSession:
         if not ok:
             raise Exception(f"Failed to generate map with pattern:\n{self.scene.params.pattern}")
 
-        for y in range(self.height):
-            for x in range(self.width):
-                for t in range(self.pattern_count):
-                    if self.wave[y, x, t]:
-                        self.scene.grid[y, x] = "wall" if self.scene._patterns[t].data[0][0] else "empty"
+        is_wall = np.array([pattern.data[0, 0] for pattern in self.scene._patterns])
+        chosen = self.scene._unpack(self.wave).argmax(axis=1).reshape(self.height, self.width)
+        self.scene.grid[:] = np.where(is_wall[chosen], "wall", "empty")
 
-    def pick_next_node(self):
-        # non-periodic
+    def pick_next_node(self) -> int | None:
         self._pick_next_count += 1
         start = time.time()
-        used_width = self.width - self.scene.params.pattern_size + 1
-        used_height = self.height - self.scene.params.pattern_size + 1
+        unresolved = self.sums_of_ones > 1
 
         if self.scene._next_node_heuristic == "scanline":
-            for i in range(self.observed, used_width * used_height):
-                y = i // used_width
-                x = i % used_width
-                if self.sums_of_ones[y, x] > 1:
-                    self.observed = i + 1
-                    return (y, x)
-            return None
+            remaining = unresolved[self.observed :]
+            cell = self.observed + int(np.argmax(remaining)) if remaining.any() else None
+            if cell is not None:
+                self.observed = cell + 1
         else:  # entropy or mrv
-            while len(self.queue) > 0:
-                _, x, y = heapq.heappop(self.queue)
-                if self.sums_of_ones[y, x] > 1:
-                    self._pick_next_time += time.time() - start
-                    return (y, x)
-            return None
-
-    def observe(self, cell: tuple[int, int]):
-        start = time.time()
-        y, x = cell
-        distribution = self.wave[y, x] * self.scene._weights
-        distribution /= np.sum(distribution)
-        r = self.scene.rng.choice(range(self.pattern_count), p=distribution)
-        for t in range(self.pattern_count):
-            if t != r and self.wave[y, x, t]:
-                self.ban(y, x, t)
-        self._observe_time += time.time() - start
-
-    def ban(self, y: int, x: int, t: int) -> bool:
-        self.wave[y, x, t] = False
-        self.compatible[y, x, :, t] = 0
-
-        self.stack[self.stacksize] = (y, x, t)
-        self.stacksize += 1
+            scores = self.entropies if self.scene._next_node_heuristic == "entropy" else self.sums_of_ones
+            cell = int(np.argmin(np.where(unresolved, scores + self.noise, np.inf)))
+            if not unresolved[cell]:
+                cell = None
 
-        self.sums_of_ones[y, x] -= 1
-        if self.sums_of_ones[y, x] == 0:
-            return False
+        self._pick_next_time += time.time() - start
+        return cell
 
-        self.sums_of_weights[y, x] -= self.scene._weights[t]
-        self.sums_of_weight_log_weights[y, x] -= self.scene._weights[t] * np.log(self.scene._weights[t])
+    def observe(self, cell: int):
+        start = time.time()
+        cumulative_weights = np.cumsum(self.scene._unpack(self.wave[cell]) * self.scene._weights)
+        r = np.searchsorted(cumulative_weights, self.scene.rng.random() * cumulative_weights[-1], side="right")
+        self.wave[cell] = self.scene._single_patterns[r]
+        self.sums_of_ones[cell] = 1
+        self.entropies[cell] = 0
+        self._observe_time += time.time() - start
 
-        sum = self.sums_of_weights[y, x]
-        if sum > 0:
-            heapq.heappush(self.queue, (self.cell_score(x, y), x, y))
+    def propagate(self, changed: np.ndarray) -> bool:
+        """Narrows down the wave after `changed` cells were narrowed down. Returns False on a contradiction."""
+        bits = self.scene._unpack(self.wave[changed])
+        counts = self.sums_of_ones[changed]
+        while len(changed) > 0:
+            # OR the propagator bitsets over the patterns left in each changed cell, for all directions at once.
+            _, patterns = np.nonzero(bits)
+            supports = np.bitwise_or.reduceat(self.scene._propagator[:, patterns], np.cumsum(counts) - counts, axis=1)
+
+            # Supported patterns apply to the neighbor at the opposite offset; AND them per neighbor.
+            ys, xs = np.divmod(changed, self.width)
+            y2 = ys - _dy
+            x2 = xs - _dx
+            inside = (y2 >= 0) & (y2 < self.height) & (x2 >= 0) & (x2 < self.width)
+            neighbors = (y2 * self.width + x2)[inside]
+            supports = supports[inside]
+            order = np.argsort(neighbors, kind="stable")
+            neighbors = neighbors[order]
+            segments = np.flatnonzero(np.concatenate(([True], neighbors[1:] != neighbors[:-1])))
+            cells = neighbors[segments]
+            allowed = np.bitwise_and.reduceat(supports[order], segments, axis=0)
+
+            before = self.wave[cells]
+            after = before & allowed
+            lost = np.any(before != after, axis=1)
+            changed = cells[lost]
+            self.wave[changed] = after[lost]
+
+            bits = self.scene._unpack(after[lost])
+            counts = bits.sum(axis=1)
+            if not counts.all():
+                return False
+            self._update_sums(changed, bits, counts)
 
         return True
 
-    def propagate(self):
-        while self.stacksize > 0:
-            y1, x1, t1 = self.stack[self.stacksize - 1]
-            self.stacksize -= 1
-
-            for d in range(4):
-                y2 = y1 + dy[d]
-                x2 = x1 + dx[d]
-                if y2 < 0 or y2 >= self.height or x2 < 0 or x2 >= self.width:
-                    continue
-
-                dt_propagator = self.scene._propagator[d][t1]
-                compat = self.compatible[y2, x2, d]
-                for t2 in dt_propagator:
-                    compat[t2] -= 1
-                    if compat[t2] == 0:
-                        ok = self.ban(y2, x2, t2)
-                        if not ok:
-                            return False
-
-        return True
+    def _update_sums(self, cells: np.ndarray, bits: np.ndarray, counts: np.ndarray):
+        self.sums_of_ones[cells] = counts
+        if self.scene._next_node_heuristic == "entropy":
+            sums_of_weights = bits @ self.scene._weights
+            self.entropies[cells] = np.log(sums_of_weights) - (bits @ self.scene._weight_log_weights) / sums_of_weights
@@ -9,6 +9,10 @@ from metta.common.util.config import Config
 # We store maps as 2D arrays of object names.
 # "empty" means an empty cell; "wall" means a wall, etc. See `metta.mettagrid.char_encoder` for the full list.
 #
+# MapGen renders into a `metta.mettagrid.coded_grid.CodedGrid`, which stores symbol ids but reads, writes and compares
+# object names, so scenes can treat it as an array of strings. The exception is numpy copying it into another array:
+# `np.array(grid, dtype=str)` and assigning it into a string array copy the ids, so use `as_string_grid` for those.
+#
 # Properly shaped version, `np.ndarray[tuple[int, int], np.dtype[np.str_]]`,
 # would be better, but slices from numpy arrays are not typed properly, which makes it too annoying to use.
 MapGrid: TypeAlias = npt.NDArray[np.str_]
@@ -0,0 +1,114 @@
+"""
+Array-based reachability helpers for scenes: 4-connected component labeling, multi-source BFS distance fields, and
+carving shortest tunnels down a distance field.
+
+All functions take boolean masks over the grid (e.g. `grid == "empty"`), so they work the same on string and coded
+grids, and none of them loop over cells in Python.
+"""
+
+import numpy as np
+import numpy.typing as npt
+import scipy.ndimage
+import scipy.sparse
+import scipy.sparse.csgraph
+
+# 4-connectivity, matching how agents move.
+NEIGHBOR_OFFSETS = np.array([(-1, 0), (0, 1), (1, 0), (0, -1)])
+_CROSS = scipy.ndimage.generate_binary_structure(2, 1)
+
+
+def label_components(passable: npt.NDArray[np.bool_]) -> tuple[npt.NDArray[np.int32], int]:
+    """
+    Labels the 4-connected components of `passable`.
+
+    Returns the label grid (0 for impassable cells, 1..n for the components, numbered in row-major order of their first
+    cell) and the number of components n.
+    """
+    labels, num_components = scipy.ndimage.label(passable, structure=_CROSS)
+    return labels, int(num_components)
+
+
+def all_adjacent(cells: npt.NDArray[np.bool_], region: npt.NDArray[np.bool_]) -> bool:
+    """Whether each of `cells` is in `region` or 4-adjacent to one of its cells."""
+    return not (cells & ~scipy.ndimage.binary_dilation(region, structure=_CROSS)).any()
+
+
+def component_sizes(labels: npt.NDArray[np.int32], num_components: int) -> npt.NDArray[np.int64]:
+    """Number of cells in each component, indexed by label - 1."""
+    return np.bincount(labels.ravel(), minlength=num_components + 1)[1:]
+
+
+def closest_cells(
+    distances: npt.NDArray[np.float64], labels: npt.NDArray[np.int32], component_labels: list[int]
+) -> npt.NDArray[np.int64]:
+    """For each of `component_labels`, the (row, col) of its cell with the smallest distance (first in row order)."""
+    positions = scipy.ndimage.minimum_position(distances, labels, component_labels)
+    return np.array(positions, dtype=np.int64).reshape(-1, 2)
+
+
+def distance_field(
+    sources: npt.NDArray[np.bool_], passable: npt.NDArray[np.bool_] | None = None
+) -> npt.NDArray[np.float64]:
+    """
+    BFS distance (in 4-connected steps) from the nearest source cell to every cell.
+
+    If `passable` is given, paths may only go through passable cells, and cells that can't be reached are `np.inf`.
+    Source cells are always at distance 0. Without `passable`, every cell can be walked through, which is what you want
+    for planning tunnels.
+    """
+    distances = np.full(sources.shape, np.inf)
+    if not sources.any():
+        return distances
+
+    if passable is None:
+        # Unobstructed BFS distance is the taxicab distance, which the chamfer transform computes exactly.
+        distances[:] = scipy.ndimage.distance_transform_cdt(~sources, metric="taxicab")
+        return distances
+
+    height, width = sources.shape
+    walkable = passable | sources
+    index = np.arange(height * width).reshape(height, width)
+    # Edges between horizontally and vertically adjacent walkable cells, plus a virtual node linked to every source.
+    right = walkable[:, :-1] & walkable[:, 1:]
+    down = walkable[:-1, :] & walkable[1:, :]
+    virtual = height * width
+    rows = np.concatenate([index[:, :-1][right], index[:-1, :][down], np.full(np.count_nonzero(sources), virtual)])
+    cols = np.concatenate([index[:, 1:][right], index[1:, :][down], index[sources]])
+    graph = scipy.sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(virtual + 1, virtual + 1))
+
+    from_virtual = scipy.sparse.csgraph.shortest_path(graph, directed=False, unweighted=True, indices=virtual)
+    distances[:] = (from_virtual[:virtual] - 1).reshape(height, width)
+    return distances
+
+
+def carve_tunnels(
+    distances: npt.NDArray[np.float64], starts: npt.NDArray[np.int_], rng: np.random.Generator
+) -> npt.NDArray[np.bool_]:
+    """
+    Walks from each start cell down `distances` to a cell at distance 0, picking uniformly among the neighbors one step
+    closer at each step, and returns the mask of cells stepped onto (start cells excluded).
+
+    `starts` is an array of (row, col) pairs. All walks advance together, one step per iteration.
+    """
+    height, width = distances.shape
+    tunnels = np.zeros(distances.shape, dtype=bool)
+    position = np.array(starts, dtype=np.int64).reshape(-1, 2)
+    remaining = distances[position[:, 0], position[:, 1]]
+
+    while (active := remaining > 0).any():
+        current = position[active]
+        neighbors = current[:, None, :] + NEIGHBOR_OFFSETS[None, :, :]
+        in_bounds = np.all((neighbors >= 0) & (neighbors < (height, width)), axis=-1)
+        clipped = np.clip(neighbors, 0, (height - 1, width - 1))
+        neighbor_distances = np.where(in_bounds, distances[clipped[..., 0], clipped[..., 1]], np.inf)
+        candidates = neighbor_distances == (remaining[active] - 1)[:, None]
+        if not candidates.any(axis=1).all():
+            # This shouldn't happen if distances are a BFS distance field.
+            raise ValueError("No next cell found")
+
+        choice = np.argmax(np.where(candidates, rng.random(candidates.shape), -1), axis=1)
+        position[active] = neighbors[np.arange(len(current)), choice]
+        remaining[active] -= 1
+        tunnels[position[active, 0], position[active, 1]] = True
+
+    return tunnels
@@ -1,12 +1,12 @@
 from typing import Literal
 
 import hydra
-import numpy as np
 from omegaconf import DictConfig
 from omegaconf.omegaconf import OmegaConf
 
 import mettascope.server
 from metta.map.utils.storable_map import StorableMap, grid_to_lines
+from metta.mettagrid.coded_grid import count_agents
 from metta.mettagrid.curriculum.core import SingleTaskCurriculum
 from metta.mettagrid.level_builder import Level
 from metta.mettagrid.mettagrid_env import MettaGridEnv
@@ -20,7 +20,7 @@ def show_map(storable_map: StorableMap, mode: ShowMode | None):
         return
 
     if mode == "mettascope":
-        num_agents = np.count_nonzero(np.char.startswith(storable_map.grid, "agent"))
+        num_agents = count_agents(storable_map.grid)
 
         env_cfg = OmegaConf.load("./configs/env/mettagrid/full.yaml")
         env_cfg.game.num_agents = int(num_agents)
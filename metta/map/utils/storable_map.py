@@ -60,8 +60,10 @@ class StorableMap:
     @staticmethod
     def from_uri(uri: str) -> StorableMap:
         logger.info(f"Loading map from {uri}")
-        content = file_utils.read(uri).decode()
+        return StorableMap.from_str(file_utils.read(uri).decode())
 
+    @staticmethod
+    def from_str(content: str) -> StorableMap:
         # TODO - validate content in a more principled way
         (frontmatter, content) = content.split("---\n", 1)
 
@@ -1,92 +1,238 @@
-import json
-from dataclasses import dataclass
-
+import posixpath
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Literal, get_args
+
+import duckdb
+import pandas as pd
 from omegaconf import OmegaConf
 
-from metta.map.utils.s3utils import list_objects
+from metta.map.utils.s3utils import is_s3_uri, list_objects
 from metta.map.utils.storable_map import StorableMap
+from metta.mettagrid.coded_grid import count_agents
 from metta.mettagrid.util import file as file_utils
 
+INDEX_FILENAME = "index.duckdb"
+
+FilterOp = Literal["=", "!=", "<", "<=", ">", ">="]
+
+# `(key, value)` selects maps where `key` equals `value`; `(key, op, value)` compares with `op` instead.
+# Keys are either columns of the `maps` table (`MAP_COLUMNS`) or flattened config/metadata keys, e.g.
+# `config.root.params.rows` or `metadata.labels.0`.
+MapFilter = tuple[str, Any] | tuple[str, FilterOp, Any]
+
+# Typed columns of the `maps` table, besides `uri`.
+MAP_COLUMNS = ("width", "height", "num_agents")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS maps (
+    uri VARCHAR PRIMARY KEY,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    num_agents INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS params (
+    uri VARCHAR NOT NULL,
+    key VARCHAR NOT NULL,
+    value VARCHAR,
+    -- Set for numeric values, so that they can be compared as numbers.
+    num_value DOUBLE
+);
+"""
+
+
+def parse_filter(item: str) -> MapFilter:
+    """Parses filters written as `key=value`, `key>=value`, etc."""
+    match = re.fullmatch(r"(.+?)(<=|>=|!=|=|<|>)(.*)", item)
+    if not match:
+        raise ValueError(f"Invalid filter item: {item}")
+    key, op, value = match.groups()
+    return (key, op, value)
+
+
+def list_map_uris(dir: str) -> list[str]:
+    """URIs of the maps stored in `dir`, local or S3."""
+    if is_s3_uri(dir):
+        return list_objects(dir)
+    return sorted(str(path) for path in Path(dir).glob("*.yaml"))
+
 
-@dataclass
 class StorableMapIndex:
     """
-    Inverted index of storable maps in an S3 directory.
+    Index of the storable maps in a directory (local or S3), stored as a DuckDB database in `{dir}/index.duckdb`.
 
-    The index can quickly find all maps that have a particular value for a particular key in their configs.
+    The `maps` table has a row per map, with typed columns for its size and number of agents. The `params` table has a
+    row per map and flattened config or metadata key, with the value as a string and, if it's a number, as a double.
+    `find_maps` compiles filters to SQL, so they're evaluated by DuckDB rather than by scanning the index in Python.
     """
 
-    dir: str
-    index_data: dict[str, dict[str, list[str]]]
+    def __init__(self, dir: str):
+        self.dir = dir
+        self.con = duckdb.connect()
+        self.con.execute(SCHEMA)
+
+    @property
+    def uri(self) -> str:
+        return f"{self.dir}/{INDEX_FILENAME}"
 
-    def _flatten_nested_dict(self, obj, parent_key=""):
+    @staticmethod
+    def _flatten_nested_dict(obj, parent_key=""):
         """Flatten nested dictionaries and lists into dot-separated keys."""
         items = []
 
         if isinstance(obj, dict):
             for k, v in obj.items():
                 new_key = f"{parent_key}.{k}" if parent_key else k
-                items.extend(self._flatten_nested_dict(v, new_key))
+                items.extend(StorableMapIndex._flatten_nested_dict(v, new_key))
         elif isinstance(obj, list):
             for i, v in enumerate(obj):
                 new_key = f"{parent_key}.{i}" if parent_key else str(i)
-                items.extend(self._flatten_nested_dict(v, new_key))
+                items.extend(StorableMapIndex._flatten_nested_dict(v, new_key))
         else:
             items.append((parent_key, obj))
 
         return items
 
-    def _process(self, map: StorableMap, uri: str):
-        key_to_value: dict[str, str] = {}
-        config_container = OmegaConf.to_container(map.config, resolve=False)
-        for k, v in self._flatten_nested_dict(config_container):
-            key = f"config.{k}"
-            key_to_value[key] = str(v)
-
-        key_to_value.update({f"metadata.{k}": v for k, v in map.metadata.items()})
-        for key, value in key_to_value.items():
-            if key not in self.index_data:
-                self.index_data[key] = {}
-            if value not in self.index_data[key]:
-                self.index_data[key][value] = []
-            self.index_data[key][value].append(uri)
-
-    def find_maps(self, filters: list[tuple[str, str]]) -> list[str]:
-        map_files: list[str]
-
-        if filters:
-            map_files_set: set[str] | None = None
-            for key, value in filters:
-                filter_files = self.index_data[key][value]
-                map_files_set = map_files_set.intersection(set(filter_files)) if map_files_set else set(filter_files)
-
-            map_files = list(map_files_set) if map_files_set else []
-        else:
-            map_files = [f for f in list_objects(self.dir) if f.endswith(".yaml")]
-
-        return map_files
-
-    def _index_dir(self):
-        filenames = list_objects(self.dir)
-        for filename in filenames:
-            map = StorableMap.from_uri(filename)
-            self._process(map, filename)
-
-    def _save(self):
-        index_uri = f"{self.dir}/index.json"
-        file_utils.write_data(index_uri, json.dumps(self.index_data), content_type="text/plain")
+    def add_maps(self, uris: list[str]):
+        """Reads the maps at `uris` and adds them to the index."""
+        if not uris:
+            return
+
+        # Reading maps is I/O bound, especially on S3.
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            storable_maps = list(pool.map(StorableMap.from_uri, uris))
+
+        map_rows = []
+        param_rows = []
+        for uri, storable_map in zip(uris, storable_maps, strict=True):
+            map_rows.append((uri, storable_map.width(), storable_map.height(), count_agents(storable_map.grid)))
+
+            config = OmegaConf.to_container(storable_map.config, resolve=False)
+            metadata = OmegaConf.to_container(OmegaConf.create(storable_map.metadata), resolve=False)
+            for key, value in self._flatten_nested_dict({"config": config, "metadata": metadata}):
+                is_number = isinstance(value, (int, float)) and not isinstance(value, bool)
+                param_rows.append((uri, key, str(value), float(value) if is_number else None))
+
+        self.con.register("new_maps", pd.DataFrame(map_rows, columns=["uri", *MAP_COLUMNS]))
+        self.con.register("new_params", pd.DataFrame(param_rows, columns=["uri", "key", "value", "num_value"]))
+        try:
+            self.con.execute("INSERT INTO maps SELECT * FROM new_maps")
+            self.con.execute("INSERT INTO params SELECT * FROM new_params")
+        finally:
+            for view in ("new_maps", "new_params"):
+                self.con.unregister(view)
+
+    def remove_maps(self, uris: list[str]):
+        if not uris:
+            return
+        for table in ("maps", "params"):
+            self.con.execute(f"DELETE FROM {table} WHERE list_contains(?, uri)", [uris])
+
+    def update(self) -> int:
+        """
+        Brings the index up to date with the directory: adds maps that aren't indexed yet and removes the ones that no
+        longer exist. Maps are never modified after they're saved, so maps that are already indexed aren't read again.
+
+        Returns the number of added and removed maps.
+        """
+        uris = list_map_uris(self.dir)
+        indexed = {row[0] for row in self.con.execute("SELECT uri FROM maps").fetchall()}
+        removed_uris = sorted(indexed - set(uris))
+        self.remove_maps(removed_uris)
+        new_uris = [uri for uri in uris if uri not in indexed]
+        self.add_maps(new_uris)
+        return len(new_uris) + len(removed_uris)
+
+    def _where(self, filters: list[MapFilter]) -> tuple[str, list]:
+        conditions = []
+        args = []
+        for map_filter in filters:
+            key, op, value = (map_filter[0], "=", map_filter[1]) if len(map_filter) == 2 else map_filter
+            if op not in get_args(FilterOp):
+                raise ValueError(f"Invalid filter operator {op!r} for {key}")
+
+            if key in MAP_COLUMNS:
+                conditions.append(f"{key} {op} ?")
+                args.append(float(value))
+                continue
+
+            # Equality on strings keeps working for numbers (values are stored as `str(value)`), other comparisons are
+            # numeric.
+            numeric = op not in ("=", "!=") or (isinstance(value, (int, float)) and not isinstance(value, bool))
+            column = "num_value" if numeric else "value"
+            conditions.append(f"uri IN (SELECT uri FROM params WHERE key = ? AND {column} {op} ?)")
+            args.extend([key, float(value) if numeric else str(value)])
+
+        return (" WHERE " + " AND ".join(conditions) if conditions else ""), args
+
+    def find_maps(self, filters: list[MapFilter]) -> list[str]:
+        """URIs of the maps that match all `filters`."""
+        where, args = self._where(filters)
+        return [row[0] for row in self.con.execute(f"SELECT uri FROM maps{where} ORDER BY uri", args).fetchall()]
+
+    def value_index(self) -> dict[str, dict[str, list[str]]]:
+        """All keys and their values, with the maps that have them: `{key: {value: [uri, ...]}}`."""
+        typed_columns = " UNION ALL ".join(
+            f"SELECT uri, '{column}' AS key, CAST({column} AS VARCHAR) FROM maps" for column in MAP_COLUMNS
+        )
+        rows = self.con.execute(
+            f"""
+            SELECT key, value, list(uri ORDER BY uri)
+            FROM (SELECT uri, key, value FROM params UNION ALL {typed_columns})
+            GROUP BY key, value
+            ORDER BY key, value
+            """
+        ).fetchall()
+
+        result: dict[str, dict[str, list[str]]] = {}
+        for key, value, uris in rows:
+            result.setdefault(key, {})[value] = uris
+        return result
+
+    def save(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir) / INDEX_FILENAME
+            self.con.execute(f"ATTACH '{path}' AS stored")
+            self.con.execute("CREATE TABLE stored.maps AS SELECT * FROM maps ORDER BY uri")
+            # Sorted by key, so that DuckDB can skip most row groups when filtering on a key.
+            self.con.execute("CREATE TABLE stored.params AS SELECT * FROM params ORDER BY key, value, uri")
+            self.con.execute("DETACH stored")
+            file_utils.write_file(self.uri, str(path))
 
     @staticmethod
-    def load(dir: str):
+    def load(dir: str) -> "StorableMapIndex":
         """Load an index from `dir`."""
-        index_content = file_utils.read(f"{dir}/index.json")
-        index_data = json.loads(index_content.decode("utf-8"))
-        index = StorableMapIndex(dir=dir, index_data=index_data)
+        index = StorableMapIndex(dir=dir)
+        with file_utils.local_copy(index.uri) as path:
+            index.con.execute(f"ATTACH '{path}' AS stored (READ_ONLY)")
+            index.con.execute("INSERT INTO maps SELECT * FROM stored.maps")
+            index.con.execute("INSERT INTO params SELECT * FROM stored.params")
+            index.con.execute("DETACH stored")
         return index
 
     @staticmethod
-    def create(dir: str):
+    def load_from_uri(index_uri: str) -> "StorableMapIndex":
+        """Load an index from the URI of its database file."""
+        if posixpath.basename(index_uri) != INDEX_FILENAME:
+            raise ValueError(f"Expected the URI of an {INDEX_FILENAME} file, got {index_uri}")
+        return StorableMapIndex.load(posixpath.dirname(index_uri))
+
+    @staticmethod
+    def create(dir: str) -> "StorableMapIndex":
         """Create a new index in `dir`. If the index already exists, it will be overwritten."""
-        index = StorableMapIndex(dir=dir, index_data={})
-        index._index_dir()
-        index._save()
+        index = StorableMapIndex(dir=dir)
+        index.update()
+        index.save()
+        return index
+
+    @staticmethod
+    def refresh(dir: str) -> "StorableMapIndex":
+        """Create the index in `dir`, or if it already exists, only index the maps that were added since."""
+        if not file_utils.exists(f"{dir}/{INDEX_FILENAME}"):
+            return StorableMapIndex.create(dir)
+        index = StorableMapIndex.load(dir)
+        if index.update():
+            index.save()
+        return index
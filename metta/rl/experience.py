@@ -138,6 +138,11 @@ class Experience:
         # Pre-allocate tensor to stores how many agents we have for use during environment reset
         self._range_tensor = torch.arange(total_agents, device=self.device, dtype=torch.int32)
 
+        # Host-side mirror of [first segment, step] that each env batch writes to next, so observations can be
+        # written straight into storage without reading ep_indices/ep_lengths back from the device
+        self._batch_slots: Dict[int, list[int]] = {}
+        self._obs_written_for: Optional[int] = None
+
     @property
     def full(self) -> bool:
         """Alias for ready_for_training for compatibility."""
@@ -172,7 +177,11 @@ class Experience:
 
         # Store data in segmented tensors
         batch_slice = (indices, episode_length)
-        self.obs[batch_slice] = obs
+        if self._obs_written_for == env_id.start:
+            # Already written by write_observations()
+            self._obs_written_for = None
+        else:
+            self.obs[batch_slice] = obs
         self.actions[batch_slice] = actions
         self.logprobs[batch_slice] = logprobs
         self.rewards[batch_slice] = rewards
@@ -182,6 +191,7 @@ class Experience:
 
         # Update episode tracking
         self.ep_lengths[env_id] += 1
+        self._batch_slot(env_id)[1] += 1
 
         # Check if episodes are complete and reset if needed
         if episode_length + 1 >= self.bptt_horizon:
@@ -200,9 +210,35 @@ class Experience:
         # Use pre-allocated range tensor and slice it
         self.ep_indices[env_id] = (self.free_idx + self._range_tensor[:num_full]) % self.segments
         self.ep_lengths[env_id] = 0
+        self._batch_slots[env_id.start] = [self.free_idx, 0]
         self.free_idx = (self.free_idx + num_full) % self.segments
         self.full_rows += num_full
 
+    def _batch_slot(self, env_id: slice) -> list[int]:
+        # Until its first completed segment, a batch writes to ep_indices = arange(total_agents) % segments,
+        # which is contiguous because total_agents <= segments
+        return self._batch_slots.setdefault(env_id.start, [env_id.start, 0])
+
+    def write_observations(self, obs: np.ndarray, env_id: slice) -> Optional[Tensor]:
+        """Write an env batch's observations straight into storage and return them on `self.device` for inference.
+
+        This copies from the vecenv's (shared-memory) observation buffer directly into the segment slots that the
+        next `store()` for this batch would fill, and `store()` then skips its own observation copy. With
+        `cpu_offload` the slots are pinned, so the transfer to the device for inference is asynchronous.
+
+        Returns None without writing anything if the batch's segments wrap around the end of storage; the caller
+        should then pass the observations to `store()` as usual.
+        """
+        segment, step = self._batch_slot(env_id)
+        num_agents = env_id.stop - env_id.start
+        if segment + num_agents > self.segments:
+            return None
+
+        slot = self.obs[segment : segment + num_agents, step]
+        slot.copy_(torch.from_numpy(obs))
+        self._obs_written_for = env_id.start
+        return slot.to(self.device, non_blocking=True)
+
     def get_lstm_state(self, env_id_start: int) -> tuple[Optional[Tensor], Optional[Tensor]]:
         """Get LSTM state as tensors."""
         if env_id_start not in self.lstm_h:
@@ -215,12 +251,21 @@ class Experience:
             self.lstm_h[env_id_start] = lstm_h
             self.lstm_c[env_id_start] = lstm_c
 
+    def copy_lstm_state_from(self, other: "Experience") -> None:
+        """Continue from another buffer's LSTM states (used when alternating between two buffers)."""
+        assert self.lstm_h.keys() == other.lstm_h.keys(), "Experience buffers have different env batch layouts"
+        # Stored states are replaced rather than mutated in place, so sharing the tensors is safe
+        self.lstm_h = dict(other.lstm_h)
+        self.lstm_c = dict(other.lstm_c)
+
     def reset_for_rollout(self) -> None:
         """Reset tracking variables for a new rollout."""
         self.full_rows = 0
         self.free_idx = self.total_agents % self.segments
         self.ep_indices = self._range_tensor % self.segments
         self.ep_lengths.zero_()
+        self._batch_slots.clear()
+        self._obs_written_for = None
 
     def reset_importance_sampling_ratios(self) -> None:
         """Reset the importance sampling ratio to 1.0."""
@@ -1,8 +1,11 @@
 import asyncio
+import copy
 import logging
 import os
 import traceback
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from typing import Any
 from uuid import UUID
@@ -276,6 +279,16 @@ class MettaTrainer:
 
         self._make_experience_buffer()
 
+        # Pipelined rollout state: a background thread fills `self._next_experience` with a snapshot policy
+        # while the learner trains on `self.experience`.
+        self._rollout_executor: ThreadPoolExecutor | None = None
+        self._rollout_policy: torch.nn.Module | None = None
+        self._rollout_stream = None
+        self._experience_ready = False
+        self._overlap_fraction = 0.0
+        if trainer_cfg.async_rollout:
+            self._setup_async_rollout()
+
         self._stats_epoch_start = self.epoch
         self._stats_epoch_id: UUID | None = None
         self._stats_run_id: UUID | None = None
@@ -372,8 +385,11 @@ class MettaTrainer:
             record_heartbeat()
 
             with self.torch_profiler:
-                self._rollout()
-                self._train()
+                if trainer_cfg.async_rollout:
+                    self._pipelined_rollout_and_train()
+                else:
+                    self._rollout()
+                    self._train()
 
             self.torch_profiler.on_epoch_end(self.epoch)
 
@@ -419,7 +435,11 @@ class MettaTrainer:
         stats_time = self.timer.get_last_elapsed("_process_stats")
         steps_calculated = self.agent_step - steps_before
 
-        total_time = train_time + rollout_time + stats_time
+        if self.trainer_cfg.async_rollout:
+            # Rollout and train run concurrently, so the epoch takes the wall time of the pipelined phase
+            total_time = self.timer.get_last_elapsed("_rollout_train") + stats_time
+        else:
+            total_time = train_time + rollout_time + stats_time
         steps_per_sec = steps_calculated / total_time
 
         train_pct = (train_time / total_time) * 100
@@ -452,16 +472,45 @@ class MettaTrainer:
             f"[dim]Train: {train_pct:.0f}% | Rollout: {rollout_pct:.0f}% | Stats: {stats_pct:.0f}%[/dim]",
         )
 
+        if self.trainer_cfg.async_rollout:
+            table.add_row(
+                "Overlap",
+                f"{self._overlap_fraction * 100:.0f}%",
+                "[dim]of rollout/train wall time spent running both concurrently[/dim]",
+            )
+
         # Log the table
         console.print(table)
 
     @with_instance_timer("_rollout")
     def _rollout(self):
         """Perform rollout phase of training."""
-        experience = self.experience
+        raw_infos, num_steps = self._collect_rollout(self.experience, self.policy)
+        self.agent_step += num_steps
+
+        # Batch process info dictionaries after rollout
+        accumulate_rollout_stats(raw_infos, self.stats)
+
+        # TODO: Better way to enable multiple collects
+        return self.stats, self.stats
+
+    @with_instance_timer("_rollout")
+    def _background_rollout(self, experience: Experience, policy: torch.nn.Module) -> tuple[list, int]:
+        """Fill `experience` from the rollout thread, on a dedicated CUDA stream when available."""
+        stream_context = torch.cuda.stream(self._rollout_stream) if self._rollout_stream is not None else nullcontext()
+        with stream_context:
+            return self._collect_rollout(experience, policy)
+
+    def _collect_rollout(self, experience: Experience, policy: torch.nn.Module) -> tuple[list, int]:
+        """Step the vecenv with `policy` until `experience` is full.
+
+        Returns:
+            Tuple of (raw infos, agent steps collected across all ranks)
+        """
         trainer_cfg = self.trainer_cfg
 
         raw_infos = []  # Collect raw info for batch processing later
+        agent_steps = 0
         experience.reset_for_rollout()
 
         while not experience.ready_for_training:
@@ -474,12 +523,14 @@ class MettaTrainer:
 
             # Perform single rollout step
             # Receive environment data
-            o, r, d, t, info, training_env_id, mask, num_steps = get_observation(self.vecenv, self.device, self.timer)
-            self.agent_step += num_steps * self._world_size
+            o, r, d, t, info, training_env_id, mask, num_steps = get_observation(
+                self.vecenv, self.device, self.timer, experience if trainer_cfg.zero_copy_obs else None
+            )
+            agent_steps += num_steps * self._world_size
 
             # Run policy inference
             actions, selected_action_log_probs, values, lstm_state_to_store = run_policy_inference(
-                self.policy, o, experience, training_env_id.start, self.device
+                policy, o, experience, training_env_id.start, self.device
             )
 
             # Store experience
@@ -504,11 +555,65 @@ class MettaTrainer:
             if info:
                 raw_infos.extend(info)
 
-        # Batch process info dictionaries after rollout
+        return raw_infos, agent_steps
+
+    def _setup_async_rollout(self):
+        """Create the second experience buffer, the rollout policy snapshot and the rollout thread."""
+        self._next_experience = self._build_experience_buffer()
+
+        policy = self.policy.module if isinstance(self.policy, DistributedMettaAgent) else self.policy
+        policy = getattr(policy, "_orig_mod", policy)  # unwrap torch.compile
+        self._rollout_policy = copy.deepcopy(policy)
+        self._rollout_policy.requires_grad_(False)
+
+        if str(self.device).startswith("cuda"):
+            self._rollout_stream = torch.cuda.Stream(device=self.device)
+
+        self._rollout_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rollout")
+        self._log_master("Pipelined rollout enabled: rollout overlaps training with a one-update-stale policy")
+
+    def _pipelined_rollout_and_train(self):
+        """Train on the filled buffer while the rollout thread fills the other one.
+
+        The rollout thread acts with a snapshot of the policy taken before this update, so the buffer it fills is
+        one update stale when it is trained on. The importance sampling ratios recomputed per minibatch in
+        `process_minibatch_update` and clipped by V-trace correct for that lag.
+        """
+        assert self._rollout_executor is not None and self._rollout_policy is not None
+
+        if not self._experience_ready:
+            # Nothing to train on yet: fill the first buffer synchronously with the live policy
+            self._rollout()
+            self._experience_ready = True
+
+        # Environments continue where the previous rollout left off, so carry its LSTM state over
+        self._next_experience.copy_lstm_state_from(self.experience)
+
+        policy = self.policy.module if isinstance(self.policy, DistributedMettaAgent) else self.policy
+        self._rollout_policy.load_state_dict(getattr(policy, "_orig_mod", policy).state_dict())
+
+        with self.timer("_rollout_train"):
+            pending_rollout = self._rollout_executor.submit(
+                self._background_rollout, self._next_experience, self._rollout_policy
+            )
+            try:
+                self._train()
+            finally:
+                # Always join so the vecenv is never stepped from two threads
+                raw_infos, num_steps = pending_rollout.result()
+
+        if self._rollout_stream is not None:
+            torch.cuda.current_stream(self.device).wait_stream(self._rollout_stream)
+
+        self.agent_step += num_steps
         accumulate_rollout_stats(raw_infos, self.stats)
 
-        # TODO: Better way to enable multiple collects
-        return self.stats, self.stats
+        # Overlap is the time both phases were running; they start together and the phase ends when both finish
+        wall_time = self.timer.get_last_elapsed("_rollout_train")
+        busy_time = self.timer.get_last_elapsed("_rollout") + self.timer.get_last_elapsed("_train")
+        self._overlap_fraction = max(0.0, busy_time - wall_time) / wall_time if wall_time > 0 else 0.0
+
+        self.experience, self._next_experience = self._next_experience, self.experience
 
     @with_instance_timer("_train")
     def _train(self):
@@ -588,7 +693,8 @@ class MettaTrainer:
                         self.policy.clip_weights()
 
                     if str(self.device).startswith("cuda"):
-                        torch.cuda.synchronize()
+                        # Only the learner's stream: a device-wide sync would also wait on the pipelined rollout
+                        torch.cuda.current_stream(self.device).synchronize()
 
                 minibatch_idx += 1
                 # end loop over minibatches
@@ -924,6 +1030,8 @@ class MettaTrainer:
             "generation": self.current_policy_generation,
             "latest_saved_policy_epoch": self.latest_saved_policy_record.metadata.epoch,
         }
+        if self.trainer_cfg.async_rollout:
+            parameters["rollout_train_overlap"] = self._overlap_fraction
 
         # Include custom stats from trainer config
         if hasattr(self.trainer_cfg, "stats") and hasattr(self.trainer_cfg.stats, "overview"):
@@ -964,6 +1072,8 @@ class MettaTrainer:
         self.grad_stats.clear()
 
     def close(self):
+        if self._rollout_executor is not None:
+            self._rollout_executor.shutdown(wait=True)
         self.vecenv.close()
         if self._master:
             self._memory_monitor.clear()
@@ -1003,6 +1113,9 @@ class MettaTrainer:
         return self.initial_policy_record.metadata.get("generation", 0) + 1
 
     def _make_experience_buffer(self):
+        self.experience = self._build_experience_buffer()
+
+    def _build_experience_buffer(self) -> Experience:
         vecenv = self.vecenv
         trainer_cfg = self.trainer_cfg
 
@@ -1018,7 +1131,7 @@ class MettaTrainer:
         hidden_size, num_lstm_layers = get_lstm_config(self.policy)
 
         # Create experience buffer
-        self.experience = Experience(
+        return Experience(
             total_agents=total_agents,
             batch_size=self._batch_size,
             bptt_horizon=trainer_cfg.bptt_horizon,
@@ -1088,6 +1201,7 @@ class MettaTrainer:
             zero_copy=trainer_cfg.zero_copy,
             is_training=True,
             run_dir=self.cfg.run_dir,
+            prefetch_maps=trainer_cfg.prefetch_maps,
         )
 
         if self.cfg.seed is None:
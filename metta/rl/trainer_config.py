@@ -162,6 +162,10 @@ class TrainerConfig(BaseModelWithForbidExtra):
     require_contiguous_env_ids: bool = False
     # Verbose logging for debugging and monitoring
     verbose: bool = True
+    # Map prefetching disabled: When > 0, each env builds up to this many levels per task ahead of time in a
+    #   background thread, so expensive map generation happens off the reset() critical path. Hit rate and wait time
+    #   are reported under task_timing/
+    prefetch_maps: int = Field(default=0, ge=0)
 
     # Batch configuration
     # Batch size: Type 2 default chosen from sweep
@@ -178,10 +182,19 @@ class TrainerConfig(BaseModelWithForbidExtra):
     # Performance configuration
     # CPU offload disabled: Keep tensors on GPU for speed
     cpu_offload: bool = False
+    # Zero-copy observations disabled: When enabled, observations are written from the vecenv's shared-memory
+    #   buffers directly into the experience buffer (pinned when cpu_offload is on) and inference reads them from
+    #   there, saving one full copy of the observation tensor per step
+    zero_copy_obs: bool = False
     # Torch compile disabled by default for stability
     compile: bool = False
     # Reduce-overhead mode: Best for training loops when compile is enabled
     compile_mode: Literal["default", "reduce-overhead", "max-autotune"] = "reduce-overhead"
+    # Pipelined rollout disabled: When enabled, env workers fill a second experience buffer using a snapshot of
+    #   the policy from before the current update while the learner trains on the previous buffer. The one-update
+    #   policy lag is corrected by V-trace (see vtrace.vtrace_rho_clip / vtrace.vtrace_c_clip). Doubles experience
+    #   buffer memory.
+    async_rollout: bool = False
     # Profile every 10K epochs: Infrequent to minimize overhead
     profiler: TorchProfilerConfig = Field(default_factory=TorchProfilerConfig)
 
@@ -17,9 +17,13 @@ def get_observation(
     vecenv: Any,
     device: torch.device,
     timer: Any,
+    experience: Optional[Experience] = None,
 ) -> Tuple[Tensor, Tensor, Tensor, Tensor, list, slice, Tensor, int]:
     """Get observations and other data from the vectorized environment and convert to tensors.
 
+    If `experience` is given, observations are written from the vecenv buffer directly into the experience storage
+    (see `Experience.write_observations`) instead of being copied to the device here and again in `store()`.
+
     Returns:
         Tuple of (observations, rewards, dones, truncations, info, training_env_id, mask, num_steps)
     """
@@ -33,7 +37,8 @@ def get_observation(
     num_steps = int(mask.sum().item())
 
     # Convert to tensors
-    o = torch.as_tensor(o).to(device, non_blocking=True)
+    stored_obs = experience.write_observations(o, training_env_id) if experience is not None else None
+    o = stored_obs if stored_obs is not None else torch.as_tensor(o).to(device, non_blocking=True)
     r = torch.as_tensor(r).to(device, non_blocking=True)
     d = torch.as_tensor(d).to(device, non_blocking=True)
     t = torch.as_tensor(t).to(device, non_blocking=True)
@@ -71,7 +76,9 @@ def run_policy_inference(
             lstm_state_to_store = {"lstm_h": state.lstm_h.detach(), "lstm_c": state.lstm_c.detach()}
 
         if str(device).startswith("cuda"):
-            torch.cuda.synchronize()
+            # Only the calling thread's stream: with trainer.async_rollout this runs on the rollout stream, and a
+            # device-wide sync would wait for the learner's kernels too
+            torch.cuda.current_stream(device).synchronize()
 
     return actions, selected_action_log_probs, value.flatten(), lstm_state_to_store
 
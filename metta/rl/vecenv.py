@@ -1,6 +1,10 @@
 import logging
-from typing import Optional
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
 
+import numpy as np
 import pufferlib
 import pufferlib.vector
 from pydantic import validate_call
@@ -8,6 +12,7 @@ from pydantic import validate_call
 from metta.common.util.logging_helpers import init_logging
 from metta.common.util.resolvers import register_resolvers
 from metta.mettagrid.curriculum.core import Curriculum
+from metta.mettagrid.mettagrid_c import MettaGridBatch
 from metta.mettagrid.mettagrid_env import MettaGridEnv
 from metta.mettagrid.replay_writer import ReplayWriter
 from metta.mettagrid.stats_writer import StatsWriter
@@ -48,6 +53,199 @@ def make_env_func(
     return env
 
 
+class Threaded:
+    """PufferLib-style vecenv that steps every env of this process from a thread pool.
+
+    MettaGrid releases the GIL while it steps and computes observations, so envs stepped from different threads run
+    in parallel without the per-worker memory and IPC of the multiprocessing backend. Envs are split into
+    `num_envs // batch_size` groups: `send()` hands a group to the pool and returns, and `recv()` waits for the next
+    group in turn, so with more than one group the envs keep stepping while the policy runs on the other groups.
+
+    State shared between envs (curriculum, stats and replay writers) is guarded by a lock passed to every env.
+    """
+
+    def __init__(
+        self,
+        env_creator: Callable[..., Any],
+        env_kwargs: dict,
+        num_envs: int,
+        num_workers: int,
+        batch_size: int,
+    ):
+        if num_envs % batch_size != 0:
+            raise ValueError(f"num_envs ({num_envs}) must be divisible by batch_size ({batch_size})")
+
+        env_kwargs = {**env_kwargs, "shared_lock": threading.Lock()}
+        self.envs = [env_creator(**env_kwargs)]
+        self.driver_env = self.envs[0]
+        agents_per_env = self.driver_env.num_agents
+
+        self.num_envs = num_envs
+        self.num_agents = num_envs * agents_per_env
+        self.agents_per_batch = batch_size * agents_per_env
+        self.single_observation_space = self.driver_env.single_observation_space
+        self.single_action_space = self.driver_env.single_action_space
+
+        obs_space = self.single_observation_space
+        self.observations = np.zeros((self.num_agents, *obs_space.shape), dtype=obs_space.dtype)
+        self.rewards = np.zeros(self.num_agents, dtype=np.float32)
+        self.terminals = np.zeros(self.num_agents, dtype=bool)
+        self.truncations = np.zeros(self.num_agents, dtype=bool)
+        self.masks = np.ones(self.num_agents, dtype=bool)
+        self.actions = np.zeros((self.num_agents, *self.single_action_space.shape), dtype=np.int32)
+        self.agent_ids = np.arange(self.num_agents)
+
+        for env_idx in range(num_envs):
+            buf = {
+                name: getattr(self, name)[env_idx * agents_per_env : (env_idx + 1) * agents_per_env]
+                for name in ("observations", "rewards", "terminals", "truncations", "masks", "actions")
+            }
+            if env_idx == 0:
+                # The driver env was created before the shared buffers existed; point it at its slice.
+                for name, view in buf.items():
+                    setattr(self.driver_env, name, view)
+            else:
+                self.envs.append(env_creator(buf=buf, **env_kwargs))
+
+        self._agents_per_env = agents_per_env
+        self._groups = [range(g * batch_size, (g + 1) * batch_size) for g in range(num_envs // batch_size)]
+        self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="vecenv")
+        self._pending: deque[tuple[int, list]] = deque()
+        self._current_group = 0
+        self.infos: list = []
+
+    def _agent_slice(self, group: int) -> slice:
+        envs = self._groups[group]
+        return slice(envs.start * self._agents_per_env, envs.stop * self._agents_per_env)
+
+    def _step_env(self, env_idx: int) -> dict:
+        env = self.envs[env_idx]
+        if env.done:
+            _, info = env.reset()
+            return info
+        start = env_idx * self._agents_per_env
+        *_, info = env.step(self.actions[start : start + self._agents_per_env])
+        return info
+
+    def async_reset(self, seed: Optional[int] = None) -> None:
+        for future in (f for _, futures in self._pending for f in futures):
+            future.result()
+        self._pending.clear()
+
+        infos = []
+        for env_idx, env in enumerate(self.envs):
+            _, info = env.reset(seed=None if seed is None else seed + env_idx)
+            if info:
+                infos.append(info)
+
+        # Every group is ready after a reset; the reset infos are reported with the first one.
+        for group in range(len(self._groups)):
+            self._pending.append((group, []))
+        self.infos = infos
+
+    def send(self, actions: np.ndarray) -> None:
+        group = self._current_group
+        self.actions[self._agent_slice(group)] = actions
+        futures = [self._executor.submit(self._step_env, env_idx) for env_idx in self._groups[group]]
+        self._pending.append((group, futures))
+
+    def _collect_infos(self, futures: list[Future]) -> list:
+        return [info for info in (future.result() for future in futures) if info]
+
+    def recv(self):
+        group, futures = self._pending.popleft()
+        infos = self.infos + self._collect_infos(futures)
+        self.infos = []
+        self._current_group = group
+
+        agents = self._agent_slice(group)
+        return (
+            self.observations[agents],
+            self.rewards[agents],
+            self.terminals[agents],
+            self.truncations[agents],
+            infos,
+            self.agent_ids[agents],
+            self.masks[agents],
+        )
+
+    def reset(self, seed: Optional[int] = None):
+        self.async_reset(seed)
+        o, _, _, _, infos, _, _ = self.recv()
+        return o, infos
+
+    def step(self, actions: np.ndarray):
+        self.send(actions)
+        o, r, d, t, infos, _, _ = self.recv()
+        return o, r, d, t, infos
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for env in self.envs:
+            env.close()
+
+
+class Batched(Threaded):
+    """Threaded, except that each group of envs is stepped with one MettaGridBatch call.
+
+    The batch steps the group's C++ envs on its own `num_workers` threads with the GIL released, in a single call
+    rather than a pool task per env. Only the Python side of each env (resets, replay logging and episode stats, see
+    MettaGridEnv.finish_step) still runs env by env, and only does real work when an episode ends.
+    """
+
+    def __init__(
+        self,
+        env_creator: Callable[..., Any],
+        env_kwargs: dict,
+        num_envs: int,
+        num_workers: int,
+        batch_size: int,
+    ):
+        super().__init__(env_creator, env_kwargs, num_envs, num_workers, batch_size)
+        self._batches = []
+        for group, envs in enumerate(self._groups):
+            batch = MettaGridBatch([self.envs[env_idx]._c_env for env_idx in envs], num_threads=num_workers)
+            agents = self._agent_slice(group)
+            batch.set_buffers(
+                self.observations[agents], self.terminals[agents], self.truncations[agents], self.rewards[agents]
+            )
+            self._batches.append(batch)
+
+    def _step_group(self, group: int) -> list:
+        envs = self._groups[group]
+        batch = self._batches[group]
+        active = np.array([not self.envs[env_idx].done for env_idx in envs])
+        infos = []
+        for i, env_idx in enumerate(envs):
+            if not active[i]:
+                _, info = self.envs[env_idx].reset()
+                # Resets build a new C++ env, which writes into the same slice of the buffers.
+                batch.set_env(i, self.envs[env_idx]._c_env)
+                infos.append(info)
+
+        agents = self._agent_slice(group)
+        batch.step(self.actions[agents], active)
+        for i, env_idx in enumerate(envs):
+            if active[i]:
+                start = env_idx * self._agents_per_env
+                infos.append(self.envs[env_idx].finish_step(self.actions[start : start + self._agents_per_env]))
+        return infos
+
+    def async_reset(self, seed: Optional[int] = None) -> None:
+        super().async_reset(seed)
+        for group, envs in enumerate(self._groups):
+            for i, env_idx in enumerate(envs):
+                self._batches[group].set_env(i, self.envs[env_idx]._c_env)
+
+    def send(self, actions: np.ndarray) -> None:
+        group = self._current_group
+        self.actions[self._agent_slice(group)] = actions
+        self._pending.append((group, [self._executor.submit(self._step_group, group)]))
+
+    def _collect_infos(self, futures: list[Future]) -> list:
+        return [info for future in futures for info in future.result() if info]
+
+
 @validate_call(config={"arbitrary_types_allowed": True})
 def make_vecenv(
     curriculum: Curriculum,
@@ -60,6 +258,7 @@ def make_vecenv(
     replay_writer: Optional[ReplayWriter] = None,
     is_training: bool = False,
     run_dir: str | None = None,
+    prefetch_maps: int = 0,
     **kwargs,
 ):
     # Determine the vectorization class
@@ -71,8 +270,12 @@ def make_vecenv(
         vectorizer_cls = pufferlib.vector.Multiprocessing
     elif vectorization == "ray":
         vectorizer_cls = pufferlib.vector.Ray
+    elif vectorization == "thread":
+        vectorizer_cls = Threaded
+    elif vectorization == "batch":
+        vectorizer_cls = Batched
     else:
-        raise ValueError("Invalid --vector (serial/multiprocessing/ray).")
+        raise ValueError("Invalid --vector (serial/multiprocessing/ray/thread/batch).")
 
     # Check if num_envs is valid
     if num_envs < 1:
@@ -84,10 +287,22 @@ def make_vecenv(
         "stats_writer": stats_writer,
         "replay_writer": replay_writer,
         "is_training": is_training,
-        "is_serial": is_serial,
+        # Threaded envs share this process, so logging and resolvers are already set up
+        "is_serial": is_serial or issubclass(vectorizer_cls, Threaded),
         "run_dir": run_dir,
+        "prefetch_maps": prefetch_maps,
     }
 
+    if issubclass(vectorizer_cls, Threaded):
+        # Multiprocessing-only options such as zero_copy don't apply here
+        return vectorizer_cls(
+            make_env_func,
+            env_kwargs,
+            num_envs=num_envs,
+            num_workers=num_workers,
+            batch_size=batch_size or num_envs,
+        )
+
     # Note: PufferLib's vector.make accepts Serial, Multiprocessing, and Ray as valid backends,
     # but the type annotations only allow PufferEnv.
     vecenv = pufferlib.vector.make(
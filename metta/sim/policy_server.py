@@ -0,0 +1,363 @@
+"""
+Local policy inference service.
+
+Simulations normally load every policy they play into their own process and run one small forward pass per policy per
+step. When many simulations run on one node (evaluation suites, several replays or play sessions), that means as many
+copies of each policy and as many tiny batches. A PolicyServer owns the loaded policies instead: simulations connect to
+it over a Unix socket through a RemotePolicy, which stands in for the policy in `Simulation`, and the forward requests
+that arrive together from all clients are batched into one pass per policy.
+
+Messages are tuples sent with `multiprocessing.connection`:
+  ("init", uri, features, action_names, max_action_args) -> ("ok", policy_id)
+  ("forward", policy_id, obs, lstm_h, lstm_c)               -> ("ok", (actions, lstm_h, lstm_c))
+and failures are answered with ("error", message). LSTM states follow MettaAgent's layout, with the batch on dim 1, and
+stay with the client between steps, so the server holds no per-episode state.
+
+Messages are pickled, so connections are authenticated: the server writes a random key, readable only by its user, next
+to the socket (see `authkey_path`), and clients need it to connect.
+"""
+
+import copy
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any
+
+import numpy as np
+import torch
+
+from metta.agent.policy_record import PolicyRecord
+from metta.agent.policy_state import PolicyState
+from metta.agent.policy_store import PolicyStore
+
+logger = logging.getLogger(__name__)
+
+
+def initialize_policy_to_environment(
+    policy: Any,
+    metadata: Any,
+    features: dict,
+    action_names: list[str],
+    max_action_args: list[int],
+    device: torch.device | str,
+    role: str = "Policy",
+) -> None:
+    """Lets a policy know the observation features and action set of the env it's about to play."""
+    # Restore original_feature_mapping from metadata if available
+    if hasattr(policy, "restore_original_feature_mapping") and "original_feature_mapping" in metadata:
+        policy.restore_original_feature_mapping(metadata["original_feature_mapping"])
+
+    if hasattr(policy, "initialize_to_environment"):
+        # New interface: pass features and actions
+        policy.initialize_to_environment(features, action_names, max_action_args, device)
+    elif hasattr(policy, "activate_actions"):
+        # Old interface: just pass actions
+        policy.activate_actions(action_names, max_action_args, device)
+    else:
+        raise AttributeError(
+            f"{role} is missing required method 'activate_actions' or 'initialize_to_environment'. "
+            f"Expected a MettaAgent-like object but got {type(policy).__name__}"
+        )
+
+
+def authkey_path(address: str) -> str:
+    """Where the server listening on `address` keeps the key that clients authenticate with."""
+    return f"{address}.key"
+
+
+def read_authkey(address: str) -> bytes:
+    with open(authkey_path(address), "rb") as f:
+        return f.read()
+
+
+def _write_authkey(address: str, authkey: bytes) -> None:
+    path = authkey_path(address)
+    # Replace rather than rewrite a key left behind, so that the file is created with the restricted mode.
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(authkey)
+
+
+@dataclass
+class _Request:
+    conn: Connection
+    message: tuple
+
+    @property
+    def rows(self) -> int:
+        if self.message[0] != "forward":
+            return 0
+        try:
+            return len(self.message[2])
+        except (IndexError, TypeError):
+            return 0  # malformed; answered with an error when handled
+
+
+class PolicyServer:
+    """
+    Serves forward passes of the policies in `policy_store` on the Unix socket at `address`.
+
+    Policies are loaded on the first "init" request for their URI, and initialized once per distinct env (features and
+    action set); clients playing the same env share the same module. Inits run one at a time on a separate thread, so
+    that a slow load doesn't hold up the forward passes of the other clients. Requests are collected until every
+    connected client has one pending, `max_wait_s` has passed since the first, or they add up to `max_batch_size` rows.
+    Each client waits for its reply before sending its next request, so a lone client is answered without waiting.
+
+    Clients authenticate with `authkey`, a random key by default, which is written to `authkey_path(address)`.
+    """
+
+    def __init__(
+        self,
+        policy_store: PolicyStore,
+        address: str,
+        device: torch.device | str = "cpu",
+        max_batch_size: int = 4096,
+        max_wait_s: float = 0.002,
+        authkey: bytes | None = None,
+    ):
+        self.address = address
+        self.authkey = authkey if authkey is not None else secrets.token_bytes(32)
+        self._policy_store = policy_store
+        self._device = torch.device(device)
+        self._max_batch_size = max_batch_size
+        self._max_wait_s = max_wait_s
+
+        self._listener = Listener(address, family="AF_UNIX", authkey=self.authkey)
+        _write_authkey(address, self.authkey)
+        self._requests: queue.Queue[_Request] = queue.Queue()
+        self._num_connections = 0
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._loader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="policy_server_init")
+
+        self._records: dict[str, PolicyRecord] = {}
+        self._policy_ids: dict[str, int] = {}
+        self._policies: list[Any] = []
+        # Number of forward passes run, and rows in them, for monitoring how well requests are batched.
+        self.num_batches = 0
+        self.num_rows = 0
+
+    def serve_forever(self) -> None:
+        threading.Thread(target=self._accept_connections, name="policy_server_accept", daemon=True).start()
+        logger.info(f"Policy server listening on {self.address}")
+        while not self._closed.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._handle(batch)
+
+    def start(self) -> threading.Thread:
+        """Serves in a background thread."""
+        thread = threading.Thread(target=self.serve_forever, name="policy_server", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        self._closed.set()
+        # Wake up the accept loop, which doesn't notice the listener being closed under it.
+        try:
+            Client(self.address, family="AF_UNIX", authkey=self.authkey).close()
+        except OSError:
+            pass
+        self._listener.close()
+        self._loader.shutdown(wait=False, cancel_futures=True)
+        try:
+            os.unlink(authkey_path(self.address))
+        except FileNotFoundError:
+            pass
+
+    def _accept_connections(self) -> None:
+        while not self._closed.is_set():
+            try:
+                conn = self._listener.accept()
+            except (AuthenticationError, EOFError):
+                logger.warning("Rejected a policy server connection that failed to authenticate")
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._read_requests, args=(conn,), name="policy_server_conn", daemon=True).start()
+
+    def _read_requests(self, conn: Connection) -> None:
+        with self._lock:
+            self._num_connections += 1
+        try:
+            while True:
+                message = conn.recv()
+                if isinstance(message, tuple) and message:
+                    self._requests.put(_Request(conn, message))
+                else:
+                    conn.send(("error", f"Malformed request {message!r}"))
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._lock:
+                self._num_connections -= 1
+            conn.close()
+
+    def _next_batch(self) -> list[_Request]:
+        try:
+            batch = [self._requests.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        if batch[0].message[0] != "forward":
+            return batch  # only forward passes are worth waiting for company
+
+        rows = batch[0].rows
+        deadline = time.monotonic() + self._max_wait_s
+        while rows < self._max_batch_size and len({id(r.conn) for r in batch}) < self._num_connections:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                request = self._requests.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(request)
+            rows += request.rows
+        return batch
+
+    def _handle(self, batch: list[_Request]) -> None:
+        forwards: dict[tuple, list[_Request]] = {}
+        for request in batch:
+            kind, *args = request.message
+            if kind == "init":
+                self._loader.submit(self._init_and_reply, request, args)
+            elif kind == "forward":
+                try:
+                    policy_id, obs, lstm_h, _ = args
+                    key = (policy_id, obs.shape[1:], obs.dtype.str, None if lstm_h is None else lstm_h.shape[::2])
+                except Exception as e:
+                    self._reply(request, ("error", f"Malformed forward request: {type(e).__name__}: {e}"))
+                    continue
+                forwards.setdefault(key, []).append(request)
+            else:
+                self._reply(request, ("error", f"Unknown request {kind!r}"))
+
+        for (policy_id, *_), requests in forwards.items():
+            try:
+                replies = self._forward(policy_id, [request.message for request in requests])
+            except Exception as e:
+                logger.exception(f"Forward pass of policy {policy_id} failed")
+                replies = [("error", f"{type(e).__name__}: {e}")] * len(requests)
+            for request, reply in zip(requests, replies, strict=True):
+                self._reply(request, reply)
+
+    def _reply(self, request: _Request, reply: tuple) -> None:
+        try:
+            request.conn.send(reply)
+        except OSError:
+            pass  # the client went away; its reader thread cleans up the connection
+
+    def _init_and_reply(self, request: _Request, args: list) -> None:
+        try:
+            reply = self._init(*args)
+        except Exception as e:
+            logger.exception(f"Failed to initialize policy {args[0] if args else None}")
+            reply = ("error", f"{type(e).__name__}: {e}")
+        self._reply(request, reply)
+
+    def _init(self, uri: str, features: dict, action_names: list[str], max_action_args: list[int]) -> tuple:
+        key = json.dumps([uri, features, action_names, max_action_args], sort_keys=True, default=str)
+        if key in self._policy_ids:
+            return ("ok", self._policy_ids[key])
+
+        pr = self._records.get(uri)
+        if pr is None:
+            pr = self._records[uri] = self._policy_store.policy_record(uri)
+            policy = pr.policy
+        else:
+            # Already initialized to another env; initialize a copy rather than changing it under its clients.
+            policy = copy.deepcopy(pr.policy)
+        initialize_policy_to_environment(policy, pr.metadata, features, action_names, max_action_args, self._device)
+
+        self._policy_ids[key] = len(self._policies)
+        self._policies.append(policy)
+        logger.info(f"Initialized {uri} as policy {self._policy_ids[key]}")
+        return ("ok", self._policy_ids[key])
+
+    def _forward(self, policy_id: int, messages: list[tuple]) -> list[tuple]:
+        sizes = [len(obs) for _, _, obs, _, _ in messages]
+        state = PolicyState()
+        if messages[0][3] is not None:
+            state.lstm_h = torch.as_tensor(np.concatenate([m[3] for m in messages], axis=1), device=self._device)
+            state.lstm_c = torch.as_tensor(np.concatenate([m[4] for m in messages], axis=1), device=self._device)
+        obs = torch.as_tensor(np.concatenate([m[2] for m in messages]), device=self._device)
+
+        with torch.no_grad():
+            actions, *_ = self._policies[policy_id](obs, state)
+        self.num_batches += 1
+        self.num_rows += len(obs)
+
+        actions = actions.cpu().numpy()
+        lstm_h = None if state.lstm_h is None else state.lstm_h.cpu().numpy()
+        lstm_c = None if state.lstm_c is None else state.lstm_c.cpu().numpy()
+        offsets = np.cumsum([0, *sizes])
+        return [
+            (
+                "ok",
+                (
+                    actions[start:end],
+                    None if lstm_h is None else lstm_h[:, start:end],
+                    None if lstm_c is None else lstm_c[:, start:end],
+                ),
+            )
+            for start, end in zip(offsets[:-1], offsets[1:], strict=True)
+        ]
+
+
+class RemotePolicy:
+    """
+    A policy loaded in a PolicyServer, usable in place of the policy itself: it has the same initialization methods and
+    forward signature, and keeps the LSTM state in the caller's PolicyState. Only actions are returned; the other
+    outputs of the forward pass are None.
+
+    Authenticates with `authkey`, by default the key the server at `address` wrote next to its socket.
+    """
+
+    def __init__(self, address: str, uri: str, authkey: bytes | None = None):
+        self.uri = uri
+        if authkey is None:
+            authkey = read_authkey(address)
+        self._conn = Client(address, family="AF_UNIX", authkey=authkey)
+        self._policy_id: int | None = None
+        self._device = torch.device("cpu")
+
+    def _request(self, *message) -> Any:
+        self._conn.send(message)
+        status, value = self._conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"Policy server failed to {message[0]} {self.uri}: {value}")
+        return value
+
+    def initialize_to_environment(
+        self, features: dict, action_names: list[str], action_max_params: list[int], device: torch.device | str
+    ) -> None:
+        self._device = torch.device(device)
+        self._policy_id = self._request("init", self.uri, features, action_names, action_max_params)
+
+    def __call__(self, obs: torch.Tensor, state: PolicyState) -> tuple:
+        if self._policy_id is None:
+            raise RuntimeError(f"{self.uri} must be initialized to an environment before its forward pass")
+
+        lstm_h = None if state.lstm_h is None else state.lstm_h.cpu().numpy()
+        lstm_c = None if state.lstm_c is None else state.lstm_c.cpu().numpy()
+        actions, lstm_h, lstm_c = self._request("forward", self._policy_id, obs.cpu().numpy(), lstm_h, lstm_c)
+
+        if lstm_h is not None and lstm_c is not None:
+            state.lstm_h = torch.from_numpy(lstm_h).to(self._device)
+            state.lstm_c = torch.from_numpy(lstm_c).to(self._device)
+        return torch.from_numpy(actions).to(self._device), None, None, None, None
+
+    def close(self) -> None:
+        self._conn.close()
@@ -20,7 +20,6 @@ from typing import Any, Dict
 
 import numpy as np
 import torch
-from einops import rearrange
 from omegaconf import OmegaConf
 
 from metta.agent.policy_record import PolicyRecord
@@ -32,6 +31,7 @@ from metta.mettagrid.mettagrid_env import MettaGridEnv, dtype_actions
 from metta.mettagrid.replay_writer import ReplayWriter
 from metta.mettagrid.stats_writer import StatsWriter
 from metta.rl.vecenv import make_vecenv
+from metta.sim.policy_server import RemotePolicy, initialize_policy_to_environment
 from metta.sim.simulation_config import SingleEnvSimulationConfig
 from metta.sim.simulation_stats_db import SimulationStatsDB
 from metta.sim.utils import get_or_create_policy_ids, wandb_policy_name_to_uri
@@ -45,6 +45,17 @@ class SimulationCompatibilityError(Exception):
     pass
 
 
+@dataclass
+class PolicyGroup:
+    """A policy and the agents it acts for, across every env; each step runs one forward pass per group."""
+
+    policy_record: PolicyRecord
+    policy: Any  # The loaded policy, or a RemotePolicy when forward passes run in a policy server
+    agent_idxs: torch.Tensor  # Flat (env-major) indices of the group's agents, on the simulation's device
+    is_npc: bool
+    state: PolicyState
+
+
 class Simulation:
     """
     A vectorized batch of MettaGrid environments sharing the same parameters.
@@ -103,6 +114,8 @@ class Simulation:
         self._replay_writer = ReplayWriter(replay_dir)
         self._device = device
 
+        npc_policy_uris = ([config.npc_policy_uri] if config.npc_policy_uri else []) + list(config.npc_policy_uris)
+
         # ----------------
         # Calculate number of parallel environments and episodes per environment
         # to achieve the target total number of episodes
@@ -147,8 +160,8 @@ class Simulation:
         # ---------------- policies ------------------------------------- #
         self._policy_pr = policy_pr
         self._policy_store = policy_store
-        self._npc_pr = policy_store.policy_record(config.npc_policy_uri) if config.npc_policy_uri else None
-        self._policy_agents_pct = config.policy_agents_pct if self._npc_pr is not None else 1.0
+        self._npc_prs = [policy_store.policy_record(uri) for uri in npc_policy_uris]
+        self._policy_agents_pct = config.policy_agents_pct if self._npc_prs else 1.0
 
         self._stats_client: StatsClient | None = stats_client
         self._stats_epoch_id: uuid.UUID | None = stats_epoch_id
@@ -157,86 +170,87 @@ class Simulation:
         assert isinstance(metta_grid_env, MettaGridEnv)
 
         # Let every policy know the active action-set of this env.
-        action_names = metta_grid_env.action_names
-        max_args = metta_grid_env.max_action_args
-
-        policy = self._policy_pr.policy
-
-        # Restore original_feature_mapping from metadata if available
-        if (
-            hasattr(policy, "restore_original_feature_mapping")
-            and "original_feature_mapping" in self._policy_pr.metadata
-        ):
-            policy.restore_original_feature_mapping(self._policy_pr.metadata["original_feature_mapping"])
-
-        # Ensure policy has required interface
-        if hasattr(policy, "initialize_to_environment"):
-            # New interface: pass features and actions
-            features = metta_grid_env.get_observation_features()
-            # Simulations are generally used for evaluation, not training
-            policy.initialize_to_environment(features, action_names, max_args, self._device)
-        elif hasattr(policy, "activate_actions"):
-            # Old interface: just pass actions
-            policy.activate_actions(action_names, max_args, self._device)
-        else:
-            raise AttributeError(
-                f"Policy is missing required method 'activate_actions' or 'initialize_to_environment'. "
-                f"Expected a MettaAgent-like object but got {type(policy).__name__}"
-            )
-
-        if self._npc_pr is not None:
-            npc_policy = self._npc_pr.policy
-
-            # Restore original_feature_mapping for NPC policy as well
-            if (
-                hasattr(npc_policy, "restore_original_feature_mapping")
-                and "original_feature_mapping" in self._npc_pr.metadata
-            ):
-                npc_policy.restore_original_feature_mapping(self._npc_pr.metadata["original_feature_mapping"])
-
-            if hasattr(npc_policy, "initialize_to_environment"):
-                features = metta_grid_env.get_observation_features()
-                # NPC policies are used during evaluation
-                npc_policy.initialize_to_environment(features, action_names, max_args, self._device)
-            elif hasattr(npc_policy, "activate_actions"):
-                npc_policy.activate_actions(action_names, max_args, self._device)
-            else:
-                raise AttributeError(
-                    f"NPC policy is missing required method 'activate_actions' or 'initialize_to_environment'. "
-                    f"Expected a MettaAgent-like object but got {type(npc_policy).__name__}"
-                )
+        policies = {id(self._policy_pr): self._initialize_policy(self._policy_pr, metta_grid_env, is_npc=False)}
+        for npc_pr in self._npc_prs:
+            policies[id(npc_pr)] = self._initialize_policy(npc_pr, metta_grid_env, is_npc=True)
 
-        # ---------------- agent-index bookkeeping ---------------------- #
-        idx_matrix = torch.arange(metta_grid_env.num_agents * self._num_envs, device=self._device).reshape(
-            self._num_envs, self._agents_per_env
-        )
+        # ---------------- agent-slot assignment ------------------------ #
+        # Every env is laid out the same way, so an agent id means the same policy in every episode: the candidate
+        # takes the first slots, and the rest go round-robin to the opponents in the pool.
         self._policy_agents_per_env = max(1, int(self._agents_per_env * self._policy_agents_pct))
         self._npc_agents_per_env = self._agents_per_env - self._policy_agents_per_env
+        if self._npc_agents_per_env and self._npc_agents_per_env < len(self._npc_prs):
+            raise ValueError(
+                f"[{self._name}] policy_agents_pct={self._policy_agents_pct} leaves {self._npc_agents_per_env} "
+                f"opponent slots per env, fewer than the {len(self._npc_prs)} opponents in the pool"
+            )
 
-        self._policy_idxs = idx_matrix[:, : self._policy_agents_per_env].reshape(-1)
-        self._npc_idxs = (
-            idx_matrix[:, self._policy_agents_per_env :].reshape(-1)
-            if self._npc_agents_per_env
-            else torch.tensor([], device=self._device, dtype=torch.long)
-        )
+        policy_prs = [self._policy_pr]
+        env_slot_policies = np.zeros(self._agents_per_env, dtype=np.int64)
+        for slot in range(self._npc_agents_per_env):
+            npc_pr = self._npc_prs[slot % len(self._npc_prs)]
+            # A policy that plays in several roles (e.g. the candidate as its own opponent) gets a single group.
+            same_policy = [i for i, pr in enumerate(policy_prs) if pr is npc_pr or pr.uri == npc_pr.uri]
+            if same_policy:
+                policy_idx = same_policy[0]
+            else:
+                policy_idx = len(policy_prs)
+                policy_prs.append(npc_pr)
+            env_slot_policies[self._policy_agents_per_env + slot] = policy_idx
+        slot_policies = np.tile(env_slot_policies, self._num_envs)
+
+        # The policy of each agent id, which is the same in every env
+        self._agent_prs: list[PolicyRecord] = [policy_prs[i] for i in env_slot_policies]
+        self._policy_groups = [
+            PolicyGroup(
+                policy_record=pr,
+                policy=policies[id(pr)],
+                agent_idxs=torch.as_tensor(np.flatnonzero(slot_policies == i), device=self._device),
+                is_npc=i > 0,
+                state=PolicyState(),
+            )
+            for i, pr in enumerate(policy_prs)
+        ]
+        self._actions: torch.Tensor | None = None  # Every agent's actions, filled in group by group
         self._episode_counters = np.zeros(self._num_envs, dtype=int)
 
+    def _initialize_policy(self, pr: PolicyRecord, metta_grid_env: MettaGridEnv, is_npc: bool) -> Any:
+        # With a policy server, the weights stay in the server; records without a URI can't be loaded there.
+        if self._config.policy_server is not None and pr.uri is not None:
+            policy = RemotePolicy(self._config.policy_server, pr.uri)
+        else:
+            policy = pr.policy
+
+        # Simulations are generally used for evaluation, not training
+        initialize_policy_to_environment(
+            policy,
+            pr.metadata,
+            metta_grid_env.get_observation_features(),
+            metta_grid_env.action_names,
+            metta_grid_env.max_action_args,
+            self._device,
+            role="NPC policy" if is_npc else "Policy",
+        )
+        return policy
+
     def start_simulation(self) -> None:
         """
         Start the simulation.
         """
         logger.info(
-            "Sim '%s': %d env × %d agents (%.0f%% candidate)",
+            "Sim '%s': %d env × %d agents (%.0f%% candidate, %d opponents)",
             self._name,
             self._num_envs,
             self._agents_per_env,
             100 * self._policy_agents_per_env / self._agents_per_env,
+            len(self._policy_groups) - 1,
         )
         logger.info("Stats dir: %s", self._stats_dir)
         # ---------------- reset ------------------------------- #
         self._obs, _ = self._vecenv.reset()
-        self._policy_state = PolicyState()
-        self._npc_state = PolicyState()
+        for group in self._policy_groups:
+            group.state = PolicyState()
+        self._policy_state = self._policy_groups[0].state
         self._env_done_flags = [False] * self._num_envs
 
         self._t0 = time.time()
@@ -245,84 +259,29 @@ class Simulation:
         """
         Generate actions for the simulation.
         """
-        if __debug__:
-            # Debug assertion: verify indices are correctly ordered
-            # Policy indices should be 0 to N-1
-            # NPC indices should be N to M-1
-            num_policy = len(self._policy_idxs)
-            num_npc = len(self._npc_idxs)
-
-            if num_policy > 0:
-                assert self._policy_idxs[0] == 0, f"Policy indices should start at 0, got {self._policy_idxs[0]}"
-                assert self._policy_idxs[-1] == num_policy - 1, (
-                    f"Policy indices should be continuous 0 to {num_policy - 1}, last index is {self._policy_idxs[-1]}"
-                )
-                assert list(self._policy_idxs) == list(range(num_policy)), (
-                    "Policy indices should be continuous sequence starting from 0"
-                )
-
-            if self._npc_pr is not None and num_npc > 0:
-                expected_npc_start = num_policy
-                assert self._npc_idxs[0] == expected_npc_start, (
-                    f"NPC indices should start at {expected_npc_start}, got {self._npc_idxs[0]}"
-                )
-                assert self._npc_idxs[-1] == expected_npc_start + num_npc - 1, (
-                    f"NPC indices should end at {expected_npc_start + num_npc - 1}, got {self._npc_idxs[-1]}"
-                )
-                assert list(self._npc_idxs) == list(range(expected_npc_start, expected_npc_start + num_npc)), (
-                    f"NPC indices should be continuous sequence from {expected_npc_start}"
-                )
-
-            # Verify no overlap between policy and NPC indices
-            if num_policy > 0 and num_npc > 0:
-                policy_set = set(self._policy_idxs)
-                npc_set = set(self._npc_idxs)
-                assert policy_set.isdisjoint(npc_set), (
-                    f"Policy and NPC indices should not overlap. Overlap: {policy_set.intersection(npc_set)}"
-                )
-
-        # ---------------- forward passes ------------------------- #
         with torch.no_grad():
             obs_t = torch.as_tensor(self._obs, device=self._device)
-            # Candidate-policy agents
-            my_obs = obs_t[self._policy_idxs]
-            policy = self._policy_pr.policy
-            policy_actions, _, _, _, _ = policy(my_obs, self._policy_state)
-            # NPC agents (if any)
-            if self._npc_pr is not None and len(self._npc_idxs):
-                npc_obs = obs_t[self._npc_idxs]
-                npc_policy = self._npc_pr.policy
+            for group in self._policy_groups:
                 try:
-                    npc_actions, _, _, _, _ = npc_policy(npc_obs, self._npc_state)
+                    group_actions, _, _, _, _ = group.policy(obs_t[group.agent_idxs], group.state)
                 except Exception as e:
+                    if not group.is_npc:
+                        raise
                     logger.error(f"Error generating NPC actions: {e}")
                     raise SimulationCompatibilityError(
-                        f"[{self._name}] Error generating NPC actions for {self._npc_pr.run_name}: {e}"
+                        f"[{self._name}] Error generating NPC actions for {group.policy_record.run_name}: {e}"
                     ) from e
 
-        # ---------------- action stitching ----------------------- #
-        actions = policy_actions
-        if self._npc_agents_per_env:
-            # Reshape policy and npc actions to (num_envs, agents_per_env, action_dim)
-            policy_actions = rearrange(
-                policy_actions,
-                "(envs policy_agents) act -> envs policy_agents act",
-                envs=self._num_envs,
-                policy_agents=self._policy_agents_per_env,
-            )
-            npc_actions = rearrange(
-                npc_actions,
-                "(envs npc_agents) act -> envs npc_agents act",
-                envs=self._num_envs,
-                npc_agents=self._npc_agents_per_env,
-            )
-            # Concatenate along agents dimension
-            actions = torch.cat([policy_actions, npc_actions], dim=1)
-            # Flatten back to (total_agents, action_dim)
-            actions = rearrange(actions, "envs agents act -> (envs agents) act")
+                if self._actions is None:
+                    self._actions = torch.empty(
+                        (self._num_envs * self._agents_per_env, *group_actions.shape[1:]),
+                        dtype=group_actions.dtype,
+                        device=group_actions.device,
+                    )
+                self._actions.index_copy_(0, group.agent_idxs, group_actions)
 
-        actions_np = actions.cpu().numpy().astype(dtype_actions)
-        return actions_np
+        assert self._actions is not None
+        return self._actions.cpu().numpy().astype(dtype_actions)
 
     def step_simulation(self, actions_np: np.ndarray) -> None:
         # ---------------- env.step ------------------------------- #
@@ -343,6 +302,10 @@ class Simulation:
     def end_simulation(self) -> SimulationResults:
         # ---------------- teardown & DB merge ------------------------ #
         self._vecenv.close()
+        self._stats_writer.close()
+        for group in self._policy_groups:
+            if isinstance(group.policy, RemotePolicy):
+                group.policy.close()
         db = self._from_shards_and_context()
         self._write_remote_stats(db)
 
@@ -368,17 +331,7 @@ class Simulation:
 
     def _from_shards_and_context(self) -> SimulationStatsDB:
         """Merge all *.duckdb* shards for this simulation → one `StatsDB`."""
-        # Make sure we're creating a dictionary of the right type
-        agent_map: Dict[int, PolicyRecord] = {}
-
-        # Add policy agents to the map
-        for idx in self._policy_idxs:
-            agent_map[int(idx.item())] = self._policy_pr
-
-        # Add NPC agents to the map if they exist
-        if self._npc_pr is not None:
-            for idx in self._npc_idxs:
-                agent_map[int(idx.item())] = self._npc_pr
+        agent_map: Dict[int, PolicyRecord] = dict(enumerate(self._agent_prs))
 
         suite_name = "" if self._sim_suite_name is None else self._sim_suite_name
         db = SimulationStatsDB.from_shards_and_context(
@@ -398,65 +351,56 @@ class Simulation:
             policy_name = self._get_policy_name()
             policy_uri = self._get_policy_uri()
             policy_details: list[tuple[str, str, str | None]] = [(policy_name, policy_uri, None)]
-            if self._npc_pr is not None:
-                policy_details.append((self._npc_pr.run_name, self._npc_pr.uri, None))
+            for group in self._policy_groups[1:]:
+                policy_details.append((group.policy_record.run_name, group.policy_record.uri, None))
 
             policy_ids = get_or_create_policy_ids(self._stats_client, policy_details, self._stats_epoch_id)
 
             agent_map: Dict[int, uuid.UUID] = {}
-            for idx in self._policy_idxs:
-                agent_map[int(idx.item())] = policy_ids[policy_name]
-
-            if self._npc_pr is not None:
-                for idx in self._npc_idxs:
-                    agent_map[int(idx.item())] = policy_ids[self._npc_pr.run_name]
-
-            # Get all episodes from the database
-            episodes_df = stats_db.query("SELECT * FROM episodes")
-
-            for _, episode_row in episodes_df.iterrows():
-                episode_id = episode_row["id"]
-
-                # Get agent metrics for this episode
-                agent_metrics_df = stats_db.query(f"SELECT * FROM agent_metrics WHERE episode_id = '{episode_id}'")
-                agent_metrics: Dict[int, Dict[str, float]] = {}
-
-                for _, metric_row in agent_metrics_df.iterrows():
-                    agent_id = int(metric_row["agent_id"])
-                    metric_name = metric_row["metric"]
-                    metric_value = float(metric_row["value"])
-
-                    if agent_id not in agent_metrics:
-                        agent_metrics[agent_id] = {}
-                    agent_metrics[agent_id][metric_name] = metric_value
-
-                # Get episode attributes
-                attributes_df = stats_db.query(f"SELECT * FROM episode_attributes WHERE episode_id = '{episode_id}'")
-                attributes: Dict[str, Any] = {}
-
-                for _, attr_row in attributes_df.iterrows():
-                    attr_name = attr_row["attribute"]
-                    attr_value = attr_row["value"]
-                    attributes[attr_name] = attr_value
+            for idx, pr in enumerate(self._agent_prs):
+                agent_map[idx] = policy_ids[policy_name if pr is self._policy_pr else pr.run_name]
+
+            # Pull every episode's rows with one query per table. Episodes are numbered by their position in the batch.
+            numbered = "(SELECT id, CAST(row_number() OVER (ORDER BY id) - 1 AS INTEGER) AS idx FROM episodes)"
+            episodes_df = stats_db.query("SELECT id, replay_url FROM episodes ORDER BY id")
+            if episodes_df.empty:
+                return
+            attributes_df = stats_db.query(
+                f"SELECT e.idx, a.attribute, a.value FROM episode_attributes a JOIN {numbered} e ON a.episode_id = e.id"
+            )
+            metrics_df = stats_db.query(
+                f"SELECT e.idx, m.agent_id, m.metric, m.value "
+                f"FROM agent_metrics m JOIN {numbered} e ON m.episode_id = e.id"
+            )
 
-                # Record the episode remotely
-                episode_tags = self._episode_tags if self._episode_tags else None
-                try:
-                    self._stats_client.record_episode(
-                        agent_policies=agent_map,
-                        agent_metrics=agent_metrics,
-                        primary_policy_id=policy_ids[policy_name],
-                        stats_epoch=self._stats_epoch_id,
-                        eval_name=self._name,
-                        simulation_suite="" if self._sim_suite_name is None else self._sim_suite_name,
-                        replay_url=episode_row.get("replay_url"),
-                        attributes=attributes,
-                        eval_task_id=self._eval_task_id,
-                        tags=episode_tags,
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to record episode {episode_id} remotely: {e}")
-                    # Continue with other episodes even if one fails
+            attributes: list[dict[str, Any]] = [{} for _ in range(len(episodes_df))]
+            for episode, attribute, value in attributes_df.itertuples(index=False):
+                attributes[episode][attribute] = value
+
+            # Every episode has the same agents, played by the same policies.
+            agent_ids = list(agent_map)
+            policy_episodes = np.repeat(np.arange(len(episodes_df)), len(agent_ids))
+
+            try:
+                self._stats_client.record_episodes(
+                    primary_policy_id=policy_ids[policy_name],
+                    replay_urls=[url if isinstance(url, str) else None for url in episodes_df["replay_url"]],
+                    attributes=attributes,
+                    policy_episodes=policy_episodes.tolist(),
+                    policy_agent_ids=agent_ids * len(episodes_df),
+                    policy_ids=[agent_map[agent_id] for agent_id in agent_ids] * len(episodes_df),
+                    metric_episodes=metrics_df["idx"].tolist(),
+                    metric_agent_ids=metrics_df["agent_id"].astype(int).tolist(),
+                    metric_names=metrics_df["metric"].tolist(),
+                    metric_values=metrics_df["value"].astype(float).tolist(),
+                    stats_epoch=self._stats_epoch_id,
+                    eval_name=self._name,
+                    simulation_suite="" if self._sim_suite_name is None else self._sim_suite_name,
+                    eval_task_id=self._eval_task_id,
+                    tags=self._episode_tags if self._episode_tags else None,
+                )
+            except Exception as e:
+                logger.error(f"Failed to record {len(episodes_df)} episodes remotely: {e}")
 
     def get_replays(self) -> dict:
         """Get all replays for this simulation."""
@@ -1,6 +1,6 @@
 # metta/sim/simulation_config.py
 
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 from pydantic import model_validator
 
@@ -18,7 +18,13 @@ class SimulationConfig(Config):
     env_overrides: dict = {}
 
     npc_policy_uri: Optional[str] = None
+    # A pool of opponents, in addition to npc_policy_uri. The agents not played by the candidate are dealt out
+    # round-robin to the pool, so one simulation scores the candidate against every opponent in it.
+    npc_policy_uris: List[str] = []
     policy_agents_pct: float = 1.0
+    # Unix socket of a policy server (tools/policy_server.py) to run forward passes in, instead of loading the policies
+    # into this process. The server batches requests from every simulation connected to it.
+    policy_server: Optional[str] = None
 
 
 class SingleEnvSimulationConfig(SimulationConfig):
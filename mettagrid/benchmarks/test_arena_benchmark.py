@@ -0,0 +1,78 @@
+"""
+Step throughput on the arena environments used for training, at sizes where grid access dominates.
+
+The arena maps are built by metta.map, so these benchmarks need the full metta repo (not just mettagrid).
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+from hydra import compose, initialize_config_dir
+from omegaconf import DictConfig, OmegaConf
+
+from metta.mettagrid.curriculum.core import SingleTaskCurriculum
+from metta.mettagrid.mettagrid_env import MettaGridEnv
+from metta.mettagrid.util.actions import generate_valid_random_actions
+
+pytest.importorskip("metta.map.mapgen")
+resolvers = pytest.importorskip("metta.common.util.resolvers")
+
+CONFIGS_DIR = Path(__file__).resolve().parents[2] / "configs"
+ACTION_SEQUENCE_LENGTH = 100
+
+
+def load_arena_cfg(name: str, num_agents: int) -> DictConfig:
+    resolvers.register_resolvers()
+    with initialize_config_dir(config_dir=str(CONFIGS_DIR), version_base=None):
+        cfg = compose(config_name=f"env/mettagrid/arena/{name}").env.mettagrid.arena
+    OmegaConf.set_struct(cfg, False)
+    # Arena maps have one instance per 6 agents, so this also scales the map.
+    cfg.game.num_agents = num_agents
+    cfg.game.max_steps = 0  # env lasts forever
+    return cfg
+
+
+@pytest.mark.parametrize("num_agents", [24, 96, 192])
+@pytest.mark.parametrize("arena", ["basic", "combat", "advanced"])
+def test_arena_step_performance(benchmark, arena, num_agents):
+    """
+    Benchmark step on an arena map with a deterministic sequence of random valid actions.
+
+    Args:
+        arena: Which configs/env/mettagrid/arena config to run
+        num_agents: Number of agents (and so map instances) to run
+    """
+    np.random.seed(42)
+    cfg = load_arena_cfg(arena, num_agents)
+    env = MettaGridEnv(SingleTaskCurriculum("arena_benchmark", task_cfg=cfg), render_mode=None)
+    env.reset(seed=42)
+
+    action_sequence = [
+        generate_valid_random_actions(env, num_agents=env.num_agents, seed=seed)
+        for seed in range(ACTION_SEQUENCE_LENGTH)
+    ]
+    iteration_counter = 0
+
+    def run_step():
+        nonlocal iteration_counter
+        env.step(action_sequence[iteration_counter % ACTION_SEQUENCE_LENGTH])
+        iteration_counter += 1
+
+    benchmark.pedantic(run_step, iterations=500, rounds=10, warmup_rounds=1)
+
+    env_rate = benchmark.stats["ops"]
+    agent_rate = env_rate * env.num_agents
+
+    print(f"\nArena {arena} ({num_agents} agents, {env.map_height}x{env.map_width}):")
+    print(f"Environment rate (steps per second): {env_rate:.2f}")
+    print(f"Agent rate (steps per second): {agent_rate:.2f}")
+
+    benchmark.extra_info.update(
+        {
+            "env_rate": env_rate,
+            "agent_rate": agent_rate,
+            "map_cells": env.map_height * env.map_width,
+        }
+    )
+    env.close()
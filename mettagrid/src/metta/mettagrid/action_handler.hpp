@@ -49,8 +49,11 @@ public:
 
   virtual ~ActionHandler() {}
 
-  void init(Grid* grid) {
+  // `last_actions` is shared by all handlers of one environment. Handlers used on their own (e.g. in tests) fall
+  // back to a private map.
+  void init(Grid* grid, std::map<size_t, std::string>* last_actions = nullptr) {
     this->_grid = grid;
+    this->_last_actions = last_actions ? last_actions : &_own_last_actions;
   }
 
   bool handle_action(GridObjectId actor_object_id, ActionArg arg) {
@@ -113,15 +116,10 @@ public:
     return it != _agent_tracking.end() ? &it->second : nullptr;
   }
 
-  // Get the last action name for an agent across all handlers
-  static std::string get_last_action_name(size_t agent_id) {
-    auto it = _global_last_actions.find(agent_id);
-    return it != _global_last_actions.end() ? it->second : "";
-  }
-
-  // Clear all tracking data (useful for reset)
-  static void clear_all_tracking() {
-    _global_last_actions.clear();
+  // Get the last action name for an agent across all handlers of this environment
+  std::string get_last_action_name(size_t agent_id) const {
+    auto it = _last_actions->find(agent_id);
+    return it != _last_actions->end() ? it->second : "";
   }
 
   // Clear tracking for this handler
@@ -139,15 +137,17 @@ protected:
   // Per-agent tracking state for this handler
   std::map<size_t, ActionTrackingState> _agent_tracking;
 
-  // Global tracking of last action names across all handlers
-  static std::map<size_t, std::string> _global_last_actions;
+  // Tracking of last action names across all handlers of one environment. This used to be a static member, which
+  // mixed up agents of different environments in the same process and raced when environments step on threads.
+  std::map<size_t, std::string>* _last_actions = &_own_last_actions;
+  std::map<size_t, std::string> _own_last_actions;
 
 private:
   void update_tracking(size_t agent_id, bool success) {
     auto& state = _agent_tracking[agent_id];
 
     // Check if this is consecutive
-    if (_global_last_actions[agent_id] == _action_name && success) {
+    if ((*_last_actions)[agent_id] == _action_name && success) {
       state.consecutive_count++;
     } else {
       state.consecutive_count = success ? 1 : 0;
@@ -159,9 +159,9 @@ private:
       state.total_count++;
     }
 
-    // Update global tracking
+    // Update environment-wide tracking
     if (success) {
-      _global_last_actions[agent_id] = _action_name;
+      (*_last_actions)[agent_id] = _action_name;
     }
   }
 };
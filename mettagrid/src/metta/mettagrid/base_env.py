@@ -22,9 +22,11 @@ from omegaconf import OmegaConf
 from pydantic import validate_call
 
 from metta.common.profiling.stopwatch import Stopwatch, with_instance_timer
+from metta.mettagrid.coded_grid import as_coded_grid, count_agents
 from metta.mettagrid.core import MettaGridCore
 from metta.mettagrid.curriculum.core import Curriculum
 from metta.mettagrid.level_builder import Level
+from metta.mettagrid.mettagrid_c import MettaGrid
 from metta.mettagrid.mettagrid_c_config import from_mettagrid_config
 from metta.mettagrid.replay_writer import ReplayWriter
 from metta.mettagrid.stats_writer import StatsWriter
@@ -132,7 +134,8 @@ class MettaGridEnv(ABC):
                 level = task_cfg.game.map_builder.build()
 
         # Validate the level
-        level_agents = np.count_nonzero(np.char.startswith(level.grid, "agent"))
+        grid = as_coded_grid(level.grid)
+        level_agents = count_agents(grid)
         assert task_cfg.game.num_agents == level_agents, (
             f"Number of agents {task_cfg.game.num_agents} does not match number of agents in map {level_agents}"
         )
@@ -162,7 +165,7 @@ class MettaGridEnv(ABC):
 
         # Create core environment
         current_seed = seed if seed is not None else self._current_seed
-        core_env = MettaGridCore(c_cfg, level.grid.tolist(), current_seed)
+        core_env = MettaGridCore(c_cfg, grid, current_seed)
 
         # Initialize renderer if needed
         if self._render_mode is not None and self._renderer is None:
@@ -423,6 +426,9 @@ class MettaGridEnv(ABC):
 
     def close(self) -> None:
         """Close the environment."""
+        if self._stats_writer is not None:
+            # Writes out any episodes still buffered.
+            self._stats_writer.close()
         if self._core_env is not None:
             # Clean up any resources if needed
             self._core_env = None
@@ -444,6 +450,12 @@ class MettaGridEnv(ABC):
         return self._core_env
 
     # Properties that delegate to core environment
+    @property
+    def c_env(self) -> MettaGrid:
+        if self._core_env is None:
+            raise RuntimeError("Environment not initialized")
+        return self._core_env.c_env
+
     @property
     def max_steps(self) -> int:
         if self._core_env is None:
@@ -0,0 +1,181 @@
+"""
+Integer-coded map grids.
+
+Maps are 2D grids of object names ("empty", "wall", "agent.agent", ...). As `<U50` strings that is 200 bytes per cell,
+and the MettaGrid constructor has to convert every cell from a Python string. A CodedGrid stores one uint16 symbol id
+per cell instead. Ids come from a process-wide symbol table, and the grid goes to the C++ constructor as a numpy buffer
+together with that table's names.
+
+CodedGrid is an ndarray subclass that still speaks names where scene code expects them:
+- assigning names (a str, or an array of str) encodes them: `grid[2:4, 5] = "wall"`
+- reading a single cell decodes it: `grid[y, x] == "empty"`
+- comparing with a name compares ids: `grid == "empty"` is a plain boolean array
+- converting to strings decodes: `grid.astype(str)`, `grid.tolist()`, and functions that mix the grid with names, like
+  `np.where(grid == "wall", "x", grid)`, see names rather than ids
+Everything else (slicing, views, copies, transposes) is ordinary numpy on the ids. to_strings() returns the classic
+string grid for code that needs one.
+
+numpy doesn't consult ndarray subclasses when it copies them into another array, so `np.array(grid, dtype=str)` and
+assigning a CodedGrid into a string array (`level[...] = grid`) see the ids; use to_strings() or `as_string_grid`.
+"""
+
+import threading
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+SYMBOL_DTYPE = np.uint16
+EMPTY_SYMBOL = "empty"
+
+# Kinds of dtypes that hold names rather than ids.
+_STRING_KINDS = "USO"
+
+_symbol_ids: dict[str, int] = {EMPTY_SYMBOL: 0}
+_symbol_names: list[str] = [EMPTY_SYMBOL]
+_symbol_lock = threading.Lock()
+
+
+def symbol_id(name: str) -> int:
+    """The id of an object name, adding it to the symbol table if it's new."""
+    id_ = _symbol_ids.get(name)
+    if id_ is None:
+        with _symbol_lock:
+            id_ = _symbol_ids.get(name)
+            if id_ is None:
+                id_ = len(_symbol_names)
+                if id_ > np.iinfo(SYMBOL_DTYPE).max:
+                    raise ValueError(f"Too many distinct map symbols to add {name!r}")
+                _symbol_names.append(name)
+                _symbol_ids[name] = id_
+    return id_
+
+
+def symbol_names() -> list[str]:
+    """Object names indexed by symbol id. Ids are only ever added, so a snapshot is valid for all earlier grids."""
+    return _symbol_names[:]
+
+
+def encode_symbols(values: Any) -> Any:
+    """Maps names (a str or an array-like of str) to symbol ids. Anything else is returned unchanged."""
+    if isinstance(values, str):
+        return SYMBOL_DTYPE(symbol_id(values))
+    if isinstance(values, CodedGrid):
+        return values.view(np.ndarray)
+    if isinstance(values, (list, tuple)):
+        values = np.asarray(values)
+    if isinstance(values, np.ndarray) and values.dtype.kind in "UO":
+        names, inverse = np.unique(values, return_inverse=True)
+        ids = np.array([symbol_id(str(name)) for name in names], dtype=SYMBOL_DTYPE)
+        return ids[inverse].reshape(values.shape)
+    return values
+
+
+class CodedGrid(np.ndarray):
+    """A grid of symbol ids that reads and writes object names. See the module docstring."""
+
+    @classmethod
+    def full(cls, shape: tuple[int, int], fill_value: str = EMPTY_SYMBOL) -> "CodedGrid":
+        return np.full(shape, symbol_id(fill_value), dtype=SYMBOL_DTYPE).view(cls)
+
+    @classmethod
+    def from_strings(cls, grid: npt.ArrayLike) -> "CodedGrid":
+        return np.asarray(encode_symbols(np.asarray(grid)), dtype=SYMBOL_DTYPE).view(cls)
+
+    def to_strings(self) -> npt.NDArray[np.str_]:
+        return np.array(_symbol_names, dtype=np.str_)[self.view(np.ndarray)]
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        if isinstance(value, np.ndarray):
+            return value
+        return _symbol_names[value]
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, encode_symbols(value))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __eq__(self, other):  # type: ignore[override]
+        return np.equal(self.view(np.ndarray), encode_symbols(other))
+
+    def __ne__(self, other):  # type: ignore[override]
+        return np.not_equal(self.view(np.ndarray), encode_symbols(other))
+
+    def __array_wrap__(self, obj, context=None, return_scalar=False):
+        # Results that aren't symbol ids (masks, sums, ...) are plain arrays, not grids.
+        if obj.dtype != SYMBOL_DTYPE:
+            return obj.view(np.ndarray)
+        return super().__array_wrap__(obj, context)
+
+    def astype(self, dtype, *args, **kwargs):  # type: ignore[override]
+        if np.dtype(dtype).kind in _STRING_KINDS:
+            return self.to_strings().astype(dtype, *args, **kwargs)
+        return self.view(np.ndarray).astype(dtype, *args, **kwargs)
+
+    def tolist(self):  # type: ignore[override]
+        return self.to_strings().tolist()
+
+    def __str__(self) -> str:
+        return str(self.to_strings())
+
+    def __repr__(self) -> str:
+        return f"CodedGrid({np.array2string(self.to_strings(), separator=', ')})"
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is not None and np.dtype(dtype).kind in _STRING_KINDS:
+            return self.to_strings().astype(dtype)
+        return self.view(np.ndarray) if dtype is None else self.view(np.ndarray).astype(dtype)
+
+    def __array_function__(self, func, types, args, kwargs):
+        result = super().__array_function__(func, types, args, kwargs)
+        if isinstance(result, np.ndarray) and result.dtype.kind in _STRING_KINDS:
+            # The ids were mixed with names and converted to strings along with them; do it again with our names.
+            return func(*_decode(args), **_decode(kwargs))
+        return result
+
+    def __reduce__(self):
+        # Ids are only meaningful within one process, so pickles carry the names of the ids they use.
+        ids = self.view(np.ndarray)
+        return (_unpickle_coded_grid, (ids, {int(i): _symbol_names[i] for i in np.unique(ids)}))
+
+
+def _decode(value: Any) -> Any:
+    # CodedGrids in function arguments (as passed to __array_function__) replaced with their names.
+    if isinstance(value, CodedGrid):
+        return value.to_strings()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_decode(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _decode(item) for key, item in value.items()}
+    return value
+
+
+def _unpickle_coded_grid(ids: np.ndarray, names: dict[int, str]) -> CodedGrid:
+    remap = np.zeros(max(names, default=0) + 1, dtype=SYMBOL_DTYPE)
+    for old_id, name in names.items():
+        remap[old_id] = symbol_id(name)
+    return remap[ids].view(CodedGrid)
+
+
+def as_coded_grid(grid: npt.ArrayLike) -> CodedGrid:
+    """Returns the grid as a CodedGrid, encoding it if it's a string grid."""
+    if isinstance(grid, CodedGrid):
+        return grid
+    return CodedGrid.from_strings(grid)
+
+
+def as_string_grid(grid: npt.ArrayLike) -> npt.NDArray[np.str_]:
+    """Returns the grid as an array of names, decoding it if it's a CodedGrid."""
+    if isinstance(grid, CodedGrid):
+        return grid.to_strings()
+    return np.asarray(grid)
+
+
+def count_agents(grid: npt.ArrayLike) -> int:
+    """Number of agent cells in a string or coded grid."""
+    coded = as_coded_grid(grid)
+    is_agent = np.array([name.startswith("agent") for name in symbol_names()], dtype=bool)
+    return int(np.count_nonzero(is_agent[coded.view(np.ndarray)]))
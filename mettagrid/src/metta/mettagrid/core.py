@@ -15,6 +15,7 @@ from typing import Any, Dict, List, Optional, Tuple
 import numpy as np
 from gymnasium import spaces
 
+from metta.mettagrid.coded_grid import CodedGrid, symbol_names
 from metta.mettagrid.mettagrid_c import GameConfig as GameConfig_cpp
 from metta.mettagrid.mettagrid_c import MettaGrid
 
@@ -31,7 +32,7 @@ class MettaGridCore:
     def __init__(
         self,
         game_config: GameConfig_cpp,
-        map_grid: List[List[str]],
+        map_grid: CodedGrid | List[List[str]],
         seed: int = 0,
         observation_buffer: Optional[np.ndarray] = None,
         terminal_buffer: Optional[np.ndarray] = None,
@@ -43,14 +44,17 @@ class MettaGridCore:
 
         Args:
             game_config: Game configuration
-            map_grid: 2D grid as list of lists of strings
+            map_grid: 2D grid, either a CodedGrid or a list of lists of strings
             seed: Random seed
             observation_buffer: Pre-allocated observation buffer (optional)
             terminal_buffer: Pre-allocated terminal buffer (optional)
             truncation_buffer: Pre-allocated truncation buffer (optional)
             reward_buffer: Pre-allocated reward buffer (optional)
         """
-        self._c_env = MettaGrid(game_config, map_grid, seed)
+        if isinstance(map_grid, CodedGrid):
+            self._c_env = MettaGrid(game_config, map_grid, symbol_names(), seed)
+        else:
+            self._c_env = MettaGrid(game_config, map_grid, seed)
         self._game_config = game_config
         self._map_grid = map_grid
         self._seed = seed
@@ -137,6 +141,11 @@ class MettaGridCore:
         self._c_env.set_buffers(observation_buffer, terminal_buffer, truncation_buffer, reward_buffer)
 
     # Properties that expose C++ environment functionality
+    @property
+    def c_env(self) -> MettaGrid:
+        """Get the underlying C++ environment."""
+        return self._c_env
+
     @property
     def num_agents(self) -> int:
         return self._c_env.num_agents
@@ -233,6 +242,10 @@ class MettaGridCore:
         """Get information about all grid objects."""
         return self._c_env.grid_objects()
 
+    def grid_ids(self) -> np.ndarray:
+        """Get a read-only [height, width, layer] view of the object ids on the grid (0 = empty)."""
+        return self._c_env.grid_ids()
+
     @property
     def action_success(self) -> List[bool]:
         action_success_array = self._c_env.action_success()
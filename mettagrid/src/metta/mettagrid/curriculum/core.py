@@ -1,12 +1,26 @@
+import hashlib
+import json
 import logging
 from typing import List
 
 import hydra
-from omegaconf import DictConfig
+from omegaconf import DictConfig, OmegaConf
 
 logger = logging.getLogger(__name__)
 
 
+def _map_builder_key(env_cfg: DictConfig) -> str | None:
+    """A digest of the resolved map builder config, or None if there is none or it can't be resolved."""
+    try:
+        map_builder = OmegaConf.select(env_cfg, "game.map_builder") if isinstance(env_cfg, DictConfig) else None
+        if not isinstance(map_builder, DictConfig):
+            return None
+        resolved = OmegaConf.to_container(map_builder, resolve=True)
+    except Exception:
+        return None
+    return hashlib.sha256(json.dumps(resolved, sort_keys=True, default=str).encode()).hexdigest()
+
+
 class Curriculum:
     def get_task(self) -> "Task":
         raise NotImplementedError("Subclasses must implement this method")
@@ -37,6 +51,8 @@ class Task:
         self._id = id
         self._is_complete = False
         self._curricula = [(curriculum, id)]
+        # Taken before instantiation, which replaces the map builder config with the builder itself.
+        self._map_builder_key = _map_builder_key(env_cfg)
         # We may have been lazy about instantiation up to this point, since that allows us to
         # override the config. Now we complete the instantiation.
         self._env_cfg = hydra.utils.instantiate(env_cfg)
@@ -62,6 +78,10 @@ class Task:
     def name(self) -> str:
         return self._name
 
+    def map_builder_key(self) -> str | None:
+        """Identifies the map builder config, which tasks sampled from the same curriculum may not share."""
+        return self._map_builder_key
+
     def short_name(self) -> str:
         return self._name.split("/")[-1]
 
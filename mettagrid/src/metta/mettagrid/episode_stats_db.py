@@ -8,8 +8,9 @@ Can be extended (e.g. see SimulationStatsDb) with additional context on top of t
 import datetime
 import logging
 import os
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List
 
 import duckdb
 import pandas as pd
@@ -54,6 +55,72 @@ EPISODE_DB_TABLES = {
 }
 
 
+@dataclass
+class EpisodeBatch:
+    """
+    Episodes waiting to be written, stored column by column (one list per table column) so that a whole batch can be
+    inserted with one statement per table.
+    """
+
+    episode_ids: List[str] = field(default_factory=list)
+    step_counts: List[int] = field(default_factory=list)
+    replay_urls: List[str | None] = field(default_factory=list)
+    created_ats: List[datetime.datetime] = field(default_factory=list)
+
+    attribute_episode_ids: List[str] = field(default_factory=list)
+    attribute_names: List[str] = field(default_factory=list)
+    attribute_values: List[str] = field(default_factory=list)
+
+    group_episode_ids: List[str] = field(default_factory=list)
+    group_ids: List[int] = field(default_factory=list)
+    group_agent_ids: List[int] = field(default_factory=list)
+
+    metric_episode_ids: List[str] = field(default_factory=list)
+    metric_agent_ids: List[int] = field(default_factory=list)
+    metric_names: List[str] = field(default_factory=list)
+    metric_values: List[float] = field(default_factory=list)
+
+    def add(
+        self,
+        episode_id: str,
+        attributes: Dict[str, str],
+        agent_metrics: Dict[int, Dict[str, float]],
+        agent_groups: Dict[int, int],
+        step_count: int,
+        replay_url: str | None,
+        created_at: datetime.datetime,
+    ) -> None:
+        self.episode_ids.append(episode_id)
+        self.step_counts.append(step_count)
+        self.replay_urls.append(replay_url)
+        self.created_ats.append(created_at)
+
+        for attr, value in attributes.items():
+            self.attribute_episode_ids.append(episode_id)
+            self.attribute_names.append(attr)
+            self.attribute_values.append(value)
+
+        for agent_id, group_id in agent_groups.items():
+            self.group_episode_ids.append(episode_id)
+            self.group_ids.append(group_id)
+            self.group_agent_ids.append(agent_id)
+
+        for agent_id, metrics in agent_metrics.items():
+            for metric, value in metrics.items():
+                self.metric_episode_ids.append(episode_id)
+                self.metric_agent_ids.append(agent_id)
+                self.metric_names.append(metric)
+                self.metric_values.append(value)
+
+    def extend(self, other: "EpisodeBatch") -> None:
+        """Appends the episodes of `other`."""
+        for column in fields(self):
+            getattr(self, column.name).extend(getattr(other, column.name))
+
+    def __len__(self) -> int:
+        return len(self.episode_ids)
+
+
 class EpisodeStatsDB:
     """
     DuckDB database for recording the outcomes of episodes.
@@ -92,60 +159,89 @@ class EpisodeStatsDB:
         replay_url: str | None,
         created_at: datetime.datetime,
     ) -> None:
-        self.con.begin()
-        self.con.execute(
-            """
-            INSERT INTO episodes
-            (id, step_count, replay_url, created_at)
-            VALUES (?, ?, ?, ?)
-            """,
-            (episode_id, step_count, replay_url, created_at),
+        batch = EpisodeBatch()
+        batch.add(episode_id, attributes, agent_metrics, agent_groups, step_count, replay_url, created_at)
+        self.record_episodes(batch)
+
+    def record_episodes(self, batch: EpisodeBatch) -> None:
+        """Write a batch of episodes in one transaction, with one insert per table and a single checkpoint."""
+        if len(batch) == 0:
+            return
+
+        episodes = pd.DataFrame(
+            {
+                "id": batch.episode_ids,
+                "step_count": batch.step_counts,
+                "replay_url": pd.Series(batch.replay_urls, dtype=object),
+                "created_at": batch.created_ats,
+            }
+        )
+        groups = pd.DataFrame(
+            {"episode_id": batch.group_episode_ids, "group_id": batch.group_ids, "agent_id": batch.group_agent_ids}
+        )
+        attributes = pd.DataFrame(
+            {
+                "episode_id": batch.attribute_episode_ids,
+                "attribute": batch.attribute_names,
+                "value": batch.attribute_values,
+            }
+        )
+        metrics = pd.DataFrame(
+            {
+                "episode_id": batch.metric_episode_ids,
+                "agent_id": batch.metric_agent_ids,
+                "metric": batch.metric_names,
+                "value": batch.metric_values,
+            }
         )
 
-        group_rows = [(episode_id, group_id, agent_id) for agent_id, group_id in agent_groups.items()]
-        if len(group_rows) > 0:
-            self.con.executemany(
+        # Like the per-row upserts they replace, a later value for the same key wins.
+        attributes = attributes.drop_duplicates(["episode_id", "attribute"], keep="last")
+        metrics = metrics.drop_duplicates(["episode_id", "agent_id", "metric"], keep="last")
+
+        self.con.begin()
+        try:
+            self.con.register("episodes_batch", episodes)
+            self.con.register("agent_groups_batch", groups)
+            self.con.register("episode_attributes_batch", attributes)
+            self.con.register("agent_metrics_batch", metrics)
+            self.con.execute(
+                """
+                INSERT INTO episodes
+                (id, step_count, replay_url, created_at)
+                SELECT id, step_count, replay_url, created_at FROM episodes_batch
+                """
+            )
+            self.con.execute(
                 """
                 INSERT INTO agent_groups
                 (episode_id, group_id, agent_id)
-                VALUES (?, ?, ?)
-                """,
-                group_rows,
+                SELECT episode_id, group_id, agent_id FROM agent_groups_batch
+                """
             )
-
-        attribute_rows = [(episode_id, attr, value) for attr, value in attributes.items()]
-        if len(attribute_rows) > 0:
-            self.con.executemany(
+            self.con.execute(
                 """
                 INSERT OR REPLACE INTO episode_attributes
                 (episode_id, attribute, value)
-                VALUES (?, ?, ?)
-                """,
-                attribute_rows,
+                SELECT episode_id, attribute, value FROM episode_attributes_batch
+                """
             )
-
-        self._add_metrics(episode_id, agent_metrics, "agent")
-
-        self.con.commit()
+            self.con.execute(
+                """
+                INSERT OR REPLACE INTO agent_metrics
+                (episode_id, agent_id, metric, value)
+                SELECT episode_id, agent_id, metric, value FROM agent_metrics_batch
+                """
+            )
+            self.con.commit()
+        except Exception:
+            self.con.rollback()
+            raise
+        finally:
+            for view in ("episodes_batch", "agent_groups_batch", "episode_attributes_batch", "agent_metrics_batch"):
+                self.con.unregister(view)
         self.con.execute("CHECKPOINT")
 
-    def _add_metrics(self, episode_id: str, metrics: Dict[int, Dict[str, float]], entity: str) -> None:
-        if len(metrics) == 0:
-            return
-
-        values = []
-        for group_id, group_metrics in metrics.items():
-            values.extend([(episode_id, group_id, metric, value) for metric, value in group_metrics.items()])
-
-        self.con.executemany(
-            f"""
-            INSERT OR REPLACE INTO {entity}_metrics
-            (episode_id, {entity}_id, metric, value)
-            VALUES (?, ?, ?, ?)
-            """,
-            values,
-        )
-
     def query(self, sql_query: str) -> pd.DataFrame:
         """Execute a SQL query and return a pandas DataFrame."""
         return self.con.execute(sql_query).fetchdf()
@@ -3,6 +3,7 @@
 
 #include <algorithm>
 #include <memory>
+#include <utility>
 #include <vector>
 
 #include "grid_object.hpp"
@@ -11,7 +12,6 @@
 using std::max;
 using std::unique_ptr;
 using std::vector;
-using GridType = std::vector<std::vector<std::vector<GridObjectId>>>;
 
 class Grid {
 public:
@@ -19,13 +19,30 @@ public:
   const GridCoord width;
   vector<std::unique_ptr<GridObject>> objects;
 
+  // Cells whose occupancy changed since the caller last cleared this list. Only recorded when track_dirty_cells is
+  // set (incremental observation encoding uses it); a cell may appear more than once.
+  bool track_dirty_cells = false;
+  vector<std::pair<GridCoord, GridCoord>> dirty_cells;
+
 private:
-  GridType grid;
+  // Object ids in row-major (r, c, layer) order, so a cell's layers are adjacent and rows are contiguous.
+  vector<GridObjectId> grid;
+
+  inline size_t cell_index(GridCoord r, GridCoord c, Layer layer) const {
+    return (static_cast<size_t>(r) * width + c) * GridLayer::GridLayerCount + layer;
+  }
+
+  inline GridObjectId& id_at(const GridLocation& loc) {
+    return grid[cell_index(loc.r, loc.c, loc.layer)];
+  }
+
+  inline GridObjectId id_at(const GridLocation& loc) const {
+    return grid[cell_index(loc.r, loc.c, loc.layer)];
+  }
 
 public:
   Grid(GridCoord height, GridCoord width) : height(height), width(width) {
-    grid.resize(height,
-                std::vector<std::vector<GridObjectId>>(width, std::vector<GridObjectId>(GridLayer::GridLayerCount, 0)));
+    grid.assign(static_cast<size_t>(height) * width * GridLayer::GridLayerCount, 0);
 
     // Reserve space for objects to avoid frequent reallocations
     // Assume ~50% of grid cells will contain objects
@@ -54,13 +71,14 @@ public:
     if (!is_valid_location(obj->location)) {
       return false;
     }
-    if (this->grid[obj->location.r][obj->location.c][obj->location.layer] != 0) {
+    if (id_at(obj->location) != 0) {
       return false;
     }
 
     obj->id = static_cast<GridObjectId>(this->objects.size());
     this->objects.push_back(std::unique_ptr<GridObject>(obj));
-    this->grid[obj->location.r][obj->location.c][obj->location.layer] = obj->id;
+    id_at(obj->location) = obj->id;
+    mark_dirty(obj->location);
     return true;
   }
 
@@ -68,7 +86,8 @@ public:
   // Since the caller is now the owner, this can make the raw pointer invalid, if the
   // returned unique_ptr is destroyed.
   inline unique_ptr<GridObject> remove_object(GridObject* obj) {
-    this->grid[obj->location.r][obj->location.c][obj->location.layer] = 0;
+    id_at(obj->location) = 0;
+    mark_dirty(obj->location);
     auto obj_ptr = this->objects[obj->id].release();
     this->objects[obj->id] = nullptr;
     return std::unique_ptr<GridObject>(obj_ptr);
@@ -79,13 +98,15 @@ public:
       return false;
     }
 
-    if (grid[loc.r][loc.c][loc.layer] != 0) {
+    if (id_at(loc) != 0) {
       return false;
     }
 
     GridObject* obj = object(id);
-    grid[loc.r][loc.c][loc.layer] = id;
-    grid[obj->location.r][obj->location.c][obj->location.layer] = 0;
+    id_at(loc) = id;
+    id_at(obj->location) = 0;
+    mark_dirty(obj->location);
+    mark_dirty(loc);
     obj->location = loc;
     return true;
   }
@@ -99,16 +120,18 @@ public:
     GridLocation loc2 = obj2->location;
 
     // Clear the objects from their original positions in the grid.
-    grid[loc1.r][loc1.c][loc1.layer] = 0;
-    grid[loc2.r][loc2.c][loc2.layer] = 0;
+    id_at(loc1) = 0;
+    id_at(loc2) = 0;
 
     // Update the location property of each object, preserving their original layers.
     obj1->location = {loc2.r, loc2.c, loc1.layer};
     obj2->location = {loc1.r, loc1.c, loc2.layer};
 
     // Place the objects in their new positions in the grid.
-    grid[obj1->location.r][obj1->location.c][obj1->location.layer] = id1;
-    grid[obj2->location.r][obj2->location.c][obj2->location.layer] = id2;
+    id_at(obj1->location) = id1;
+    id_at(obj2->location) = id2;
+    mark_dirty(loc1);
+    mark_dirty(loc2);
   }
 
   inline GridObject* object(GridObjectId obj_id) const {
@@ -120,10 +143,11 @@ public:
     if (!is_valid_location(loc)) {
       return nullptr;
     }
-    if (grid[loc.r][loc.c][loc.layer] == 0) {
+    GridObjectId id = id_at(loc);
+    if (id == 0) {
       return nullptr;
     }
-    return object(grid[loc.r][loc.c][loc.layer]);
+    return object(id);
   }
 
   /**
@@ -173,12 +197,24 @@ public:
     return this->relative_location(loc, orientation, 1, 0);
   }
 
+  inline void mark_dirty(const GridLocation& loc) {
+    if (track_dirty_cells) {
+      dirty_cells.emplace_back(loc.r, loc.c);
+    }
+  }
+
   inline bool is_empty(GridCoord row, GridCoord col) const {
-    for (const auto& layer_objects : grid[row][col]) {
-      if (layer_objects != 0) return false;
+    const GridObjectId* cell = grid.data() + cell_index(row, col, 0);
+    for (size_t layer = 0; layer < GridLayer::GridLayerCount; layer++) {
+      if (cell[layer] != 0) return false;
     }
     return true;
   }
+
+  // Object ids as a contiguous [height, width, GridLayerCount] array; 0 means empty.
+  inline const GridObjectId* id_data() const {
+    return grid.data();
+  }
 };
 
 #endif  // GRID_HPP_
@@ -75,6 +75,12 @@ public:
   virtual std::vector<PartialObservationToken> obs_features() const {
     return {};  // Default: no observable features
   }
+
+  // Whether obs_features() can never change after construction. Incremental observation encoding skips these
+  // objects when looking for changes.
+  virtual bool has_static_obs_features() const {
+    return false;
+  }
 };
 
 #endif  // GRID_OBJECT_HPP_
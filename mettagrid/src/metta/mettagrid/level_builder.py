@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import Any
 
 import numpy as np
 import numpy.typing as npt
@@ -13,10 +14,10 @@ class Level:
     Note: this is intentionally called "Level" instead of "Map" because `map` is a reserved word in Python.
     """
 
-    # Two-dimensional grid of strings.
+    # Two-dimensional grid of object names, either as strings or as a `CodedGrid` of symbol ids (see `coded_grid.py`).
     # Possible values: "wall", "empty", "agent", etc.
     # For the full list, see `mettagrid_c.cpp`.
-    grid: npt.NDArray[np.str_]
+    grid: npt.NDArray[np.str_] | npt.NDArray[np.uint16]
 
     # List of labels. These will be used for `rewards/map:...` episode stats.
     labels: list[str]
@@ -35,3 +36,13 @@ class LevelBuilder(ABC):
 
     @abstractmethod
     def build(self) -> Level: ...
+
+    def cache_key(self) -> Any:
+        """
+        A JSON-serializable value that determines the level this builder builds, or None if builds aren't reproducible.
+
+        Builders that return a key can have their levels stored in and served from a `LevelCache`. The key must change
+        whenever the level would, so it should include the contents of the files the builder reads (not just their
+        paths), and a version of the generation code if its output can change.
+        """
+        return None
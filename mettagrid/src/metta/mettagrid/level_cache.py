@@ -0,0 +1,106 @@
+"""
+On-disk cache of built levels.
+
+Levels from reproducible builders (see `LevelBuilder.cache_key`) are stored as `.npz` files named by a hash of the
+builder's cache key: the grid as symbol ids, the symbol names, and the labels. Files are written atomically, so any
+number of worker processes can share one cache directory. When the directory grows past `max_bytes`, the least
+recently used files are deleted (reads refresh a file's mtime).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from metta.mettagrid.coded_grid import SYMBOL_DTYPE, CodedGrid, as_coded_grid, symbol_id, symbol_names
+from metta.mettagrid.level_builder import Level
+
+logger = logging.getLogger(__name__)
+
+# Bump when the file format changes, so old entries are ignored rather than misread. Changes to the levels themselves
+# are covered by the builders' keys (see `LevelBuilder.cache_key`).
+CACHE_FORMAT_VERSION = 1
+
+
+class LevelCache:
+    """Levels keyed by `LevelBuilder.cache_key()`, stored in `cache_dir` and kept under `max_bytes` in total."""
+
+    def __init__(self, cache_dir: str | os.PathLike, max_bytes: int = 1 << 30):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key_digest(key: Any) -> str:
+        payload = json.dumps([CACHE_FORMAT_VERSION, key], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _path(self, digest: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}.npz"
+
+    def get(self, key: Any) -> Level | None:
+        path = self._path(self.key_digest(key))
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                ids, symbols, labels = data["ids"], data["symbols"], data["labels"]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.warning(f"Ignoring unreadable level cache entry {path}", exc_info=True)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass  # evicted by another process in the meantime; we already have the data
+
+        remap = np.array([symbol_id(str(name)) for name in symbols], dtype=SYMBOL_DTYPE)
+        return Level(grid=remap[ids].view(CodedGrid), labels=[str(label) for label in labels])
+
+    def put(self, key: Any, level: Level) -> None:
+        path = self._path(self.key_digest(key))
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Store ids local to this file, since symbol ids are only meaningful within one process.
+        grid = as_coded_grid(level.grid).view(np.ndarray)
+        used_ids, local_ids = np.unique(grid, return_inverse=True)
+        names = symbol_names()
+
+        with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as f:
+            np.savez_compressed(
+                f,
+                ids=local_ids.reshape(grid.shape).astype(SYMBOL_DTYPE),
+                symbols=np.array([names[i] for i in used_ids], dtype=np.str_),
+                labels=np.array(level.labels, dtype=np.str_),
+            )
+        os.replace(f.name, path)
+        self._evict()
+
+    def get_or_build(self, key: Any, build: Callable[[], Level]) -> tuple[Level, bool]:
+        """Returns the cached level for `key`, building and storing it on a miss, and whether it was a hit."""
+        level = self.get(key)
+        if level is not None:
+            return level, True
+        level = build()
+        self.put(key, level)
+        return level, False
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self.cache_dir.glob("*/*.npz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
@@ -0,0 +1,121 @@
+"""
+Background map generation for MettaGridEnv.
+
+Building a level (WFC, ConvChain, BSP, MakeConnected, ...) can take much longer than an episode's worth of steps, and
+without prefetching it happens inside reset(), stalling the env and with it the whole rollout batch. MapPrefetcher
+keeps a few levels per task ready, built in a background thread or process pool. Each level taken from it is replaced
+by submitting another build for the same task, so for curricula that keep revisiting the same tasks, maps come out of
+the ready queue instead of being built on the critical path.
+"""
+
+import copy
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from metta.mettagrid.level_builder import Level, LevelBuilder
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PrefetchResult:
+    level: Level
+    # Whether the level was already built when it was asked for.
+    hit: bool
+    # Time the caller spent waiting for the level, whether on a pending build or building it itself.
+    wait_time: float
+    # Time the build took, wherever it ran.
+    build_time: float
+
+
+def _timed_build(map_builder: LevelBuilder) -> tuple[Level, float]:
+    start = time.perf_counter()
+    level = map_builder.build()
+    return level, time.perf_counter() - start
+
+
+def _reseeded_copy(map_builder: LevelBuilder) -> LevelBuilder:
+    """
+    A copy of `map_builder` whose random generators are spawned from the original's. Plain copies would share the
+    original's generator state, and so all build the same level.
+    """
+    clone = copy.deepcopy(map_builder)
+    for name, value in vars(map_builder).items():
+        if isinstance(value, np.random.Generator):
+            setattr(clone, name, value.spawn(1)[0])
+    return clone
+
+
+class MapPrefetcher:
+    """
+    Keeps up to `max_ready_per_task` levels built ahead of time for each of the `max_tasks` most recently used tasks.
+
+    Tasks are identified by a key chosen by the caller (MettaGridEnv uses a digest of the map builder config); all
+    levels for a key must come from equivalent map builders. Builders are copied before being handed to the pool, since
+    builders like MapGen keep per-build state on themselves, and each copy gets its own random generators (see
+    `_reseeded_copy`). With `use_processes`, builders and levels have to be picklable.
+    """
+
+    def __init__(
+        self,
+        max_ready_per_task: int = 1,
+        max_tasks: int = 8,
+        num_workers: int = 1,
+        use_processes: bool = False,
+    ):
+        if max_ready_per_task < 1:
+            raise ValueError(f"max_ready_per_task must be at least 1, got {max_ready_per_task}")
+        self._max_ready_per_task = max_ready_per_task
+        self._max_tasks = max_tasks
+        self._executor: Executor
+        if use_processes:
+            self._executor = ProcessPoolExecutor(max_workers=num_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="map_prefetch")
+        self._pending: OrderedDict[str, deque[Future]] = OrderedDict()
+
+    def get(self, key: str, map_builder: LevelBuilder) -> PrefetchResult:
+        """Returns the oldest prefetched level for `key`, or builds one now if there is none, then refills the queue."""
+        start = time.perf_counter()
+        queue = self._pending.get(key)
+        future = queue.popleft() if queue else None
+        hit = future is not None and future.done()
+
+        level = None
+        build_time = 0.0
+        if future is not None:
+            try:
+                level, build_time = future.result()
+            except Exception:
+                logger.exception(f"Background map build for {key} failed, building in the foreground")
+                hit = False
+        if level is None:
+            level, build_time = _timed_build(map_builder)
+        wait_time = time.perf_counter() - start
+
+        self.prefetch(key, map_builder)
+        return PrefetchResult(level=level, hit=hit, wait_time=wait_time, build_time=build_time)
+
+    def prefetch(self, key: str, map_builder: LevelBuilder) -> None:
+        """Submits builds for `key` until it has `max_ready_per_task` levels ready or in progress."""
+        queue = self._pending.setdefault(key, deque())
+        self._pending.move_to_end(key)
+        while len(queue) < self._max_ready_per_task:
+            queue.append(self._executor.submit(_timed_build, _reseeded_copy(map_builder)))
+
+        while len(self._pending) > self._max_tasks:
+            _, evicted = self._pending.popitem(last=False)
+            for future in evicted:
+                future.cancel()
+
+    def num_ready(self, key: str) -> int:
+        return sum(future.done() for future in self._pending.get(key, ()))
+
+    def close(self) -> None:
+        self._pending.clear()
+        self._executor.shutdown(wait=False, cancel_futures=True)
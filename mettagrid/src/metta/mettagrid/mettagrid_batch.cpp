@@ -0,0 +1,170 @@
+#include "mettagrid_batch.hpp"
+
+#include <algorithm>
+#include <string>
+#include <thread>
+
+MettaGridBatch::MettaGridBatch(const py::list& envs, unsigned int num_threads) {
+  if (py::len(envs) == 0) {
+    throw std::runtime_error("MettaGridBatch needs at least one environment");
+  }
+
+  MettaGrid* first = envs[0].cast<MettaGrid*>();
+  _num_agents = first->num_agents();
+  _num_observation_tokens = first->num_observation_tokens();
+
+  for (const auto& env : envs) {
+    auto env_object = py::reinterpret_borrow<py::object>(env);
+    _envs.push_back(_check_env(env_object));
+    _env_objects.push_back(env_object);
+  }
+
+  const auto total_agents = static_cast<ssize_t>(_envs.size() * _num_agents);
+  _observations = py::array_t<ObservationType, py::array::c_style>(
+      {total_agents, static_cast<ssize_t>(_num_observation_tokens), static_cast<ssize_t>(3)});
+  _terminals = py::array_t<TerminalType, py::array::c_style>({total_agents});
+  _truncations = py::array_t<TruncationType, py::array::c_style>({total_agents});
+  _rewards = py::array_t<RewardType, py::array::c_style>({total_agents});
+
+  for (size_t env_idx = 0; env_idx < _envs.size(); env_idx++) {
+    _attach(env_idx);
+  }
+
+  if (num_threads == 0) {
+    num_threads = std::max(1u, std::thread::hardware_concurrency());
+  }
+  _pool = std::make_unique<ThreadPool>(std::min(static_cast<size_t>(num_threads), _envs.size()));
+}
+
+MettaGrid* MettaGridBatch::_check_env(const py::object& env) const {
+  MettaGrid* grid = env.cast<MettaGrid*>();
+  if (grid->num_agents() != _num_agents) {
+    throw std::runtime_error("All environments in a batch must have the same number of agents (expected " +
+                             std::to_string(_num_agents) + ", got " + std::to_string(grid->num_agents()) + ")");
+  }
+  if (grid->num_observation_tokens() != _num_observation_tokens) {
+    throw std::runtime_error("All environments in a batch must have the same number of observation tokens");
+  }
+  return grid;
+}
+
+void MettaGridBatch::_attach(size_t env_idx) {
+  const auto num_agents = static_cast<ssize_t>(_num_agents);
+  const auto num_tokens = static_cast<ssize_t>(_num_observation_tokens);
+  const size_t first_agent = env_idx * _num_agents;
+
+  // Views into the batch buffers; `base` keeps the batch arrays alive for as long as the environment holds them.
+  py::array_t<ObservationType, py::array::c_style> observations(
+      {num_agents, num_tokens, static_cast<ssize_t>(3)},
+      _observations.mutable_data() + first_agent * _num_observation_tokens * 3,
+      _observations);
+  py::array_t<TerminalType, py::array::c_style> terminals(
+      {num_agents}, _terminals.mutable_data() + first_agent, _terminals);
+  py::array_t<TruncationType, py::array::c_style> truncations(
+      {num_agents}, _truncations.mutable_data() + first_agent, _truncations);
+  py::array_t<RewardType, py::array::c_style> rewards({num_agents}, _rewards.mutable_data() + first_agent, _rewards);
+
+  _envs[env_idx]->set_buffers(observations, terminals, truncations, rewards);
+}
+
+void MettaGridBatch::set_env(size_t env_idx, const py::object& env) {
+  if (env_idx >= _envs.size()) {
+    throw std::out_of_range("env_idx " + std::to_string(env_idx) + " out of range for batch of " +
+                            std::to_string(_envs.size()));
+  }
+  _envs[env_idx] = _check_env(env);
+  _env_objects[env_idx] = env;
+  _attach(env_idx);
+}
+
+void MettaGridBatch::set_buffers(const py::array_t<ObservationType, py::array::c_style>& observations,
+                                 const py::array_t<TerminalType, py::array::c_style>& terminals,
+                                 const py::array_t<TruncationType, py::array::c_style>& truncations,
+                                 const py::array_t<RewardType, py::array::c_style>& rewards) {
+  const auto total_agents = static_cast<ssize_t>(_envs.size() * _num_agents);
+  if (observations.ndim() != 3 || observations.shape(0) != total_agents ||
+      observations.shape(1) != static_cast<ssize_t>(_num_observation_tokens) || observations.shape(2) != 3) {
+    throw std::runtime_error("observations must have shape [" + std::to_string(total_agents) + ", " +
+                             std::to_string(_num_observation_tokens) + ", 3]");
+  }
+  if (terminals.ndim() != 1 || terminals.shape(0) != total_agents) {
+    throw std::runtime_error("terminals has the wrong shape");
+  }
+  if (truncations.ndim() != 1 || truncations.shape(0) != total_agents) {
+    throw std::runtime_error("truncations has the wrong shape");
+  }
+  if (rewards.ndim() != 1 || rewards.shape(0) != total_agents) {
+    throw std::runtime_error("rewards has the wrong shape");
+  }
+
+  _observations = observations;
+  _terminals = terminals;
+  _truncations = truncations;
+  _rewards = rewards;
+
+  for (size_t env_idx = 0; env_idx < _envs.size(); env_idx++) {
+    _attach(env_idx);
+  }
+}
+
+py::tuple MettaGridBatch::step(const py::array_t<ActionType, py::array::c_style>& actions,
+                               const std::optional<py::array_t<bool, py::array::c_style>>& active) {
+  const size_t num_envs = _envs.size();
+  bool batched_shape = actions.ndim() == 3 && actions.shape(0) == static_cast<ssize_t>(num_envs) &&
+                       actions.shape(1) == static_cast<ssize_t>(_num_agents) && actions.shape(2) == 2;
+  bool flat_shape = actions.ndim() == 2 && actions.shape(0) == static_cast<ssize_t>(num_envs * _num_agents) &&
+                    actions.shape(1) == 2;
+  if (!batched_shape && !flat_shape) {
+    throw std::runtime_error("actions must have shape [" + std::to_string(num_envs) + ", " +
+                             std::to_string(_num_agents) + ", 2]");
+  }
+
+  const bool* active_data = nullptr;
+  if (active.has_value()) {
+    if (active->ndim() != 1 || active->shape(0) != static_cast<ssize_t>(num_envs)) {
+      throw std::runtime_error("active must have shape [" + std::to_string(num_envs) + "]");
+    }
+    active_data = active->data();
+  }
+
+  const ActionType* actions_data = actions.data();
+  {
+    // Everything below only touches the environments' raw buffers, which were validated when they were attached.
+    py::gil_scoped_release release;
+    _pool->parallel_for(num_envs, [&](size_t env_idx) {
+      if (active_data && !active_data[env_idx]) return;
+      _envs[env_idx]->step_raw(actions_data + env_idx * _num_agents * 2);
+    });
+  }
+
+  return py::make_tuple(_observations, _rewards, _terminals, _truncations);
+}
+
+py::list MettaGridBatch::envs() const {
+  py::list envs;
+  for (const auto& env : _env_objects) {
+    envs.append(env);
+  }
+  return envs;
+}
+
+void bind_mettagrid_batch(py::module& m) {
+  py::class_<MettaGridBatch>(m, "MettaGridBatch")
+      .def(py::init<const py::list&, unsigned int>(), py::arg("envs"), py::arg("num_threads") = 1)
+      .def("set_env", &MettaGridBatch::set_env, py::arg("env_idx"), py::arg("env"))
+      .def("set_buffers",
+           &MettaGridBatch::set_buffers,
+           py::arg("observations").noconvert(),
+           py::arg("terminals").noconvert(),
+           py::arg("truncations").noconvert(),
+           py::arg("rewards").noconvert())
+      .def("step", &MettaGridBatch::step, py::arg("actions").noconvert(), py::arg("active") = py::none())
+      .def("envs", &MettaGridBatch::envs)
+      .def_property_readonly("num_envs", &MettaGridBatch::num_envs)
+      .def_property_readonly("num_agents", &MettaGridBatch::num_agents)
+      .def_property_readonly("num_threads", &MettaGridBatch::num_threads)
+      .def_property_readonly("observations", &MettaGridBatch::observations)
+      .def_property_readonly("terminals", &MettaGridBatch::terminals)
+      .def_property_readonly("truncations", &MettaGridBatch::truncations)
+      .def_property_readonly("rewards", &MettaGridBatch::rewards);
+}
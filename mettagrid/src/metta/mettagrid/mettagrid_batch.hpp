@@ -0,0 +1,88 @@
+#ifndef METTAGRID_BATCH_HPP_
+#define METTAGRID_BATCH_HPP_
+
+#include <pybind11/numpy.h>
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+
+#include <memory>
+#include <optional>
+#include <vector>
+
+#include "mettagrid_c.hpp"
+#include "thread_pool.hpp"
+#include "types.hpp"
+
+namespace py = pybind11;
+
+// Steps N MettaGrid environments with one call across the pybind boundary.
+//
+// All environments must have the same number of agents and observation tokens. Their buffers are views into
+// contiguous batch buffers laid out as [N * num_agents, ...], which is the layout pufferlib uses for a worker's
+// agents. step() releases the GIL and, when num_threads > 1, spreads the environments over a thread pool.
+//
+// Environments are created (and re-created between episodes) in Python; the batch holds references to them so they
+// stay alive while it steps them.
+class METTAGRID_API MettaGridBatch {
+public:
+  // num_threads == 0 uses one thread per hardware thread.
+  MettaGridBatch(const py::list& envs, unsigned int num_threads = 1);
+
+  // Replaces environment env_idx (e.g. after its episode ended) and points it at its slice of the batch buffers.
+  void set_env(size_t env_idx, const py::object& env);
+
+  // Swaps in externally owned batch buffers (e.g. pufferlib's shared memory) and re-points every environment at them.
+  void set_buffers(const py::array_t<ObservationType, py::array::c_style>& observations,
+                   const py::array_t<TerminalType, py::array::c_style>& terminals,
+                   const py::array_t<TruncationType, py::array::c_style>& truncations,
+                   const py::array_t<RewardType, py::array::c_style>& rewards);
+
+  // actions has shape [num_envs, num_agents, 2] (or [num_envs * num_agents, 2]). Environments whose entry in `active`
+  // is false are not stepped and their slices of the buffers are left untouched.
+  py::tuple step(const py::array_t<ActionType, py::array::c_style>& actions,
+                 const std::optional<py::array_t<bool, py::array::c_style>>& active);
+
+  size_t num_envs() const {
+    return _envs.size();
+  }
+  size_t num_agents() const {
+    return _num_agents;
+  }
+  size_t num_threads() const {
+    return _pool->size();
+  }
+  py::list envs() const;
+
+  py::array_t<ObservationType> observations() const {
+    return _observations;
+  }
+  py::array_t<TerminalType> terminals() const {
+    return _terminals;
+  }
+  py::array_t<TruncationType> truncations() const {
+    return _truncations;
+  }
+  py::array_t<RewardType> rewards() const {
+    return _rewards;
+  }
+
+private:
+  std::vector<py::object> _env_objects;
+  std::vector<MettaGrid*> _envs;
+  size_t _num_agents;
+  size_t _num_observation_tokens;
+
+  py::array_t<ObservationType, py::array::c_style> _observations;
+  py::array_t<TerminalType, py::array::c_style> _terminals;
+  py::array_t<TruncationType, py::array::c_style> _truncations;
+  py::array_t<RewardType, py::array::c_style> _rewards;
+
+  std::unique_ptr<ThreadPool> _pool;
+
+  MettaGrid* _check_env(const py::object& env) const;
+  void _attach(size_t env_idx);
+};
+
+void bind_mettagrid_batch(py::module& m);
+
+#endif  // METTAGRID_BATCH_HPP_
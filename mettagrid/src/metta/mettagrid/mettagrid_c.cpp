@@ -21,6 +21,7 @@
 #include "event.hpp"
 #include "grid.hpp"
 #include "hash.hpp"
+#include "mettagrid_batch.hpp"
 #include "objects/agent.hpp"
 #include "objects/constants.hpp"
 #include "objects/converter.hpp"
@@ -28,15 +29,66 @@
 #include "objects/wall.hpp"
 #include "observation_encoder.hpp"
 #include "packed_coordinate.hpp"
+#include "replay_recorder.hpp"
 #include "stats_tracker.hpp"
 #include "types.hpp"
 
 namespace py = pybind11;
 
-// Static member definition for ActionHandler
-std::map<size_t, std::string> ActionHandler::_global_last_actions;
+namespace {
+
+// Encodes a list of lists of object names, giving each distinct name a symbol id in order of first appearance.
+EncodedMap encode_map(const py::list& map) {
+  EncodedMap encoded;
+  encoded.height = static_cast<GridCoord>(py::len(map));
+  encoded.width = static_cast<GridCoord>(py::len(map[0]));
+  encoded.cells.reserve(static_cast<size_t>(encoded.height) * encoded.width);
+
+  std::map<std::string, uint16_t> symbol_ids;
+  for (GridCoord r = 0; r < encoded.height; r++) {
+    auto row = map[r].cast<py::list>();
+    for (GridCoord c = 0; c < encoded.width; c++) {
+      auto cell = row[c].cast<std::string>();
+      auto [it, inserted] = symbol_ids.try_emplace(cell, static_cast<uint16_t>(encoded.symbols.size()));
+      if (inserted) {
+        encoded.symbols.push_back(cell);
+      }
+      encoded.cells.push_back(it->second);
+    }
+  }
+  return encoded;
+}
+
+EncodedMap encode_map(const py::array_t<uint16_t, py::array::c_style | py::array::forcecast>& map,
+                      std::vector<std::string> symbols) {
+  if (map.ndim() != 2) {
+    throw std::runtime_error("Map must be a 2D array of symbol ids");
+  }
+  EncodedMap encoded;
+  encoded.height = static_cast<GridCoord>(map.shape(0));
+  encoded.width = static_cast<GridCoord>(map.shape(1));
+  encoded.cells.assign(map.data(), map.data() + map.size());
+  encoded.symbols = std::move(symbols);
+  for (uint16_t id : encoded.cells) {
+    if (id >= encoded.symbols.size()) {
+      throw std::runtime_error("Map symbol id " + std::to_string(id) + " has no entry in the symbol table");
+    }
+  }
+  return encoded;
+}
+
+}  // namespace
 
 MettaGrid::MettaGrid(const GameConfig& cfg, const py::list map, unsigned int seed)
+    : MettaGrid(cfg, encode_map(map), seed) {}
+
+MettaGrid::MettaGrid(const GameConfig& cfg,
+                     py::array_t<uint16_t, py::array::c_style | py::array::forcecast> map,
+                     std::vector<std::string> symbols,
+                     unsigned int seed)
+    : MettaGrid(cfg, encode_map(map, std::move(symbols)), seed) {}
+
+MettaGrid::MettaGrid(const GameConfig& cfg, const EncodedMap& map, unsigned int seed)
     : obs_width(cfg.obs_width),
       obs_height(cfg.obs_height),
       max_steps(cfg.max_steps),
@@ -44,11 +96,12 @@ MettaGrid::MettaGrid(const GameConfig& cfg, const py::list map, unsigned int see
       inventory_item_names(cfg.inventory_item_names),
       _num_observation_tokens(cfg.num_observation_tokens),
       _global_obs_config(cfg.global_obs),
-      _track_movement_metrics(cfg.track_movement_metrics) {
+      _track_movement_metrics(cfg.track_movement_metrics),
+      _incremental_obs(cfg.incremental_obs) {
   _seed = seed;
   _rng = std::mt19937(seed);
 
-  // `map` is a list of lists of strings, which are the map cells.
+  // `map` holds a symbol id per cell; `map.symbols` gives the object name for each id.
 
   unsigned int num_agents = cfg.num_agents;
 
@@ -61,10 +114,11 @@ MettaGrid::MettaGrid(const GameConfig& cfg, const py::list map, unsigned int see
                              std::to_string(obs_height) + ") exceeds maximum packable size");
   }
 
-  GridCoord height = static_cast<GridCoord>(py::len(map));
-  GridCoord width = static_cast<GridCoord>(py::len(map[0]));
+  GridCoord height = map.height;
+  GridCoord width = map.width;
 
   _grid = std::make_unique<Grid>(height, width);
+  _grid->track_dirty_cells = _incremental_obs;
   _obs_encoder = std::make_unique<ObservationEncoder>(inventory_item_names, cfg.recipe_details_obs);
   _feature_normalizations = _obs_encoder->feature_normalizations();
 
@@ -78,6 +132,10 @@ MettaGrid::MettaGrid(const GameConfig& cfg, const py::list map, unsigned int see
   _event_manager->event_handlers.insert({EventType::CoolDown, std::make_unique<CoolDownHandler>(_event_manager.get())});
 
   _action_success.resize(num_agents);
+  _agent_obs_locations.resize(num_agents);
+  _agent_tokens_written.resize(num_agents);
+  _agent_tokens_attempted.resize(num_agents);
+  _agent_obs_stale.resize(num_agents);
 
   for (const auto& [action_name, action_config] : cfg.actions) {
     std::string action_name_str = action_name;
@@ -144,25 +202,34 @@ MettaGrid::MettaGrid(const GameConfig& cfg, const py::list map, unsigned int see
   std::string grid_hash_data;                                        // String to accumulate grid data for hashing
   grid_hash_data.reserve(static_cast<size_t>(height * width * 20));  // Pre-allocate for efficiency
 
+  // Object configs are looked up once per symbol, the first time a cell uses it. nullptr means an empty cell.
+  std::vector<const GridObjectConfig*> symbol_cfgs(map.symbols.size(), nullptr);
+  std::vector<bool> symbol_resolved(map.symbols.size(), false);
+
   for (GridCoord r = 0; r < height; r++) {
     for (GridCoord c = 0; c < width; c++) {
-      auto py_cell = map[r].cast<py::list>()[c].cast<py::str>();
-      auto cell = py_cell.cast<std::string>();
+      uint16_t symbol = map.cells[static_cast<size_t>(r) * width + c];
+      const std::string& cell = map.symbols[symbol];
 
       // Add cell position and type to hash data
       grid_hash_data += std::to_string(r) + "," + std::to_string(c) + ":" + cell + ";";
 
-      // #HardCodedConfig
-      if (cell == "empty" || cell == "." || cell == " ") {
-        continue;
+      if (!symbol_resolved[symbol]) {
+        symbol_resolved[symbol] = true;
+        // #HardCodedConfig
+        if (cell != "empty" && cell != "." && cell != " ") {
+          if (!cfg.objects.contains(cell)) {
+            throw std::runtime_error("Unknown object type: " + cell);
+          }
+          symbol_cfgs[symbol] = cfg.objects.at(cell).get();
+        }
       }
 
-      if (!cfg.objects.contains(cell)) {
-        throw std::runtime_error("Unknown object type: " + cell);
+      const GridObjectConfig* object_cfg = symbol_cfgs[symbol];
+      if (object_cfg == nullptr) {
+        continue;
       }
 
-      const GridObjectConfig* object_cfg = cfg.objects.at(cell).get();
-
       // TODO: replace the dynamic casts with virtual dispatch
 
       const WallConfig* wall_config = dynamic_cast<const WallConfig*>(object_cfg);
@@ -257,7 +324,7 @@ void MettaGrid::init_action_handlers() {
 
   for (size_t i = 0; i < _action_handlers.size(); i++) {
     auto& handler = _action_handlers[i];
-    handler->init(_grid.get());
+    handler->init(_grid.get(), &_last_action_names);
     if (handler->priority > _max_action_priority) {
       _max_action_priority = handler->priority;
     }
@@ -273,37 +340,10 @@ void MettaGrid::add_agent(Agent* agent) {
   _agents.push_back(agent);
 }
 
-void MettaGrid::_compute_observation(GridCoord observer_row,
-                                     GridCoord observer_col,
-                                     ObservationCoord observable_width,
-                                     ObservationCoord observable_height,
-                                     size_t agent_idx,
-                                     ActionType action,
-                                     ActionArg action_arg) {
-  // Calculate observation boundaries
-  ObservationCoord obs_width_radius = observable_width >> 1;
-  ObservationCoord obs_height_radius = observable_height >> 1;
-
-  int r_start = std::max(static_cast<int>(observer_row) - static_cast<int>(obs_height_radius), 0);
-  int c_start = std::max(static_cast<int>(observer_col) - static_cast<int>(obs_width_radius), 0);
-
-  int r_end = std::min(static_cast<int>(observer_row) + static_cast<int>(obs_height_radius) + 1,
-                       static_cast<int>(_grid->height));
-  int c_end =
-      std::min(static_cast<int>(observer_col) + static_cast<int>(obs_width_radius) + 1, static_cast<int>(_grid->width));
-
-  // Fill in visible objects. Observations should have been cleared in _step, so
-  // we don't need to do that here.
-  size_t attempted_tokens_written = 0;
-  size_t tokens_written = 0;
-  auto observation_view = _observations.mutable_unchecked<3>();
-  auto rewards_view = _rewards.unchecked<1>();
-
-  // Global tokens
-  ObservationToken* agent_obs_ptr = reinterpret_cast<ObservationToken*>(observation_view.mutable_data(agent_idx, 0, 0));
-  ObservationTokens agent_obs_tokens(
-      agent_obs_ptr, static_cast<size_t>(observation_view.shape(1)) - static_cast<size_t>(tokens_written));
-
+size_t MettaGrid::_write_global_tokens(ObservationTokens tokens,
+                                      size_t agent_idx,
+                                      ActionType action,
+                                      ActionArg action_arg) {
   // Build global tokens based on configuration
   std::vector<PartialObservationToken> global_tokens;
 
@@ -322,7 +362,7 @@ void MettaGrid::_compute_observation(GridCoord observer_row,
   }
 
   if (_global_obs_config.last_reward) {
-    ObservationType reward_int = static_cast<ObservationType>(std::round(rewards_view(agent_idx) * 100.0f));
+    ObservationType reward_int = static_cast<ObservationType>(std::round(_rewards_data[agent_idx] * 100.0f));
     global_tokens.push_back({ObservationFeature::LastReward, reward_int});
   }
 
@@ -332,12 +372,42 @@ void MettaGrid::_compute_observation(GridCoord observer_row,
   }
 
   // Global tokens are always at the center of the observation.
-  uint8_t global_location =
-      PackedCoordinate::pack(static_cast<uint8_t>(obs_height_radius), static_cast<uint8_t>(obs_width_radius));
+  uint8_t global_location = PackedCoordinate::pack(static_cast<uint8_t>(obs_height >> 1),
+                                                   static_cast<uint8_t>(obs_width >> 1));
 
-  attempted_tokens_written +=
-      _obs_encoder->append_tokens_if_room_available(agent_obs_tokens, global_tokens, global_location);
-  tokens_written = std::min(attempted_tokens_written, static_cast<size_t>(observation_view.shape(1)));
+  return _obs_encoder->append_tokens_if_room_available(tokens, global_tokens, global_location);
+}
+
+void MettaGrid::_compute_observation(GridCoord observer_row,
+                                     GridCoord observer_col,
+                                     ObservationCoord observable_width,
+                                     ObservationCoord observable_height,
+                                     size_t agent_idx,
+                                     ActionType action,
+                                     ActionArg action_arg) {
+  // Calculate observation boundaries
+  ObservationCoord obs_width_radius = observable_width >> 1;
+  ObservationCoord obs_height_radius = observable_height >> 1;
+
+  int r_start = std::max(static_cast<int>(observer_row) - static_cast<int>(obs_height_radius), 0);
+  int c_start = std::max(static_cast<int>(observer_col) - static_cast<int>(obs_width_radius), 0);
+
+  int r_end = std::min(static_cast<int>(observer_row) + static_cast<int>(obs_height_radius) + 1,
+                       static_cast<int>(_grid->height));
+  int c_end =
+      std::min(static_cast<int>(observer_col) + static_cast<int>(obs_width_radius) + 1, static_cast<int>(_grid->width));
+
+  // Fill in visible objects. Observations should have been cleared in _step, so
+  // we don't need to do that here.
+  size_t attempted_tokens_written = 0;
+  size_t tokens_written = 0;
+  const size_t num_tokens = _observation_buffer_tokens;
+  ObservationType* agent_obs_data = _observations_data + agent_idx * num_tokens * 3;
+
+  // Global tokens
+  ObservationTokens agent_obs_tokens(reinterpret_cast<ObservationToken*>(agent_obs_data), num_tokens);
+  attempted_tokens_written += _write_global_tokens(agent_obs_tokens, agent_idx, action, action_arg);
+  tokens_written = std::min(attempted_tokens_written, num_tokens);
 
   // Process locations in increasing manhattan distance order
   for (const auto& [r_offset, c_offset] : PackedCoordinate::ObservationPattern{observable_height, observable_width}) {
@@ -356,10 +426,8 @@ void MettaGrid::_compute_observation(GridCoord observer_row,
       if (!obj) continue;
 
       // Prepare observation buffer for this object
-      ObservationToken* obs_ptr =
-          reinterpret_cast<ObservationToken*>(observation_view.mutable_data(agent_idx, tokens_written, 0));
-      ObservationTokens obs_tokens(
-          obs_ptr, static_cast<size_t>(observation_view.shape(1)) - static_cast<size_t>(tokens_written));
+      ObservationToken* obs_ptr = reinterpret_cast<ObservationToken*>(agent_obs_data + tokens_written * 3);
+      ObservationTokens obs_tokens(obs_ptr, num_tokens - tokens_written);
 
       // Calculate position within the observation window (agent is at the center)
       int obs_r = r - static_cast<int>(observer_row) + static_cast<int>(obs_height_radius);
@@ -368,25 +436,104 @@ void MettaGrid::_compute_observation(GridCoord observer_row,
       // Encode location and add tokens
       uint8_t location = PackedCoordinate::pack(static_cast<uint8_t>(obs_r), static_cast<uint8_t>(obs_c));
       attempted_tokens_written += _obs_encoder->encode_tokens(obj, obs_tokens, location);
-      tokens_written = std::min(attempted_tokens_written, static_cast<size_t>(observation_view.shape(1)));
+      tokens_written = std::min(attempted_tokens_written, num_tokens);
     }
   }
 
-  _stats->add("tokens_written", static_cast<float>(tokens_written));
-  _stats->add("tokens_dropped", static_cast<float>(attempted_tokens_written - tokens_written));
-  _stats->add("tokens_free_space",
-              static_cast<float>(static_cast<size_t>(observation_view.shape(1)) - static_cast<size_t>(tokens_written)));
+  _agent_tokens_written[agent_idx] = tokens_written;
+  _agent_tokens_attempted[agent_idx] = attempted_tokens_written;
+  _agent_obs_locations[agent_idx] = GridLocation(observer_row, observer_col);
 }
 
-void MettaGrid::_compute_observations(const py::array_t<ActionType, py::array::c_style> actions) {
-  auto actions_view = actions.unchecked<2>();
-  // auto observation_view = _observations.mutable_unchecked<3>();
+void MettaGrid::_mark_stale_observations() {
+  std::fill(_agent_obs_stale.begin(), _agent_obs_stale.end(), !_obs_cache_valid);
 
+  // Objects whose features changed in place (inventory, orientation, converter state, ...) dirty their cell.
+  // Diffing once per object replaces re-encoding every object once per agent that can see it.
+  _object_obs_features.resize(_grid->objects.size());
+  for (size_t obj_id = 1; obj_id < _grid->objects.size(); obj_id++) {
+    const GridObject* obj = _grid->object(static_cast<GridObjectId>(obj_id));
+    if (!obj || (_obs_cache_valid && obj->has_static_obs_features())) continue;
+
+    auto features = obj->obs_features();
+    auto& cached = _object_obs_features[obj_id];
+    bool changed = features.size() != cached.size() ||
+                   !std::equal(features.begin(),
+                               features.end(),
+                               cached.begin(),
+                               [](const PartialObservationToken& a, const PartialObservationToken& b) {
+                                 return a.feature_id == b.feature_id && a.value == b.value;
+                               });
+    if (changed) {
+      cached = std::move(features);
+      _grid->mark_dirty(obj->location);
+    }
+  }
+
+  if (!_obs_cache_valid) {
+    _grid->dirty_cells.clear();
+    return;
+  }
+
+  // Agents that moved see a shifted window.
+  for (size_t idx = 0; idx < _agents.size(); idx++) {
+    const auto& location = _agents[idx]->location;
+    if (location.r != _agent_obs_locations[idx].r || location.c != _agent_obs_locations[idx].c) {
+      _agent_obs_stale[idx] = true;
+    }
+  }
+
+  // Windows are symmetric, so the agents that can see a dirty cell are the ones within a window of it.
+  const int height_radius = obs_height >> 1;
+  const int width_radius = obs_width >> 1;
+  for (const auto& [dirty_r, dirty_c] : _grid->dirty_cells) {
+    int r_start = std::max(static_cast<int>(dirty_r) - height_radius, 0);
+    int r_end = std::min(static_cast<int>(dirty_r) + height_radius + 1, static_cast<int>(_grid->height));
+    int c_start = std::max(static_cast<int>(dirty_c) - width_radius, 0);
+    int c_end = std::min(static_cast<int>(dirty_c) + width_radius + 1, static_cast<int>(_grid->width));
+    for (int r = r_start; r < r_end; r++) {
+      for (int c = c_start; c < c_end; c++) {
+        auto obj = _grid->object_at(
+            GridLocation(static_cast<GridCoord>(r), static_cast<GridCoord>(c), GridLayer::AgentLayer));
+        if (obj) {
+          _agent_obs_stale[static_cast<Agent*>(obj)->agent_id] = true;
+        }
+      }
+    }
+  }
+  _grid->dirty_cells.clear();
+}
+
+void MettaGrid::_compute_observations(const ActionType* actions) {
+  if (_incremental_obs) {
+    _mark_stale_observations();
+  }
+
+  const size_t num_tokens = _observation_buffer_tokens;
   for (size_t idx = 0; idx < _agents.size(); idx++) {
     auto& agent = _agents[idx];
-    _compute_observation(
-        agent->location.r, agent->location.c, obs_width, obs_height, idx, actions_view(idx, 0), actions_view(idx, 1));
+    ObservationType* agent_obs_data = _observations_data + idx * num_tokens * 3;
+
+    if (_incremental_obs && !_agent_obs_stale[idx]) {
+      // Nothing in view changed, so only the global tokens at the front of the observation need refreshing.
+      ObservationTokens agent_obs_tokens(reinterpret_cast<ObservationToken*>(agent_obs_data), num_tokens);
+      _write_global_tokens(agent_obs_tokens, idx, actions[idx * 2], actions[idx * 2 + 1]);
+    } else {
+      if (_incremental_obs) {
+        // Observations aren't cleared wholesale in incremental mode
+        std::fill(agent_obs_data, agent_obs_data + num_tokens * 3, EmptyTokenByte);
+      }
+      _compute_observation(
+          agent->location.r, agent->location.c, obs_width, obs_height, idx, actions[idx * 2], actions[idx * 2 + 1]);
+    }
+
+    size_t tokens_written = _agent_tokens_written[idx];
+    _stats->add("tokens_written", static_cast<float>(tokens_written));
+    _stats->add("tokens_dropped", static_cast<float>(_agent_tokens_attempted[idx] - tokens_written));
+    _stats->add("tokens_free_space", static_cast<float>(num_tokens - tokens_written));
   }
+
+  _obs_cache_valid = _incremental_obs;
 }
 
 void MettaGrid::_handle_invalid_action(size_t agent_idx, const std::string& stat, ActionType type, ActionArg arg) {
@@ -397,18 +544,14 @@ void MettaGrid::_handle_invalid_action(size_t agent_idx, const std::string& stat
   *agent->reward -= agent->action_failure_penalty;
 }
 
-void MettaGrid::_step(py::array_t<ActionType, py::array::c_style> actions) {
-  auto actions_view = actions.unchecked<2>();
-
-  // Reset rewards and observations
-  auto rewards_view = _rewards.mutable_unchecked<1>();
+void MettaGrid::_step(const ActionType* actions) {
+  const size_t num_agents = _agents.size();
 
-  std::fill(
-      static_cast<float*>(_rewards.request().ptr), static_cast<float*>(_rewards.request().ptr) + _rewards.size(), 0);
-
-  auto obs_ptr = static_cast<ObservationType*>(_observations.request().ptr);
-  auto obs_size = _observations.size();
-  std::fill(obs_ptr, obs_ptr + obs_size, EmptyTokenByte);
+  // Reset rewards and observations. Incremental observation encoding clears only the agents it re-encodes.
+  std::fill(_rewards_data, _rewards_data + num_agents, 0.0f);
+  if (!_incremental_obs) {
+    std::fill(_observations_data, _observations_data + num_agents * _observation_buffer_tokens * 3, EmptyTokenByte);
+  }
 
   std::fill(_action_success.begin(), _action_success.end(), false);
 
@@ -426,8 +569,8 @@ void MettaGrid::_step(py::array_t<ActionType, py::array::c_style> actions) {
     unsigned char current_priority = _max_action_priority - offset;
 
     for (const auto& agent_idx : agent_indices) {
-      ActionType action = actions_view(agent_idx, 0);
-      ActionArg arg = actions_view(agent_idx, 1);
+      ActionType action = actions[agent_idx * 2];
+      ActionArg arg = actions[agent_idx * 2 + 1];
 
       if (action < 0 || static_cast<size_t>(action) >= _num_action_handlers) {
         _handle_invalid_action(agent_idx, "action.invalid_type", action, arg);
@@ -462,21 +605,16 @@ void MettaGrid::_step(py::array_t<ActionType, py::array::c_style> actions) {
   }
 
   // Update episode rewards
-  auto episode_rewards_view = _episode_rewards.mutable_unchecked<1>();
-  for (py::ssize_t i = 0; i < rewards_view.shape(0); i++) {
-    episode_rewards_view(i) += rewards_view(i);
+  for (size_t i = 0; i < num_agents; i++) {
+    _episode_rewards_data[i] += _rewards_data[i];
   }
 
   // Check for truncation
   if (max_steps > 0 && current_step >= max_steps) {
     if (episode_truncates) {
-      std::fill(static_cast<bool*>(_truncations.request().ptr),
-                static_cast<bool*>(_truncations.request().ptr) + _truncations.size(),
-                1);
+      std::fill(_truncations_data, _truncations_data + num_agents, true);
     } else {
-      std::fill(static_cast<bool*>(_terminals.request().ptr),
-                static_cast<bool*>(_terminals.request().ptr) + _terminals.size(),
-                1);
+      std::fill(_terminals_data, _terminals_data + num_agents, true);
     }
   }
 }
@@ -487,7 +625,7 @@ py::tuple MettaGrid::reset() {
   }
 
   // Clear action tracking from previous episodes
-  ActionHandler::clear_all_tracking();
+  _last_action_names.clear();
   for (auto& handler : _action_handlers) {
     handler->clear_tracking();
   }
@@ -496,31 +634,22 @@ py::tuple MettaGrid::reset() {
   // Views are created only for validating types; actual clearing is done via
   // direct memory operations for speed.
 
-  std::fill(static_cast<bool*>(_terminals.request().ptr),
-            static_cast<bool*>(_terminals.request().ptr) + _terminals.size(),
-            0);
-  std::fill(static_cast<bool*>(_truncations.request().ptr),
-            static_cast<bool*>(_truncations.request().ptr) + _truncations.size(),
-            0);
-  std::fill(static_cast<float*>(_episode_rewards.request().ptr),
-            static_cast<float*>(_episode_rewards.request().ptr) + _episode_rewards.size(),
-            0.0f);
-  std::fill(
-      static_cast<float*>(_rewards.request().ptr), static_cast<float*>(_rewards.request().ptr) + _rewards.size(), 0.0f);
+  const size_t num_agents = _agents.size();
+  std::fill(_terminals_data, _terminals_data + num_agents, false);
+  std::fill(_truncations_data, _truncations_data + num_agents, false);
+  std::fill(_episode_rewards_data, _episode_rewards_data + num_agents, 0.0f);
+  std::fill(_rewards_data, _rewards_data + num_agents, 0.0f);
 
   // Clear observations
-  auto obs_ptr = static_cast<uint8_t*>(_observations.request().ptr);
-  auto obs_size = _observations.size();
-  std::fill(obs_ptr, obs_ptr + obs_size, EmptyTokenByte);
+  std::fill(_observations_data, _observations_data + num_agents * _observation_buffer_tokens * 3, EmptyTokenByte);
+  _obs_cache_valid = false;
 
   // Compute initial observations
-  std::vector<ssize_t> shape = {static_cast<ssize_t>(_agents.size()), static_cast<ssize_t>(2)};
-  auto zero_actions = py::array_t<ActionType, py::array::c_style>(shape);
-  std::fill(static_cast<ActionType*>(zero_actions.request().ptr),
-            static_cast<ActionType*>(zero_actions.request().ptr) + zero_actions.size(),
-            static_cast<ActionType>(0));
-
-  _compute_observations(zero_actions);
+  std::vector<ActionType> zero_actions(num_agents * 2, 0);
+  {
+    py::gil_scoped_release release;
+    _compute_observations(zero_actions.data());
+  }
 
   return py::make_tuple(_observations, py::dict());
 }
@@ -575,33 +704,62 @@ void MettaGrid::set_buffers(const py::array_t<uint8_t, py::array::c_style>& obse
   _terminals = terminals;
   _truncations = truncations;
   _rewards = rewards;
-  _episode_rewards = py::array_t<float, py::array::c_style>({static_cast<ssize_t>(_rewards.shape(0))}, {sizeof(float)});
-  for (size_t i = 0; i < _agents.size(); i++) {
-    _agents[i]->init(&_rewards.mutable_unchecked<1>()(i));
+  // Episode rewards belong to the environment rather than the caller, so keep them across buffer swaps.
+  if (_episode_rewards.size() != _rewards.shape(0)) {
+    _episode_rewards =
+        py::array_t<float, py::array::c_style>({static_cast<ssize_t>(_rewards.shape(0))}, {sizeof(float)});
+    std::fill(_episode_rewards.mutable_data(), _episode_rewards.mutable_data() + _episode_rewards.size(), 0.0f);
   }
-
   validate_buffers();
+
+  _observations_data = _observations.mutable_data();
+  _terminals_data = _terminals.mutable_data();
+  _truncations_data = _truncations.mutable_data();
+  _rewards_data = _rewards.mutable_data();
+  _episode_rewards_data = _episode_rewards.mutable_data();
+  _observation_buffer_tokens = static_cast<size_t>(_observations.shape(1));
+  _obs_cache_valid = false;
+  for (size_t i = 0; i < _agents.size(); i++) {
+    _agents[i]->init(&_rewards_data[i]);
+  }
 }
 
 py::tuple MettaGrid::step(const py::array_t<ActionType, py::array::c_style> actions) {
-  _step(actions);
+  if (actions.ndim() != 2 || actions.shape(0) != static_cast<ssize_t>(_agents.size()) || actions.shape(1) != 2) {
+    throw std::runtime_error("actions must have shape [" + std::to_string(_agents.size()) + ", 2]");
+  }
 
-  auto rewards_view = _rewards.mutable_unchecked<1>();
+  // The step loop only touches the raw buffers validated in set_buffers(), so other Python threads (e.g. ones stepping
+  // other environments) can run in the meantime.
+  const ActionType* actions_data = actions.data();
+  {
+    py::gil_scoped_release release;
+    step_raw(actions_data);
+  }
+
+  return py::make_tuple(_observations, _rewards, _terminals, _truncations, py::dict());
+}
 
+void MettaGrid::step_raw(const ActionType* actions) {
+  _step(actions);
+  _share_group_rewards();
+}
+
+void MettaGrid::_share_group_rewards() {
   // Clear group rewards from previous step
   std::fill(_group_rewards.begin(), _group_rewards.end(), 0.0f);
 
   bool share_rewards = false;
 
   for (size_t agent_idx = 0; agent_idx < _agents.size(); agent_idx++) {
-    if (rewards_view(agent_idx) != 0.0f) {
+    if (_rewards_data[agent_idx] != 0.0f) {
       share_rewards = true;
       auto& agent = _agents[agent_idx];
       auto group_id = agent->group;
 
-      RewardType agent_reward = rewards_view(agent_idx);
+      RewardType agent_reward = _rewards_data[agent_idx];
       RewardType group_reward = agent_reward * _group_reward_pct[group_id];
-      rewards_view(agent_idx) = agent_reward - group_reward;
+      _rewards_data[agent_idx] = agent_reward - group_reward;
 
       _group_rewards[group_id] += group_reward / static_cast<RewardType>(_group_sizes[group_id]);
     }
@@ -611,11 +769,60 @@ py::tuple MettaGrid::step(const py::array_t<ActionType, py::array::c_style> acti
     for (size_t agent_idx = 0; agent_idx < _agents.size(); agent_idx++) {
       auto& agent = _agents[agent_idx];
       size_t group_id = static_cast<size_t>(agent->group);
-      rewards_view(agent_idx) += _group_rewards[group_id];
+      _rewards_data[agent_idx] += _group_rewards[group_id];
     }
   }
+}
 
-  return py::make_tuple(_observations, _rewards, _terminals, _truncations, py::dict());
+py::array_t<GridObjectId> MettaGrid::grid_ids() {
+  const auto row_stride = static_cast<ssize_t>(_grid->width * GridLayer::GridLayerCount * sizeof(GridObjectId));
+  const auto col_stride = static_cast<ssize_t>(GridLayer::GridLayerCount * sizeof(GridObjectId));
+  // The Python wrapper of this env is the view's base, so the grid outlives every view handed out.
+  py::array_t<GridObjectId> ids({static_cast<ssize_t>(_grid->height),
+                                 static_cast<ssize_t>(_grid->width),
+                                 static_cast<ssize_t>(GridLayer::GridLayerCount)},
+                                {row_stride, col_stride, static_cast<ssize_t>(sizeof(GridObjectId))},
+                                _grid->id_data(),
+                                py::cast(this, py::return_value_policy::reference));
+  py::detail::array_proxy(ids.ptr())->flags &= ~py::detail::npy_api::NPY_ARRAY_WRITEABLE_;
+  return ids;
+}
+
+void MettaGrid::start_replay_recording() {
+  _replay_recorder =
+      std::make_unique<ReplayRecorder>(_grid.get(), _obs_encoder->feature_names(), inventory_item_names.size());
+}
+
+void MettaGrid::record_replay_step() {
+  if (!_replay_recorder) {
+    throw std::runtime_error("Call start_replay_recording() before record_replay_step()");
+  }
+  _replay_recorder->record();
+}
+
+py::list MettaGrid::replay_keys() {
+  if (!_replay_recorder) {
+    throw std::runtime_error("Replay recording has not been started");
+  }
+  py::list keys;
+  for (const auto& key : _replay_recorder->keys()) {
+    keys.append(py::make_tuple(key.name, key.item, static_cast<int>(key.kind)));
+  }
+  return keys;
+}
+
+py::dict MettaGrid::replay_deltas() {
+  if (!_replay_recorder) {
+    throw std::runtime_error("Replay recording has not been started");
+  }
+  py::dict deltas;
+  deltas["step"] = py::array_t<uint32_t>(_replay_recorder->steps().size(), _replay_recorder->steps().data());
+  deltas["object_id"] =
+      py::array_t<uint32_t>(_replay_recorder->object_ids().size(), _replay_recorder->object_ids().data());
+  deltas["key"] = py::array_t<uint16_t>(_replay_recorder->key_ids().size(), _replay_recorder->key_ids().data());
+  deltas["value"] = py::array_t<int32_t>(_replay_recorder->values().size(), _replay_recorder->values().data());
+  deltas["num_steps"] = _replay_recorder->num_steps();
+  return deltas;
 }
 
 py::dict MettaGrid::grid_objects() {
@@ -861,6 +1068,14 @@ PYBIND11_MODULE(mettagrid_c, m) {
   // MettaGrid class bindings
   py::class_<MettaGrid>(m, "MettaGrid")
       .def(py::init<const GameConfig&, const py::list&, unsigned int>())
+      .def(py::init<const GameConfig&,
+                    py::array_t<uint16_t, py::array::c_style | py::array::forcecast>,
+                    std::vector<std::string>,
+                    unsigned int>(),
+           py::arg("env_cfg"),
+           py::arg("map"),
+           py::arg("symbols"),
+           py::arg("seed"))
       .def("reset", &MettaGrid::reset)
       .def("step", &MettaGrid::step, py::arg("actions").noconvert())
       .def("set_buffers",
@@ -870,6 +1085,11 @@ PYBIND11_MODULE(mettagrid_c, m) {
            py::arg("truncations").noconvert(),
            py::arg("rewards").noconvert())
       .def("grid_objects", &MettaGrid::grid_objects)
+      .def("grid_ids", &MettaGrid::grid_ids)
+      .def("start_replay_recording", &MettaGrid::start_replay_recording)
+      .def("record_replay_step", &MettaGrid::record_replay_step)
+      .def("replay_keys", &MettaGrid::replay_keys)
+      .def("replay_deltas", &MettaGrid::replay_deltas)
       .def("action_names", &MettaGrid::action_names)
       .def_property_readonly("map_width", &MettaGrid::map_width)
       .def_property_readonly("map_height", &MettaGrid::map_height)
@@ -890,6 +1110,8 @@ PYBIND11_MODULE(mettagrid_c, m) {
       .def("inventory_item_names", &MettaGrid::inventory_item_names_py)
       .def_readonly("initial_grid_hash", &MettaGrid::initial_grid_hash);
 
+  bind_mettagrid_batch(m);
+
   // Expose this so we can cast python WallConfig / AgentConfig / ConverterConfig to a common GridConfig cpp object.
   py::class_<GridObjectConfig, std::shared_ptr<GridObjectConfig>>(m, "GridObjectConfig");
 
@@ -1028,6 +1250,7 @@ PYBIND11_MODULE(mettagrid_c, m) {
                     const std::map<std::string, std::shared_ptr<ActionConfig>>&,
                     const std::map<std::string, std::shared_ptr<GridObjectConfig>>&,
                     bool,
+                    bool,
                     bool>(),
            py::arg("num_agents"),
            py::arg("max_steps"),
@@ -1040,7 +1263,8 @@ PYBIND11_MODULE(mettagrid_c, m) {
            py::arg("actions"),
            py::arg("objects"),
            py::arg("track_movement_metrics"),
-           py::arg("recipe_details_obs") = false)
+           py::arg("recipe_details_obs") = false,
+           py::arg("incremental_obs") = false)
       .def_readwrite("num_agents", &GameConfig::num_agents)
       .def_readwrite("max_steps", &GameConfig::max_steps)
       .def_readwrite("episode_truncates", &GameConfig::episode_truncates)
@@ -1050,7 +1274,8 @@ PYBIND11_MODULE(mettagrid_c, m) {
       .def_readwrite("num_observation_tokens", &GameConfig::num_observation_tokens)
       .def_readwrite("global_obs", &GameConfig::global_obs)
       .def_readwrite("track_movement_metrics", &GameConfig::track_movement_metrics)
-      .def_readwrite("recipe_details_obs", &GameConfig::recipe_details_obs);
+      .def_readwrite("recipe_details_obs", &GameConfig::recipe_details_obs)
+      .def_readwrite("incremental_obs", &GameConfig::incremental_obs);
   // We don't expose these since they're copied on read, and this means that mutations
   // to the dictionaries don't impact the underlying cpp objects. This is confusing!
   // This can be fixed, but until we do that, we're not exposing these.
@@ -30,6 +30,7 @@ class StatsTracker;
 class ActionHandler;
 class Agent;
 class ObservationEncoder;
+class ReplayRecorder;
 class GridObject;
 
 struct GridObjectConfig;
@@ -63,11 +64,25 @@ struct GameConfig {
   std::map<std::string, std::shared_ptr<GridObjectConfig>> objects;
   bool track_movement_metrics;
   bool recipe_details_obs = false;
+  bool incremental_obs = false;
+};
+
+// A map as symbol ids, row-major, plus the object name each id stands for.
+struct EncodedMap {
+  GridCoord height;
+  GridCoord width;
+  std::vector<uint16_t> cells;
+  std::vector<std::string> symbols;
 };
 
 class METTAGRID_API MettaGrid {
 public:
   MettaGrid(const GameConfig& cfg, py::list map, unsigned int seed);
+  MettaGrid(const GameConfig& cfg,
+            py::array_t<uint16_t, py::array::c_style | py::array::forcecast> map,
+            std::vector<std::string> symbols,
+            unsigned int seed);
+  MettaGrid(const GameConfig& cfg, const EncodedMap& map, unsigned int seed);
   ~MettaGrid();
 
   ObservationCoord obs_width;
@@ -89,7 +104,19 @@ public:
                    const py::array_t<TruncationType, py::array::c_style>& truncations,
                    const py::array_t<RewardType, py::array::c_style>& rewards);
   void validate_buffers();
+  // Core of step(). Takes a pre-validated [num_agents, 2] action buffer and only touches raw memory, so callers may
+  // run it with the GIL released.
+  void step_raw(const ActionType* actions);
   py::dict grid_objects();
+  // Read-only [height, width, layers] view of the object ids on the grid (0 = empty), valid while this env lives.
+  py::array_t<GridObjectId> grid_ids();
+
+  // Replay recording. Each record_replay_step() appends the objects' changes since the previous call to columns that
+  // replay_deltas() returns; replay_keys() describes what the key ids in those columns mean.
+  void start_replay_recording();
+  void record_replay_step();
+  py::list replay_keys();
+  py::dict replay_deltas();
   py::list action_names();
 
   GridCoord map_width();
@@ -97,6 +124,9 @@ public:
   py::dict feature_normalizations();
   py::dict feature_spec();
   size_t num_agents();
+  size_t num_observation_tokens() const {
+    return _num_observation_tokens;
+  }
   py::array_t<float> get_episode_rewards();
   py::dict get_episode_stats();
   py::object action_space();
@@ -127,6 +157,7 @@ private:
 
   std::unique_ptr<ObservationEncoder> _obs_encoder;
   std::unique_ptr<StatsTracker> _stats;
+  std::unique_ptr<ReplayRecorder> _replay_recorder;
 
   size_t _num_observation_tokens;
 
@@ -142,6 +173,17 @@ private:
   py::array_t<float> _rewards;
   py::array_t<float> _episode_rewards;
 
+  // Raw views of the buffers above, cached by set_buffers() so the step loop doesn't need the GIL.
+  ObservationType* _observations_data = nullptr;
+  TerminalType* _terminals_data = nullptr;
+  TruncationType* _truncations_data = nullptr;
+  RewardType* _rewards_data = nullptr;
+  RewardType* _episode_rewards_data = nullptr;
+  size_t _observation_buffer_tokens = 0;
+
+  // Last successful action name per agent, shared by all action handlers of this environment.
+  std::map<size_t, std::string> _last_action_names;
+
   std::map<uint8_t, float> _feature_normalizations;
 
   std::vector<bool> _action_success;
@@ -152,6 +194,16 @@ private:
   // Movement tracking
   bool _track_movement_metrics;
 
+  // Incremental observation encoding: only agents whose observation window changed since the previous step are
+  // re-encoded; everyone else keeps their tokens and just gets fresh global tokens.
+  bool _incremental_obs;
+  bool _obs_cache_valid = false;  // Cleared whenever the observation buffer can't be trusted (reset, set_buffers)
+  std::vector<std::vector<PartialObservationToken>> _object_obs_features;  // Last seen features, by object id
+  std::vector<GridLocation> _agent_obs_locations;  // Where each agent was when its window was last encoded
+  std::vector<size_t> _agent_tokens_written;
+  std::vector<size_t> _agent_tokens_attempted;
+  std::vector<bool> _agent_obs_stale;
+
   void init_action_handlers();
   void add_agent(Agent* agent);
   void _compute_observation(GridCoord observer_r,
@@ -161,8 +213,11 @@ private:
                             size_t agent_idx,
                             ActionType action,
                             ActionArg action_arg);
-  void _compute_observations(py::array_t<ActionType, py::array::c_style> actions);
-  void _step(py::array_t<ActionType, py::array::c_style> actions);
+  size_t _write_global_tokens(ObservationTokens tokens, size_t agent_idx, ActionType action, ActionArg action_arg);
+  void _mark_stale_observations();
+  void _compute_observations(const ActionType* actions);
+  void _step(const ActionType* actions);
+  void _share_group_rewards();
 
   void _handle_invalid_action(size_t agent_idx, const std::string& stat, ActionType type, ActionArg arg);
   AgentConfig _create_agent_config(const py::dict& agent_group_cfg_py);
@@ -1,4 +1,4 @@
-from typing import Optional, Tuple, TypeAlias, TypedDict
+from typing import Any, Optional, Tuple, TypeAlias, TypedDict, overload
 
 import gymnasium as gym
 import numpy as np
@@ -114,6 +114,9 @@ class GameConfig:
         global_obs: GlobalObsConfig,
         actions: dict[str, ActionConfig],
         objects: dict[str, GridObjectConfig],
+        track_movement_metrics: bool,
+        recipe_details_obs: bool = False,
+        incremental_obs: bool = False,
     ): ...
     num_agents: int
     max_steps: int
@@ -123,6 +126,9 @@ class GameConfig:
     inventory_item_names: list[str]
     num_observation_tokens: int
     global_obs: GlobalObsConfig
+    track_movement_metrics: bool
+    recipe_details_obs: bool
+    incremental_obs: bool
 
 class MettaGrid:
     obs_width: int
@@ -136,13 +142,21 @@ class MettaGrid:
     observation_space: gym.spaces.Box
     initial_grid_hash: int
 
+    @overload
     def __init__(self, env_cfg: GameConfig, map: list, seed: int) -> None: ...
+    @overload
+    def __init__(self, env_cfg: GameConfig, map: np.ndarray, symbols: list[str], seed: int) -> None: ...
     def reset(self) -> Tuple[np.ndarray, dict]: ...
     def step(self, actions: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, dict]: ...
     def set_buffers(
         self, observations: np.ndarray, terminals: np.ndarray, truncations: np.ndarray, rewards: np.ndarray
     ) -> None: ...
     def grid_objects(self) -> dict[int, dict]: ...
+    def grid_ids(self) -> np.ndarray: ...
+    def start_replay_recording(self) -> None: ...
+    def record_replay_step(self) -> None: ...
+    def replay_keys(self) -> list[tuple[str, int, int]]: ...
+    def replay_deltas(self) -> dict[str, Any]: ...
     def action_names(self) -> list[str]: ...
     def get_episode_rewards(self) -> np.ndarray: ...
     def get_episode_stats(self) -> EpisodeStats: ...
@@ -152,3 +166,28 @@ class MettaGrid:
     def inventory_item_names(self) -> list[str]: ...
     def feature_normalizations(self) -> dict[int, float]: ...
     def feature_spec(self) -> dict[str, dict[str, float | int]]: ...
+
+class MettaGridBatch:
+    """Steps several MettaGrid environments with a single call, optionally across threads with the GIL released.
+
+    All environments must have the same number of agents and observation tokens. Their buffers are views into
+    contiguous batch buffers with a leading dimension of num_envs * num_agents.
+    """
+
+    num_envs: int
+    num_agents: int
+    num_threads: int
+    observations: np.ndarray
+    terminals: np.ndarray
+    truncations: np.ndarray
+    rewards: np.ndarray
+
+    def __init__(self, envs: list[MettaGrid], num_threads: int = 1) -> None: ...
+    def set_env(self, env_idx: int, env: MettaGrid) -> None: ...
+    def set_buffers(
+        self, observations: np.ndarray, terminals: np.ndarray, truncations: np.ndarray, rewards: np.ndarray
+    ) -> None: ...
+    def step(
+        self, actions: np.ndarray, active: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: ...
+    def envs(self) -> list[MettaGrid]: ...
@@ -193,6 +193,8 @@ class PyGameConfig(BaseModelWithForbidExtra):
     actions: PyActionsConfig
     global_obs: PyGlobalObsConfig = Field(default_factory=PyGlobalObsConfig)
     recipe_details_obs: bool = Field(default=False)
+    # Re-encode only the observations of agents whose view changed since the last step
+    incremental_obs: bool = Field(default=False)
     objects: dict[str, PyConverterConfig | PyWallConfig]
     # these are not used in the C++ code, but we allow them to be set for other uses.
     # E.g., templates can use params as a place where values are expected to be written,
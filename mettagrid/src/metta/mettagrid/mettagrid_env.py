@@ -5,6 +5,7 @@ import logging
 import os
 import time
 import uuid
+from contextlib import AbstractContextManager, nullcontext
 from typing import Any, Dict, Optional, cast
 
 import numpy as np
@@ -16,8 +17,11 @@ from pydantic import validate_call
 from typing_extensions import override
 
 from metta.common.profiling.stopwatch import Stopwatch, with_instance_timer
+from metta.mettagrid.coded_grid import as_coded_grid, count_agents, symbol_names
 from metta.mettagrid.curriculum.core import Curriculum
 from metta.mettagrid.level_builder import Level
+from metta.mettagrid.level_cache import LevelCache
+from metta.mettagrid.map_prefetcher import MapPrefetcher, PrefetchResult
 from metta.mettagrid.mettagrid_c import MettaGrid
 from metta.mettagrid.mettagrid_c_config import from_mettagrid_config
 from metta.mettagrid.replay_writer import ReplayWriter
@@ -68,6 +72,9 @@ class MettaGridEnv(PufferEnv, GymEnv):
         stats_writer: Optional[StatsWriter] = None,
         replay_writer: Optional[ReplayWriter] = None,
         is_training: bool = False,
+        shared_lock: Optional[AbstractContextManager] = None,
+        prefetch_maps: int = 0,
+        level_cache_dir: Optional[str] = None,
         **kwargs,
     ):
         self.timer = Stopwatch(logger)
@@ -93,6 +100,21 @@ class MettaGridEnv(PufferEnv, GymEnv):
 
         self._is_training = is_training
 
+        # The curriculum and the stats/replay writers may be shared with envs stepped on other threads (see the
+        # "thread" vectorization in metta.rl.vecenv), so all access to them goes through this lock.
+        self._shared_lock = shared_lock if shared_lock is not None else nullcontext()
+
+        # With prefetch_maps > 0, levels are built ahead of time in a background thread, keeping up to that many ready
+        # for each recent task.
+        self._map_prefetcher = MapPrefetcher(max_ready_per_task=prefetch_maps) if prefetch_maps > 0 else None
+        self._map_prefetch_result: PrefetchResult | None = None
+
+        # Levels from reproducible map builders (see LevelBuilder.cache_key) are stored in and served from an on-disk
+        # cache that all envs pointed at the same directory share.
+        level_cache_dir = level_cache_dir or os.environ.get("METTA_LEVEL_CACHE_DIR")
+        self._level_cache = LevelCache(level_cache_dir) if level_cache_dir else None
+        self._level_cache_hit: bool | None = None
+
         self._initialize_c_env()
         super().__init__(buf)
 
@@ -133,11 +155,21 @@ class MettaGridEnv(PufferEnv, GymEnv):
         level = self._level
 
         if level is None:
+            map_builder = task_cfg.game.map_builder
             with self.timer("_initialize_c_env.build_map"):
-                level = task_cfg.game.map_builder.build()
+                if self._level_cache is not None and (cache_key := map_builder.cache_key()) is not None:
+                    level, self._level_cache_hit = self._level_cache.get_or_build(cache_key, map_builder.build)
+                elif self._map_prefetcher is not None and (map_builder_key := task.map_builder_key()) is not None:
+                    # Keyed by the map builder config rather than the task name, which sampling curricula reuse for
+                    # differently configured tasks.
+                    self._map_prefetch_result = self._map_prefetcher.get(map_builder_key, map_builder)
+                    level = self._map_prefetch_result.level
+                else:
+                    level = map_builder.build()
 
         # Validate the level
-        level_agents = np.count_nonzero(np.char.startswith(level.grid, "agent"))
+        grid = as_coded_grid(level.grid)
+        level_agents = count_agents(grid)
         assert task_cfg.game.num_agents == level_agents, (
             f"Number of agents {task_cfg.game.num_agents} does not match number of agents in map {level_agents}"
         )
@@ -154,8 +186,6 @@ class MettaGridEnv(PufferEnv, GymEnv):
 
         self._map_labels = level.labels
 
-        # Convert string array to list of strings for C++ compatibility
-        # TODO: push the not-numpy-array higher up the stack, and consider pushing not-a-sparse-list lower.
         with self.timer("_initialize_c_env.make_c_env"):
             c_cfg = None
             try:
@@ -165,7 +195,7 @@ class MettaGridEnv(PufferEnv, GymEnv):
                 logger.error(f"Game config: {game_config_dict}")
                 raise e
 
-            self._c_env = MettaGrid(c_cfg, level.grid.tolist(), self._current_seed)
+            self._c_env = MettaGrid(c_cfg, grid, symbol_names(), self._current_seed)
 
         self._grid_env = self._c_env
 
@@ -174,7 +204,8 @@ class MettaGridEnv(PufferEnv, GymEnv):
     def reset(self, seed: int | None = None) -> tuple[np.ndarray, dict]:
         self.timer.stop("thread_idle")
 
-        self._task = self._curriculum.get_task()
+        with self._shared_lock:
+            self._task = self._curriculum.get_task()
 
         self._initialize_c_env()
         self._steps = 0
@@ -191,7 +222,8 @@ class MettaGridEnv(PufferEnv, GymEnv):
         self._current_seed = seed or 0
         self._reset_at = datetime.datetime.now()
         if self._replay_writer:
-            self._replay_writer.start_episode(self._episode_id, self)
+            with self._shared_lock:
+                self._replay_writer.start_episode(self._episode_id, self)
 
         obs, infos = self._c_env.reset()
         self._should_reset = False
@@ -223,10 +255,24 @@ class MettaGridEnv(PufferEnv, GymEnv):
 
         with self.timer("_c_env.step"):
             self._c_env.step(actions)
-            self._steps += 1
+
+        infos = self.finish_step(actions)
+
+        self.timer.start("thread_idle")
+        return self.observations, self.rewards, self.terminals, self.truncations, infos
+
+    def finish_step(self, actions: np.ndarray) -> dict:
+        """
+        The Python side of a step, once the C++ environment has been stepped with `actions`: replay logging, and the
+        episode stats and curriculum update when the episode ends. Called by step(), and directly by callers that step
+        the C++ environments of many envs at once (see MettaGridBatch and the "batch" vectorization).
+
+        Returns the step's infos.
+        """
+        self._steps += 1
 
         if self._replay_writer and self._episode_id:
-            with self.timer("_replay_writer.log_step"):
+            with self.timer("_replay_writer.log_step"), self._shared_lock:
                 self._replay_writer.log_step(self._episode_id, actions, self.rewards)
 
         infos = {}
@@ -239,19 +285,23 @@ class MettaGridEnv(PufferEnv, GymEnv):
             #         self._task.env_cfg().game.diversity_bonus.diversity_coef,
             #     )
 
-            self.process_episode_stats(infos)
-            self._should_reset = True
-            self._task.complete(self._c_env.get_episode_rewards().mean())
+            with self._shared_lock:
+                self.process_episode_stats(infos)
+                self._should_reset = True
+                self._task.complete(self._c_env.get_episode_rewards().mean())
 
-            # Add curriculum task probabilities to infos for distributed logging
-            infos["curriculum_task_probs"] = self._curriculum.get_task_probs()
+                # Add curriculum task probabilities to infos for distributed logging
+                infos["curriculum_task_probs"] = self._curriculum.get_task_probs()
 
-        self.timer.start("thread_idle")
-        return self.observations, self.rewards, self.terminals, self.truncations, infos
+        return infos
 
     @override
     def close(self):
-        pass
+        if self._map_prefetcher is not None:
+            self._map_prefetcher.close()
+        if self._stats_writer:
+            # Writes out any episodes still buffered.
+            self._stats_writer.close()
 
     def process_episode_stats(self, infos: Dict[str, Any]):
         self.timer.start("process_episode_stats")
@@ -371,9 +421,25 @@ class MettaGridEnv(PufferEnv, GymEnv):
                 f"task_timing/{self._task.short_name()}/init_time_msec": task_init_time_msec,
             }
         )
+        if self._level_cache_hit is not None:
+            infos[f"task_timing/{self._task.short_name()}/level_cache_hit"] = float(self._level_cache_hit)
+        prefetched = self._map_prefetch_result
+        if prefetched is not None:
+            infos.update(
+                {
+                    f"task_timing/{self._task.short_name()}/map_prefetch_hit": float(prefetched.hit),
+                    f"task_timing/{self._task.short_name()}/map_wait_msec": prefetched.wait_time * 1000,
+                    f"task_timing/{self._task.short_name()}/map_build_msec": prefetched.build_time * 1000,
+                }
+            )
 
         self._episode_id = None
 
+    @property
+    def c_env(self) -> MettaGrid:
+        """The underlying C++ environment (replaced on every reset)."""
+        return self._c_env
+
     @property
     def max_steps(self) -> int:
         return self._c_env.max_steps
@@ -484,6 +550,16 @@ class MettaGridEnv(PufferEnv, GymEnv):
         """
         return self._c_env.grid_objects()
 
+    @property
+    def grid_ids(self) -> np.ndarray:
+        """
+        Read-only [height, width, layer] view of the object id at each grid cell (0 where empty).
+
+        Unlike grid_objects this doesn't copy anything, so it's cheap to read every step. Ids are the
+        keys of grid_objects.
+        """
+        return self._c_env.grid_ids()
+
     @property
     def max_action_args(self) -> list[int]:
         """
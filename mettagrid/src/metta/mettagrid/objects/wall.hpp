@@ -40,6 +40,10 @@ public:
   bool swappable() const override {
     return this->_swappable;
   }
+
+  bool has_static_obs_features() const override {
+    return true;
+  }
 };
 
 #endif  // OBJECTS_WALL_HPP_
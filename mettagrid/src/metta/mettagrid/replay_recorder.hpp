@@ -0,0 +1,348 @@
+#ifndef REPLAY_RECORDER_HPP_
+#define REPLAY_RECORDER_HPP_
+
+#include <algorithm>
+#include <cstdint>
+#include <limits>
+#include <map>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "grid.hpp"
+#include "grid_object.hpp"
+#include "objects/agent.hpp"
+#include "objects/converter.hpp"
+#include "types.hpp"
+
+// Records how every object's replay state changes over an episode, as four flat columns (step, object id, key,
+// value) holding one entry per changed value.
+//
+// An object's replay state is the flattened form of its grid_objects() dict: one key per scalar field, and one key per
+// item for the inventory-like dicts (plus a "presence" key so an empty dict still shows up). record() diffs every
+// object against the state it recorded last and appends only what changed, so the per-step cost is proportional to
+// the number of non-static objects plus the number of changes, and no Python objects are built. The replay writer
+// decodes the columns into the usual replay format at the end of the episode.
+class ReplayRecorder {
+public:
+  // How the Python side should interpret a key's values.
+  enum KeyKind : uint8_t {
+    IntKey = 0,
+    BoolKey = 1,
+    DictKey = 2,       // Marks that the object has this dict; value is always 0
+    DictEntryKey = 3,  // One item of a dict; `item` says which
+  };
+
+  struct Key {
+    std::string name;
+    int item;
+    KeyKind kind;
+  };
+
+  // Value recorded when a key disappears from an object (or the object disappears from the grid).
+  static constexpr int32_t Absent = std::numeric_limits<int32_t>::min();
+
+  ReplayRecorder(const Grid* grid, const std::map<ObservationType, std::string>& feature_names, size_t num_items)
+      : _grid(grid), _num_items(num_items) {
+    const std::vector<std::pair<std::string, KeyKind>> scalar_keys = {{"id", IntKey},
+                                                                      {"type", IntKey},
+                                                                      {"r", IntKey},
+                                                                      {"c", IntKey},
+                                                                      {"layer", IntKey},
+                                                                      {"is_swappable", BoolKey},
+                                                                      {"orientation", IntKey},
+                                                                      {"group_id", IntKey},
+                                                                      {"is_frozen", BoolKey},
+                                                                      {"freeze_remaining", IntKey},
+                                                                      {"freeze_duration", IntKey},
+                                                                      {"color", IntKey},
+                                                                      {"agent_id", IntKey},
+                                                                      {"is_converting", BoolKey},
+                                                                      {"is_cooling_down", BoolKey},
+                                                                      {"conversion_duration", IntKey},
+                                                                      {"cooldown_duration", IntKey},
+                                                                      {"output_limit", IntKey}};
+    for (const auto& [name, kind] : scalar_keys) {
+      _keys.push_back({name, -1, kind});
+    }
+
+    for (const auto& name : {"inventory", "resource_limits", "input_resources", "output_resources"}) {
+      _keys.push_back({name, -1, DictKey});
+      for (size_t item = 0; item < num_items; item++) {
+        _keys.push_back({name, static_cast<int>(item), DictEntryKey});
+      }
+    }
+
+    _is_constant.assign(_keys.size(), false);
+    for (auto key : {IdKeyId,
+                     TypeKeyId,
+                     IsSwappableKeyId,
+                     GroupIdKeyId,
+                     FreezeDurationKeyId,
+                     AgentIdKeyId,
+                     ConversionDurationKeyId,
+                     CooldownDurationKeyId,
+                     OutputLimitKeyId}) {
+      _is_constant[key] = true;
+    }
+    // Agents' resource_limits aren't here: looking up a missing item inserts it.
+    for (auto dict : {InputResourcesDict, OutputResourcesDict}) {
+      std::fill_n(_is_constant.begin() + _dict_key(dict), num_items + 1, true);
+    }
+
+    _feature_keys.assign(std::numeric_limits<ObservationType>::max() + 1, 0);
+    for (const auto& [feature_id, name] : feature_names) {
+      _feature_keys[feature_id] = static_cast<uint16_t>(_keys.size());
+      _keys.push_back({name, -1, IntKey});
+      _is_constant.push_back(false);
+    }
+  }
+
+  const std::vector<Key>& keys() const {
+    return _keys;
+  }
+
+  // Diffs every object against its last recorded state and appends the changes for the current step.
+  void record() {
+    const size_t num_objects = _grid->objects.size();
+    if (_last_states.size() < num_objects) {
+      _last_states.resize(num_objects);
+      _constant_keys.resize(num_objects);
+      _last_locations.resize(num_objects);
+      _recorded.resize(num_objects, false);
+      _kinds.resize(num_objects, OtherObject);
+    }
+
+    for (size_t obj_id = 1; obj_id < num_objects; obj_id++) {
+      if (_kinds[obj_id] == FixedObject) continue;
+      const GridObject* obj = _grid->object(static_cast<GridObjectId>(obj_id));
+      auto& last_state = _last_states[obj_id];
+      if (!obj) {
+        for (const auto key : _constant_keys[obj_id]) {
+          _append(obj_id, key, Absent);
+        }
+        for (const auto& [key, value] : last_state) {
+          _append(obj_id, key, Absent);
+        }
+        _constant_keys[obj_id].clear();
+        last_state.clear();
+        continue;
+      }
+
+      // Walls and blocks never change features, so they only need re-checking when they move.
+      const GridLocation& location = obj->location;
+      const GridLocation& last_location = _last_locations[obj_id];
+      if (_recorded[obj_id] && obj->has_static_obs_features() && location.r == last_location.r &&
+          location.c == last_location.c && location.layer == last_location.layer) {
+        continue;
+      }
+
+      const bool first_record = !_recorded[obj_id];
+      if (first_record) {
+        _kinds[obj_id] = dynamic_cast<const Agent*>(obj)       ? AgentObject
+                         : dynamic_cast<const Converter*>(obj) ? ConverterObject
+                                                               : OtherObject;
+      }
+      _build_state(obj_id, *obj, first_record);
+      _diff(obj_id, last_state, _state);
+      if (first_record) {
+        // Constant keys are recorded once; only the rest are diffed from here on.
+        for (const auto& [key, value] : _state) {
+          if (_is_constant[key]) _constant_keys[obj_id].push_back(key);
+        }
+        _state.erase(std::remove_if(
+                         _state.begin(), _state.end(), [this](const auto& entry) { return _is_constant[entry.first]; }),
+                     _state.end());
+      }
+      last_state.swap(_state);
+      _last_locations[obj_id] = location;
+      _recorded[obj_id] = true;
+      // Nothing moves a non-swappable static object (i.e. a wall), so it never needs looking at again.
+      if (obj->has_static_obs_features() && !obj->swappable()) {
+        _kinds[obj_id] = FixedObject;
+      }
+    }
+    _step++;
+  }
+
+  uint32_t num_steps() const {
+    return _step;
+  }
+
+  const std::vector<uint32_t>& steps() const {
+    return _steps;
+  }
+  const std::vector<uint32_t>& object_ids() const {
+    return _object_ids;
+  }
+  const std::vector<uint16_t>& key_ids() const {
+    return _key_ids;
+  }
+  const std::vector<int32_t>& values() const {
+    return _values;
+  }
+
+private:
+  enum ScalarKeyId : uint16_t {
+    IdKeyId = 0,
+    TypeKeyId,
+    RKeyId,
+    CKeyId,
+    LayerKeyId,
+    IsSwappableKeyId,
+    OrientationKeyId,
+    GroupIdKeyId,
+    IsFrozenKeyId,
+    FreezeRemainingKeyId,
+    FreezeDurationKeyId,
+    ColorKeyId,
+    AgentIdKeyId,
+    IsConvertingKeyId,
+    IsCoolingDownKeyId,
+    ConversionDurationKeyId,
+    CooldownDurationKeyId,
+    OutputLimitKeyId,
+    NumScalarKeys,
+  };
+
+  enum DictId : uint16_t {
+    InventoryDict = 0,
+    ResourceLimitsDict,
+    InputResourcesDict,
+    OutputResourcesDict,
+  };
+
+  // Object classes with extra replay state, resolved once per object so record() doesn't dynamic_cast every step.
+  enum ObjectKind : uint8_t {
+    OtherObject = 0,
+    AgentObject,
+    ConverterObject,
+    FixedObject,  // Can't change; skipped after its first record
+  };
+
+  using State = std::vector<std::pair<uint16_t, int32_t>>;
+
+  const Grid* _grid;
+  size_t _num_items;
+  std::vector<Key> _keys;
+  std::vector<uint16_t> _feature_keys;  // Key id of each observation feature id
+  std::vector<bool> _is_constant;       // By key id: set from config and never changed afterwards
+
+  uint32_t _step = 0;
+  std::vector<State> _last_states;  // By object id, sorted by key id; constant keys left out
+  std::vector<std::vector<uint16_t>> _constant_keys;  // By object id, the constant keys it was recorded with
+  std::vector<GridLocation> _last_locations;
+  std::vector<bool> _recorded;
+  std::vector<ObjectKind> _kinds;
+  State _state;  // Scratch space for the state being built
+
+  std::vector<uint32_t> _steps;
+  std::vector<uint32_t> _object_ids;
+  std::vector<uint16_t> _key_ids;
+  std::vector<int32_t> _values;
+
+  uint16_t _dict_key(DictId dict) const {
+    return static_cast<uint16_t>(NumScalarKeys + dict * (_num_items + 1));
+  }
+
+  void _add_dict(DictId dict, const std::map<InventoryItem, InventoryQuantity>& items) {
+    const uint16_t dict_key = _dict_key(dict);
+    _state.emplace_back(dict_key, 0);
+    for (const auto& [item, quantity] : items) {
+      _state.emplace_back(static_cast<uint16_t>(dict_key + 1 + item), static_cast<int32_t>(quantity));
+    }
+  }
+
+  // Mirrors MettaGrid::grid_objects(); keep the two in sync. Keys are emitted in increasing key id order (scalars,
+  // then dicts, then observation features) so that only the features need sorting. Constant keys are only emitted
+  // when with_constants is set.
+  void _build_state(size_t obj_id, const GridObject& obj, bool with_constants) {
+    _state.clear();
+    if (with_constants) {
+      _state.emplace_back(IdKeyId, static_cast<int32_t>(obj_id));
+      _state.emplace_back(TypeKeyId, static_cast<int32_t>(obj.type_id));
+    }
+    _state.emplace_back(RKeyId, static_cast<int32_t>(obj.location.r));
+    _state.emplace_back(CKeyId, static_cast<int32_t>(obj.location.c));
+    _state.emplace_back(LayerKeyId, static_cast<int32_t>(obj.location.layer));
+    if (with_constants) {
+      _state.emplace_back(IsSwappableKeyId, obj.swappable() ? 1 : 0);
+    }
+
+    if (_kinds[obj_id] == AgentObject) {
+      const auto* agent = static_cast<const Agent*>(&obj);
+      _state.emplace_back(OrientationKeyId, static_cast<int32_t>(agent->orientation));
+      if (with_constants) {
+        _state.emplace_back(GroupIdKeyId, static_cast<int32_t>(agent->group));
+      }
+      _state.emplace_back(IsFrozenKeyId, agent->frozen ? 1 : 0);
+      _state.emplace_back(FreezeRemainingKeyId, static_cast<int32_t>(agent->frozen));
+      if (with_constants) {
+        _state.emplace_back(FreezeDurationKeyId, static_cast<int32_t>(agent->freeze_duration));
+      }
+      _state.emplace_back(ColorKeyId, static_cast<int32_t>(agent->color));
+      if (with_constants) {
+        _state.emplace_back(AgentIdKeyId, static_cast<int32_t>(agent->agent_id));
+      }
+      _add_dict(InventoryDict, agent->inventory);
+      _add_dict(ResourceLimitsDict, agent->resource_limits);
+    } else if (_kinds[obj_id] == ConverterObject) {
+      const auto* converter = static_cast<const Converter*>(&obj);
+      _state.emplace_back(ColorKeyId, static_cast<int32_t>(converter->color));
+      _state.emplace_back(IsConvertingKeyId, converter->converting ? 1 : 0);
+      _state.emplace_back(IsCoolingDownKeyId, converter->cooling_down ? 1 : 0);
+      if (with_constants) {
+        _state.emplace_back(ConversionDurationKeyId, static_cast<int32_t>(converter->conversion_ticks));
+        _state.emplace_back(CooldownDurationKeyId, static_cast<int32_t>(converter->cooldown));
+        _state.emplace_back(OutputLimitKeyId, static_cast<int32_t>(converter->max_output));
+      }
+      _add_dict(InventoryDict, converter->inventory);
+      if (with_constants) {
+        _add_dict(InputResourcesDict, converter->input_resources);
+        _add_dict(OutputResourcesDict, converter->output_resources);
+      }
+    }
+
+    const auto features_begin = static_cast<std::ptrdiff_t>(_state.size());
+    for (const auto& feature : obj.obs_features()) {
+      _state.emplace_back(_feature_keys[feature.feature_id], static_cast<int32_t>(feature.value));
+    }
+    auto features = _state.begin() + features_begin;
+    if (!std::is_sorted(features, _state.end(), [](const auto& a, const auto& b) { return a.first < b.first; })) {
+      std::stable_sort(features, _state.end(), [](const auto& a, const auto& b) { return a.first < b.first; });
+    }
+    // Like a dict, a later entry for the same feature wins.
+    auto last = std::unique(
+        _state.rbegin(), _state.rend() - features_begin, [](const auto& a, const auto& b) { return a.first == b.first; });
+    _state.erase(features, last.base());
+  }
+
+  void _diff(size_t obj_id, const State& before, const State& after) {
+    auto b = before.begin();
+    auto a = after.begin();
+    while (b != before.end() || a != after.end()) {
+      if (a == after.end() || (b != before.end() && b->first < a->first)) {
+        _append(obj_id, b->first, Absent);
+        ++b;
+      } else if (b == before.end() || a->first < b->first) {
+        _append(obj_id, a->first, a->second);
+        ++a;
+      } else {
+        if (a->second != b->second) {
+          _append(obj_id, a->first, a->second);
+        }
+        ++a;
+        ++b;
+      }
+    }
+  }
+
+  void _append(size_t obj_id, uint16_t key, int32_t value) {
+    _steps.push_back(_step);
+    _object_ids.push_back(static_cast<uint32_t>(obj_id));
+    _key_ids.push_back(key);
+    _values.push_back(value);
+  }
+};
+
+#endif  // REPLAY_RECORDER_HPP_
@@ -1,25 +1,36 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from omegaconf import OmegaConf
 
 if TYPE_CHECKING:
     from metta.mettagrid.mettagrid_env import MettaGridEnv
 
+import io
 import json
 import zlib
 
 import numpy as np
 
-from metta.mettagrid.util.file import http_url, write_data
+from metta.mettagrid.util.file import http_url, read, write_data
+
+# Key kinds reported by MettaGrid.replay_keys(); see ReplayRecorder::KeyKind.
+_INT_KEY, _BOOL_KEY, _DICT_KEY, _DICT_ENTRY_KEY = range(4)
+# Value the recorder uses for "this key disappeared"; see ReplayRecorder::Absent.
+_ABSENT_VALUE = np.iinfo(np.int32).min
+_ABSENT = object()
+
+_LOCATION_KEYS = ("r", "c", "layer")
 
 
 class ReplayWriter:
     """Helper class for generating and uploading replays."""
 
-    def __init__(self, replay_dir: str | None = None):
+    def __init__(self, replay_dir: str | None = None, write_binary: bool = False):
         self.replay_dir = replay_dir
+        # Also write the compact columnar form (see EpisodeReplay.write_binary_replay) next to each .json.z replay.
+        self.write_binary = write_binary
         self.episodes = {}
 
     def start_episode(self, episode_id: str, env: MettaGridEnv):
@@ -37,15 +48,32 @@ class ReplayWriter:
             raise ValueError(f"Episode {episode_id} not found")
         replay_path = f"{self.replay_dir}/{episode_id}.json.z"
         episode_replay.write_replay(replay_path)
+        if self.write_binary:
+            episode_replay.write_binary_replay(f"{self.replay_dir}/{episode_id}.replay.npz")
         return http_url(replay_path)
 
 
 class EpisodeReplay:
+    """
+    Records an episode for replay.
+
+    Object state is diffed in C++ every step (MettaGrid.record_replay_step), and per-agent actions and rewards go into
+    preallocated numpy columns, so logging a step doesn't build any per-object Python data. The columns are decoded
+    into the replay format mettascope reads (one [[step, value], ...] change list per object key) when the replay is
+    requested.
+    """
+
     def __init__(self, env: MettaGridEnv):
         self.env = env
+        self._c_env = env.c_env
+        self._c_env.start_replay_recording()
         self.step = 0
-        self.grid_objects = []
-        self.total_rewards = np.zeros(env.num_agents)
+
+        capacity = env.max_steps if env.max_steps > 0 else 1024
+        self._actions = np.zeros((capacity, env.num_agents, 2), dtype=np.int64)
+        self._action_success = np.zeros((capacity, env.num_agents), dtype=bool)
+        self._rewards = np.zeros((capacity, env.num_agents), dtype=np.float32)
+
         self.replay_data = {
             "version": 1,
             "action_names": env.action_names,
@@ -54,58 +82,52 @@ class EpisodeReplay:
             "map_size": [env.map_width, env.map_height],
             "num_agents": env.num_agents,
             "max_steps": env.max_steps,
-            "grid_objects": self.grid_objects,
+            "grid_objects": [],
         }
 
     def log_step(self, actions: np.ndarray, rewards: np.ndarray):
-        self.total_rewards += rewards
-        for i, grid_object in enumerate(self.env.grid_objects.values()):
-            update_object = grid_object.copy()
-            if len(self.grid_objects) <= i:
-                self.grid_objects.append({})
-            if "agent_id" in grid_object:
-                agent_id = update_object["agent_id"]
-                update_object["action"] = actions[agent_id].tolist()
-                update_object["action_success"] = bool(self.env.action_success[agent_id])
-                update_object["reward"] = rewards[agent_id].item()
-                update_object["total_reward"] = self.total_rewards[agent_id].item()
-            self._seq_key_merge(self.grid_objects[i], self.step, update_object)
+        if self.step == len(self._rewards):
+            self._actions = np.concatenate([self._actions, np.zeros_like(self._actions)])
+            self._action_success = np.concatenate([self._action_success, np.zeros_like(self._action_success)])
+            self._rewards = np.concatenate([self._rewards, np.zeros_like(self._rewards)])
+        self._actions[self.step] = actions
+        self._action_success[self.step] = self._c_env.action_success()
+        self._rewards[self.step] = rewards
+        self._c_env.record_replay_step()
         self.step += 1
 
-    def _seq_key_merge(self, grid_object: dict, step: int, update_object: dict):
-        """Add a sequence keys to replay grid object."""
-        for key, value in update_object.items():
-            if key not in grid_object:
-                # Add new key.
-                if step == 0:
-                    grid_object[key] = [[step, value]]
-                else:
-                    grid_object[key] = [[0, 0], [step, value]]
-            else:
-                # Only add new entry if it has changed:
-                if grid_object[key][-1][1] != value:
-                    grid_object[key].append([step, value])
-        # If key has vanished, add a zero entry.
-        for key in grid_object.keys():
-            if key not in update_object:
-                if grid_object[key][-1][1] != 0:
-                    grid_object[key].append([step, 0])
+    def get_columns(self) -> dict[str, np.ndarray]:
+        """Gets the recorded episode as flat numpy columns (the compact form of the replay)."""
+        keys = self._c_env.replay_keys()
+        deltas = self._c_env.replay_deltas()
+        return {
+            "step": deltas["step"],
+            "object_id": deltas["object_id"],
+            "key": deltas["key"],
+            "value": deltas["value"],
+            "key_names": np.array([name for name, _, _ in keys]),
+            "key_items": np.array([item for _, item, _ in keys], dtype=np.int32),
+            "key_kinds": np.array([kind for _, _, kind in keys], dtype=np.uint8),
+            "actions": self._actions[: self.step],
+            "action_success": self._action_success[: self.step],
+            "rewards": self._rewards[: self.step],
+        }
 
     def get_replay_data(self):
         """Gets full replay as a tree of plain python dictionaries."""
-        self.replay_data["max_steps"] = self.step
-        # Trim value changes to make them more compact.
-        for grid_object in self.grid_objects:
-            for key, changes in list(grid_object.items()):
-                if isinstance(changes, list) and len(changes) == 1:
-                    grid_object[key] = changes[0][1]
-
-        self.replay_data["config"] = OmegaConf.to_container(self.env._task.env_cfg())
-        # The map_builder is not needed for replay, and it's not serializable.
-        del self.replay_data["config"]["game"]["map_builder"]
-
+        self.replay_data.update(self._get_header())
+        self.replay_data["grid_objects"] = decode_grid_objects(self.get_columns())
         return self.replay_data
 
+    def _get_header(self) -> dict:
+        header = {k: v for k, v in self.replay_data.items() if k != "grid_objects"}
+        header["max_steps"] = self.step
+
+        header["config"] = OmegaConf.to_container(self.env._task.env_cfg())
+        # The map_builder is not needed for replay, and it's not serializable.
+        del header["config"]["game"]["map_builder"]
+        return header
+
     def write_replay(self, path: str):
         """Writes a replay to a file."""
         replay_data = json.dumps(self.get_replay_data())  # Convert to JSON string
@@ -113,3 +135,127 @@ class EpisodeReplay:
         compressed_data = zlib.compress(replay_bytes)  # Compress the bytes
 
         write_data(path, compressed_data, content_type="application/x-compress")
+
+    def write_binary_replay(self, path: str):
+        """Writes the replay's columns and header as a compressed .npz; read it back with load_binary_replay."""
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, header=np.array(json.dumps(self._get_header())), **self.get_columns())
+        write_data(path, buffer.getvalue(), content_type="application/octet-stream")
+
+
+def load_binary_replay(path: str) -> dict:
+    """Loads a replay written by EpisodeReplay.write_binary_replay, in the same form get_replay_data returns."""
+    with np.load(io.BytesIO(read(path))) as npz:
+        columns = {name: npz[name] for name in npz.files}
+    replay_data = json.loads(str(columns.pop("header")))
+    replay_data["grid_objects"] = decode_grid_objects(columns)
+    return replay_data
+
+
+def decode_grid_objects(columns: dict[str, np.ndarray]) -> list[dict[str, Any]]:
+    """
+    Turns recorded columns into the replay's grid_objects: per object, a dict mapping each key to its list of
+    [step, value] changes, or to the bare value if it never changed.
+    """
+    keys = list(
+        zip(columns["key_names"].tolist(), columns["key_items"].tolist(), columns["key_kinds"].tolist(), strict=True)
+    )
+    object_ids = columns["object_id"]
+    order = np.argsort(object_ids, kind="stable")  # Groups changes by object, keeping them in step order
+    _, starts = np.unique(object_ids[order], return_index=True)
+    ends = np.append(starts[1:], len(order))
+    steps = columns["step"][order].tolist()
+    key_ids = columns["key"][order].tolist()
+    values = columns["value"][order].tolist()
+
+    actions = columns["actions"]
+    action_success = columns["action_success"]
+    rewards = columns["rewards"]
+    total_rewards = np.cumsum(rewards, axis=0, dtype=np.float64)
+
+    grid_objects = []
+    for start, end in zip(starts.tolist(), ends.tolist(), strict=True):
+        grid_object = _decode_object(keys, steps[start:end], key_ids[start:end], values[start:end])
+        if "agent_id" in grid_object:
+            agent_id = grid_object["agent_id"][-1][1]
+            first_step = steps[start]
+            grid_object["action"] = _column_changes(actions[:, agent_id], first_step)
+            grid_object["action_success"] = _column_changes(action_success[:, agent_id], first_step)
+            grid_object["reward"] = _column_changes(rewards[:, agent_id], first_step)
+            grid_object["total_reward"] = _column_changes(total_rewards[:, agent_id], first_step)
+        grid_objects.append(grid_object)
+
+    # Trim value changes to make them more compact.
+    for grid_object in grid_objects:
+        for key, changes in list(grid_object.items()):
+            if isinstance(changes, list) and len(changes) == 1:
+                grid_object[key] = changes[0][1]
+    return grid_objects
+
+
+def _decode_object(keys: list[tuple[str, int, int]], steps: list[int], key_ids: list[int], values: list[int]) -> dict:
+    grid_object: dict[str, list] = {}
+    scalars: dict[str, Any] = {}
+    dicts: dict[str, dict[int, int] | None] = {}
+
+    i = 0
+    while i < len(steps):
+        step = steps[i]
+        changed_dicts = set()
+        location_changed = False
+        while i < len(steps) and steps[i] == step:
+            name, item, kind = keys[key_ids[i]]
+            value = values[i]
+            if kind == _DICT_KEY:
+                # Presence changes come before the entries of the same dict, since they have a lower key id.
+                dicts[name] = None if value == _ABSENT_VALUE else {}
+                changed_dicts.add(name)
+            elif kind == _DICT_ENTRY_KEY:
+                entries = dicts[name]
+                if value == _ABSENT_VALUE:
+                    entries.pop(item, None)
+                else:
+                    entries[item] = value
+                changed_dicts.add(name)
+            else:
+                if value == _ABSENT_VALUE:
+                    value = _ABSENT
+                elif kind == _BOOL_KEY:
+                    value = bool(value)
+                scalars[name] = value
+                location_changed |= name in _LOCATION_KEYS
+                _add_change(grid_object, name, step, value)
+            i += 1
+
+        for name in changed_dicts:
+            entries = dicts[name]
+            _add_change(grid_object, name, step, _ABSENT if entries is None else dict(entries))
+        if location_changed:
+            location = tuple(scalars.get(name, _ABSENT) for name in _LOCATION_KEYS)
+            _add_change(grid_object, "location", step, _ABSENT if _ABSENT in location else location)
+
+    return grid_object
+
+
+def _add_change(grid_object: dict[str, list], key: str, step: int, value: Any):
+    """Add a sequence key change to a replay grid object."""
+    changes = grid_object.get(key)
+    if value is _ABSENT:
+        # If key has vanished, add a zero entry.
+        if changes is not None and changes[-1][1] != 0:
+            changes.append([step, 0])
+    elif changes is None:
+        # Add new key.
+        grid_object[key] = [[step, value]] if step == 0 else [[0, 0], [step, value]]
+    elif changes[-1][1] != value:
+        # Only add new entry if it has changed.
+        changes.append([step, value])
+
+
+def _column_changes(column: np.ndarray, first_step: int) -> list:
+    """[step, value] changes of a per-step column, starting at the step the object first appeared."""
+    column = column[first_step:]
+    rows = column.reshape(len(column), -1)
+    changed = np.flatnonzero(np.any(rows[1:] != rows[:-1], axis=1)) + 1
+    changes = [[first_step + i, column[i].tolist()] for i in [0, *changed.tolist()]]
+    return changes if first_step == 0 else [[0, 0], *changes]
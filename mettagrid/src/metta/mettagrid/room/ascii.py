@@ -1,3 +1,5 @@
+import hashlib
+
 import numpy as np
 
 from metta.mettagrid.char_encoder import char_to_grid_object
@@ -9,10 +11,20 @@ class Ascii(Room):
         super().__init__(border_width=border_width, border_object=border_object)
         with open(uri, "r", encoding="utf-8") as f:
             ascii_map = f.read()
-        lines = ascii_map.strip().splitlines()
-        self._level = np.array([list(line) for line in lines], dtype="U6")
-        self._level = np.vectorize(char_to_grid_object)(self._level)
-        self.set_size_labels(self._level.shape[1], self._level.shape[0])
+        # Decoding the characters is left to _build(), which doesn't run when the level comes from a LevelCache.
+        self._lines = ascii_map.strip().splitlines()
+        self._map_digest = hashlib.sha256(ascii_map.encode()).hexdigest()
+        self.set_size_labels(len(self._lines[0]), len(self._lines))
+
+    def cache_key(self):
+        return {
+            "type": "Ascii",
+            "map_sha256": self._map_digest,
+            "border_width": self._border_width,
+            "border_object": self._border_object,
+            "labels": self.labels,
+        }
 
     def _build(self):
-        return self._level
+        level = np.array([list(line) for line in self._lines], dtype="U6")
+        return np.vectorize(char_to_grid_object)(level)
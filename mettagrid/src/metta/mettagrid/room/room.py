@@ -3,6 +3,7 @@ from typing import Optional
 import numpy as np
 import numpy.typing as npt
 
+from metta.mettagrid.coded_grid import as_string_grid
 from metta.mettagrid.level_builder import Level, LevelBuilder
 
 
@@ -30,7 +31,7 @@ class Room(LevelBuilder):
         b = self._border_width
         h, w = room.shape
         final_level = np.full((h + b * 2, w + b * 2), self._border_object, dtype="<U50")
-        final_level[b : b + h, b : b + w] = room
+        final_level[b : b + h, b : b + w] = as_string_grid(room)
         return final_level
 
     def _build(self) -> npt.NDArray[np.str_]:
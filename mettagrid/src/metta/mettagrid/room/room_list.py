@@ -2,6 +2,7 @@ from typing import List
 
 import numpy as np
 
+from metta.mettagrid.coded_grid import as_string_grid
 from metta.mettagrid.room.room import Room
 
 
@@ -26,7 +27,7 @@ class RoomList(Room):
             grid = room_level.grid
             max_height = max(max_height, grid.shape[0])
             max_width = max(max_width, grid.shape[1])
-            rooms.append(grid)
+            rooms.append(as_string_grid(grid))
             # how do we want to account for room lists with different labels?
             room_labels.append(room_level.labels)
 
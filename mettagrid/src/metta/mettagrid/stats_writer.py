@@ -3,23 +3,57 @@ StatsWriter is a class for writing statistics to a DuckDB database.
 It is used to record the outcomes of episodes in MettaGrid.
 """
 
+import atexit
 import datetime
+import logging
 import os
+import threading
 import uuid
+import weakref
 from pathlib import Path
 from typing import Dict
 
-from metta.mettagrid.episode_stats_db import EpisodeStatsDB
+from metta.mettagrid.episode_stats_db import EpisodeBatch, EpisodeStatsDB
+
+logger = logging.getLogger(__name__)
+
+# Writers with an open database in this process, so buffered episodes still get written if the process exits without
+# close() being called. Processes killed by a signal skip this, which is why writers in vecenv workers don't buffer.
+_open_writers: "weakref.WeakSet[StatsWriter]" = weakref.WeakSet()
+_shutdown_hooks_pid: int | None = None
+
+
+def _close_open_writers() -> None:
+    for writer in list(_open_writers):
+        writer.close()
+
+
+def _install_shutdown_hooks() -> None:
+    global _shutdown_hooks_pid
+    if _shutdown_hooks_pid == os.getpid():
+        return
+    _shutdown_hooks_pid = os.getpid()
+    atexit.register(_close_open_writers)
 
 
 class StatsWriter:
     """
     Writer class for tracking statistics in MettaGrid; can be used by multiple environments simultaneously.
     Safe to serialize/deserialize with multiprocessing as long as we have not yet created a connection to a duckdb file.
+
+    Episodes are buffered in memory and written to the database in batches by a background thread, so recording an
+    episode doesn't wait on DuckDB. A batch is written once max_buffered_episodes are waiting or flush_interval seconds
+    have passed; flush() and close() write everything buffered so far. A batch that fails to be written stays buffered
+    and is retried with the next one.
+
+    A writer unpickled in another process (a vecenv worker) writes each episode as it's recorded instead: vecenvs
+    terminate their workers without closing the envs, which would lose whatever is buffered.
     """
 
-    def __init__(self, dir: Path) -> None:
+    def __init__(self, dir: Path, max_buffered_episodes: int = 256, flush_interval: float = 10.0) -> None:
         self.dir = dir
+        self.max_buffered_episodes = max_buffered_episodes
+        self.flush_interval = flush_interval
         # We do not pick a specific path or open a connection here,
         # because for simplicity we pass a single StatsWriter as an
         # argument to make_vecenv. These objects are pickled/unpickled
@@ -27,14 +61,50 @@ class StatsWriter:
         # connection to a particular duckdb file, so we create a random
         # path and open a connection on demand.
         self.db = None
+        self._write_through = False
+        self._init_buffer()
+
+    def _init_buffer(self) -> None:
+        self._buffer = EpisodeBatch()
+        self._buffer_lock = threading.Lock()  # Guards _buffer; held only to append or swap it out
+        self._db_lock = threading.Lock()  # Guards db; held while a batch is written
+        self._init_lock = threading.Lock()  # Guards opening db, so that recording never waits on a batch being written
+        self._flush_requested = threading.Event()
+        self._closing = threading.Event()
+        self._flusher: threading.Thread | None = None
+
+    def __getstate__(self) -> dict:
+        assert self.db is None, "StatsWriter can't be pickled after it has opened its database"
+        return {
+            "dir": self.dir,
+            "max_buffered_episodes": self.max_buffered_episodes,
+            "flush_interval": self.flush_interval,
+        }
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.db = None
+        self._write_through = True
+        self._init_buffer()
 
     def _ensure_db(self) -> None:
-        if self.db is None:
-            # Create a random filename for the duckdb file within the specified directory.
-            # This ensures that each process has a unique file, and that
-            # the file is not locked by another process.
-            path = Path(self.dir) / f"{os.getpid()}_{uuid.uuid4().hex[:6]}.duckdb"
-            self.db = EpisodeStatsDB(path)
+        if self.db is not None:
+            return
+        with self._init_lock:
+            if self.db is None:
+                # Create a random filename for the duckdb file within the specified directory.
+                # This ensures that each process has a unique file, and that
+                # the file is not locked by another process.
+                path = Path(self.dir) / f"{os.getpid()}_{uuid.uuid4().hex[:6]}.duckdb"
+                db = EpisodeStatsDB(path)
+                with self._db_lock:
+                    self.db = db
+                if not self._write_through:
+                    self._closing.clear()
+                    self._flusher = threading.Thread(target=self._flush_loop, name="StatsWriter-flush", daemon=True)
+                    self._flusher.start()
+                _install_shutdown_hooks()
+                _open_writers.add(self)
 
     def record_episode(
         self,
@@ -47,9 +117,49 @@ class StatsWriter:
         created_at: datetime.datetime,
     ) -> None:
         self._ensure_db()
-        assert self.db is not None, "Database must be initialized before recording episodes"
-        self.db.record_episode(episode_id, attributes, agent_metrics, agent_groups, step_count, replay_url, created_at)
+        with self._buffer_lock:
+            self._buffer.add(episode_id, attributes, agent_metrics, agent_groups, step_count, replay_url, created_at)
+            buffered = len(self._buffer)
+        if self._write_through:
+            self.flush()
+        elif buffered >= self.max_buffered_episodes:
+            self._flush_requested.set()
+
+    def flush(self) -> None:
+        """Write all buffered episodes to the database. If that fails, they stay buffered."""
+        with self._db_lock:
+            with self._buffer_lock:
+                batch, self._buffer = self._buffer, EpisodeBatch()
+            if self.db is None:
+                return
+            try:
+                self.db.record_episodes(batch)
+            except Exception:
+                # The batch is written in one transaction, so none of it was; put it back ahead of newer episodes.
+                with self._buffer_lock:
+                    batch.extend(self._buffer)
+                    self._buffer = batch
+                raise
+
+    def _flush_loop(self) -> None:
+        while not self._closing.is_set():
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception(f"Failed to write episodes to {self.dir}; retrying in {self.flush_interval}s")
 
     def close(self) -> None:
-        if self.db is not None:
-            self.db.close()
+        if self._flusher is not None:
+            self._closing.set()
+            self._flush_requested.set()
+            if self._flusher is not threading.current_thread():
+                self._flusher.join()
+            self._flusher = None
+        self.flush()
+        with self._db_lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+        _open_writers.discard(self)
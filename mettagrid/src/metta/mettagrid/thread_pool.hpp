@@ -0,0 +1,124 @@
+#ifndef THREAD_POOL_HPP_
+#define THREAD_POOL_HPP_
+
+#include <atomic>
+#include <condition_variable>
+#include <cstdint>
+#include <exception>
+#include <functional>
+#include <mutex>
+#include <thread>
+#include <vector>
+
+// Minimal fork-join pool. parallel_for() hands out indices to the workers and to the calling thread, and returns once
+// every index has been processed. Workers are kept alive between calls so a step doesn't pay for thread creation.
+class ThreadPool {
+public:
+  // num_threads counts the calling thread, so a pool of size 1 runs everything inline.
+  explicit ThreadPool(size_t num_threads) {
+    for (size_t i = 1; i < num_threads; i++) {
+      _workers.emplace_back([this] { worker_loop(); });
+    }
+  }
+
+  ~ThreadPool() {
+    {
+      std::lock_guard<std::mutex> lock(_mutex);
+      _stop = true;
+    }
+    _work_cv.notify_all();
+    for (auto& worker : _workers) {
+      worker.join();
+    }
+  }
+
+  ThreadPool(const ThreadPool&) = delete;
+  ThreadPool& operator=(const ThreadPool&) = delete;
+
+  size_t size() const {
+    return _workers.size() + 1;
+  }
+
+  // Calls fn(i) for every i in [0, n). The first exception thrown by fn is rethrown here once all workers are idle.
+  void parallel_for(size_t n, const std::function<void(size_t)>& fn) {
+    if (_workers.empty() || n <= 1) {
+      for (size_t i = 0; i < n; i++) {
+        fn(i);
+      }
+      return;
+    }
+
+    {
+      std::lock_guard<std::mutex> lock(_mutex);
+      _fn = &fn;
+      _n = n;
+      _next = 0;
+      _active = _workers.size();
+      _error = nullptr;
+      _generation++;
+    }
+    _work_cv.notify_all();
+
+    run_tasks();
+
+    std::exception_ptr error;
+    {
+      std::unique_lock<std::mutex> lock(_mutex);
+      _done_cv.wait(lock, [this] { return _active == 0; });
+      _fn = nullptr;
+      error = _error;
+    }
+    if (error) {
+      std::rethrow_exception(error);
+    }
+  }
+
+private:
+  void worker_loop() {
+    uint64_t seen_generation = 0;
+    while (true) {
+      {
+        std::unique_lock<std::mutex> lock(_mutex);
+        _work_cv.wait(lock, [&] { return _stop || _generation != seen_generation; });
+        if (_stop) return;
+        seen_generation = _generation;
+      }
+
+      run_tasks();
+
+      {
+        std::lock_guard<std::mutex> lock(_mutex);
+        if (--_active == 0) {
+          _done_cv.notify_one();
+        }
+      }
+    }
+  }
+
+  void run_tasks() {
+    for (size_t i = _next.fetch_add(1); i < _n; i = _next.fetch_add(1)) {
+      try {
+        (*_fn)(i);
+      } catch (...) {
+        std::lock_guard<std::mutex> lock(_mutex);
+        if (!_error) _error = std::current_exception();
+      }
+    }
+  }
+
+  std::vector<std::thread> _workers;
+  std::mutex _mutex;
+  std::condition_variable _work_cv;
+  std::condition_variable _done_cv;
+
+  // State of the current parallel_for call. Written under _mutex before _generation is bumped.
+  const std::function<void(size_t)>* _fn = nullptr;
+  size_t _n = 0;
+  std::atomic<size_t> _next{0};
+  size_t _active = 0;
+  uint64_t _generation = 0;
+  bool _stop = false;
+  std::exception_ptr _error;
+};
+
+#endif  // THREAD_POOL_HPP_
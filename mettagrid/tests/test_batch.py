@@ -0,0 +1,108 @@
+import numpy as np
+import pytest
+
+from metta.mettagrid.mettagrid_c import MettaGridBatch
+from metta.mettagrid.mettagrid_env import dtype_actions
+
+from .test_mettagrid import EnvConfig, TestEnvironmentBuilder
+
+NUM_ENVS = 6
+AGENT_POSITIONS = [[(1, 1), (2, 4)], [(1, 2), (2, 5)], [(2, 1), (1, 6)]]
+
+
+def make_envs(num_envs: int = NUM_ENVS):
+    builder = TestEnvironmentBuilder()
+    envs = []
+    for i in range(num_envs):
+        game_map = builder.place_agents(builder.create_basic_grid(), AGENT_POSITIONS[i % len(AGENT_POSITIONS)])
+        envs.append(builder.create_environment(game_map))
+    return envs
+
+
+def random_actions(env, rng: np.random.Generator, num_envs: int = NUM_ENVS) -> np.ndarray:
+    num_actions = len(env.action_names())
+    max_arg = max(env.max_action_args())
+    actions = np.zeros((num_envs, EnvConfig.NUM_AGENTS, 2), dtype=dtype_actions)
+    actions[..., 0] = rng.integers(0, num_actions, size=(num_envs, EnvConfig.NUM_AGENTS))
+    actions[..., 1] = rng.integers(0, max_arg + 1, size=(num_envs, EnvConfig.NUM_AGENTS))
+    return actions
+
+
+class TestMettaGridBatch:
+    @pytest.mark.parametrize("num_threads", [1, 4])
+    def test_matches_per_env_stepping(self, num_threads):
+        """Stepping a batch produces exactly what stepping each environment on its own does."""
+        batch_envs = make_envs()
+        reference_envs = make_envs()
+        batch = MettaGridBatch(batch_envs, num_threads=num_threads)
+        for env in batch_envs + reference_envs:
+            env.reset()
+
+        rng = np.random.default_rng(0)
+        for _ in range(12):
+            actions = random_actions(reference_envs[0], rng)
+            obs, rewards, terminals, truncations = batch.step(actions)
+
+            for i, env in enumerate(reference_envs):
+                ref_obs, ref_rewards, ref_terminals, ref_truncations, _ = env.step(actions[i])
+                agents = slice(i * EnvConfig.NUM_AGENTS, (i + 1) * EnvConfig.NUM_AGENTS)
+                np.testing.assert_array_equal(obs[agents], ref_obs)
+                np.testing.assert_array_equal(rewards[agents], ref_rewards)
+                np.testing.assert_array_equal(terminals[agents], ref_terminals)
+                np.testing.assert_array_equal(truncations[agents], ref_truncations)
+
+        for batch_env, reference_env in zip(batch_envs, reference_envs, strict=True):
+            assert batch_env.get_episode_stats() == reference_env.get_episode_stats()
+
+    def test_buffers_are_contiguous_views(self):
+        """Each environment writes straight into its slice of the batch buffers."""
+        envs = make_envs()
+        batch = MettaGridBatch(envs)
+        obs, _ = envs[2].reset()
+
+        assert batch.observations.shape == (NUM_ENVS * EnvConfig.NUM_AGENTS, EnvConfig.NUM_OBS_TOKENS, 3)
+        assert batch.observations.flags.c_contiguous
+        agents = slice(2 * EnvConfig.NUM_AGENTS, 3 * EnvConfig.NUM_AGENTS)
+        np.testing.assert_array_equal(batch.observations[agents], obs)
+
+    def test_inactive_envs_are_not_stepped(self):
+        envs = make_envs()
+        batch = MettaGridBatch(envs, num_threads=2)
+        for env in envs:
+            env.reset()
+
+        active = np.ones(NUM_ENVS, dtype=bool)
+        active[1] = False
+        batch.step(random_actions(envs[0], np.random.default_rng(0)), active)
+
+        assert envs[0].current_step == 1
+        assert envs[1].current_step == 0
+
+    def test_set_env_replaces_environment(self):
+        envs = make_envs()
+        batch = MettaGridBatch(envs)
+        replacement = make_envs(1)[0]
+
+        batch.set_env(3, replacement)
+        obs, _ = replacement.reset()
+
+        assert batch.envs()[3] is replacement
+        agents = slice(3 * EnvConfig.NUM_AGENTS, 4 * EnvConfig.NUM_AGENTS)
+        np.testing.assert_array_equal(batch.observations[agents], obs)
+
+    def test_rejects_mismatched_environments(self):
+        builder = TestEnvironmentBuilder()
+        game_map = builder.place_agents(builder.create_basic_grid(), [(1, 1), (2, 4), (2, 2)])
+        three_agent_env = builder.create_environment(game_map, num_agents=3)
+
+        with pytest.raises(RuntimeError, match="same number of agents"):
+            MettaGridBatch(make_envs(2) + [three_agent_env])
+
+    def test_rejects_wrong_action_shape(self):
+        envs = make_envs()
+        batch = MettaGridBatch(envs)
+        for env in envs:
+            env.reset()
+
+        with pytest.raises(RuntimeError, match="actions must have shape"):
+            batch.step(np.zeros((NUM_ENVS - 1, EnvConfig.NUM_AGENTS, 2), dtype=dtype_actions))
@@ -0,0 +1,147 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from metta.mettagrid.coded_grid import (
+    CodedGrid,
+    as_coded_grid,
+    as_string_grid,
+    count_agents,
+    symbol_id,
+    symbol_names,
+)
+from metta.mettagrid.level_builder import Level, LevelBuilder
+from metta.mettagrid.mettagrid_c import MettaGrid
+from metta.mettagrid.mettagrid_c_config import from_mettagrid_config
+from metta.mettagrid.room.room_list import RoomList
+
+
+def make_game_config(num_agents: int):
+    return from_mettagrid_config(
+        {
+            "max_steps": 10,
+            "num_agents": num_agents,
+            "obs_width": 3,
+            "obs_height": 3,
+            "num_observation_tokens": 100,
+            "inventory_item_names": ["laser", "armor"],
+            "actions": {
+                "noop": {"enabled": True},
+                "move": {"enabled": True},
+                "rotate": {"enabled": True},
+                "attack": {"enabled": False},
+                "put_items": {"enabled": False},
+                "get_items": {"enabled": False},
+                "swap": {"enabled": False},
+                "change_color": {"enabled": False},
+                "change_glyph": {"enabled": False, "number_of_glyphs": 4},
+            },
+            "groups": {"red": {"id": 0, "props": {}}},
+            "objects": {"wall": {"type_id": 1}},
+            "agent": {},
+        }
+    )
+
+
+def make_string_grid() -> np.ndarray:
+    grid = np.full((5, 7), "empty", dtype="<U50")
+    grid[[0, -1], :] = "wall"
+    grid[:, [0, -1]] = "wall"
+    grid[2, 2] = "agent.red"
+    grid[3, 4] = "agent.red"
+    grid[1, 3] = "wall"
+    return grid
+
+
+def test_coded_grid_reads_and_writes_names():
+    grid = CodedGrid.full((3, 4), "empty")
+    grid[0, :] = "wall"
+    grid[1:3, 1] = ["agent.red", "agent.blue"]
+    grid[2, 2:4] = np.array(["altar", "wall"])
+
+    assert grid[0, 0] == "wall"
+    assert grid[1, 1] == "agent.red"
+    assert isinstance(grid[0], CodedGrid)
+    assert list(grid[2]) == ["empty", "agent.blue", "altar", "wall"]
+    assert type(grid == "wall") is np.ndarray
+    assert np.count_nonzero(grid == "wall") == 5
+    assert np.array_equal(grid.T.to_strings(), grid.to_strings().T)
+    assert count_agents(grid) == count_agents(grid.to_strings()) == 2
+
+
+def test_coded_grid_round_trips_through_strings():
+    strings = make_string_grid()
+    grid = as_coded_grid(strings)
+
+    assert grid.dtype == np.uint16
+    assert np.array_equal(grid.to_strings(), strings)
+    assert as_coded_grid(grid) is grid
+
+
+def test_coded_grid_converts_to_names():
+    strings = make_string_grid()
+    grid = as_coded_grid(strings)
+
+    assert np.array_equal(grid.astype(str), strings)
+    assert np.array_equal(grid.astype(object), strings)
+    assert grid.tolist() == strings.tolist()
+    assert np.array_equal(np.where(grid == "wall", "x", grid), np.where(strings == "wall", "x", strings))
+    assert np.array_equal(np.concatenate([grid, strings]), np.concatenate([strings, strings]))
+    assert np.array_equal(as_string_grid(grid), strings)
+    # Numeric conversions and functions stay on the ids
+    assert grid.astype(np.int64).dtype == np.int64
+    assert np.concatenate([grid, grid]).dtype == np.uint16
+    assert str(grid) == str(strings)
+
+
+def test_room_list_of_coded_grids():
+    class CodedBuilder(LevelBuilder):
+        def build(self):
+            return Level(as_coded_grid(make_string_grid()), [])
+
+    level = RoomList([CodedBuilder(), CodedBuilder()], layout="row", border_width=1).build()  # type: ignore[list-item]
+    assert level.grid.dtype.kind == "U"
+    assert np.array_equal(level.grid[1:-1, 1:-1], np.hstack([make_string_grid(), make_string_grid()]))
+
+
+def test_coded_grid_pickle_remaps_symbols():
+    grid = CodedGrid.from_strings(make_string_grid())
+    assert np.array_equal(pickle.loads(pickle.dumps(grid)).to_strings(), make_string_grid())
+
+    # A grid pickled by a process whose symbol table gave the same names other ids.
+    unpickle, (ids, names) = grid.__reduce__()
+    foreign_ids = {old_id: 1000 + i for i, old_id in enumerate(names)}
+    foreign_grid = np.vectorize(foreign_ids.get)(ids).astype(np.uint16)
+    foreign_names = {foreign_ids[old_id]: name for old_id, name in names.items()}
+
+    restored = unpickle(foreign_grid, foreign_names)
+    assert isinstance(restored, CodedGrid)
+    assert np.array_equal(restored.to_strings(), make_string_grid())
+
+
+def test_constructor_from_coded_grid_matches_list_constructor():
+    strings = make_string_grid()
+    from_list = MettaGrid(make_game_config(2), strings.tolist(), 42)
+    from_codes = MettaGrid(make_game_config(2), as_coded_grid(strings), symbol_names(), 42)
+
+    assert from_codes.initial_grid_hash == from_list.initial_grid_hash
+    assert from_codes.grid_objects() == from_list.grid_objects()
+    np.testing.assert_array_equal(from_codes.reset()[0], from_list.reset()[0])
+
+
+def test_constructor_only_rejects_unknown_symbols_that_are_used():
+    grid = as_coded_grid(make_string_grid())
+    symbol_id("no_such_object")
+    MettaGrid(make_game_config(2), grid, symbol_names(), 0)
+
+    grid[2, 4] = "no_such_object"
+    with pytest.raises(RuntimeError, match="Unknown object type: no_such_object"):
+        MettaGrid(make_game_config(2), grid, symbol_names(), 0)
+
+
+def test_constructor_rejects_ids_outside_the_symbol_table():
+    grid = np.zeros((3, 3), dtype=np.uint16)
+    grid[1, 1] = 5
+    with pytest.raises(RuntimeError, match="symbol table"):
+        MettaGrid(make_game_config(1), grid, ["empty", "wall"], 0)
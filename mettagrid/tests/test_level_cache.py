@@ -0,0 +1,96 @@
+import os
+
+import numpy as np
+from omegaconf import OmegaConf
+
+from metta.mettagrid.coded_grid import CodedGrid
+from metta.mettagrid.curriculum.core import SingleTaskCurriculum
+from metta.mettagrid.level_builder import Level
+from metta.mettagrid.level_cache import LevelCache
+from metta.mettagrid.mettagrid_env import MettaGridEnv
+from metta.mettagrid.room.ascii import Ascii
+from metta.mettagrid.util.hydra import get_cfg
+
+
+def make_level(rows: list[str]) -> Level:
+    names = {"#": "wall", ".": "empty", "@": "agent.agent", "_": "altar"}
+    return Level(grid=np.array([[names[c] for c in row] for row in rows]), labels=["test", "small"])
+
+
+def test_round_trip(tmp_path):
+    cache = LevelCache(tmp_path)
+    level = make_level(["####", "#@_#", "####"])
+
+    assert cache.get({"map": 1}) is None
+    cache.put({"map": 1}, level)
+    cached = cache.get({"map": 1})
+
+    assert cached is not None
+    assert isinstance(cached.grid, CodedGrid)
+    assert np.array_equal(cached.grid.to_strings(), level.grid)
+    assert cached.labels == level.labels
+
+
+def test_get_or_build_builds_once(tmp_path):
+    cache = LevelCache(tmp_path)
+    builds = []
+
+    def build():
+        builds.append(1)
+        return make_level(["@."])
+
+    _, first_hit = cache.get_or_build(["key", 7], build)
+    level, second_hit = cache.get_or_build(["key", 7], build)
+
+    assert (first_hit, second_hit) == (False, True)
+    assert len(builds) == 1
+    assert level.grid[0, 0] == "agent.agent"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = LevelCache(tmp_path)
+    for i in range(3):
+        cache.put(i, make_level(["@" * (i + 1)]))
+        path = cache._path(cache.key_digest(i))
+        os.utime(path, (i, i))
+    entry_size = cache._path(cache.key_digest(0)).stat().st_size
+
+    # Reading entry 0 makes it the most recently used, so entry 1 goes first.
+    assert cache.get(0) is not None
+    cache.max_bytes = 3 * entry_size
+    cache.put(3, make_level(["@@@@"]))
+
+    assert cache.get(1) is None
+    assert cache.get(0) is not None and cache.get(3) is not None
+
+
+def test_unreadable_entries_are_misses(tmp_path):
+    cache = LevelCache(tmp_path)
+    path = cache._path(cache.key_digest("broken"))
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"not an npz file")
+
+    assert cache.get("broken") is None
+
+
+def test_env_serves_ascii_levels_from_cache(tmp_path):
+    map_path = tmp_path / "map.txt"
+    map_path.write_text("#####\n#A._#\n#####\n")
+    assert Ascii(str(map_path)).cache_key() == Ascii(str(map_path)).cache_key()
+
+    cfg = get_cfg("benchmark")
+    cfg.game.num_agents = 1
+    cfg.game.max_steps = 1
+    cfg.game.map_builder = OmegaConf.create({"_target_": "metta.mettagrid.room.ascii.Ascii", "uri": str(map_path)})
+    env = MettaGridEnv(SingleTaskCurriculum("cached", cfg), render_mode=None, level_cache_dir=str(tmp_path / "levels"))
+
+    hits = []
+    for _ in range(2):
+        env.reset()
+        _, _, _, _, infos = env.step(np.zeros((1, 2), dtype=np.int32))
+        hits.append(infos["task_timing/cached/level_cache_hit"])
+
+    # The env's constructor built the level, so both episodes are served from the cache.
+    assert hits == [1.0, 1.0]
+    assert len(list((tmp_path / "levels").glob("*/*.npz"))) == 1
+    env.close()
@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+import pytest
+from omegaconf import OmegaConf
+
+from metta.mettagrid.curriculum.core import Curriculum, SingleTaskCurriculum, Task
+from metta.mettagrid.level_builder import Level, LevelBuilder
+from metta.mettagrid.map_prefetcher import MapPrefetcher
+from metta.mettagrid.mettagrid_env import MettaGridEnv
+from metta.mettagrid.room.random import Random
+from metta.mettagrid.util.hydra import get_cfg
+
+
+class CountingBuilder(LevelBuilder):
+    """Builds numbered 1x1 levels, optionally blocking until released."""
+
+    def __init__(self, release: threading.Event | None = None):
+        self.builds = 0
+        self.release = release
+
+    def __deepcopy__(self, memo) -> "CountingBuilder":
+        clone = CountingBuilder(self.release)
+        clone.builds = self.builds
+        return clone
+
+    def build(self) -> Level:
+        if self.release is not None:
+            self.release.wait(timeout=10)
+        self.builds += 1
+        return Level(grid=np.full((1, 1), "empty"), labels=[f"build{self.builds}"])
+
+
+def wait_until_ready(prefetcher: MapPrefetcher, key: str, count: int) -> None:
+    for future in prefetcher._pending[key]:
+        future.result(timeout=10)
+    assert prefetcher.num_ready(key) == count
+
+
+def test_first_get_builds_in_foreground_then_hits():
+    prefetcher = MapPrefetcher(max_ready_per_task=2)
+    builder = CountingBuilder()
+
+    first = prefetcher.get("task", builder)
+    assert not first.hit
+    assert builder.builds == 1
+
+    wait_until_ready(prefetcher, "task", 2)
+    second = prefetcher.get("task", builder)
+    assert second.hit
+    assert second.build_time >= 0
+    # Background builds run on copies, so the builder's own state is only touched by foreground builds.
+    assert builder.builds == 1
+    prefetcher.close()
+
+
+def test_pending_build_is_waited_for_not_rebuilt():
+    release = threading.Event()
+    prefetcher = MapPrefetcher(max_ready_per_task=1)
+    prefetcher.prefetch("task", CountingBuilder(release))
+
+    timer = threading.Timer(0.05, release.set)
+    timer.start()
+    result = prefetcher.get("task", CountingBuilder())
+    timer.join()
+
+    assert not result.hit
+    assert result.level.labels == ["build1"]
+    assert result.wait_time > 0
+    prefetcher.close()
+
+
+def test_least_recently_used_tasks_are_evicted():
+    prefetcher = MapPrefetcher(max_ready_per_task=1, max_tasks=2)
+    for key in ["a", "b", "a", "c"]:
+        prefetcher.prefetch(key, CountingBuilder())
+
+    assert list(prefetcher._pending) == ["a", "c"]
+    prefetcher.close()
+
+
+def test_prefetched_levels_differ():
+    prefetcher = MapPrefetcher(max_ready_per_task=3)
+    builder = Random(width=8, height=8, objects=OmegaConf.create({"wall": 20}), agents=1, seed=0)
+    prefetcher.prefetch("task", builder)
+    wait_until_ready(prefetcher, "task", 3)
+
+    grids = [np.asarray(prefetcher.get("task", builder).level.grid) for _ in range(3)]
+    assert all(not np.array_equal(grids[i], grids[j]) for i in range(3) for j in range(i + 1, 3))
+    prefetcher.close()
+
+
+def test_max_ready_per_task_must_be_positive():
+    with pytest.raises(ValueError):
+        MapPrefetcher(max_ready_per_task=0)
+
+
+def test_env_reports_prefetch_stats():
+    cfg = get_cfg("benchmark")
+    cfg.game.num_agents = 1
+    cfg.game.max_steps = 2
+    cfg.game.map_builder = OmegaConf.create(
+        {
+            "_target_": "metta.mettagrid.room.random.Random",
+            "width": 5,
+            "height": 5,
+            "objects": {},
+            "agents": 1,
+            "border_width": 1,
+        }
+    )
+    env = MettaGridEnv(SingleTaskCurriculum("prefetch", cfg), render_mode=None, prefetch_maps=1)
+
+    for _ in range(2):
+        env.reset()
+        for _ in range(2):
+            _, _, terminals, truncations, infos = env.step(np.zeros((1, 2), dtype=np.int32))
+        assert terminals.all() or truncations.all()
+
+    assert "task_timing/prefetch/map_prefetch_hit" in infos
+    assert infos["task_timing/prefetch/map_wait_msec"] >= 0
+    assert infos["task_timing/prefetch/map_build_msec"] > 0
+    env.close()
+
+
+class SameNameCurriculum(Curriculum):
+    """Alternates between maps of different widths, under the same task name, like sampling curricula do."""
+
+    def __init__(self, cfg, widths: list[int]):
+        self._cfg = cfg
+        self._widths = widths
+        self.num_tasks = 0
+
+    def get_task(self) -> Task:
+        cfg = self._cfg.copy()
+        cfg.game.map_builder.width = self._widths[self.num_tasks % len(self._widths)]
+        self.num_tasks += 1
+        return Task("sampled", self, cfg)
+
+
+def test_env_prefetches_by_map_config_not_task_name():
+    cfg = get_cfg("benchmark")
+    cfg.game.num_agents = 1
+    cfg.game.max_steps = 1
+    cfg.game.map_builder = OmegaConf.create(
+        {"_target_": "metta.mettagrid.room.random.Random", "width": 5, "height": 5, "objects": {}, "agents": 1}
+    )
+    curriculum = SameNameCurriculum(cfg, widths=[5, 7])
+    env = MettaGridEnv(curriculum, render_mode=None, prefetch_maps=1)
+
+    for _ in range(4):
+        env.reset()
+        assert env.map_width == curriculum._widths[(curriculum.num_tasks - 1) % 2]
+        env.step(np.zeros((1, 2), dtype=np.int32))
+    env.close()
@@ -2,6 +2,7 @@ from dataclasses import dataclass
 from typing import List, Tuple
 
 import numpy as np
+import pytest
 
 from metta.mettagrid.mettagrid_c import MettaGrid, PackedCoordinate
 from metta.mettagrid.mettagrid_c_config import from_mettagrid_config
@@ -197,6 +198,40 @@ class TestBasicFunctionality:
         actions2 = basic_env.action_names()
         assert actions1 == actions2
 
+    def test_grid_ids_match_grid_objects(self, basic_env):
+        """The id grid view agrees with grid_objects and follows objects as they move."""
+        basic_env.reset()
+        grid_ids = basic_env.grid_ids()
+        assert grid_ids.shape[:2] == (basic_env.map_height, basic_env.map_width)
+        assert grid_ids.dtype == np.uint32
+
+        rng = np.random.default_rng(0)
+        move_idx = basic_env.action_names().index("move")
+        rotate_idx = basic_env.action_names().index("rotate")
+        for _ in range(10):
+            actions = np.zeros((EnvConfig.NUM_AGENTS, 2), dtype=dtype_actions)
+            actions[:, 0] = rng.choice([move_idx, rotate_idx], size=EnvConfig.NUM_AGENTS)
+            actions[:, 1] = rng.integers(0, 2, size=EnvConfig.NUM_AGENTS)
+            actions[actions[:, 0] == rotate_idx, 1] = rng.integers(0, 4)
+            basic_env.step(actions)
+
+            objects = basic_env.grid_objects()
+            assert np.count_nonzero(grid_ids) == len(objects)
+            for obj_id, obj in objects.items():
+                assert grid_ids[obj["r"], obj["c"], obj["layer"]] == obj_id
+
+    def test_grid_ids_is_read_only_and_outlives_env(self):
+        builder = TestEnvironmentBuilder()
+        env = builder.create_environment(builder.place_agents(builder.create_basic_grid(), [(1, 1), (2, 4)]))
+        grid_ids = env.grid_ids()
+        assert not grid_ids.flags.writeable
+        with pytest.raises(ValueError):
+            grid_ids[0, 0, 0] = 0
+
+        expected = grid_ids.copy()
+        del env
+        np.testing.assert_array_equal(grid_ids, expected)
+
 
 class TestPackedCoordinate:
     """Test PackedCoordinate functionality."""
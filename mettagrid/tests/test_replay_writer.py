@@ -0,0 +1,118 @@
+"""Test that the columnar replay recorder produces the same replays as merging grid_objects() every step."""
+
+import json
+import zlib
+
+import numpy as np
+import pytest
+from omegaconf import OmegaConf
+
+from metta.mettagrid.mettagrid_c import MettaGrid
+from metta.mettagrid.mettagrid_c_config import from_mettagrid_config
+from metta.mettagrid.mettagrid_env import dtype_actions
+from metta.mettagrid.replay_writer import EpisodeReplay, ReplayWriter, load_binary_replay
+
+from .test_incremental_observations import NUM_AGENTS, make_game_config, make_map
+
+
+class FakeTask:
+    def env_cfg(self):
+        return OmegaConf.create({"game": {"map_builder": None, "num_agents": NUM_AGENTS}})
+
+
+class ReplayEnv:
+    """The parts of MettaGridEnv that EpisodeReplay reads, around a bare MettaGrid."""
+
+    def __init__(self, max_steps: int):
+        game_config = make_game_config(obs_size=5, incremental_obs=False)
+        game_config["max_steps"] = max_steps
+        self.c_env = MettaGrid(from_mettagrid_config(game_config), make_map(), 7)
+        self._task = FakeTask()
+        self.max_steps = max_steps
+        self.num_agents = NUM_AGENTS
+        self.action_names = self.c_env.action_names()
+        self.inventory_item_names = self.c_env.inventory_item_names()
+        self.object_type_names = self.c_env.object_type_names()
+        self.map_width = self.c_env.map_width
+        self.map_height = self.c_env.map_height
+
+
+def merge_grid_objects_reference(env: ReplayEnv, steps: int, rng: np.random.Generator):
+    """Steps the env, recording every step by merging full grid_objects() dicts key by key."""
+    replay = EpisodeReplay(env)
+    grid_objects = []
+    total_rewards = np.zeros(env.num_agents)
+    num_actions = len(env.action_names)
+    max_args = np.array(env.c_env.max_action_args())
+
+    for step in range(steps):
+        actions = np.zeros((NUM_AGENTS, 2), dtype=dtype_actions)
+        actions[:, 0] = rng.integers(0, num_actions, size=NUM_AGENTS)
+        actions[:, 1] = rng.integers(0, max_args[actions[:, 0]] + 1)
+        _, rewards, _, _, _ = env.c_env.step(actions)
+        replay.log_step(actions, rewards)
+
+        total_rewards += rewards
+        for i, grid_object in enumerate(env.c_env.grid_objects().values()):
+            update_object = grid_object.copy()
+            if len(grid_objects) <= i:
+                grid_objects.append({})
+            if "agent_id" in grid_object:
+                agent_id = update_object["agent_id"]
+                update_object["action"] = actions[agent_id].tolist()
+                update_object["action_success"] = bool(env.c_env.action_success()[agent_id])
+                update_object["reward"] = rewards[agent_id].item()
+                update_object["total_reward"] = total_rewards[agent_id].item()
+            merged = grid_objects[i]
+            for key, value in update_object.items():
+                if key not in merged:
+                    merged[key] = [[step, value]] if step == 0 else [[0, 0], [step, value]]
+                elif merged[key][-1][1] != value:
+                    merged[key].append([step, value])
+            for key in merged.keys():
+                if key not in update_object and merged[key][-1][1] != 0:
+                    merged[key].append([step, 0])
+
+    for grid_object in grid_objects:
+        for key, changes in list(grid_object.items()):
+            if len(changes) == 1:
+                grid_object[key] = changes[0][1]
+    return replay, grid_objects
+
+
+def as_json(data):
+    return json.loads(json.dumps(data))
+
+
+@pytest.mark.parametrize("max_steps", [100, 0])
+def test_replay_matches_grid_objects_merge(max_steps):
+    env = ReplayEnv(max_steps)
+    env.c_env.reset()
+    replay, expected_grid_objects = merge_grid_objects_reference(env, 120, np.random.default_rng(3))
+
+    replay_data = replay.get_replay_data()
+    assert replay_data["max_steps"] == 120
+    assert as_json(replay_data["grid_objects"]) == as_json(expected_grid_objects)
+
+
+def test_written_replays_round_trip(tmp_path):
+    env = ReplayEnv(50)
+    env.c_env.reset()
+    writer = ReplayWriter(str(tmp_path), write_binary=True)
+    writer.start_episode("episode", env)
+    rng = np.random.default_rng(0)
+    for _ in range(30):
+        actions = np.zeros((NUM_AGENTS, 2), dtype=dtype_actions)
+        actions[:, 0] = rng.integers(0, 3, size=NUM_AGENTS)
+        _, rewards, _, _, _ = env.c_env.step(actions)
+        writer.log_step("episode", actions, rewards)
+
+    writer.write_replay("episode")
+    with open(tmp_path / "episode.json.z", "rb") as f:
+        json_replay = json.loads(zlib.decompress(f.read()))
+    binary_replay = load_binary_replay(str(tmp_path / "episode.replay.npz"))
+
+    assert "map_builder" not in json_replay["config"]["game"]
+    assert json_replay["max_steps"] == 30
+    assert len(json_replay["grid_objects"]) == len(env.c_env.grid_objects())
+    assert as_json(binary_replay) == json_replay
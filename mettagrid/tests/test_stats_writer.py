@@ -3,7 +3,10 @@ Unit tests for the StatsWriter functionality in mettagrid.stats_writer.
 """
 
 import datetime
+import pickle
 import tempfile
+import threading
+import time
 import uuid
 from pathlib import Path
 
@@ -62,6 +65,7 @@ def test_episode_lifecycle(temp_dir):
 
     # Record the complete episode
     writer.record_episode(episode_id, attributes, agent_metrics, agent_groups, step_count, replay_url, created_at)
+    writer.flush()
 
     # Verify data in database
     assert writer.db is not None
@@ -111,3 +115,126 @@ def test_close_without_db(temp_dir):
     # This should not raise an error
     writer.close()
     assert writer.db is None
+
+
+def record_test_episode(writer: StatsWriter, episode_id: str, num_agents: int = 2) -> None:
+    agent_metrics = {agent_id: {"reward": float(agent_id), "steps": 10.0} for agent_id in range(num_agents)}
+    agent_groups = {agent_id: agent_id % 2 for agent_id in range(num_agents)}
+    writer.record_episode(episode_id, {"seed": "0"}, agent_metrics, agent_groups, 100, None, datetime.datetime.now())
+
+
+def count_rows(db: EpisodeStatsDB, table: str) -> int:
+    return db.con.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_episodes_are_written_in_batches(temp_dir):
+    """Episodes stay buffered until max_buffered_episodes are waiting, then are written together."""
+    writer = StatsWriter(temp_dir, max_buffered_episodes=5, flush_interval=60)
+    for i in range(4):
+        record_test_episode(writer, f"episode_{i}")
+    assert writer.db is not None
+    assert count_rows(writer.db, "episodes") == 0
+
+    record_test_episode(writer, "episode_4")
+    deadline = time.time() + 10
+    while len(writer._buffer) > 0 and time.time() < deadline:
+        time.sleep(0.01)
+    writer.flush()  # Waits for the background write to finish
+    assert count_rows(writer.db, "episodes") == 5
+    assert count_rows(writer.db, "agent_metrics") == 5 * 2 * 2
+    assert count_rows(writer.db, "agent_groups") == 5 * 2
+    assert count_rows(writer.db, "episode_attributes") == 5
+    writer.close()
+
+
+def test_episodes_are_written_after_flush_interval(temp_dir):
+    writer = StatsWriter(temp_dir, max_buffered_episodes=1000, flush_interval=0.05)
+    record_test_episode(writer, "episode")
+    deadline = time.time() + 10
+    while len(writer._buffer) > 0 and time.time() < deadline:
+        time.sleep(0.01)
+    writer.flush()
+    assert writer.db is not None
+    assert count_rows(writer.db, "episodes") == 1
+    writer.close()
+
+
+def test_recording_does_not_wait_for_a_batch_being_written(temp_dir):
+    writer = StatsWriter(temp_dir, max_buffered_episodes=1000, flush_interval=60)
+    record_test_episode(writer, "episode_0")
+
+    # Hold the lock that a background flush holds while writing a batch
+    with writer._db_lock:
+        recorder = threading.Thread(target=record_test_episode, args=(writer, "episode_1"))
+        recorder.start()
+        recorder.join(timeout=5)
+        assert not recorder.is_alive()
+    assert len(writer._buffer) == 2
+    writer.close()
+
+
+def test_failed_batches_are_retried(temp_dir, monkeypatch):
+    writer = StatsWriter(temp_dir, max_buffered_episodes=1000, flush_interval=0.05)
+    record_test_episode(writer, "episode_0")
+    assert writer.db is not None
+    record_episodes = writer.db.record_episodes
+    failures = []
+
+    def fail_once(batch):
+        if not failures:
+            failures.append(len(batch))
+            raise RuntimeError("disk full")
+        record_episodes(batch)
+
+    monkeypatch.setattr(writer.db, "record_episodes", fail_once)
+    record_test_episode(writer, "episode_1")
+    deadline = time.time() + 10
+    while (not failures or len(writer._buffer) > 0) and time.time() < deadline:
+        time.sleep(0.01)
+    writer.flush()  # Waits for the background write to finish
+
+    # The flusher survived the failure and wrote the episodes with its next batch
+    assert failures
+    assert writer._flusher is not None and writer._flusher.is_alive()
+    assert count_rows(writer.db, "episodes") == 2
+    writer.close()
+
+
+def test_close_writes_buffered_episodes(temp_dir):
+    writer = StatsWriter(temp_dir, max_buffered_episodes=1000, flush_interval=60)
+    for i in range(3):
+        record_test_episode(writer, f"episode_{i}", num_agents=4)
+    writer.close()
+    assert writer.db is None
+
+    (db_path,) = temp_dir.glob("*.duckdb")
+    db = EpisodeStatsDB(db_path)
+    assert count_rows(db, "episodes") == 3
+    assert count_rows(db, "agent_metrics") == 3 * 4 * 2
+    db.close()
+
+
+def test_record_episodes_without_agents(temp_dir):
+    """An episode with no metrics, groups or attributes still gets its episodes row."""
+    db = EpisodeStatsDB(temp_dir / "stats.duckdb")
+    db.record_episode("episode", {}, {}, {}, 10, None, datetime.datetime.now())
+    assert count_rows(db, "episodes") == 1
+    assert count_rows(db, "agent_metrics") == 0
+    db.close()
+
+
+def test_stats_writer_pickles_before_use(temp_dir):
+    writer = StatsWriter(temp_dir, max_buffered_episodes=7, flush_interval=3.0)
+    copy = pickle.loads(pickle.dumps(writer))
+    assert copy.dir == temp_dir
+    assert copy.max_buffered_episodes == 7
+    assert copy.flush_interval == 3.0
+    assert copy.db is None
+
+    record_test_episode(copy, "episode")
+    # Unpickled in a vecenv worker, which may be terminated without closing its envs: nothing is left buffered.
+    assert copy.db is not None
+    assert count_rows(copy.db, "episodes") == 1
+    assert len(copy._buffer) == 0
+    copy.close()
+    assert len(list(temp_dir.glob("*.duckdb"))) == 1
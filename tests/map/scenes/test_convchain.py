@@ -1,22 +1,46 @@
-from metta.map.scenes.convchain import ConvChain
-from tests.map.scenes.utils import render_scene
+import numpy as np
+import pytest
 
+from metta.map.scenes.convchain import ConvChain, _independent_lines
+from metta.map.types import Area
+from tests.map.scenes.utils import render_scene
 
-def test_basic():
-    scene = render_scene(
-        ConvChain,
-        dict(
-            pattern="""
+PARAMS = dict(
+    pattern="""
 ##..#
 #....
 #####
 """,
-            pattern_size=3,
-            iterations=10,
-            temperature=1,
-        ),
-        (20, 20),
-    )
+    pattern_size=3,
+    iterations=10,
+    temperature=1,
+)
+
+
+def test_basic():
+    scene = render_scene(ConvChain, PARAMS, (20, 20))
 
     assert (scene.grid == "wall").sum() > 0
     assert (scene.grid == "empty").sum() > 0
+
+
+def test_batch_matches_individual_renders():
+    scenes = [
+        ConvChain(area=Area.root_area_from_grid(np.full((13, 17), "empty", dtype="<U50")), params=PARAMS, seed=seed)
+        for seed in range(3)
+    ]
+    ConvChain.render_batch(scenes)
+
+    for seed, scene in enumerate(scenes):
+        assert np.array_equal(scene.grid, render_scene(ConvChain, PARAMS, (13, 17), seed=seed).grid)
+
+
+@pytest.mark.parametrize("size", [2, 9, 10, 11])
+def test_independent_lines_are_far_apart(size):
+    groups = _independent_lines(size, 3)
+
+    assert sorted(np.concatenate(groups).tolist()) == list(range(size))
+    for lines in groups:
+        for a in lines:
+            for b in lines:
+                assert a == b or min(abs(a - b), size - abs(a - b)) >= 3
@@ -1,4 +1,5 @@
 from metta.map.scenes.make_connected import MakeConnected
+from metta.map.scenes.random_objects import RandomObjects
 from metta.map.scenes.room_grid import RoomGrid
 from metta.map.types import ChildrenAction
 from tests.map.scenes.utils import assert_connected, render_scene
@@ -16,3 +17,15 @@ def test_connect_room_grid():
     )
 
     assert_connected(scene.grid)
+
+
+def test_connect_random_walls():
+    scene = render_scene(
+        RandomObjects,
+        params=dict(object_ranges={"wall": ("uniform", 0.4, 0.5)}),
+        shape=(60, 80),
+        children=[ChildrenAction(scene=MakeConnected.factory(params={}), where="full")],
+        seed=42,
+    )
+
+    assert_connected(scene.grid)
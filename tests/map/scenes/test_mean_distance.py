@@ -1,9 +1,23 @@
 import numpy as np
+import pytest
 
 from metta.map.scenes.mean_distance import MeanDistance
+from metta.map.types import Area
+from metta.map.utils.connectivity import all_adjacent, label_components
 from tests.map.scenes.utils import render_scene
 
 
+def render_in_corridor(objects: dict[str, int], seed: int) -> MeanDistance:
+    # 7x7 walls with a single corridor through the center row.
+    grid = np.full((7, 7), "wall", dtype="<U50")
+    grid[3, :] = "empty"
+    scene = MeanDistance(
+        area=Area.root_area_from_grid(grid), params={"mean_distance": 2.0, "objects": objects}, seed=seed
+    )
+    scene.render_with_children()
+    return scene
+
+
 def test_basic():
     """Test basic functionality of MeanDistance scene."""
     scene = render_scene(MeanDistance, {"mean_distance": 3.0, "objects": {"altar": 2, "enemy": 1}}, (11, 11))
@@ -73,3 +87,25 @@ def test_small_grid():
     altar_count = (scene.grid == "altar").sum()
     assert altar_count <= 2  # At most the requested number
     assert altar_count >= 0  # At least 0 if no space
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_placed_objects_stay_reachable(seed):
+    scene = render_in_corridor({"altar": 2}, seed)
+    assert (scene.grid == "altar").sum() == 2
+
+    passable = (scene.grid == "empty") | (scene.grid == "agent.agent")
+    labels, _ = label_components(passable)
+    assert all_adjacent(scene.grid == "altar", labels == labels[3, 3])
+
+
+def test_placement_gives_up_when_objects_would_be_cut_off(caplog):
+    # In a corridor, an object on each side of the agent cuts off the rest of the corridor.
+    scene = render_in_corridor({"altar": 3}, seed=0)
+    assert (scene.grid == "altar").sum() == 2
+    assert "Placed only 2 of 3 altar objects" in caplog.text
+
+
+def test_too_many_objects_for_reachable_cells():
+    with pytest.raises(ValueError, match="Too many objects"):
+        render_in_corridor({"altar": 7}, seed=0)
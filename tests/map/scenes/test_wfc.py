@@ -1,19 +1,46 @@
+import numpy as np
+import pytest
+from omegaconf import OmegaConf
+
+from metta.map.config import scenes_root
 from metta.map.scenes.wfc import WFC
+from metta.map.utils.pattern import Pattern, ascii_to_patterns_with_counts
 from tests.map.scenes.utils import render_scene
 
-
-def test_basic():
-    scene = render_scene(
-        WFC,
-        dict(
-            pattern="""
+PATTERN = """
         .#...
         ###..
         ###..
-            """,
-        ),
-        (20, 20),
-    )
+"""
+
+
+def test_basic():
+    scene = render_scene(WFC, dict(pattern=PATTERN), (20, 20))
 
     assert (scene.grid == "wall").sum() > 0
     assert (scene.grid == "empty").sum() > 0
+
+
+@pytest.mark.parametrize("next_node_heuristic", ["scanline", "mrv", "entropy"])
+def test_windows_are_sample_patterns(next_node_heuristic):
+    scene = render_scene(WFC, dict(pattern=PATTERN, next_node_heuristic=next_node_heuristic), (15, 12), seed=42)
+
+    sample_patterns = {pattern.index() for pattern, _ in ascii_to_patterns_with_counts(PATTERN, 3, True, "all")}
+    walls = scene.grid == "wall"
+    for y in range(walls.shape[0] - 2):
+        for x in range(walls.shape[1] - 2):
+            assert Pattern(walls, x, y, 3).index() in sample_patterns
+
+
+def test_seed_is_reproducible():
+    grids = [render_scene(WFC, dict(pattern=PATTERN), (16, 16), seed=7).grid for _ in range(2)]
+    assert np.array_equal(grids[0], grids[1])
+
+
+@pytest.mark.parametrize("config", sorted(scenes_root.glob("wfc/*.yaml")), ids=lambda path: path.stem)
+def test_benchmark_wfc_patterns(benchmark, config):
+    """Benchmark generating a room with each of the WFC pattern configs."""
+    params = OmegaConf.to_container(OmegaConf.load(config).params)
+
+    scene = benchmark.pedantic(render_scene, args=(WFC, params, (30, 30)), kwargs=dict(seed=0), rounds=1)
+    assert (scene.grid == "wall").sum() > 0
@@ -1,10 +1,14 @@
 import numpy as np
 import pytest
 
+from metta.map import mapgen
 from metta.map.mapgen import MapGen
+from metta.map.scenes import convchain
 from metta.map.scenes.inline_ascii import InlineAscii
 from metta.map.scenes.room_grid import RoomGrid
 from metta.map.scenes.transplant_scene import TransplantScene
+from metta.mettagrid.coded_grid import count_agents
+from metta.mettagrid.level_cache import LevelCache
 from tests.map.scenes.utils import assert_raw_grid
 
 
@@ -86,7 +90,30 @@ class TestMapGenInstances:
         expected_shape = (inner_h + 2 * border_width, inner_w + 2 * border_width)
         assert level.grid.shape == expected_shape
         assert isinstance(mg.root_scene, RoomGrid)
-        assert np.count_nonzero(np.char.startswith(level.grid, "agent")) == instances
+        assert count_agents(level.grid) == instances
+
+    def test_instances_render_as_one_batch(self, monkeypatch):
+        batch_sizes = []
+        original_sample = convchain.convchain_sample
+
+        def sample(*args, **kwargs):
+            fields = original_sample(*args, **kwargs)
+            batch_sizes.append(len(fields))
+            return fields
+
+        monkeypatch.setattr(convchain, "convchain_sample", sample)
+        mg = MapGen(
+            root={
+                "type": "metta.map.scenes.convchain.ConvChain",
+                "params": {"pattern": ".#.\n###\n.#.", "pattern_size": 2, "iterations": 2, "temperature": 1},
+            },
+            width=6,
+            height=6,
+            instances=5,
+        )
+        mg.build()
+
+        assert batch_sizes == [5]
 
     def test_num_agents(self):
         mg = MapGen(
@@ -122,7 +149,7 @@ class TestMapGenInstances:
 ###########
     """,
         )
-        assert np.count_nonzero(np.char.startswith(level.grid, "agent")) == 10
+        assert count_agents(level.grid) == 10
 
         assert isinstance(mg.root_scene, RoomGrid)
         assert isinstance(mg.root_scene.children[0], TransplantScene)
@@ -160,3 +187,49 @@ class TestMapGenLabels:
         size_labels = {"small", "medium", "large"}
         present = set(level.labels) & size_labels
         assert present == {expected_label}
+
+
+class TestMapGenCacheKey:
+    def make(self, **kwargs):
+        return MapGen(root={"type": "metta.map.scenes.maze.Maze", "params": {"algorithm": "kruskal"}}, **kwargs)
+
+    def test_unseeded_maps_are_not_cacheable(self):
+        assert self.make(width=11, height=11).cache_key() is None
+
+    def test_seeded_maps_are_keyed_by_config_and_seed(self, tmp_path):
+        mg = self.make(width=11, height=11, seed=3)
+        key = mg.cache_key()
+        level = mg.build()
+
+        # build() rewrites some fields on the instance, which must not leak into the key.
+        assert mg.cache_key() == key == self.make(width=11, height=11, seed=3).cache_key()
+        assert key != self.make(width=11, height=11, seed=4).cache_key()
+        assert key != self.make(width=13, height=11, seed=3).cache_key()
+
+        cache = LevelCache(tmp_path)
+        cache.put(key, level)
+        cached = cache.get(self.make(width=11, height=11, seed=3).cache_key())
+        assert cached is not None
+        assert np.array_equal(cached.grid.to_strings(), level.grid.to_strings())
+
+    def test_key_follows_referenced_files(self, tmp_path):
+        map_path = tmp_path / "map.map"
+        scene_path = tmp_path / "scene.yaml"
+        map_path.write_text("###\n#_#\n###\n")
+        scene_path.write_text(f"type: metta.map.scenes.ascii.Ascii\nparams:\n  uri: {map_path}\n")
+        key = MapGen(root=str(scene_path), seed=3).cache_key()
+        assert MapGen(root=str(scene_path), seed=3).cache_key() == key
+
+        # The ascii map referenced by the scene config changes
+        map_path.write_text("###\n#@#\n###\n")
+        map_key = MapGen(root=str(scene_path), seed=3).cache_key()
+        assert map_key != key
+
+        # The scene config itself changes
+        scene_path.write_text(f"type: metta.map.scenes.ascii.Ascii\nparams:\n  uri: {map_path}\nchildren: []\n")
+        assert MapGen(root=str(scene_path), seed=3).cache_key() not in (key, map_key)
+
+    def test_key_follows_generator_version(self, monkeypatch):
+        key = self.make(width=11, height=11, seed=3).cache_key()
+        monkeypatch.setattr(mapgen, "MAPGEN_VERSION", mapgen.MAPGEN_VERSION + 1)
+        assert self.make(width=11, height=11, seed=3).cache_key() != key
@@ -0,0 +1,97 @@
+from collections import deque
+
+import numpy as np
+import pytest
+
+from metta.map.utils.connectivity import (
+    all_adjacent,
+    carve_tunnels,
+    closest_cells,
+    component_sizes,
+    distance_field,
+    label_components,
+)
+from metta.map.utils.pattern import parse_ascii_into_grid
+
+
+def reference_distances(sources: np.ndarray, passable: np.ndarray) -> np.ndarray:
+    height, width = sources.shape
+    distances = np.full(sources.shape, np.inf)
+    queue = deque(zip(*np.nonzero(sources), strict=True))
+    distances[sources] = 0
+    while queue:
+        y, x = queue.popleft()
+        for dy, dx in [(-1, 0), (0, 1), (1, 0), (0, -1)]:
+            ny, nx = y + dy, x + dx
+            if 0 <= ny < height and 0 <= nx < width and passable[ny, nx] and distances[ny, nx] == np.inf:
+                distances[ny, nx] = distances[y, x] + 1
+                queue.append((ny, nx))
+    return distances
+
+
+def test_label_components():
+    walls = parse_ascii_into_grid(
+        """
+        ..#..
+        ..#..
+        ####.
+        .#...
+        """
+    )
+    labels, num_components = label_components(~walls)
+
+    assert num_components == 3
+    assert labels[0, 0] == 1 and labels[0, 3] == 2 and labels[3, 0] == 3
+    assert labels[3, 4] == labels[0, 3]
+    assert np.all(labels[walls] == 0)
+    assert component_sizes(labels, num_components).tolist() == [4, 8, 1]
+
+
+def test_all_adjacent():
+    region = np.zeros((3, 3), dtype=bool)
+    region[1, 1] = True
+    cells = np.zeros((3, 3), dtype=bool)
+
+    cells[0, 1] = cells[1, 1] = True
+    assert all_adjacent(cells, region)
+    cells[0, 0] = True
+    assert not all_adjacent(cells, region)
+
+
+@pytest.mark.parametrize("obstructed", [False, True])
+def test_distance_field_matches_bfs(obstructed):
+    rng = np.random.default_rng(0)
+    passable = rng.random((40, 30)) < 0.6 if obstructed else np.ones((40, 30), dtype=bool)
+    sources = np.zeros((40, 30), dtype=bool)
+    sources[[3, 20, 35], [5, 29, 0]] = True
+
+    distances = distance_field(sources, passable if obstructed else None)
+
+    np.testing.assert_array_equal(distances, reference_distances(sources, passable))
+
+
+def test_distance_field_without_sources_is_unreachable():
+    assert np.all(distance_field(np.zeros((3, 4), dtype=bool)) == np.inf)
+
+
+def test_carve_tunnels_connects_components():
+    walls = parse_ascii_into_grid(
+        """
+        ...#.....
+        ...#.###.
+        ####.#.#.
+        .....###.
+        ##.......
+        """
+    )
+    labels, num_components = label_components(~walls)
+    largest = int(np.argmax(component_sizes(labels, num_components))) + 1
+    distances = distance_field(labels == largest)
+    others = [label for label in range(1, num_components + 1) if label != largest]
+
+    starts = closest_cells(distances, labels, others)
+    tunnels = carve_tunnels(distances, starts, np.random.default_rng(0))
+
+    assert np.all(distances[tuple(starts.T)] == 2)
+    assert np.count_nonzero(tunnels & walls) == 2
+    assert label_components(~walls | tunnels)[1] == 1
@@ -0,0 +1,101 @@
+import numpy as np
+import pytest
+from omegaconf import DictConfig
+
+from metta.map.load import Load
+from metta.map.load_random_from_index import LoadRandomFromIndex
+from metta.map.utils.storable_map import StorableMap
+from metta.map.utils.storable_map_index import StorableMapIndex, parse_filter
+
+
+def save_map(dir, name: str, width: int, height: int, agents: int, rows: int):
+    grid = np.full((height, width), "empty", dtype="<U50")
+    grid.flat[:agents] = "agent.agent"
+    config = DictConfig({"root": {"type": "metta.map.scenes.room_grid.RoomGrid", "params": {"rows": rows}}})
+    StorableMap(grid, metadata={"labels": ["test"]}, config=config).save(str(dir / f"{name}.yaml"))
+    return str(dir / f"{name}.yaml")
+
+
+@pytest.fixture
+def map_dir(tmp_path):
+    save_map(tmp_path, "small", 5, 4, agents=1, rows=2)
+    save_map(tmp_path, "medium", 10, 8, agents=2, rows=3)
+    save_map(tmp_path, "large", 20, 16, agents=4, rows=3)
+    return tmp_path
+
+
+def names(uris: list[str]) -> list[str]:
+    return sorted(uri.rsplit("/", 1)[-1].removesuffix(".yaml") for uri in uris)
+
+
+def test_find_maps(map_dir):
+    StorableMapIndex.create(str(map_dir))
+    index = StorableMapIndex.load(str(map_dir))
+
+    assert names(index.find_maps([])) == ["large", "medium", "small"]
+    assert names(index.find_maps([("width", ">=", 10)])) == ["large", "medium"]
+    assert names(index.find_maps([("num_agents", "<", 4), ("height", "!=", 4)])) == ["medium"]
+    # Equality on string values, as sent by gridworks.
+    assert names(index.find_maps([("config.root.params.rows", "3")])) == ["large", "medium"]
+    assert names(index.find_maps([("config.root.params.rows", "<=", "2")])) == ["small"]
+    assert names(index.find_maps([("metadata.labels.0", "test"), ("width", "=", 20)])) == ["large"]
+    assert index.find_maps([("config.root.params.missing", "1")]) == []
+
+
+def test_value_index(map_dir):
+    index = StorableMapIndex.create(str(map_dir))
+    value_index = index.value_index()
+
+    assert names(value_index["config.root.params.rows"]["3"]) == ["large", "medium"]
+    assert names(value_index["num_agents"]["1"]) == ["small"]
+
+
+def test_refresh_only_reads_new_maps(map_dir, monkeypatch):
+    StorableMapIndex.create(str(map_dir))
+    (map_dir / "small.yaml").unlink()
+    new_uri = save_map(map_dir, "new", 6, 6, agents=1, rows=5)
+
+    read_uris = []
+    original_from_uri = StorableMap.from_uri
+
+    def from_uri(uri: str) -> StorableMap:
+        read_uris.append(uri)
+        return original_from_uri(uri)
+
+    monkeypatch.setattr(StorableMap, "from_uri", staticmethod(from_uri))
+    StorableMapIndex.refresh(str(map_dir))
+
+    assert read_uris == [new_uri]
+    index = StorableMapIndex.load(str(map_dir))
+    assert names(index.find_maps([])) == ["large", "medium", "new"]
+    assert names(index.find_maps([("config.root.params.rows", ">", 4)])) == ["new"]
+
+
+def test_parse_filter():
+    assert parse_filter("width>=10") == ("width", ">=", "10")
+    assert parse_filter("config.a.b=x=y") == ("config.a.b", "=", "x=y")
+    with pytest.raises(ValueError):
+        parse_filter("width")
+
+
+def test_load_random_from_index(map_dir):
+    index = StorableMapIndex.create(str(map_dir))
+
+    for _ in range(5):
+        level = LoadRandomFromIndex(index.uri, filters=[["num_agents", ">=", 2]]).build()
+        assert level.grid.shape in [(8, 10), (16, 20)]
+
+    with pytest.raises(ValueError, match="No maps"):
+        LoadRandomFromIndex(index.uri, filters=[["width", ">", 100]])
+
+
+def test_load_cache_key_follows_map_contents(tmp_path):
+    uri = save_map(tmp_path, "map", 5, 4, agents=1, rows=2)
+    load = Load(uri)
+    key = load.cache_key()
+    assert load.build().grid.shape == (4, 5)
+    assert Load(uri).cache_key() == key
+
+    # Rewritten under the same URI
+    save_map(tmp_path, "map", 6, 4, agents=1, rows=2)
+    assert Load(uri).cache_key() != key
@@ -0,0 +1,95 @@
+"""
+Unit tests for the Experience buffer in metta.rl.experience.
+"""
+
+import numpy as np
+import torch
+from gymnasium import spaces
+
+from metta.rl.experience import Experience
+
+
+def make_experience(total_agents: int = 4, agents_per_batch: int = 2) -> Experience:
+    return Experience(
+        total_agents=total_agents,
+        batch_size=32,
+        bptt_horizon=4,
+        minibatch_size=16,
+        max_minibatch_size=16,
+        obs_space=spaces.Box(low=0, high=255, shape=(3, 3), dtype=np.uint8),
+        atn_space=spaces.MultiDiscrete([5, 5]),
+        device="cpu",
+        hidden_size=8,
+        num_lstm_layers=1,
+        agents_per_batch=agents_per_batch,
+    )
+
+
+class TestExperience:
+    """Test suite for the Experience class."""
+
+    def test_copy_lstm_state_from(self):
+        """A second buffer continues from the LSTM states of the buffer it alternates with."""
+        filled = make_experience()
+        empty = make_experience()
+
+        h = torch.ones(1, 2, 8)
+        c = torch.full((1, 2, 8), 2.0)
+        filled.set_lstm_state(2, h, c)
+
+        empty.copy_lstm_state_from(filled)
+
+        lstm_h, lstm_c = empty.get_lstm_state(2)
+        assert lstm_h is not None and lstm_c is not None
+        assert torch.equal(lstm_h, h)
+        assert torch.equal(lstm_c, c)
+
+        # Replacing a state in one buffer does not leak into the other
+        empty.set_lstm_state(2, torch.zeros(1, 2, 8), torch.zeros(1, 2, 8))
+        assert torch.equal(filled.get_lstm_state(2)[0], h)
+
+    def test_reset_for_rollout_keeps_lstm_state(self):
+        """Resetting rollout tracking does not drop the carried-over LSTM states."""
+        experience = make_experience()
+        h = torch.ones(1, 2, 8)
+        experience.set_lstm_state(0, h, h)
+        experience.full_rows = experience.segments
+
+        experience.reset_for_rollout()
+
+        assert not experience.ready_for_training
+        assert torch.equal(experience.get_lstm_state(0)[0], h)
+
+    def test_write_observations_matches_store(self):
+        """Observations written straight into storage end up where store() would have put them."""
+        direct = make_experience()
+        legacy = make_experience()
+        rng = np.random.default_rng(0)
+
+        for _ in range(3 * direct.bptt_horizon):
+            for start in (0, 2):
+                env_id = slice(start, start + 2)
+                obs = rng.integers(0, 255, size=(2, 3, 3), dtype=np.uint8)
+                kwargs = dict(
+                    actions=torch.zeros(2, 2, dtype=torch.int32),
+                    logprobs=torch.zeros(2),
+                    rewards=torch.zeros(2),
+                    dones=torch.zeros(2),
+                    truncations=torch.zeros(2),
+                    values=torch.zeros(2),
+                    env_id=env_id,
+                    mask=torch.ones(2, dtype=torch.bool),
+                )
+
+                written = direct.write_observations(obs, env_id)
+                direct.store(obs=written if written is not None else torch.as_tensor(obs), **kwargs)
+                legacy.store(obs=torch.as_tensor(obs), **kwargs)
+
+        assert torch.equal(direct.obs, legacy.obs)
+
+    def test_write_observations_declines_wrapping_segments(self):
+        """A batch whose segments wrap around the end of storage falls back to store()."""
+        experience = make_experience()
+        experience._batch_slots[2] = [experience.segments - 1, 0]
+
+        assert experience.write_observations(np.zeros((2, 3, 3), dtype=np.uint8), slice(2, 4)) is None
@@ -0,0 +1,133 @@
+"""
+Microbenchmark for the rollout observation path: bytes of observation data copied per agent-step with and without
+writing observations straight from the vecenv buffer into Experience storage (trainer.zero_copy_obs).
+"""
+
+import contextlib
+
+import numpy as np
+import pytest
+import torch
+from gymnasium import spaces
+from torch.utils._python_dispatch import TorchDispatchMode
+
+from metta.rl.experience import Experience
+from metta.rl.util.rollout import get_observation
+
+NUM_AGENTS = 64
+OBS_SHAPE = (200, 3)  # token observations
+
+_COPY_OPS = {
+    torch.ops.aten.copy_.default,
+    torch.ops.aten._to_copy.default,
+    torch.ops.aten.index_put_.default,
+    torch.ops.aten.index_put.default,
+}
+
+
+class CopyCounter(TorchDispatchMode):
+    """Counts bytes written by copy-like aten ops."""
+
+    def __init__(self):
+        super().__init__()
+        self.bytes_copied = 0
+
+    def __torch_dispatch__(self, func, types, args=(), kwargs=None):
+        out = func(*args, **(kwargs or {}))
+        if func in _COPY_OPS:
+            # The written tensor is the source for copy_ and the values for index_put
+            src = args[2] if func in (torch.ops.aten.index_put_.default, torch.ops.aten.index_put.default) else out
+            if src.dtype == torch.uint8:
+                self.bytes_copied += src.numel() * src.element_size()
+        return out
+
+
+class FakeVecEnv:
+    """Stands in for a pufferlib vecenv whose observations live in a (shared-memory) numpy buffer."""
+
+    def __init__(self):
+        self.observations = np.random.default_rng(0).integers(0, 255, (NUM_AGENTS, *OBS_SHAPE), dtype=np.uint8)
+
+    def recv(self):
+        zeros = np.zeros(NUM_AGENTS, dtype=np.float32)
+        env_id = np.arange(NUM_AGENTS)
+        return self.observations, zeros, zeros, zeros, [], env_id, np.ones(NUM_AGENTS, dtype=bool)
+
+
+class NullTimer:
+    def __call__(self, name):
+        return contextlib.nullcontext()
+
+
+def make_experience(device: torch.device, cpu_offload: bool) -> Experience:
+    return Experience(
+        total_agents=NUM_AGENTS,
+        batch_size=NUM_AGENTS * 16,
+        bptt_horizon=16,
+        minibatch_size=NUM_AGENTS * 16,
+        max_minibatch_size=NUM_AGENTS * 16,
+        obs_space=spaces.Box(low=0, high=255, shape=OBS_SHAPE, dtype=np.uint8),
+        atn_space=spaces.MultiDiscrete([9, 10]),
+        device=device,
+        hidden_size=8,
+        cpu_offload=cpu_offload,
+        num_lstm_layers=1,
+    )
+
+
+def rollout_step(vecenv, experience: Experience, device: torch.device, zero_copy_obs: bool) -> None:
+    o, r, d, t, _, env_id, mask, _ = get_observation(vecenv, device, NullTimer(), experience if zero_copy_obs else None)
+    experience.store(
+        obs=o,
+        actions=torch.zeros(NUM_AGENTS, 2, dtype=torch.int32, device=device),
+        logprobs=torch.zeros(NUM_AGENTS, device=device),
+        rewards=r,
+        dones=d,
+        truncations=t,
+        values=torch.zeros(NUM_AGENTS, device=device),
+        env_id=env_id,
+        mask=mask,
+    )
+
+
+def bytes_copied_per_agent_step(device: torch.device, cpu_offload: bool, zero_copy_obs: bool) -> float:
+    vecenv = FakeVecEnv()
+    experience = make_experience(device, cpu_offload)
+    steps = experience.bptt_horizon
+    with CopyCounter() as counter:
+        for _ in range(steps):
+            rollout_step(vecenv, experience, device, zero_copy_obs)
+    return counter.bytes_copied / (steps * NUM_AGENTS)
+
+
+DEVICE_CONFIGS = [pytest.param("cpu", False, id="cpu")]
+if torch.cuda.is_available():
+    DEVICE_CONFIGS += [pytest.param("cuda", False, id="cuda"), pytest.param("cuda", True, id="cuda-cpu_offload")]
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="On CPU, observations are copied once either way")
+def test_zero_copy_obs_copies_less():
+    device = torch.device("cuda")
+    before = bytes_copied_per_agent_step(device, cpu_offload=False, zero_copy_obs=False)
+    after = bytes_copied_per_agent_step(device, cpu_offload=False, zero_copy_obs=True)
+
+    # Observations go straight from host memory into device storage instead of via a temporary device tensor
+    assert before - after >= int(np.prod(OBS_SHAPE))
+
+
+@pytest.mark.parametrize("zero_copy_obs", [False, True], ids=["copy", "zero_copy"])
+@pytest.mark.parametrize("device,cpu_offload", DEVICE_CONFIGS)
+def test_obs_path_benchmark(benchmark, device, cpu_offload, zero_copy_obs):
+    device = torch.device(device)
+    vecenv = FakeVecEnv()
+    experience = make_experience(device, cpu_offload)
+
+    def run():
+        experience.reset_for_rollout()
+        for _ in range(experience.bptt_horizon):
+            rollout_step(vecenv, experience, device, zero_copy_obs)
+
+    benchmark(run)
+    benchmark.extra_info["bytes_copied_per_agent_step"] = bytes_copied_per_agent_step(
+        device, cpu_offload, zero_copy_obs
+    )
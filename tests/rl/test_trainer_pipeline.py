@@ -0,0 +1,111 @@
+"""
+Tests for the pipelined rollout/train step of MettaTrainer (trainer.async_rollout), with stub rollouts and updates.
+"""
+
+import copy
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+import torch
+
+from metta.common.profiling.stopwatch import Stopwatch, with_instance_timer
+from metta.rl.trainer import MettaTrainer
+from metta.rl.util.rollout import run_policy_inference
+
+PHASE_SECONDS = 0.1
+
+
+class StubExperience:
+    """Stands in for an Experience buffer; remembers which rollout filled it."""
+
+    def __init__(self):
+        self.rollout = None
+        self.lstm_source = None
+
+    def copy_lstm_state_from(self, other: "StubExperience") -> None:
+        self.lstm_source = other
+
+
+class PipelineTrainer(MettaTrainer):
+    """MettaTrainer with just the state the pipelined step uses, and sleeping stubs for rollouts and updates."""
+
+    def __init__(self):
+        self.timer = Stopwatch()
+        self.device = torch.device("cpu")
+        self.policy = torch.nn.Linear(1, 1, bias=False)
+        torch.nn.init.zeros_(self.policy.weight)
+        self.experience = StubExperience()
+        self._next_experience = StubExperience()
+        self._rollout_policy = copy.deepcopy(self.policy)
+        self._rollout_executor = ThreadPoolExecutor(max_workers=1)
+        self._rollout_stream = None
+        self._experience_ready = False
+        self._overlap_fraction = 0.0
+        self.agent_step = 0
+        self.stats = {}
+
+        self.rollout_weights: list[float] = []  # policy weight each rollout acted with
+        self.trained_on: list[int] = []  # rollout each update trained on
+
+    def _collect_rollout(self, experience, policy):
+        time.sleep(PHASE_SECONDS)
+        self.rollout_weights.append(policy.weight.item())
+        experience.rollout = len(self.rollout_weights)
+        return [], 10
+
+    @with_instance_timer("_train")
+    def _train(self):
+        self.trained_on.append(self.experience.rollout)
+        time.sleep(PHASE_SECONDS)
+        with torch.no_grad():
+            self.policy.weight += 1
+
+
+def test_each_update_trains_on_the_previous_rollout():
+    trainer = PipelineTrainer()
+    buffers = [trainer.experience, trainer._next_experience]
+
+    for step in range(1, 4):
+        trainer._pipelined_rollout_and_train()
+
+        # The update trained on the rollout collected before it; the one collected meanwhile is trained on next
+        assert trainer.trained_on[-1] == step
+        assert trainer.experience.rollout == step + 1
+        # The buffers alternate, and each rollout continues from the LSTM state of the previous one
+        assert trainer.experience is buffers[step % 2]
+        assert trainer.experience.lstm_source is trainer._next_experience
+
+    # The first rollout runs with the live policy, the others with a snapshot from before the concurrent update
+    assert trainer.rollout_weights == [0.0, 0.0, 1.0, 2.0]
+    assert trainer.policy.weight.item() == 3.0
+    assert trainer.agent_step == 40
+
+
+def test_rollout_overlaps_training():
+    trainer = PipelineTrainer()
+    trainer._pipelined_rollout_and_train()
+
+    # Both phases take as long and run concurrently, so they overlap for most of the wall time
+    wall_time = trainer.timer.get_last_elapsed("_rollout_train")
+    assert wall_time < 1.5 * PHASE_SECONDS
+    assert trainer._overlap_fraction > 0.5
+
+
+def test_policy_inference_only_waits_for_its_own_stream(monkeypatch):
+    """On the rollout thread, inference must not wait for the learner's kernels on the other stream."""
+    device_sync = MagicMock()
+    stream = MagicMock()
+    monkeypatch.setattr(torch.cuda, "synchronize", device_sync)
+    monkeypatch.setattr(torch.cuda, "current_stream", MagicMock(return_value=stream))
+
+    experience = MagicMock()
+    experience.get_lstm_state.return_value = (None, None)
+
+    def policy(obs, state):
+        return torch.zeros((2, 2), dtype=torch.long), torch.zeros(2), None, torch.zeros((2, 1)), None
+
+    run_policy_inference(policy, torch.zeros((2, 1)), experience, 0, "cuda:0")  # type: ignore[arg-type]
+
+    stream.synchronize.assert_called_once()
+    device_sync.assert_not_called()
@@ -0,0 +1,159 @@
+"""
+Unit tests for the thread-based vectorizations in metta.rl.vecenv.
+"""
+
+import numpy as np
+from gymnasium import spaces
+from omegaconf import OmegaConf
+
+from metta.mettagrid.curriculum.core import SingleTaskCurriculum
+from metta.mettagrid.mettagrid_env import MettaGridEnv
+from metta.mettagrid.util.hydra import get_cfg
+from metta.rl.vecenv import Batched, Threaded
+
+AGENTS_PER_ENV = 2
+EPISODE_LENGTH = 3
+
+
+class CountingEnv:
+    """Stands in for MettaGridEnv: writes its step count into its buffers and ends episodes after a few steps."""
+
+    single_observation_space = spaces.Box(low=0, high=255, shape=(4, 3), dtype=np.uint8)
+    single_action_space = spaces.MultiDiscrete([5, 5])
+    num_agents = AGENTS_PER_ENV
+
+    def __init__(self, buf=None, shared_lock=None, **kwargs):
+        assert shared_lock is not None
+        if buf is None:
+            self.observations = np.zeros((AGENTS_PER_ENV, 4, 3), dtype=np.uint8)
+            self.rewards = np.zeros(AGENTS_PER_ENV, dtype=np.float32)
+            self.terminals = np.zeros(AGENTS_PER_ENV, dtype=bool)
+            self.truncations = np.zeros(AGENTS_PER_ENV, dtype=bool)
+            self.masks = np.ones(AGENTS_PER_ENV, dtype=bool)
+            self.actions = np.zeros((AGENTS_PER_ENV, 2), dtype=np.int32)
+        else:
+            for name, view in buf.items():
+                setattr(self, name, view)
+        self.done = False
+        self.resets = 0
+        self._steps = 0
+
+    def reset(self, seed=None):
+        self.resets += 1
+        self._steps = 0
+        self.done = False
+        self.observations[:] = 0
+        self.terminals[:] = False
+        return self.observations, {}
+
+    def step(self, actions):
+        self._steps += 1
+        self.observations[:] = self._steps
+        self.rewards[:] = actions[:, 0]
+        infos = {}
+        if self._steps == EPISODE_LENGTH:
+            self.terminals[:] = True
+            self.done = True
+            infos = {"episode_steps": self._steps}
+        return self.observations, self.rewards, self.terminals, self.truncations, infos
+
+    def close(self):
+        pass
+
+
+def make_threaded(num_envs: int = 4, batch_size: int = 2) -> Threaded:
+    return Threaded(CountingEnv, {}, num_envs=num_envs, num_workers=2, batch_size=batch_size)
+
+
+class TestThreaded:
+    def test_envs_write_into_shared_buffers(self):
+        vecenv = make_threaded()
+        assert vecenv.num_agents == 4 * AGENTS_PER_ENV
+        assert vecenv.agents_per_batch == 2 * AGENTS_PER_ENV
+        for env_idx, env in enumerate(vecenv.envs):
+            assert np.shares_memory(env.observations, vecenv.observations)
+            env.observations[:] = env_idx + 1
+        np.testing.assert_array_equal(vecenv.observations[:, 0, 0], np.repeat([1, 2, 3, 4], AGENTS_PER_ENV))
+        vecenv.close()
+
+    def test_recv_cycles_through_batches(self):
+        vecenv = make_threaded()
+        vecenv.async_reset(0)
+
+        seen = []
+        for step in range(4):
+            o, r, d, t, infos, env_id, mask = vecenv.recv()
+            seen.append(list(env_id))
+            vecenv.send(np.full((len(env_id), 2), step, dtype=np.int32))
+
+        assert seen == [[0, 1, 2, 3], [4, 5, 6, 7], [0, 1, 2, 3], [4, 5, 6, 7]]
+        vecenv.close()
+
+    def test_actions_reach_their_envs(self):
+        vecenv = make_threaded(num_envs=2, batch_size=2)
+        vecenv.reset(seed=0)
+
+        actions = np.array([[1, 0], [1, 0], [4, 0], [4, 0]], dtype=np.int32)
+        o, r, d, t, infos = vecenv.step(actions)
+
+        np.testing.assert_array_equal(r, [1, 1, 4, 4])
+        assert (o == 1).all()
+        vecenv.close()
+
+    def test_done_envs_reset_on_next_step(self):
+        vecenv = make_threaded(num_envs=2, batch_size=2)
+        vecenv.reset(seed=0)
+        actions = np.zeros((2 * AGENTS_PER_ENV, 2), dtype=np.int32)
+
+        for _ in range(EPISODE_LENGTH - 1):
+            _, _, d, _, infos = vecenv.step(actions)
+            assert not d.any() and infos == []
+        _, _, d, _, infos = vecenv.step(actions)
+        assert d.all()
+        assert infos == [{"episode_steps": EPISODE_LENGTH}] * 2
+
+        o, _, d, _, _ = vecenv.step(actions)
+        assert not d.any()
+        assert (o == 0).all()
+        assert all(env.resets == 2 for env in vecenv.envs)
+        vecenv.close()
+
+
+def make_mettagrid_vecenv(vecenv_cls, map_path, num_envs: int = 4, batch_size: int = 2):
+    cfg = get_cfg("benchmark")
+    cfg.game.num_agents = 1
+    cfg.game.max_steps = EPISODE_LENGTH
+    cfg.game.map_builder = OmegaConf.create({"_target_": "metta.mettagrid.room.ascii.Ascii", "uri": str(map_path)})
+    env_kwargs = {"curriculum": SingleTaskCurriculum("batched", cfg), "render_mode": None}
+    return vecenv_cls(MettaGridEnv, env_kwargs, num_envs=num_envs, num_workers=2, batch_size=batch_size)
+
+
+class TestBatched:
+    def test_matches_threaded(self, tmp_path):
+        map_path = tmp_path / "map.txt"
+        map_path.write_text("#######\n#A.._.#\n#..#..#\n#######\n")
+        vecenvs = [make_mettagrid_vecenv(cls, map_path) for cls in (Threaded, Batched)]
+        for vecenv in vecenvs:
+            vecenv.async_reset(0)
+
+        rng = np.random.default_rng(0)
+        num_actions = len(vecenvs[0].driver_env.action_names)
+        episodes = 0
+        for _ in range(4 * EPISODE_LENGTH):
+            results = [vecenv.recv() for vecenv in vecenvs]
+            (o, r, d, t, infos, env_id, _), (batched_o, batched_r, batched_d, batched_t, batched_infos, *_) = results
+            np.testing.assert_array_equal(batched_o, o)
+            np.testing.assert_array_equal(batched_r, r)
+            np.testing.assert_array_equal(batched_d, d)
+            np.testing.assert_array_equal(batched_t, t)
+            assert [sorted(info) for info in batched_infos] == [sorted(info) for info in infos]
+            episodes += sum("curriculum_task_probs" in info for info in infos)
+
+            actions = np.stack([rng.integers(0, num_actions, len(env_id)), np.zeros(len(env_id))], axis=1)
+            for vecenv in vecenvs:
+                vecenv.send(actions.astype(np.int32))
+
+        # Every env finished episodes, and was reset and attached to its batch again in between.
+        assert episodes >= 4
+        for vecenv in vecenvs:
+            vecenv.close()
@@ -0,0 +1,183 @@
+"""Test that a PolicyServer batches forward requests from concurrent clients and keeps their LSTM states apart."""
+
+import os
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+import torch
+
+from metta.agent.policy_metadata import PolicyMetadata
+from metta.agent.policy_record import PolicyRecord
+from metta.agent.policy_state import PolicyState
+from metta.sim.policy_server import PolicyServer, RemotePolicy, authkey_path
+
+
+class CountingPolicy(torch.nn.Module):
+    """Acts with (first observation feature, steps taken so far), keeping the step count in the LSTM state."""
+
+    def __init__(self):
+        super().__init__()
+        self.batch_sizes = []
+        self.envs = []
+
+    def initialize_to_environment(self, features, action_names, action_max_params, device):
+        self.envs.append(action_names)
+
+    def forward(self, obs, state):
+        if obs.shape[1] == 0:
+            raise ValueError("empty observations")
+        self.batch_sizes.append(obs.shape[0])
+        steps = torch.zeros((1, obs.shape[0], 1)) if state.lstm_h is None else state.lstm_h
+        state.lstm_h = steps + 1
+        state.lstm_c = steps + 1
+        actions = torch.stack([obs[:, 0].long(), steps[0, :, 0].long()], dim=1)
+        return actions, None, None, None, None
+
+
+class FakePolicyStore:
+    def __init__(self, uris: list[str]):
+        self.loaded = []
+        self.uris = uris
+        # Loads of "file://slow.pt" wait for this, like a download would.
+        self.slow_load_done = threading.Event()
+
+    def policy_record(self, uri):
+        if uri not in self.uris:
+            raise ValueError(f"No policy at {uri}")
+        if uri == "file://slow.pt":
+            self.slow_load_done.wait(timeout=10)
+        self.loaded.append(uri)
+        pr = PolicyRecord(None, uri, uri, PolicyMetadata())  # type: ignore
+        pr.policy = CountingPolicy()
+        return pr
+
+
+@pytest.fixture
+def server(tmp_path):
+    store = FakePolicyStore(["file://a.pt"])
+    # A long max_wait_s, so that the test doesn't depend on timing: batches close once every client has a request in.
+    server = PolicyServer(store, str(tmp_path / "policy.sock"), max_wait_s=5.0)  # type: ignore
+    server.start()
+    yield server
+    server.close()
+
+
+def test_concurrent_requests_share_a_forward_pass(server):
+    clients = [RemotePolicy(server.address, "file://a.pt") for _ in range(2)]
+    for client in clients:
+        client.initialize_to_environment({}, ["noop", "move"], [0, 1], "cpu")
+    observations = [torch.tensor([[10], [11], [12], [13]]), torch.tensor([[20], [21], [22]])]
+    states = [PolicyState(), PolicyState()]
+    results = [[], []]
+
+    def play(i):
+        for _ in range(2):
+            actions, *_ = clients[i](observations[i], states[i])
+            results[i].append(actions)
+
+    threads = [threading.Thread(target=play, args=(i,)) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    for obs, state, (first, second) in zip(observations, states, results, strict=True):
+        assert first.tolist() == [[o, 0] for o in obs[:, 0].tolist()]
+        assert second.tolist() == [[o, 1] for o in obs[:, 0].tolist()]
+        assert state.lstm_h.shape == (1, len(obs), 1)
+        assert (state.lstm_h == 2).all()
+
+    # Both clients play the same env, so they share one policy, loaded once.
+    policy = server._policies[0]
+    assert server._policy_store.loaded == ["file://a.pt"]
+    assert policy.envs == [["noop", "move"]]
+    assert policy.batch_sizes == [7, 7]
+    for client in clients:
+        client.close()
+
+
+def test_each_env_gets_its_own_copy_of_the_policy(server):
+    first = RemotePolicy(server.address, "file://a.pt")
+    second = RemotePolicy(server.address, "file://a.pt")
+    first.initialize_to_environment({}, ["noop"], [0], "cpu")
+    second.initialize_to_environment({}, ["noop", "attack"], [0, 9], "cpu")
+
+    assert [policy.envs for policy in server._policies] == [[["noop"]], [["noop"], ["noop", "attack"]]]
+    assert server._policy_store.loaded == ["file://a.pt"]
+    first.close()
+    second.close()
+
+
+def test_errors_are_raised_in_the_client(server):
+    missing = RemotePolicy(server.address, "file://missing.pt")
+    with pytest.raises(RuntimeError, match="No policy at file://missing.pt"):
+        missing.initialize_to_environment({}, ["noop"], [0], "cpu")
+    missing.close()
+
+    client = RemotePolicy(server.address, "file://a.pt")
+    with pytest.raises(RuntimeError, match="must be initialized"):
+        client(torch.zeros((1, 1)), PolicyState())
+    client.initialize_to_environment({}, ["noop"], [0], "cpu")
+    with pytest.raises(RuntimeError, match="empty observations"):
+        client(torch.zeros((2, 0)), PolicyState())
+
+    # The server keeps serving after a failed request.
+    actions, *_ = client(torch.tensor([[5]]), PolicyState())
+    assert actions.tolist() == [[5, 0]]
+    client.close()
+
+
+def test_clients_must_authenticate(server):
+    with pytest.raises(AuthenticationError):
+        RemotePolicy(server.address, "file://a.pt", authkey=b"not the key")
+
+    # Clients read the key the server wrote next to its socket, which only its user can read.
+    client = RemotePolicy(server.address, "file://a.pt")
+    client.initialize_to_environment({}, ["noop"], [0], "cpu")
+    actions, *_ = client(torch.tensor([[5]]), PolicyState())
+    assert actions.tolist() == [[5, 0]]
+    assert os.stat(authkey_path(server.address)).st_mode & 0o777 == 0o600
+    client.close()
+
+
+def test_malformed_requests_are_answered_with_errors(server):
+    conn = Client(server.address, family="AF_UNIX", authkey=server.authkey)
+    for message in [("forward", 0, "not an array", None, None), ("forward", 0), ("init",), "not a tuple"]:
+        conn.send(message)
+        status, _ = conn.recv()
+        assert status == "error"
+    conn.close()
+
+    # The server keeps serving.
+    client = RemotePolicy(server.address, "file://a.pt")
+    client.initialize_to_environment({}, ["noop"], [0], "cpu")
+    actions, *_ = client(torch.tensor([[5]]), PolicyState())
+    assert actions.tolist() == [[5, 0]]
+    client.close()
+
+
+def test_slow_loads_dont_hold_up_other_clients(tmp_path):
+    store = FakePolicyStore(["file://a.pt", "file://slow.pt"])
+    server = PolicyServer(store, str(tmp_path / "policy.sock"))  # type: ignore
+    server.start()
+    client = RemotePolicy(server.address, "file://a.pt")
+    client.initialize_to_environment({}, ["noop"], [0], "cpu")
+
+    slow = RemotePolicy(server.address, "file://slow.pt")
+    loading = threading.Thread(target=slow.initialize_to_environment, args=({}, ["noop"], [0], "cpu"))
+    loading.start()
+    for _ in range(3):
+        actions, *_ = client(torch.tensor([[5]]), PolicyState())
+        assert actions.tolist() == [[5, 0]]
+    assert store.loaded == ["file://a.pt"]
+
+    store.slow_load_done.set()
+    loading.join(timeout=10)
+    assert store.loaded == ["file://a.pt", "file://slow.pt"]
+    actions, *_ = slow(torch.tensor([[7]]), PolicyState())
+    assert actions.tolist() == [[7, 0]]
+    client.close()
+    slow.close()
+    server.close()
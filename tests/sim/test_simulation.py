@@ -0,0 +1,244 @@
+"""Test that Simulation assigns agent slots to the candidate and a pool of opponents, one forward pass per policy."""
+
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+from hydra import compose, initialize_config_dir
+from hydra.core.global_hydra import GlobalHydra
+from omegaconf import OmegaConf
+
+from metta.agent.policy_metadata import PolicyMetadata
+from metta.agent.policy_record import PolicyRecord
+from metta.common.util.fs import get_repo_root
+from metta.common.util.resolvers import register_resolvers
+from metta.sim.policy_server import PolicyServer
+from metta.sim.simulation import Simulation
+from metta.sim.simulation_config import SingleEnvSimulationConfig
+
+AGENTS_PER_ENV = 6
+
+
+class ConstantPolicy(torch.nn.Module):
+    """Always takes action `action_type`, so the stitched actions show which policy acted for each agent."""
+
+    def __init__(self, action_type: int):
+        super().__init__()
+        self.action_type = action_type
+        self.batch_sizes = []
+
+    def activate_actions(self, action_names, action_max_params, device):
+        pass
+
+    def forward(self, obs, state):
+        self.batch_sizes.append(obs.shape[0])
+        actions = torch.zeros((obs.shape[0], 2), dtype=torch.long, device=obs.device)
+        actions[:, 0] = self.action_type
+        return actions, None, None, None, None
+
+
+class FakePolicyStore:
+    def __init__(self, prs: dict[str, PolicyRecord]):
+        self.prs = prs
+
+    def policy_record(self, uri):
+        return self.prs[uri]
+
+
+def make_pr(name: str, action_type: int) -> PolicyRecord:
+    pr = PolicyRecord(None, name, f"file://{name}.pt", PolicyMetadata())  # type: ignore
+    pr.policy = ConstantPolicy(action_type)
+    return pr
+
+
+@pytest.fixture
+def env_cfg():
+    register_resolvers()
+    GlobalHydra.instance().clear()
+    with initialize_config_dir(config_dir=str(get_repo_root() / "configs"), version_base=None):
+        cfg = compose(config_name="env/mettagrid/arena/basic").env.mettagrid.arena
+    OmegaConf.set_struct(cfg, False)
+    cfg.game.num_agents = AGENTS_PER_ENV
+    return cfg
+
+
+def test_candidate_plays_every_opponent_in_the_pool(env_cfg, tmp_path):
+    candidate = make_pr("candidate", 1)
+    opponents = {f"opponent_{i}": make_pr(f"opponent_{i}", 2 + i) for i in range(3)}
+    config = SingleEnvSimulationConfig(
+        env="arena/basic",
+        num_episodes=1,
+        npc_policy_uris=list(opponents),
+        policy_agents_pct=0.5,
+        env_overrides={"_pre_built_env_config": env_cfg},
+    )
+    sim = Simulation(
+        "pool",
+        config,
+        candidate,
+        FakePolicyStore(opponents),  # type: ignore
+        device=torch.device("cpu"),
+        vectorization="serial",
+        stats_dir=str(tmp_path),
+    )
+
+    sim.start_simulation()
+    actions = sim.generate_actions().reshape(-1, AGENTS_PER_ENV, 2)
+    sim._vecenv.close()
+    sim._stats_writer.close()
+
+    # Every env has the same layout: the candidate, then the opponents in turn.
+    np.testing.assert_array_equal(actions[:, :, 0], np.tile([1, 1, 1, 2, 3, 4], (actions.shape[0], 1)))
+    assert sim._agent_prs == [candidate] * 3 + list(opponents.values())
+
+    # One batched forward per policy, over all of its agents.
+    num_envs = actions.shape[0]
+    assert candidate.policy.batch_sizes == [3 * num_envs]
+    assert [pr.policy.batch_sizes for pr in opponents.values()] == [[num_envs]] * 3
+
+
+def test_pool_larger_than_opponent_slots_is_rejected(env_cfg, tmp_path):
+    opponents = {f"opponent_{i}": make_pr(f"opponent_{i}", 2 + i) for i in range(4)}
+    config = SingleEnvSimulationConfig(
+        env="arena/basic",
+        num_episodes=1,
+        npc_policy_uris=list(opponents),
+        policy_agents_pct=0.5,
+        env_overrides={"_pre_built_env_config": env_cfg},
+    )
+    with pytest.raises(ValueError, match="fewer than the 4 opponents"):
+        Simulation(
+            "pool",
+            config,
+            make_pr("candidate", 1),
+            FakePolicyStore(opponents),  # type: ignore
+            device=torch.device("cpu"),
+            vectorization="serial",
+            stats_dir=str(tmp_path),
+        )
+
+
+def test_candidate_as_its_own_opponent_shares_a_forward_pass(env_cfg, tmp_path):
+    candidate = make_pr("candidate", 1)
+    config = SingleEnvSimulationConfig(
+        env="arena/basic",
+        num_episodes=1,
+        npc_policy_uri=candidate.uri,
+        policy_agents_pct=0.5,
+        env_overrides={"_pre_built_env_config": env_cfg},
+    )
+    sim = Simulation(
+        "self_play",
+        config,
+        candidate,
+        FakePolicyStore({candidate.uri: candidate}),  # type: ignore
+        device=torch.device("cpu"),
+        vectorization="serial",
+        stats_dir=str(tmp_path),
+    )
+
+    sim.start_simulation()
+    actions = sim.generate_actions()
+    sim._vecenv.close()
+    sim._stats_writer.close()
+
+    np.testing.assert_array_equal(actions[:, 0], 1)
+    assert candidate.policy.batch_sizes == [AGENTS_PER_ENV]
+
+
+def test_policies_run_in_a_policy_server(env_cfg, tmp_path):
+    served = {"candidate": make_pr("candidate", 1), "opponent": make_pr("opponent", 2)}
+    server_store = FakePolicyStore({pr.uri: pr for pr in served.values()})
+    server = PolicyServer(server_store, str(tmp_path / "policy.sock"))  # type: ignore
+    server.start()
+
+    # The simulation's own records are never loaded: the server's copies act instead.
+    candidate = make_pr("candidate", 7)
+    config = SingleEnvSimulationConfig(
+        env="arena/basic",
+        num_episodes=1,
+        npc_policy_uri=served["opponent"].uri,
+        policy_agents_pct=0.5,
+        policy_server=server.address,
+        env_overrides={"_pre_built_env_config": env_cfg},
+    )
+    sim = Simulation(
+        "remote",
+        config,
+        candidate,
+        FakePolicyStore({served["opponent"].uri: make_pr("opponent", 8)}),  # type: ignore
+        device=torch.device("cpu"),
+        vectorization="serial",
+        stats_dir=str(tmp_path),
+    )
+
+    sim.start_simulation()
+    actions = sim.generate_actions()
+    for group in sim._policy_groups:
+        group.policy.close()
+    sim._vecenv.close()
+    sim._stats_writer.close()
+    server.close()
+
+    np.testing.assert_array_equal(actions.reshape(-1, AGENTS_PER_ENV, 2)[0, :, 0], [1, 1, 1, 2, 2, 2])
+    assert candidate.policy.batch_sizes == []
+    assert served["candidate"].policy.batch_sizes == [3]
+    assert served["opponent"].policy.batch_sizes == [3]
+
+
+class RecordingStatsClient:
+    """Hands out a policy id per name and keeps the episode batches it's sent."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_policy_ids(self, policy_names):
+        return SimpleNamespace(policy_ids={name: uuid.uuid5(uuid.NAMESPACE_DNS, name) for name in policy_names})
+
+    def record_episodes(self, **batch):
+        self.batches.append(batch)
+
+
+def test_episodes_are_uploaded_in_one_batch(env_cfg, tmp_path):
+    env_cfg.game.max_steps = 2
+    candidate = make_pr("candidate", 1)
+    opponent = make_pr("opponent", 2)
+    stats_client = RecordingStatsClient()
+    config = SingleEnvSimulationConfig(
+        env="arena/basic",
+        num_episodes=3,
+        npc_policy_uri=opponent.uri,
+        policy_agents_pct=0.5,
+        env_overrides={"_pre_built_env_config": env_cfg},
+    )
+    sim = Simulation(
+        "upload",
+        config,
+        candidate,
+        FakePolicyStore({opponent.uri: opponent}),  # type: ignore
+        device=torch.device("cpu"),
+        vectorization="serial",
+        stats_dir=str(tmp_path),
+        stats_client=stats_client,  # type: ignore
+        episode_tags=["nightly"],
+    )
+    sim.simulate()
+
+    [batch] = stats_client.batches
+    num_episodes = len(batch["replay_urls"])
+    assert num_episodes >= 3
+    assert len(batch["attributes"]) == num_episodes
+    assert batch["policy_episodes"] == [e for e in range(num_episodes) for _ in range(AGENTS_PER_ENV)]
+    assert batch["policy_agent_ids"] == list(range(AGENTS_PER_ENV)) * num_episodes
+    candidate_id, opponent_id = uuid.uuid5(uuid.NAMESPACE_DNS, "candidate"), uuid.uuid5(uuid.NAMESPACE_DNS, "opponent")
+    assert batch["policy_ids"][:AGENTS_PER_ENV] == [candidate_id] * 3 + [opponent_id] * 3
+    assert batch["primary_policy_id"] == candidate_id
+    assert batch["eval_name"] == "upload"
+    assert batch["tags"] == ["nightly"]
+
+    metric_columns = [batch[c] for c in ("metric_episodes", "metric_agent_ids", "metric_names", "metric_values")]
+    assert len({len(column) for column in metric_columns}) == 1
+    assert set(batch["metric_episodes"]) == set(range(num_episodes))
+    assert all(isinstance(value, float) for value in batch["metric_values"])
@@ -0,0 +1,50 @@
+#!/usr/bin/env -S uv run
+# Serves batched forward passes to every simulation on this node that's configured with `policy_server=<address>`,
+# e.g. `./tools/sim.py sim.policy_server=./train_dir/policy_server/policy_server.sock`, so they share one copy of each
+# policy. They authenticate with the key the server writes next to the socket, so they must run as the same user. See
+# metta/sim/policy_server.py.
+
+import logging
+from pathlib import Path
+
+import torch
+from omegaconf import DictConfig, OmegaConf
+
+from metta.agent.policy_store import PolicyStore
+from metta.common.util.config import Config
+from metta.sim.policy_server import PolicyServer
+from metta.util.metta_script import metta_script
+
+
+class PolicyServerJob(Config):
+    __init__ = Config.__init__
+    address: str  # Path of the Unix socket to listen on
+    max_batch_size: int = 4096
+    max_wait_s: float = 0.002
+
+
+def main(cfg: DictConfig) -> None:
+    logger = logging.getLogger("tools.policy_server")
+    logger.info(f"tools.policy_server job config:\n{OmegaConf.to_yaml(cfg, resolve=True)}")
+    job = PolicyServerJob(cfg.policy_server_job)
+
+    # A socket left behind by a previous server would make listening fail.
+    address = Path(job.address)
+    address.parent.mkdir(parents=True, exist_ok=True)
+    address.unlink(missing_ok=True)
+
+    server = PolicyServer(
+        PolicyStore(cfg, None),
+        str(address),
+        device=torch.device(cfg.device),
+        max_batch_size=job.max_batch_size,
+        max_wait_s=job.max_wait_s,
+    )
+    try:
+        server.serve_forever()
+    finally:
+        server.close()
+        address.unlink(missing_ok=True)
+
+
+metta_script(main, "policy_server_job")